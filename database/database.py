@@ -1,5 +1,7 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -13,6 +15,18 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("No DATABASE_URL found in environment variables. Please create a .env file.")
 
+# The async engine talks to the same database through asyncpg. It can be pointed
+# elsewhere with ASYNC_DATABASE_URL; otherwise the driver in DATABASE_URL is swapped.
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or str(
+    make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+)
+
+# Connection pool settings for the async engine.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 30))  # Seconds before a query is abandoned
+
 # Create the SQLAlchemy engine for PostgreSQL
 # The connect_args for 'check_same_thread' is specific to SQLite and not needed for PostgreSQL.
 engine = create_engine(
@@ -25,6 +39,22 @@ engine = create_engine(
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and sessions used by the API routes. The sync engine above is
+# kept for scripts such as database/create_admin.py.
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    connect_args={"command_timeout": DB_COMMAND_TIMEOUT} if "asyncpg" in ASYNC_SQLALCHEMY_DATABASE_URL else {},
+)
+
+# expire_on_commit=False keeps loaded attributes usable after commit, since
+# async sessions cannot lazily reload them during response serialization.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Create a Base class
 Base = declarative_base()
 
@@ -35,3 +65,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Function to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
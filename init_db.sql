@@ -16,6 +16,7 @@ VALUES (
         "can_manage_ips": true,
         "can_view_all_logs": true,
         "can_view_logs": true,
+        "can_ingest_logs": true,
         "can_setup_alerts": true,
         "can_view_alerts": true,
         "can_view_dashboard": true,
@@ -36,6 +37,7 @@ VALUES (
         "can_manage_ips": false,
         "can_view_all_logs": false,
         "can_view_logs": true,
+        "can_ingest_logs": false,
         "can_setup_alerts": false,
         "can_view_alerts": true,
         "can_view_dashboard": true,
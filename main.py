@@ -1,11 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import your API routers
-from routes import auth, users, roles, discover, templates, indices
+from routes import auth, users, roles, discover, templates, indices, dashboards, alerts, ips, ingest, lifecycle, query_limits
+from services import opensearch_service, index_catalog, field_catalog, rollup_service, alert_service, percolator_service, ip_list_service, ingest_service, syslog_receiver, lifecycle_service, template_builder, query_guard, search_scheduler, search_job_service
+from services.result_cache import result_cache
+from services.single_flight import search_flights
+from database.database import async_engine
+from utils.principal_cache import principal_cache
+from utils.hashing import hashing_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens shared connections on startup and closes them on shutdown."""
+    await opensearch_service.connect()
+    template_builder.start(lambda: opensearch_service.client)
+    index_catalog.start(lambda: opensearch_service.client)
+    field_catalog.start(lambda: opensearch_service.client)
+    query_guard.start()
+    search_job_service.start()
+    rollup_service.start(lambda: opensearch_service.client)
+    alert_service.start(lambda: opensearch_service.client)
+    percolator_service.start(lambda: opensearch_service.client)
+    ip_list_service.start()
+    ingest_service.start(lambda: opensearch_service.client)
+    await syslog_receiver.start()
+    lifecycle_service.start(lambda: opensearch_service.client)
+    try:
+        yield
+    finally:
+        await search_job_service.stop()
+        await lifecycle_service.stop()
+        await syslog_receiver.stop()
+        await ingest_service.stop()
+        await ip_list_service.stop()
+        await percolator_service.stop()
+        await alert_service.stop()
+        await rollup_service.stop()
+        await index_catalog.stop()
+        await field_catalog.stop()
+        await query_guard.stop()
+        await template_builder.stop()
+        await opensearch_service.disconnect()
+        await async_engine.dispose()
 
-app = FastAPI(title="SC-SIEM-Corvette API")
+
+app = FastAPI(title="SC-SIEM-Corvette API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,12 +66,41 @@ app.include_router(roles.router, prefix="/api/v1/roles", tags=["Roles"])
 app.include_router(discover.router, prefix="/api/v1/discover", tags=["Discover"])
 app.include_router(templates.router, prefix="/api/v1", tags=["Templates"])
 app.include_router(indices.router, prefix="/api/v1/indices", tags=["Indices"])
+app.include_router(dashboards.router, prefix="/api/v1/dashboards", tags=["Dashboards"])
+app.include_router(alerts.router, prefix="/api/v1/alerts", tags=["Alerts"])
+app.include_router(ips.router, prefix="/api/v1/ips", tags=["IPs"])
+app.include_router(ingest.router, prefix="/api/v1/ingest", tags=["Ingest"])
+app.include_router(lifecycle.router, prefix="/api/v1/lifecycle", tags=["Lifecycle"])
+app.include_router(query_limits.router, prefix="/api/v1/query-limits", tags=["Query Limits"])
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """In-process counters for the caches and limiters of this worker."""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": hashing_stats(),
+        "index_catalog": index_catalog.catalog.stats(),
+        "field_catalog": field_catalog.catalog.stats(),
+        "result_cache": result_cache.stats(),
+        "search_single_flight": search_flights.stats(),
+        "dashboard_rollups": rollup_service.stats(),
+        "alerting": alert_service.stats(),
+        "alert_percolator": percolator_service.stats(),
+        "ip_lists": ip_list_service.ip_index.stats(),
+        "ingest": ingest_service.stats(),
+        "syslog": syslog_receiver.stats(),
+        "index_lifecycle": lifecycle_service.stats(),
+        "query_guard": query_guard.stats(),
+        "search_scheduler": search_scheduler.scheduler.stats(),
+        "search_jobs": search_job_service.stats(),
+    }
+
+
 # --- FINAL DIAGNOSTIC: Print all registered routes --- #
 print("\n--- Final Registered Application Routes ---")
 for route in app.routes:
@@ -3,4 +3,10 @@
 # Import all models here to ensure SQLAlchemy's registry is aware of them
 # before any relationships are configured.
 from .role import Role
-from .user import User
\ No newline at end of file
+from .user import User
+from .dashboard import Dashboard, DashboardPanel, RollupBucket, RollupWatermark
+from .alert import AlertRule, Alert, AlertWindowCount
+from .ip_list import IPListEntry, IPListChange
+from .lifecycle import LifecyclePolicy
+from .query_limit import QueryLimit
+from .search_job import SearchJob
\ No newline at end of file
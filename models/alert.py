@@ -0,0 +1,91 @@
+# sc-siem-corvette/models/alert.py
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from database.database import Base
+
+
+class AlertRule(Base):
+    """
+    A saved search that raises an alert when it matches at least `threshold`
+    events within one evaluation window. Rules are evaluated every
+    `interval_seconds`, each run only covering the time since `watermark`.
+    """
+    __tablename__ = "alert_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    client_id = Column(String, nullable=True, index=True)  # None: rule spans every client (admin only)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=True)
+
+    index_pattern = Column(String, nullable=False)
+    query = Column(JSON, nullable=False, default=dict)    # Same shape as DiscoverRequest.query
+    filters = Column(JSON, nullable=True)                 # Same shape as DiscoverRequest.filters
+    group_by = Column(String, nullable=True)              # Optional field; raises one alert per value
+    threshold = Column(Integer, nullable=False, default=1)
+    interval_seconds = Column(Integer, nullable=False, default=60)
+    severity = Column(String, nullable=False, default="medium")
+    # A new match for an alert that is still open within this window updates it instead of raising another.
+    dedup_window_seconds = Column(Integer, nullable=False, default=3600)
+    enabled = Column(Boolean, nullable=False, default=True)
+    # 'poll': evaluated by the scheduler over time windows; 'percolate': matched against documents as they are ingested.
+    mode = Column(String, nullable=False, default="poll")
+
+    watermark = Column(DateTime(timezone=True), nullable=False)  # End (exclusive) of the last evaluated window
+    last_evaluated_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)  # Set while a worker evaluates the rule
+
+    alerts = relationship("Alert", back_populates="rule", cascade="all, delete-orphan", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<AlertRule(id={self.id}, name='{self.name}', client_id='{self.client_id}')>"
+
+
+class Alert(Base):
+    """
+    A raised alert. Repeated matches with the same rule and dedup key are
+    folded into one alert while it stays open.
+    """
+    __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_dedup", "rule_id", "dedup_key", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    rule_id = Column(Integer, ForeignKey('alert_rules.id', ondelete="CASCADE"), nullable=False, index=True)
+    client_id = Column(String, nullable=True, index=True)
+    dedup_key = Column(String, nullable=False, default="")  # group_by value, or "" for ungrouped rules
+    status = Column(String, nullable=False, default="open")  # 'open', 'acknowledged' or 'resolved'
+    severity = Column(String, nullable=False)
+    message = Column(Text, nullable=True)
+
+    event_count = Column(BigInteger, nullable=False, default=0)  # Matching events across all occurrences
+    occurrences = Column(Integer, nullable=False, default=1)     # Windows in which the rule matched
+    first_seen = Column(DateTime(timezone=True), nullable=False)
+    last_seen = Column(DateTime(timezone=True), nullable=False)
+    window_start = Column(DateTime(timezone=True), nullable=True)  # Window of the latest occurrence
+    window_end = Column(DateTime(timezone=True), nullable=True)
+
+    rule = relationship("AlertRule", back_populates="alerts")
+
+    def __repr__(self):
+        return f"<Alert(id={self.id}, rule_id={self.rule_id}, status='{self.status}')>"
+
+
+class AlertWindowCount(Base):
+    """
+    Matches of a percolate rule for one dedup key within one interval window,
+    counted by every API worker alike so the threshold sees all of them.
+    """
+    __tablename__ = "alert_window_counts"
+
+    rule_id = Column(Integer, ForeignKey('alert_rules.id', ondelete="CASCADE"), primary_key=True)
+    dedup_key = Column(String, primary_key=True)
+    window_start = Column(DateTime(timezone=True), primary_key=True)  # Of the events' @timestamp, not of ingest
+    window_end = Column(DateTime(timezone=True), nullable=False, index=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    alerted = Column(Boolean, nullable=False, default=False)  # The window already raised its alert
+
+    def __repr__(self):
+        return f"<AlertWindowCount(rule_id={self.rule_id}, dedup_key='{self.dedup_key}', count={self.count})>"
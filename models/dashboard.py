@@ -0,0 +1,75 @@
+# sc-siem-corvette/models/dashboard.py
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from database.database import Base
+
+
+class Dashboard(Base):
+    """
+    A saved dashboard: a named set of panels scoped to a client_id.
+    Dashboards without a client_id are system-wide and only visible to admins.
+    """
+    __tablename__ = "dashboards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    client_id = Column(String, nullable=True, index=True)
+    owner_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+
+    panels = relationship("DashboardPanel", back_populates="dashboard", lazy="selectin",
+                          cascade="all, delete-orphan", order_by="DashboardPanel.position")
+
+    def __repr__(self):
+        return f"<Dashboard(id={self.id}, name='{self.name}', client_id='{self.client_id}')>"
+
+
+class DashboardPanel(Base):
+    """
+    A single chart on a dashboard. Panels are answered from the per-minute
+    rollups rather than from raw logs.
+    """
+    __tablename__ = "dashboard_panels"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dashboard_id = Column(Integer, ForeignKey('dashboards.id', ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    title = Column(String, nullable=False)
+    panel_type = Column(String, nullable=False)  # 'histogram', 'top_n' or 'pie'
+    dimension = Column(String, nullable=True)    # Rollup dimension for top_n/pie panels, e.g. 'host'
+    size = Column(Integer, nullable=False, default=10)
+    interval = Column(String, nullable=True)     # Fixed histogram interval such as '5m'; automatic when empty
+
+    dashboard = relationship("Dashboard", back_populates="panels")
+
+    def __repr__(self):
+        return f"<DashboardPanel(id={self.id}, type='{self.panel_type}', dimension='{self.dimension}')>"
+
+
+class RollupBucket(Base):
+    """
+    Per-minute document count for one value of one dimension of one tenant.
+    The 'total' dimension (with an empty value) holds the overall count.
+    """
+    __tablename__ = "rollup_buckets"
+    __table_args__ = (
+        UniqueConstraint("client_id", "dimension", "value", "bucket_start", name="uq_rollup_bucket"),
+        Index("ix_rollup_lookup", "dimension", "client_id", "bucket_start"),
+        Index("ix_rollup_bucket_start", "bucket_start"),  # Pruning old buckets
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    client_id = Column(String, nullable=True)
+    dimension = Column(String, nullable=False)
+    value = Column(String, nullable=False, default="")
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """End (exclusive) of the time span that has been rolled up so far."""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    rolled_up_to = Column(DateTime(timezone=True), nullable=False)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)  # Set while a worker rolls up the next span
@@ -0,0 +1,39 @@
+# sc-siem-corvette/models/ip_list.py
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, UniqueConstraint, func
+from database.database import Base
+
+
+class IPListEntry(Base):
+    """
+    A CIDR on a tenant's allow or deny list. Entries without a client_id are
+    global and apply to every tenant.
+    """
+    __tablename__ = "ip_list_entries"
+    __table_args__ = (
+        UniqueConstraint("client_id", "list_type", "cidr", name="uq_ip_list_entry"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(String, nullable=True, index=True)
+    list_type = Column(String, nullable=False)  # 'allow' or 'deny'
+    cidr = Column(String, nullable=False)       # Normalized network, e.g. '10.0.0.0/8'
+    description = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<IPListEntry(id={self.id}, {self.list_type} {self.cidr}, client_id='{self.client_id}')>"
+
+
+class IPListChange(Base):
+    """
+    Append-only log of list changes. Each API worker replays it to update its
+    in-memory lookup index incrementally instead of reloading every entry.
+    """
+    __tablename__ = "ip_list_changes"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    client_id = Column(String, nullable=True)
+    list_type = Column(String, nullable=False)
+    cidr = Column(String, nullable=False)
+    op = Column(String, nullable=False)  # 'add' or 'remove'
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,29 @@
+# sc-siem-corvette/models/lifecycle.py
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from database.database import Base
+
+
+class LifecyclePolicy(Base):
+    """
+    Lifecycle of the daily indices ('<index_prefix>-YYYY-MM-DD') created from
+    one index template. Ages are whole UTC days since the index's date; a
+    None age disables that step.
+    """
+    __tablename__ = "lifecycle_policies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template_name = Column(String, unique=True, nullable=False)
+    index_prefix = Column(String, unique=True, nullable=False)
+
+    create_ahead = Column(Boolean, nullable=False, default=True)         # Create tomorrow's index today
+    force_merge_after_days = Column(Integer, nullable=True, default=1)   # Merge to one segment per shard
+    read_only_after_days = Column(Integer, nullable=True, default=7)     # Block writes and drop replicas
+    read_only_replicas = Column(Integer, nullable=False, default=0)
+    delete_after_days = Column(Integer, nullable=True, default=30)
+    enabled = Column(Boolean, nullable=False, default=True)
+
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<LifecyclePolicy(id={self.id}, template_name='{self.template_name}', index_prefix='{self.index_prefix}')>"
@@ -0,0 +1,26 @@
+# sc-siem-corvette/models/query_limit.py
+from sqlalchemy import Column, Integer, String, Float
+from database.database import Base
+
+
+class QueryLimit(Base):
+    """
+    Query cost thresholds of one tenant. The row without a client_id applies
+    to every tenant that has no row of its own; a None column falls back to
+    the server default.
+    """
+    __tablename__ = "query_limits"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(String, unique=True, nullable=True)
+
+    max_cost = Column(Float, nullable=True)          # Rejected above this, even after downgrading
+    downgrade_cost = Column(Float, nullable=True)    # Downgraded above this
+    max_size = Column(Integer, nullable=True)        # Most hits (from + size) one page may ask for
+    timeout_seconds = Column(Float, nullable=True)   # Search timeout; partial results are returned
+    terminate_after = Column(Integer, nullable=True)  # Documents collected per shard; 0 disables
+    max_in_flight = Column(Integer, nullable=True)   # Concurrent OpenSearch calls (search scheduler)
+    weight = Column(Float, nullable=True)            # Share of contended slots relative to other tenants
+
+    def __repr__(self):
+        return f"<QueryLimit(id={self.id}, client_id='{self.client_id}')>"
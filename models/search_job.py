@@ -0,0 +1,39 @@
+# sc-siem-corvette/models/search_job.py
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, JSON, ForeignKey
+from database.database import Base
+
+
+class SearchJob(Base):
+    """
+    A Discover search run in the background over its time range, one window
+    at a time. Progress is saved after every window and the merged results
+    every few windows, so they can be polled while the job runs; they are
+    kept until expires_at.
+    """
+    __tablename__ = "search_jobs"
+
+    id = Column(String, primary_key=True)  # Random token handed to the submitter
+    client_id = Column(String, nullable=True, index=True)  # None: spans every client (admin only)
+    created_by = Column(Integer, ForeignKey('users.id', ondelete="SET NULL"), nullable=True)
+    index_pattern = Column(String, nullable=False)
+    request = Column(JSON, nullable=False)  # The submitted DiscoverRequest
+
+    status = Column(String, nullable=False, default="running")  # 'running', 'completed', 'failed' or 'cancelled'
+    windows_total = Column(Integer, nullable=False, default=0)
+    windows_done = Column(Integer, nullable=False, default=0)
+
+    hits = Column(JSON, nullable=True)          # Best hits so far, as returned by OpenSearch (with sort values)
+    total = Column(BigInteger, nullable=False, default=0)
+    aggregations = Column(JSON, nullable=True)  # Merged over the windows searched so far
+    timed_out = Column(Boolean, nullable=False, default=False)
+    failed_shards = Column(Integer, nullable=False, default=0)
+    downgrades = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)  # Advances with every window; stale jobs are failed
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SearchJob(id='{self.id}', client_id='{self.client_id}', status='{self.status}')>"
@@ -5,6 +5,11 @@ from . import users
 from . import roles
 from . import ips
 from . import indices
+from . import dashboards
+from . import alerts
+from . import ingest
+from . import lifecycle
+from . import query_limits
 
 # Explicitly declare the public API of the 'routes' package.
-__all__ = ["auth", "users", "roles", "ips", "indices"]
+__all__ = ["auth", "users", "roles", "ips", "indices", "dashboards", "alerts", "ingest", "lifecycle", "query_limits"]
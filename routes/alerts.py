@@ -0,0 +1,222 @@
+# sc-siem-corvette/routes/alerts.py
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_async_db
+from models.alert import AlertRule, Alert
+from schemas.alert import AlertRuleCreate, AlertRuleUpdate, AlertRuleResponse, AlertResponse
+from services import percolator_service, filter_compiler
+from utils.security import get_current_user
+from utils.principal_cache import Principal
+from utils.permissions import Permissions
+
+router = APIRouter()
+
+
+def _is_admin(current_user: Principal) -> bool:
+    return current_user.has_permission(Permissions.CAN_MANAGE_INDICES)
+
+
+def authorize_alert_access(current_user: Principal, permission: Permissions, client_id: Optional[str]):
+    """
+    Requires the given alert permission. Admins may manage rules and alerts of
+    any client (or none, spanning all clients); everyone else only those of
+    their own client_id.
+    """
+    if not current_user.has_permission(permission):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not enough permissions. Requires {permission.value}."
+        )
+    if _is_admin(current_user):
+        return
+    if not current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with a client_id."
+        )
+    if client_id != current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not permitted to access alerts for the requested client_id."
+        )
+
+
+def _scope(query, model, current_user: Principal):
+    """Restricts a query to the current user's client_id unless they are an admin."""
+    if _is_admin(current_user):
+        return query
+    return query.filter(model.client_id == current_user.client_id)
+
+
+async def _sync_percolator(rule: AlertRule, was_percolated: bool):
+    """
+    Keeps the percolator index in line with a saved rule. Registration failures
+    are reported to the caller (before the rule is committed); removal is best effort.
+    """
+    if rule.mode == "percolate" and rule.enabled:
+        try:
+            await percolator_service.register_rule(rule)
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not register the rule with the percolator: {e}"
+            )
+    elif was_percolated:
+        try:
+            await percolator_service.unregister_rule(rule.id)
+        except Exception as e:
+            print(f"WARNING: Could not remove rule {rule.id} from the percolator: {e}")
+
+
+async def _get_rule(db: AsyncSession, rule_id: int, current_user: Principal, permission: Permissions) -> AlertRule:
+    rule = (await db.execute(select(AlertRule).filter(AlertRule.id == rule_id))).scalars().first()
+    if rule is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert rule not found")
+    authorize_alert_access(current_user, permission, rule.client_id)
+    return rule
+
+
+# --- Rules ---
+
+@router.post("/rules", response_model=AlertRuleResponse, status_code=status.HTTP_201_CREATED)
+async def create_alert_rule(
+    rule: AlertRuleCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Creates an alert rule. Requires 'can_setup_alerts'.
+    The rule only considers events from its creation onwards.
+    """
+    client_id = rule.client_id if _is_admin(current_user) else current_user.client_id
+    authorize_alert_access(current_user, Permissions.CAN_SETUP_ALERTS, client_id)
+    filter_compiler.validate_filters(rule.filters)
+
+    data = rule.model_dump()
+    data["client_id"] = client_id
+    new_rule = AlertRule(**data, created_by=current_user.user_id, watermark=datetime.now(timezone.utc))
+    db.add(new_rule)
+    await db.flush()
+    await _sync_percolator(new_rule, was_percolated=False)
+    await db.commit()
+    await db.refresh(new_rule)
+    return new_rule
+
+
+@router.get("/rules", response_model=List[AlertRuleResponse])
+async def get_alert_rules(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Lists the alert rules visible to the current user. Requires 'can_view_alerts'."""
+    authorize_alert_access(current_user, Permissions.CAN_VIEW_ALERTS, current_user.client_id)
+    query = _scope(select(AlertRule), AlertRule, current_user)
+    return (await db.execute(query.order_by(AlertRule.id))).scalars().all()
+
+
+@router.get("/rules/{rule_id}", response_model=AlertRuleResponse)
+async def get_alert_rule(
+    rule_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return await _get_rule(db, rule_id, current_user, Permissions.CAN_VIEW_ALERTS)
+
+
+@router.put("/rules/{rule_id}", response_model=AlertRuleResponse)
+async def update_alert_rule(
+    rule_id: int,
+    update: AlertRuleUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Updates an alert rule. Requires 'can_setup_alerts'."""
+    rule = await _get_rule(db, rule_id, current_user, Permissions.CAN_SETUP_ALERTS)
+    was_percolated = rule.mode == "percolate" and rule.enabled
+    changes = update.model_dump(exclude_unset=True)
+    filter_compiler.validate_filters(update.filters)
+    if changes.get("enabled") and not rule.enabled:
+        # A re-enabled rule starts from now rather than replaying the time it was off.
+        rule.watermark = datetime.now(timezone.utc)
+    elif changes.get("mode") == "poll" and rule.mode == "percolate":
+        # Percolation already matched the events so far; polling them again would alert twice.
+        rule.watermark = datetime.now(timezone.utc)
+    for field, value in changes.items():
+        setattr(rule, field, value)
+    await _sync_percolator(rule, was_percolated)
+    await db.commit()
+    await db.refresh(rule)
+    return rule
+
+
+@router.delete("/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_alert_rule(
+    rule_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Deletes an alert rule and its alerts. Requires 'can_setup_alerts'."""
+    rule = await _get_rule(db, rule_id, current_user, Permissions.CAN_SETUP_ALERTS)
+    if rule.mode == "percolate":
+        rule.enabled = False
+        await _sync_percolator(rule, was_percolated=True)
+    await db.delete(rule)
+    await db.commit()
+
+
+# --- Alerts ---
+
+@router.get("/", response_model=List[AlertResponse])
+async def get_alerts(
+    alert_status: Optional[str] = Query(None, alias="status", description="'open', 'acknowledged' or 'resolved'"),
+    rule_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Lists alerts visible to the current user, newest first. Requires 'can_view_alerts'."""
+    authorize_alert_access(current_user, Permissions.CAN_VIEW_ALERTS, current_user.client_id)
+    query = _scope(select(Alert), Alert, current_user)
+    if alert_status:
+        query = query.filter(Alert.status == alert_status)
+    if rule_id is not None:
+        query = query.filter(Alert.rule_id == rule_id)
+    return (await db.execute(query.order_by(Alert.last_seen.desc()).limit(limit))).scalars().all()
+
+
+async def _set_alert_status(db: AsyncSession, alert_id: int, new_status: str, current_user: Principal) -> Alert:
+    alert = (await db.execute(select(Alert).filter(Alert.id == alert_id))).scalars().first()
+    if alert is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert not found")
+    authorize_alert_access(current_user, Permissions.CAN_VIEW_ALERTS, alert.client_id)
+    alert.status = new_status
+    await db.commit()
+    await db.refresh(alert)
+    return alert
+
+
+@router.post("/{alert_id}/acknowledge", response_model=AlertResponse)
+async def acknowledge_alert(
+    alert_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Marks an alert as acknowledged. Further matches keep updating it until it is resolved."""
+    return await _set_alert_status(db, alert_id, "acknowledged", current_user)
+
+
+@router.post("/{alert_id}/resolve", response_model=AlertResponse)
+async def resolve_alert(
+    alert_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Resolves an alert. The next match raises a new alert."""
+    return await _set_alert_status(db, alert_id, "resolved", current_user)
@@ -1,60 +1,73 @@
-# sc-siem-corvette/routes/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-
-from database.database import get_db
-from models.user import User
-from utils.hashing import verify_password
-from utils.security import create_access_token, create_refresh_token, get_current_user
-from schemas.token import Token
-
-router = APIRouter()
-
-
-@router.post("/login", response_model=Token)
-async def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
-):
-    """
-    Authenticates a user and returns both an access and a refresh token.
-    """
-    user = db.query(User).filter(User.username == form_data.username).first()
-
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    if not user.is_active:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
-
-    # Prepare data for the token, now including client_id
-    token_data = {"sub": user.username, "client_id": user.client_id}
-    access_token = create_access_token(data=token_data)
-    refresh_token = create_refresh_token(data=token_data)
-
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
-
-
-@router.post("/refresh", response_model=Token)
-async def refresh_access_token(current_user: User = Depends(get_current_user)):
-    """
-    Takes a valid refresh token and returns a new access and refresh token pair.
-    """
-    token_data = {"sub": current_user.username, "client_id": current_user.client_id}
-    new_access_token = create_access_token(data=token_data)
-    new_refresh_token = create_refresh_token(data=token_data)
-    
-    return {
-        "access_token": new_access_token,
-        "refresh_token": new_refresh_token,
-        "token_type": "bearer"
-    }
+# sc-siem-corvette/routes/auth.py
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_async_db
+from models.user import User
+from utils.hashing import verify_and_update_password_async
+from utils.security import create_access_token, create_refresh_token, get_current_user
+from utils.principal_cache import Principal
+from schemas.token import Token
+
+router = APIRouter()
+
+
+@router.post("/login", response_model=Token)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Authenticates a user and returns both an access and a refresh token.
+    """
+    user = (await db.execute(select(User).filter(User.username == form_data.username))).scalars().first()
+
+    # Verification runs on the bcrypt pool so logins don't stall other requests.
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+
+    if new_hash:
+        # The stored hash used outdated cost parameters; upgrade it transparently.
+        # Only for active accounts, so attempts on a disabled one never write to it.
+        user.hashed_password = new_hash
+        await db.commit()
+
+    # Prepare data for the token, now including client_id
+    token_data = {"sub": user.username, "client_id": user.client_id}
+    access_token = create_access_token(data=token_data)
+    refresh_token = create_refresh_token(data=token_data)
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(current_user: Principal = Depends(get_current_user)):
+    """
+    Takes a valid refresh token and returns a new access and refresh token pair.
+    """
+    token_data = {"sub": current_user.username, "client_id": current_user.client_id}
+    new_access_token = create_access_token(data=token_data)
+    new_refresh_token = create_refresh_token(data=token_data)
+    
+    return {
+        "access_token": new_access_token,
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer"
+    }
@@ -0,0 +1,164 @@
+# sc-siem-corvette/routes/dashboards.py
+from datetime import timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_async_db
+from models.dashboard import Dashboard, DashboardPanel
+from schemas.dashboard import DashboardCreate, DashboardResponse, DashboardDataRequest, DashboardDataResponse
+from services import rollup_service
+from utils.security import get_current_user
+from utils.principal_cache import Principal
+from utils.permissions import Permissions
+from utils.helpers import parse_time_expression
+
+router = APIRouter()
+
+
+def _is_admin(current_user: Principal) -> bool:
+    return current_user.has_permission(Permissions.CAN_MANAGE_INDICES)
+
+
+def authorize_dashboard_access(current_user: Principal, client_id: Optional[str]):
+    """
+    Requires can_view_dashboard. Admins may use dashboards of any client (or
+    none, spanning all clients); everyone else only those of their own client_id.
+    """
+    if not current_user.has_permission(Permissions.CAN_VIEW_DASHBOARD):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_view_dashboard."
+        )
+    if _is_admin(current_user):
+        return
+    if not current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with a client_id."
+        )
+    if client_id != current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not permitted to access dashboards for the requested client_id."
+        )
+
+
+async def _get_dashboard(db: AsyncSession, dashboard_id: int, current_user: Principal) -> Dashboard:
+    dashboard = (await db.execute(select(Dashboard).filter(Dashboard.id == dashboard_id))).scalars().first()
+    if dashboard is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dashboard not found")
+    authorize_dashboard_access(current_user, dashboard.client_id)
+    return dashboard
+
+
+@router.post("/", response_model=DashboardResponse, status_code=status.HTTP_201_CREATED)
+async def create_dashboard(
+    dashboard: DashboardCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Creates a dashboard and its panels. Non-admin users always create
+    dashboards for their own client_id.
+    """
+    client_id = dashboard.client_id if _is_admin(current_user) else current_user.client_id
+    authorize_dashboard_access(current_user, client_id)
+    for panel in dashboard.panels:
+        rollup_service.validate_panel(panel.panel_type, panel.dimension, panel.interval)
+
+    new_dashboard = Dashboard(
+        name=dashboard.name,
+        description=dashboard.description,
+        client_id=client_id,
+        owner_id=current_user.user_id,
+        panels=[
+            DashboardPanel(position=position, **panel.model_dump())
+            for position, panel in enumerate(dashboard.panels)
+        ],
+    )
+    db.add(new_dashboard)
+    await db.commit()
+    await db.refresh(new_dashboard)
+    return new_dashboard
+
+
+@router.get("/", response_model=List[DashboardResponse])
+async def get_dashboards(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Lists the dashboards visible to the current user."""
+    if _is_admin(current_user):
+        authorize_dashboard_access(current_user, None)
+        query = select(Dashboard)
+    else:
+        authorize_dashboard_access(current_user, current_user.client_id)
+        query = select(Dashboard).filter(Dashboard.client_id == current_user.client_id)
+    return (await db.execute(query.order_by(Dashboard.id))).scalars().all()
+
+
+@router.get("/{dashboard_id}", response_model=DashboardResponse)
+async def get_dashboard(
+    dashboard_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return await _get_dashboard(db, dashboard_id, current_user)
+
+
+@router.delete("/{dashboard_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_dashboard(
+    dashboard_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    dashboard = await _get_dashboard(db, dashboard_id, current_user)
+    await db.delete(dashboard)
+    await db.commit()
+
+
+@router.post("/{dashboard_id}/data", response_model=DashboardDataResponse)
+async def get_dashboard_data(
+    dashboard_id: int,
+    request: DashboardDataRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Computes every panel of a dashboard for the given time range from the
+    per-minute rollups. The range is widened to whole minutes; events newer
+    than 'rolled_up_to' are not yet included.
+    """
+    dashboard = await _get_dashboard(db, dashboard_id, current_user)
+
+    start = parse_time_expression(request.time_range.from_)
+    end = parse_time_expression(request.time_range.to, round_up=True)
+    if start is None or end is None or end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid time_range.")
+    start = rollup_service.floor_to_bucket(start)
+    end = rollup_service.floor_to_bucket(end - timedelta(microseconds=1)) + timedelta(seconds=rollup_service.ROLLUP_BUCKET_SECONDS)
+
+    try:
+        panels = [
+            await rollup_service.panel_data(db, panel, dashboard.client_id, start, end)
+            for panel in dashboard.panels
+        ]
+        rolled_up_to = await rollup_service.get_rolled_up_to(db)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+    return {
+        "dashboard_id": dashboard.id,
+        "start": int(start.timestamp() * 1000),
+        "end": int(end.timestamp() * 1000),
+        "rolled_up_to": int(rolled_up_to.timestamp() * 1000) if rolled_up_to else None,
+        "panels": panels,
+    }
@@ -1,35 +1,39 @@
 # sc-siem-corvette/routes/discover.py
+from typing import List, Optional, Tuple, Union
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Project imports
-from database.database import get_db
-from schemas.discover import DiscoverRequest, DiscoverResponse
-from services import opensearch_service
+from schemas.discover import (
+    DiscoverRequest, DiscoverResponse, DiscoverBatchRequest, DiscoverBatchResponse,
+    DiscoverHistogramRequest, DiscoverHistogramResponse,
+    DiscoverFieldsResponse, FieldValuesRequest, FieldValuesResponse,
+    SearchJobSummary, SearchJobResponse,
+)
+from schemas.query_limit import QueryCostEstimate
+from database.database import get_async_db
+from services import opensearch_service, export_service, search_job_service
 from utils.security import get_current_user
-from models.user import User
+from utils.principal_cache import Principal
 from utils.permissions import Permissions
+from utils.helpers import FastJSONResponse
 
 router = APIRouter()
 
 
-@router.post("/", response_model=DiscoverResponse)
-async def discover_logs(
-    request: DiscoverRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+def authorize_discover_request(request: Union[DiscoverRequest, DiscoverHistogramRequest, FieldValuesRequest], current_user: Principal):
     """
-    Fetches raw logs from OpenSearch based on the provided index pattern and filters.
-    Permissions are enforced based on the user's role and client_id.
+    Enforces Discover permissions on a request.
+    Admins may query any client; everyone else needs can_view_logs and may
+    only query their own client_id.
     """
-    # 1. Permission and Client ID validation
-    user_permissions = current_user.role.permissions or {}
-    is_admin = user_permissions.get(Permissions.CAN_MANAGE_INDICES.value, False)
+    is_admin = current_user.has_permission(Permissions.CAN_MANAGE_INDICES)
 
     if not is_admin:
         # Non-admins must have CAN_VIEW_LOGS
-        if not user_permissions.get(Permissions.CAN_VIEW_LOGS.value, False):
+        if not current_user.has_permission(Permissions.CAN_VIEW_LOGS):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions. Requires can_view_logs."
@@ -53,10 +57,27 @@ async def discover_logs(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User is not permitted to view logs for the requested client_id."
             )
+
+
+@router.post("/", response_model=DiscoverResponse)
+async def discover_logs(
+    request: DiscoverRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Fetches raw logs from OpenSearch based on the provided index pattern and filters.
+    Permissions are enforced based on the user's role and client_id.
+    """
+    # 1. Permission and Client ID validation
+    authorize_discover_request(request, current_user)
     
     # 2. Fetch logs from OpenSearch
     # The opensearch_service will handle the actual query and error handling
     try:
+        if opensearch_service.DISCOVER_FAST_RESPONSE:
+            # Hits are already in the response shape; skip model validation.
+            payload = await opensearch_service.fetch_logs(request, raw=True)
+            return FastJSONResponse(payload)
         response = await opensearch_service.fetch_logs(request)
         return response
     except HTTPException as e:
@@ -68,3 +89,278 @@ async def discover_logs(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {e}"
         )
+
+
+@router.post("/batch", response_model=DiscoverBatchResponse)
+async def discover_logs_batch(
+    batch: DiscoverBatchRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Runs several Discover searches in one call (e.g. all panels of a dashboard).
+    Authentication happens once for the whole batch, and the searches are sent
+    to OpenSearch as a single _msearch. Each item carries its own status and
+    error, so one failing search does not fail the others.
+    """
+    if len(batch.requests) > opensearch_service.DISCOVER_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {opensearch_service.DISCOVER_BATCH_MAX_ITEMS} requests."
+        )
+
+    # Items the user may not run are answered with their own error instead of failing the batch.
+    allowed, rejected = [], {}
+    for position, request in enumerate(batch.requests):
+        try:
+            authorize_discover_request(request, current_user)
+            allowed.append(request)
+        except HTTPException as e:
+            allowed.append(None)
+            rejected[position] = {"status": e.status_code, "response": None, "error": e.detail}
+
+    raw = opensearch_service.DISCOVER_FAST_RESPONSE
+    try:
+        items = await opensearch_service.fetch_logs_batch(allowed, raw=raw)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+    for position, item in rejected.items():
+        items[position] = item
+
+    if raw:
+        return FastJSONResponse({"responses": items})
+    return {"responses": items}
+
+
+@router.post("/histogram", response_model=DiscoverHistogramResponse)
+async def discover_histogram(
+    request: DiscoverHistogramRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Returns log counts over time for the Discover histogram bar.
+    The interval is picked from the time range and target_buckets, and the
+    number of buckets is capped no matter what the client asks for.
+    """
+    authorize_discover_request(request, current_user)
+    try:
+        return FastJSONResponse(await opensearch_service.fetch_histogram(request))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@router.post("/cost", response_model=QueryCostEstimate)
+async def discover_cost(
+    request: DiscoverRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Estimates the cost of a search without running it, and reports whether
+    it would be accepted, downgraded (and how) or rejected.
+    """
+    authorize_discover_request(request, current_user)
+    try:
+        return await opensearch_service.estimate_search_cost(request)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@router.get("/fields", response_model=DiscoverFieldsResponse)
+async def discover_fields(
+    index_pattern: str,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Lists the fields of an index pattern for the Discover field sidebar.
+    Served from the cached field catalog rather than the full mapping. Field
+    names come from mappings shared by every tenant writing to the indices and
+    are treated as non-sensitive, so the list is not scoped to a client_id.
+    """
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES) and not current_user.has_permission(Permissions.CAN_VIEW_LOGS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_view_logs."
+        )
+    try:
+        return FastJSONResponse(await opensearch_service.list_fields(index_pattern))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@router.post("/field-values", response_model=FieldValuesResponse)
+async def discover_field_values(
+    request: FieldValuesRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Returns the top values of a field for the Discover field sidebar, counted
+    over a sample of the matching logs instead of the whole time range.
+    """
+    authorize_discover_request(request, current_user)
+    try:
+        return FastJSONResponse(await opensearch_service.fetch_field_values(request))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@router.post("/export")
+async def export_logs(
+    request: DiscoverRequest,
+    format: str = "ndjson",
+    gzip: bool = False,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Streams every log matching the request as NDJSON or CSV.
+    Only one page of hits is held in memory at a time, so exports of any size
+    use the same amount of memory. `fields` selects the exported columns.
+    """
+    authorize_discover_request(request, current_user)
+
+    chunks = await export_service.export_logs(request, fmt=format, compress=gzip)
+
+    filename = f"export.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else export_service.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.delete("/cursor", status_code=status.HTTP_204_NO_CONTENT)
+async def close_cursor(
+    cursor: str,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Releases the point-in-time behind a Discover cursor before its keep-alive runs out.
+    Clients should call this when they stop paging before reaching the last page.
+    Only cursors of the caller's own client can be released (admins: any).
+    """
+    is_admin = current_user.has_permission(Permissions.CAN_MANAGE_INDICES)
+    state = opensearch_service.decode_cursor(cursor, current_user.client_id, any_client=is_admin)
+    await opensearch_service.close_point_in_time(state["pit"])
+
+
+# --- Search Jobs ---
+
+def job_scope(current_user: Principal) -> Tuple[Optional[str], bool]:
+    """
+    Returns (client_id, all_clients) for search job lookups. Admins see every
+    job; everyone else needs can_view_logs and only sees their client's jobs.
+    """
+    if current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
+        return None, True
+    if not current_user.has_permission(Permissions.CAN_VIEW_LOGS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_view_logs."
+        )
+    if not current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with a client_id."
+        )
+    return current_user.client_id, False
+
+
+@router.post("/jobs", response_model=SearchJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_search_job(
+    request: DiscoverRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Starts a Discover search in the background and returns its job right away.
+    For investigations over time ranges too long to answer within one request:
+    the job searches the range window by window, and its merged hits and
+    aggregations can be polled while it runs.
+    """
+    authorize_discover_request(request, current_user)
+    try:
+        job = await search_job_service.submit(db, request, current_user.user_id)
+        return FastJSONResponse(search_job_service.job_payload(job), status_code=status.HTTP_202_ACCEPTED)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@router.get("/jobs", response_model=List[SearchJobSummary])
+async def list_search_jobs(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Lists the search jobs that have not expired yet, newest first, without their results."""
+    client_id, all_clients = job_scope(current_user)
+    jobs = await search_job_service.list_jobs(db, client_id, all_clients)
+    return FastJSONResponse([search_job_service.job_payload(job, with_response=False) for job in jobs])
+
+
+@router.get("/jobs/{job_id}", response_model=SearchJobResponse)
+async def get_search_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Returns a search job with the results merged so far. While the job is
+    running, `progress` tells how much of the time range was searched and the
+    response is flagged as partial.
+    """
+    client_id, all_clients = job_scope(current_user)
+    job = await search_job_service.get_job(db, job_id, client_id, all_clients)
+    return FastJSONResponse(search_job_service.job_payload(job))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=SearchJobResponse)
+async def cancel_search_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stops a running search job. The results found so far stay available until the job expires."""
+    client_id, all_clients = job_scope(current_user)
+    job = await search_job_service.get_job(db, job_id, client_id, all_clients)
+    job = await search_job_service.cancel(db, job)
+    return FastJSONResponse(search_job_service.job_payload(job))
+
+
+@router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_search_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Cancels a search job if it is still running and deletes it with its results."""
+    client_id, all_clients = job_scope(current_user)
+    job = await search_job_service.get_job(db, job_id, client_id, all_clients)
+    await search_job_service.delete_job(db, job)
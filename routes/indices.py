@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List, Dict, Any
 
-from services.opensearch_service import client
+from services import opensearch_service
 from schemas.index import IndexSchema
 from utils.security import require_permission
 from utils.permissions import Permissions
@@ -15,11 +15,7 @@ async def create_index(index: IndexSchema, _=Depends(require_permission(Permissi
     If a template_name is provided, the index will be created without any specific settings or mappings,
     and OpenSearch will apply a matching template.
     """
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="OpenSearch service is not available"
-        )
+    client = opensearch_service.get_client()
     try:
         body = {}
         if not index.template_name:
@@ -27,7 +23,7 @@ async def create_index(index: IndexSchema, _=Depends(require_permission(Permissi
                 "settings": index.settings,
                 "mappings": index.mappings
             }
-        client.indices.create(index=index.index_name, body=body)
+        await client.indices.create(index=index.index_name, body=body)
         return {"message": f"Index '{index.index_name}' created successfully."}
     except Exception as e:
         raise HTTPException(
@@ -40,13 +36,9 @@ async def get_all_indices(_=Depends(require_permission(Permissions.CAN_MANAGE_IN
     """
     Retrieves all indices from OpenSearch.
     """
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="OpenSearch service is not available"
-        )
+    client = opensearch_service.get_client()
     try:
-        indices = client.indices.get(index="*")
+        indices = await client.indices.get(index="*")
         return indices
     except Exception as e:
         raise HTTPException(
@@ -59,13 +51,9 @@ async def get_index(index_name: str, _=Depends(require_permission(Permissions.CA
     """
     Retrieves a specific OpenSearch index.
     """
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="OpenSearch service is not available"
-        )
+    client = opensearch_service.get_client()
     try:
-        index = client.indices.get(index=index_name)
+        index = await client.indices.get(index=index_name)
         return index
     except Exception as e:
         raise HTTPException(
@@ -78,13 +66,9 @@ async def delete_index(index_name: str, _=Depends(require_permission(Permissions
     """
     Deletes a specific OpenSearch index.
     """
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="OpenSearch service is not available"
-        )
+    client = opensearch_service.get_client()
     try:
-        client.indices.delete(index=index_name)
+        await client.indices.delete(index=index_name)
         return {"message": f"Index '{index_name}' deleted successfully."}
     except Exception as e:
         raise HTTPException(
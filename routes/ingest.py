@@ -0,0 +1,83 @@
+# sc-siem-corvette/routes/ingest.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from schemas.ingest import IngestResponse
+from services import ingest_service, syslog_receiver
+from utils.security import get_current_user
+from utils.principal_cache import Principal
+from utils.permissions import Permissions
+
+router = APIRouter()
+
+
+def resolve_ingest_client(current_user: Principal, client_id: Optional[str]) -> str:
+    """
+    Requires can_ingest_logs and returns the client_id stamped on the documents.
+    Admins may ingest for any client; everyone else always ingests for their own.
+    """
+    if not current_user.has_permission(Permissions.CAN_INGEST_LOGS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_ingest_logs."
+        )
+    if current_user.has_permission(Permissions.CAN_MANAGE_INDICES) and client_id:
+        return client_id
+    if not current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A client_id is required to ingest documents."
+        )
+    if client_id and client_id != current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not permitted to ingest documents for the requested client_id."
+        )
+    return current_user.client_id
+
+
+@router.post("/syslog/replay")
+async def replay_refused_syslog(current_user: Principal = Depends(get_current_user)):
+    """
+    Re-processes syslog messages that were refused because their source was
+    not allowed, e.g. after adding it to a source list. Admin only.
+    """
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_manage_indices."
+        )
+    if not ingest_service.ingester.running:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Ingest is not enabled")
+    try:
+        return await syslog_receiver.replay_refused()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while replaying refused syslog messages: {e}"
+        )
+
+
+@router.post("/{source_type}", response_model=IngestResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_documents(
+    source_type: str,
+    request: Request,
+    client_id: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Accepts newline-delimited JSON documents for indexing into daily
+    '<source_type>-YYYY-MM-DD' indices. Requires 'can_ingest_logs'.
+    Responds once the documents are buffered; 429 means retry later.
+    """
+    client_id = resolve_ingest_client(current_user, client_id)
+    try:
+        return await ingest_service.ingest_ndjson(source_type, client_id, request.stream())
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while ingesting documents: {e}"
+        )
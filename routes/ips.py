@@ -0,0 +1,185 @@
+# sc-siem-corvette/routes/ips.py
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_async_db
+from models.ip_list import IPListEntry
+from schemas.ip_list import (
+    IPEntryCreate, IPEntryResponse, IPImportRequest, IPImportResponse, IPCheckRequest, IPCheckResponse,
+)
+from services import ip_list_service
+from services.ip_list_service import ip_index
+from utils.security import get_current_user
+from utils.principal_cache import Principal
+from utils.permissions import Permissions
+
+router = APIRouter()
+
+
+def resolve_ip_client(current_user: Principal, client_id: Optional[str]) -> Optional[str]:
+    """
+    Requires can_manage_ips and returns the client_id whose lists are used.
+    Admins may name any client (or none, for the global lists); everyone else
+    always works on their own client_id.
+    """
+    if not current_user.has_permission(Permissions.CAN_MANAGE_IPS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_manage_ips."
+        )
+    if current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
+        return client_id
+    if not current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with a client_id."
+        )
+    if client_id is not None and client_id != current_user.client_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not permitted to manage IP lists for the requested client_id."
+        )
+    return current_user.client_id
+
+
+def check_source_list(current_user: Principal, list_type: str, client_id: Optional[str]):
+    """
+    Source lists decide which client a syslog sender's messages are indexed
+    under, so only admins may change them, and every entry names a client.
+    """
+    if list_type != "source":
+        return
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Source lists can only be changed by admins."
+        )
+    if client_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Source list entries need a client_id.")
+
+
+def _list_query(client_id: Optional[str], list_type: Optional[str]):
+    query = select(IPListEntry).filter(ip_list_service.client_filter(client_id))
+    if list_type:
+        query = query.filter(IPListEntry.list_type == list_type)
+    return query
+
+
+@router.get("/", response_model=List[IPEntryResponse])
+async def get_ip_entries(
+    client_id: Optional[str] = None,
+    list_type: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Lists the entries of a client's allow and/or deny lists."""
+    client_id = resolve_ip_client(current_user, client_id)
+    query = _list_query(client_id, list_type).order_by(IPListEntry.id).offset(offset).limit(limit)
+    return (await db.execute(query)).scalars().all()
+
+
+@router.post("/", response_model=IPEntryResponse, status_code=status.HTTP_201_CREATED)
+async def create_ip_entry(
+    entry: IPEntryCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Adds one address or CIDR to a list."""
+    client_id = resolve_ip_client(current_user, entry.client_id)
+    check_source_list(current_user, entry.list_type, client_id)
+    network = ip_list_service.parse_cidrs([entry.cidr])[0]
+    if not await ip_list_service.add_entries(db, client_id, entry.list_type, [network], entry.description):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{network} is already on the {entry.list_type} list")
+    await db.commit()
+    await ip_list_service.sync_now()
+    return (await db.execute(
+        _list_query(client_id, entry.list_type).filter(IPListEntry.cidr == str(network))
+    )).scalars().first()
+
+
+@router.delete("/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_ip_entry(
+    entry_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    entry = (await db.execute(select(IPListEntry).filter(IPListEntry.id == entry_id))).scalars().first()
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="IP list entry not found")
+    if resolve_ip_client(current_user, entry.client_id) != entry.client_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="IP list entry not found")
+    check_source_list(current_user, entry.list_type, entry.client_id)
+    await ip_list_service.remove_entries(db, [entry])
+    await db.commit()
+    await ip_list_service.sync_now()
+
+
+@router.post("/import", response_model=IPImportResponse)
+async def import_ip_entries(
+    request: IPImportRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Adds many CIDRs to one list in a single transaction. With replace=true the
+    list ends up containing exactly the imported CIDRs.
+    """
+    client_id = resolve_ip_client(current_user, request.client_id)
+    check_source_list(current_user, request.list_type, client_id)
+    networks = ip_list_service.parse_cidrs(request.cidrs)
+
+    removed = 0
+    if request.replace:
+        keep = {str(network) for network in networks}
+        current = (await db.execute(_list_query(client_id, request.list_type))).scalars().all()
+        stale = [entry for entry in current if entry.cidr not in keep]
+        await ip_list_service.remove_entries(db, stale)
+        removed = len(stale)
+    added = await ip_list_service.add_entries(db, client_id, request.list_type, networks, request.description)
+    await db.commit()
+    await ip_list_service.sync_now()
+    return {"added": added, "removed": removed}
+
+
+@router.get("/export")
+async def export_ip_entries(
+    list_type: str,
+    client_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Returns one list as plain text, one CIDR per line (the format accepted by /import as 'cidrs')."""
+    client_id = resolve_ip_client(current_user, client_id)
+    cidrs = (await db.execute(
+        select(IPListEntry.cidr)
+        .filter(ip_list_service.client_filter(client_id), IPListEntry.list_type == list_type)
+        .order_by(IPListEntry.cidr)
+    )).scalars().all()
+    return PlainTextResponse("".join(f"{cidr}\n" for cidr in cidrs))
+
+
+@router.post("/check", response_model=IPCheckResponse)
+async def check_ips(
+    request: IPCheckRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Checks many source addresses against the client's lists (and the global
+    lists) in one call, using the in-memory index.
+    """
+    client_id = resolve_ip_client(current_user, request.client_id)
+    if len(request.ips) > ip_list_service.IP_CHECK_MAX_ADDRESSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {ip_list_service.IP_CHECK_MAX_ADDRESSES} addresses can be checked per call."
+        )
+    if not ip_index.loaded:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="IP lists are still loading")
+    allowed, matched = ip_index.check(client_id, request.ips)
+    return {"allowed": allowed, "matched": matched}
@@ -0,0 +1,157 @@
+# sc-siem-corvette/routes/lifecycle.py
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_async_db
+from models.lifecycle import LifecyclePolicy
+from schemas.lifecycle import (
+    LifecyclePolicyCreate, LifecyclePolicyUpdate, LifecyclePolicyResponse,
+    LifecyclePolicyStatus, LifecycleRunResponse,
+)
+from services import opensearch_service, lifecycle_service
+from utils.security import require_permission
+from utils.permissions import Permissions
+
+router = APIRouter()
+require_admin = require_permission(Permissions.CAN_MANAGE_INDICES)
+
+
+async def _get_policy(db: AsyncSession, policy_id: int) -> LifecyclePolicy:
+    policy = (await db.execute(select(LifecyclePolicy).filter(LifecyclePolicy.id == policy_id))).scalars().first()
+    if policy is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lifecycle policy not found")
+    return policy
+
+
+async def _selected_policies(db: AsyncSession, policy_id: Optional[int]) -> List[LifecyclePolicy]:
+    if policy_id is not None:
+        return [await _get_policy(db, policy_id)]
+    return (await db.execute(
+        select(LifecyclePolicy).filter(LifecyclePolicy.enabled.is_(True)).order_by(LifecyclePolicy.id)
+    )).scalars().all()
+
+
+# --- Policies ---
+
+@router.post("/policies", response_model=LifecyclePolicyResponse, status_code=status.HTTP_201_CREATED)
+async def create_policy(
+    policy: LifecyclePolicyCreate,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(require_admin)
+):
+    """Creates the lifecycle policy for one template's daily indices."""
+    lifecycle_service.validate_policy(policy.force_merge_after_days, policy.read_only_after_days, policy.delete_after_days)
+    existing = (await db.execute(select(LifecyclePolicy).filter(
+        (LifecyclePolicy.template_name == policy.template_name) | (LifecyclePolicy.index_prefix == policy.index_prefix)
+    ))).scalars().first()
+    if existing is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A lifecycle policy for this template or index prefix already exists"
+        )
+    new_policy = LifecyclePolicy(**policy.model_dump())
+    db.add(new_policy)
+    await db.commit()
+    await db.refresh(new_policy)
+    return new_policy
+
+
+@router.get("/policies", response_model=List[LifecyclePolicyResponse])
+async def get_policies(db: AsyncSession = Depends(get_async_db), _=Depends(require_admin)):
+    return (await db.execute(select(LifecyclePolicy).order_by(LifecyclePolicy.id))).scalars().all()
+
+
+@router.put("/policies/{policy_id}", response_model=LifecyclePolicyResponse)
+async def update_policy(
+    policy_id: int,
+    update: LifecyclePolicyUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(require_admin)
+):
+    policy = await _get_policy(db, policy_id)
+    for field, value in update.model_dump(exclude_unset=True).items():
+        setattr(policy, field, value)
+    lifecycle_service.validate_policy(policy.force_merge_after_days, policy.read_only_after_days, policy.delete_after_days)
+    await db.commit()
+    await db.refresh(policy)
+    return policy
+
+
+@router.delete("/policies/{policy_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_policy(policy_id: int, db: AsyncSession = Depends(get_async_db), _=Depends(require_admin)):
+    """Deletes a policy. Its indices are left as they are."""
+    await db.delete(await _get_policy(db, policy_id))
+    await db.commit()
+
+
+# --- Status and runs ---
+
+@router.get("/policies/{policy_id}/status", response_model=LifecyclePolicyStatus)
+async def get_policy_status(policy_id: int, db: AsyncSession = Depends(get_async_db), _=Depends(require_admin)):
+    """Lists the policy's daily indices with their age, size, segments and the actions they are due for."""
+    policy = await _get_policy(db, policy_id)
+    try:
+        states = await lifecycle_service.inspect_indices(opensearch_service.get_client(), policy.index_prefix)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while reading index state from OpenSearch: {e}"
+        )
+    today = datetime.now(timezone.utc).date()
+    indices = [
+        {
+            "index": state.name,
+            "age_days": (today - state.day).days,
+            "docs": state.docs,
+            "size_bytes": state.size_bytes,
+            "segments": state.segments,
+            "shards": state.shards,
+            "replicas": state.replicas,
+            "read_only": state.read_only,
+            "pending_actions": [action for action, _ in lifecycle_service.index_actions(policy, state, today)],
+        }
+        for state in sorted(states.values(), key=lambda s: s.day)
+    ]
+    return {"policy": policy, "indices": indices}
+
+
+@router.post("/run", response_model=LifecycleRunResponse)
+async def run_lifecycle(
+    policy_id: Optional[int] = None,
+    dry_run: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(require_admin)
+):
+    """
+    Plans one policy (or all enabled ones). With dry_run=true (the default)
+    nothing is changed; otherwise the plan is applied in the background with
+    the usual pacing and load checks.
+    """
+    policies = await _selected_policies(db, policy_id)
+    os_client = opensearch_service.get_client()
+    try:
+        actions = await lifecycle_service.plan(os_client, policies)
+        load = await lifecycle_service.search_load(os_client)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while planning lifecycle actions: {e}"
+        )
+    if not dry_run and actions:
+        lifecycle_service.run_in_background(os_client, policies)
+    return {
+        "dry_run": dry_run,
+        "actions": [
+            {"policy_id": a.policy_id, "index": a.index, "action": a.action, "reason": a.reason, "status": a.status}
+            for a in actions
+        ],
+        "search_load": load,
+    }
@@ -0,0 +1,83 @@
+# sc-siem-corvette/routes/query_limits.py
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_async_db
+from models.query_limit import QueryLimit
+from schemas.query_limit import QueryLimitCreate, QueryLimitUpdate, QueryLimitResponse
+from services import query_guard
+from utils.security import require_permission
+from utils.permissions import Permissions
+
+router = APIRouter()
+require_admin = require_permission(Permissions.CAN_MANAGE_INDICES)
+
+
+async def _get_limit(db: AsyncSession, limit_id: int) -> QueryLimit:
+    limit = (await db.execute(select(QueryLimit).filter(QueryLimit.id == limit_id))).scalars().first()
+    if limit is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Query limit not found")
+    return limit
+
+
+def _validate(limit):
+    if limit.max_cost is not None and limit.downgrade_cost is not None and limit.downgrade_cost > limit.max_cost:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="downgrade_cost must not be higher than max_cost"
+        )
+
+
+@router.post("/", response_model=QueryLimitResponse, status_code=status.HTTP_201_CREATED)
+async def create_query_limit(
+    limit: QueryLimitCreate,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(require_admin)
+):
+    """Sets the query cost thresholds of a client (or, without client_id, the default for all clients)."""
+    _validate(limit)
+    client_filter = QueryLimit.client_id.is_(None) if limit.client_id is None else QueryLimit.client_id == limit.client_id
+    if (await db.execute(select(QueryLimit).filter(client_filter))).scalars().first() is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Query limits for this client already exist"
+        )
+    new_limit = QueryLimit(**limit.model_dump())
+    db.add(new_limit)
+    await db.commit()
+    await db.refresh(new_limit)
+    await query_guard.reload_now()
+    return new_limit
+
+
+@router.get("/", response_model=List[QueryLimitResponse])
+async def get_query_limits(db: AsyncSession = Depends(get_async_db), _=Depends(require_admin)):
+    return (await db.execute(select(QueryLimit).order_by(QueryLimit.id))).scalars().all()
+
+
+@router.put("/{limit_id}", response_model=QueryLimitResponse)
+async def update_query_limit(
+    limit_id: int,
+    update: QueryLimitUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(require_admin)
+):
+    limit = await _get_limit(db, limit_id)
+    for field, value in update.model_dump(exclude_unset=True).items():
+        setattr(limit, field, value)
+    _validate(limit)
+    await db.commit()
+    await db.refresh(limit)
+    await query_guard.reload_now()
+    return limit
+
+
+@router.delete("/{limit_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_query_limit(limit_id: int, db: AsyncSession = Depends(get_async_db), _=Depends(require_admin)):
+    """Deletes a client's limits; the defaults apply to it again."""
+    await db.delete(await _get_limit(db, limit_id))
+    await db.commit()
+    await query_guard.reload_now()
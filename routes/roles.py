@@ -1,9 +1,11 @@
 # W:/pyProjects/sc-siem-corvette/routes/roles.py
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 from typing import List
 
-from database.database import get_db
+from database.database import get_async_db
 from utils.security import require_permission
 from utils.permissions import Permissions
 from models.role import Role
@@ -24,13 +26,15 @@ async def get_all_permissions():
 @router.post("/", response_model=RoleResponse, status_code=status.HTTP_201_CREATED)
 async def create_role(
     role: RoleCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(require_permission(Permissions.CAN_MANAGE_ROLES))
 ):
     """
     Creates a new role. Requires 'can_manage_roles' permission.
     """
-    existing_role = db.query(Role).filter(Role.name == role.name).first()
+    existing_role = (await db.execute(
+        select(Role).options(noload(Role.users)).filter(Role.name == role.name)
+    )).scalars().first()
     if existing_role:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, 
@@ -46,16 +50,18 @@ async def create_role(
     )
 
     db.add(new_role)
-    db.commit()
-    db.refresh(new_role)
+    await db.commit()
+    await db.refresh(new_role)
 
     return new_role
 
 
 @router.get("/", response_model=List[RoleResponse])
-async def get_roles(db: Session = Depends(get_db)):
+async def get_roles(db: AsyncSession = Depends(get_async_db)):
     """
     Retrieves a list of all roles from the database.
     """
-    roles = db.query(Role).all()
+    # The role's users are not part of the response, so don't load them.
+    result = await db.execute(select(Role).options(noload(Role.users)))
+    roles = result.scalars().all()
     return roles
@@ -1,10 +1,10 @@
 # sc-siem-corvette/routes/templates.py
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database.database import get_db
-from services import opensearch_service
+from services import opensearch_service, template_builder
 from utils.security import get_current_user
-from models.user import User
+from utils.principal_cache import Principal
 from utils.permissions import Permissions
 
 router = APIRouter()
@@ -13,12 +13,10 @@ router = APIRouter()
 async def create_template(
     name: str,
     template: dict,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Creates or updates an index template."""
-    user_permissions = current_user.role.permissions or {}
-    if not user_permissions.get(Permissions.CAN_MANAGE_INDICES.value, False):
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Requires can_manage_indices."
@@ -37,12 +35,10 @@ async def create_template(
 @router.get("/templates/{name}")
 async def get_template(
     name: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Gets an index template."""
-    user_permissions = current_user.role.permissions or {}
-    if not user_permissions.get(Permissions.CAN_MANAGE_INDICES.value, False):
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Requires can_manage_indices."
@@ -61,12 +57,10 @@ async def get_template(
 @router.delete("/templates/{name}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_template(
     name: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Deletes an index template."""
-    user_permissions = current_user.role.permissions or {}
-    if not user_permissions.get(Permissions.CAN_MANAGE_INDICES.value, False):
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Requires can_manage_indices."
@@ -84,12 +78,10 @@ async def delete_template(
 @router.head("/templates/{name}", status_code=status.HTTP_200_OK)
 async def template_exists(
     name: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Checks if an index template exists."""
-    user_permissions = current_user.role.permissions or {}
-    if not user_permissions.get(Permissions.CAN_MANAGE_INDICES.value, False):
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Requires can_manage_indices."
@@ -104,3 +96,63 @@ async def template_exists(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {e}"
         )
+
+
+# --- Profiles ---
+
+def _require_manage_indices(current_user: Principal):
+    if not current_user.has_permission(Permissions.CAN_MANAGE_INDICES):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Requires can_manage_indices."
+        )
+
+
+@router.get("/template-profiles")
+async def get_template_profiles(current_user: Principal = Depends(get_current_user)):
+    """Lists the built-in template profiles."""
+    _require_manage_indices(current_user)
+    return {"profiles": list(template_builder.PROFILES)}
+
+
+@router.get("/template-profiles/{profile}")
+async def get_template_profile(
+    profile: str,
+    name: Optional[str] = None,
+    index_prefix: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Shows the template a profile generates and how it differs from the
+    installed template of the same name (default: the profile name).
+    """
+    _require_manage_indices(current_user)
+    try:
+        return await template_builder.plan_profile(opensearch_service.get_client(), profile, name, index_prefix)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@router.post("/template-profiles/{profile}/apply")
+async def apply_template_profile(
+    profile: str,
+    name: Optional[str] = None,
+    index_prefix: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Registers a profile's template if it differs from the installed one. Existing indices are not changed."""
+    _require_manage_indices(current_user)
+    try:
+        return await template_builder.apply_profile(opensearch_service.get_client(), profile, name, index_prefix)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {e}"
+        )
@@ -1,12 +1,14 @@
 # W:/pyProjects/sc-siem-corvette/routes/users.py
 print("=== Loading users routes ===")
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, noload
 from typing import List
 
 # Database and security imports
-from database.database import get_db
-from utils.hashing import get_password_hash
+from database.database import get_async_db
+from utils.hashing import get_password_hash_async
 from utils.security import require_permission
 from utils.permissions import Permissions
 
@@ -21,20 +23,24 @@ router = APIRouter()
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def create_user(user: UserCreate, db: Session = Depends(get_db),
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db),
                       _=Depends(require_permission(Permissions.CAN_MANAGE_USERS))):
     """
     Creates a new user in the database. Requires 'can_manage_users' permission.
     """
-    existing_user = db.query(User).filter((User.username == user.username) | (User.email == user.email)).first()
+    existing_user = (await db.execute(
+        select(User).filter((User.username == user.username) | (User.email == user.email))
+    )).scalars().first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Username or email already registered")
 
-    role_db = db.query(Role).filter(Role.name == user.role).first()
+    role_db = (await db.execute(
+        select(Role).options(noload(Role.users)).filter(Role.name == user.role)
+    )).scalars().first()
     if not role_db:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Role '{user.role}' not found")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
@@ -44,18 +50,21 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db),
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    # The response embeds the role, which cannot be lazy-loaded in an async session.
+    new_user.role = role_db
 
     return new_user
 
 
 @router.get("/", response_model=List[UserResponse])
-async def get_users(db: Session = Depends(get_db), _=Depends(require_permission(Permissions.CAN_MANAGE_USERS))):
+async def get_users(db: AsyncSession = Depends(get_async_db), _=Depends(require_permission(Permissions.CAN_MANAGE_USERS))):
     """
     Retrieves a list of all users. Requires 'can_manage_users' permission.
     """
-    users = db.query(User).all()
+    result = await db.execute(select(User).options(selectinload(User.role).noload(Role.users)))
+    users = result.scalars().all()
     return users
 
 
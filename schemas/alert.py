@@ -0,0 +1,92 @@
+# sc-siem-corvette/schemas/alert.py
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Literal
+
+from schemas.discover import DynamicFilter
+
+Severity = Literal["low", "medium", "high", "critical"]
+RuleMode = Literal["poll", "percolate"]
+
+
+# --- Schemas for Request Data (Input Validation) ---
+
+class AlertRuleCreate(BaseModel):
+    """
+    Schema for creating an alert rule.
+    The query and filters use the same shape as a Discover request. Non-admin
+    users always create rules for their own client_id.
+    """
+    name: str = Field(..., min_length=1)
+    description: Optional[str] = None
+    client_id: Optional[str] = None
+    index_pattern: str
+    query: Dict[str, Any] = Field(default_factory=lambda: {"match_all": {}})
+    filters: Optional[List[DynamicFilter]] = None
+    group_by: Optional[str] = Field(None, description="Keyword field; one alert is raised per value that reaches the threshold")
+    threshold: int = Field(1, ge=1, description="Minimum number of matching events in one window")
+    interval_seconds: int = Field(60, ge=10, description="How often the rule is evaluated")
+    severity: Severity = "medium"
+    dedup_window_seconds: int = Field(3600, ge=0)
+    enabled: bool = True
+    mode: RuleMode = Field("poll", description="'poll' evaluates time windows on a schedule; 'percolate' matches events as they are ingested")
+
+
+class AlertRuleUpdate(BaseModel):
+    """Schema for updating an alert rule. Omitted fields are left unchanged."""
+    name: Optional[str] = Field(None, min_length=1)
+    description: Optional[str] = None
+    index_pattern: Optional[str] = None
+    query: Optional[Dict[str, Any]] = None
+    filters: Optional[List[DynamicFilter]] = None
+    group_by: Optional[str] = None
+    threshold: Optional[int] = Field(None, ge=1)
+    interval_seconds: Optional[int] = Field(None, ge=10)
+    severity: Optional[Severity] = None
+    dedup_window_seconds: Optional[int] = Field(None, ge=0)
+    enabled: Optional[bool] = None
+    mode: Optional[RuleMode] = None
+
+
+# --- Schemas for Response Data (Output Serialization) ---
+
+class AlertRuleResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    client_id: Optional[str] = None
+    index_pattern: str
+    query: Dict[str, Any]
+    filters: Optional[List[DynamicFilter]] = None
+    group_by: Optional[str] = None
+    threshold: int
+    interval_seconds: int
+    severity: str
+    dedup_window_seconds: int
+    enabled: bool
+    mode: str
+    watermark: datetime
+    last_evaluated_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AlertResponse(BaseModel):
+    id: int
+    rule_id: int
+    client_id: Optional[str] = None
+    dedup_key: str
+    status: str
+    severity: str
+    message: Optional[str] = None
+    event_count: int
+    occurrences: int
+    first_seen: datetime
+    last_seen: datetime
+    window_start: Optional[datetime] = None
+    window_end: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,90 @@
+# sc-siem-corvette/schemas/dashboard.py
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+
+from schemas.discover import TimeRange
+
+
+# --- Schemas for Request Data (Input Validation) ---
+
+class PanelCreate(BaseModel):
+    """
+    Schema for one panel of a dashboard.
+    'histogram' panels chart the total event count over time; 'top_n' and 'pie'
+    panels rank the values of a rollup dimension (e.g. host, severity, source_ip).
+    """
+    title: str = Field(..., min_length=1)
+    panel_type: Literal["histogram", "top_n", "pie"]
+    dimension: Optional[str] = Field(None, description="Rollup dimension for top_n/pie panels")
+    size: int = Field(10, ge=1, le=100, description="Number of values returned by top_n/pie panels")
+    interval: Optional[str] = Field(None, description="Fixed histogram interval such as '5m' or '1h'; chosen automatically when omitted")
+
+
+class DashboardCreate(BaseModel):
+    """
+    Schema for creating a dashboard.
+    Non-admin users always create dashboards for their own client_id.
+    """
+    name: str = Field(..., min_length=1)
+    description: Optional[str] = None
+    client_id: Optional[str] = None
+    panels: List[PanelCreate] = Field(default_factory=list)
+
+
+class DashboardDataRequest(BaseModel):
+    """Time range for which a dashboard's panels are computed."""
+    time_range: TimeRange
+
+
+# --- Schemas for Response Data (Output Serialization) ---
+
+class PanelResponse(BaseModel):
+    id: int
+    title: str
+    panel_type: str
+    dimension: Optional[str] = None
+    size: int
+    interval: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DashboardResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    client_id: Optional[str] = None
+    panels: List[PanelResponse] = []
+
+    class Config:
+        from_attributes = True
+
+
+class PanelBucket(BaseModel):
+    key: str
+    count: int
+
+
+class PanelData(BaseModel):
+    """
+    Computed data for one panel. Histograms fill the parallel timestamps/counts
+    arrays; top_n and pie panels fill buckets, and pie panels also report the
+    count of all remaining values in 'other'.
+    """
+    panel_id: int
+    panel_type: str
+    interval: Optional[str] = None
+    timestamps: Optional[List[int]] = None  # Bucket start, epoch millis
+    counts: Optional[List[int]] = None
+    buckets: Optional[List[PanelBucket]] = None
+    other: Optional[int] = None
+
+
+class DashboardDataResponse(BaseModel):
+    dashboard_id: int
+    start: int  # epoch millis
+    end: int    # epoch millis
+    # Rollups only cover data up to this point (epoch millis); later events are not yet counted.
+    rolled_up_to: Optional[int] = None
+    panels: List[PanelData]
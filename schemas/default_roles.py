@@ -15,6 +15,8 @@ admin_role = RoleCreate(
         Permissions.CAN_MANAGE_IPS: True,
         Permissions.CAN_SETUP_ALERTS: True,
         Permissions.CAN_VIEW_ALL_LOGS: True,
+        Permissions.CAN_INGEST_LOGS: True,
+        Permissions.CAN_VIEW_DASHBOARD: True,
         Permissions.CAN_VIEW_ANALYTICS: True,
         Permissions.CAN_VIEW_ALERTS: True,
         Permissions.CAN_GENERATE_REPORTS: True,
@@ -27,6 +29,7 @@ user_role = RoleCreate(
     description="Monitor logs, analytics, alerts for assigned client_id (multi-tenant).",
     permissions={
         Permissions.CAN_VIEW_LOGS: True,
+        Permissions.CAN_VIEW_DASHBOARD: True,
         Permissions.CAN_VIEW_ANALYTICS: True,
         Permissions.CAN_VIEW_ALERTS: True,
     }
@@ -1,4 +1,5 @@
 # sc-siem-corvette/schemas/discover.py
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
@@ -32,6 +33,9 @@ class DiscoverRequest(BaseModel):
     aggregations: Optional[Dict[str, Any]] = Field(None, alias="aggs")
     highlight: Optional[Dict[str, Any]] = None
     fields: Optional[List[str]] = Field(None, description="List of fields to return from _source")
+    use_cursor: bool = Field(False, description="Paginate with a point-in-time cursor instead of from/size")
+    cursor: Optional[str] = Field(None, description="Opaque cursor returned by the previous page")
+    keep_alive: str = Field("1m", description="How long the point-in-time is kept open between pages (at most DISCOVER_CURSOR_MAX_KEEP_ALIVE)")
 
 class Hit(BaseModel):
     """Represents a single search hit, with field names safe for Pydantic."""
@@ -43,3 +47,91 @@ class DiscoverResponse(BaseModel):
     hits: List[Hit]
     total: int
     aggregations: Optional[Dict[str, Any]] = {}
+    cursor: Optional[str] = None  # Set when more pages are available in cursor mode
+    partial: bool = False  # Hits and counts may be incomplete (see the flags below)
+    timed_out: bool = False
+    terminated_early: bool = False
+    failed_shards: int = 0
+    downgrades: List[str] = []  # What the query cost guard reduced, e.g. 'size capped to 500'
+
+# --- Batch Schemas ---
+
+class DiscoverBatchRequest(BaseModel):
+    requests: List[DiscoverRequest] = Field(..., min_length=1, description="Discover requests to run together")
+
+class DiscoverBatchItem(BaseModel):
+    status: int  # HTTP-style status of this item
+    response: Optional[DiscoverResponse] = None
+    error: Optional[str] = None
+
+class DiscoverBatchResponse(BaseModel):
+    responses: List[DiscoverBatchItem]
+
+# --- Histogram Schemas ---
+
+class DiscoverHistogramRequest(BaseModel):
+    index_pattern: str
+    client_id: Optional[str] = None
+    time_range: TimeRange
+    query: Dict[str, Any] = Field(default_factory=lambda: {"match_all": {}})
+    filters: Optional[List[DynamicFilter]] = None
+    target_buckets: int = Field(60, ge=1, description="Approximate number of buckets wanted; capped server-side")
+    interval: Optional[str] = Field(None, description="Fixed ('30s', '5m') or calendar ('1d', '1w', '1M') interval; chosen automatically when omitted")
+    time_zone: str = Field("UTC", description="Time zone used to align calendar buckets")
+
+class DiscoverHistogramResponse(BaseModel):
+    interval: Optional[str] = None  # Interval actually used
+    timestamps: List[int]  # Bucket start, epoch millis
+    counts: List[int]
+    total: int
+
+# --- Field Sidebar Schemas ---
+
+class DiscoverField(BaseModel):
+    name: str
+    type: str  # 'conflict' when the indices behind the pattern map it differently
+    searchable: bool
+    aggregatable: bool
+    keyword_variant: Optional[str] = None  # Sub-field to use for exact values and aggregations of a text field
+
+class DiscoverFieldsResponse(BaseModel):
+    index_pattern: str
+    fields: List[DiscoverField]
+
+class FieldValuesRequest(BaseModel):
+    index_pattern: str
+    client_id: Optional[str] = None
+    field: str
+    time_range: Optional[TimeRange] = None
+    query: Dict[str, Any] = Field(default_factory=lambda: {"match_all": {}})
+    filters: Optional[List[DynamicFilter]] = None
+    size: int = Field(10, ge=1, description="Number of top values to return; capped server-side")
+    sample_size: int = Field(5000, ge=1, description="Documents sampled per shard; capped server-side")
+    diversify_by: Optional[str] = Field(None, description="Limit how many sampled documents may share a value of this field (e.g. 'host')")
+    max_docs_per_value: int = Field(1, ge=1, description="With diversify_by, sampled documents allowed per value")
+
+class FieldValue(BaseModel):
+    value: Any
+    count: int
+
+class FieldValuesResponse(BaseModel):
+    field: str
+    sampled: int  # Documents the values were counted over
+    values: List[FieldValue]
+
+# --- Search Job Schemas ---
+
+class SearchJobSummary(BaseModel):
+    id: str
+    status: str  # 'running', 'completed', 'failed' or 'cancelled'
+    client_id: Optional[str] = None
+    index_pattern: str
+    progress: float  # Share of the time range searched so far, 0 to 1
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+    expires_at: datetime  # The job and its results are deleted afterwards
+
+class SearchJobResponse(SearchJobSummary):
+    response: DiscoverResponse  # Results merged over the part of the time range searched so far
@@ -0,0 +1,11 @@
+# sc-siem-corvette/schemas/ingest.py
+from pydantic import BaseModel
+from typing import List
+
+
+class IngestResponse(BaseModel):
+    """Result of an ingest request. Accepted documents are indexed asynchronously."""
+    accepted: int
+    invalid: int
+    # Line numbers (1-based) of lines that were not JSON objects or whose @timestamp was refused, at most 100.
+    invalid_lines: List[int] = []
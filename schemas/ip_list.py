@@ -0,0 +1,60 @@
+# sc-siem-corvette/schemas/ip_list.py
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+
+ListType = Literal["allow", "deny", "source"]
+
+
+# --- Schemas for Request Data (Input Validation) ---
+
+class IPEntryCreate(BaseModel):
+    """
+    Schema for adding one address or CIDR to an allow, deny or source list.
+    Non-admin users always manage the lists of their own client_id; source
+    lists, which attribute syslog senders to a client, are admin-only.
+    """
+    cidr: str = Field(..., description="Address or CIDR, e.g. '10.0.0.0/8' or '2001:db8::/32'")
+    list_type: ListType
+    client_id: Optional[str] = None
+    description: Optional[str] = None
+
+
+class IPImportRequest(BaseModel):
+    """Schema for bulk-importing CIDRs into one list."""
+    list_type: ListType
+    client_id: Optional[str] = None
+    cidrs: List[str] = Field(..., min_length=1)
+    description: Optional[str] = None
+    replace: bool = Field(False, description="Remove entries of the list that are not in this import")
+
+
+class IPCheckRequest(BaseModel):
+    """Schema for checking many source addresses against a tenant's lists at once."""
+    client_id: Optional[str] = None
+    ips: List[str] = Field(..., min_length=1)
+
+
+# --- Schemas for Response Data (Output Serialization) ---
+
+class IPEntryResponse(BaseModel):
+    id: int
+    client_id: Optional[str] = None
+    list_type: str
+    cidr: str
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class IPImportResponse(BaseModel):
+    added: int
+    removed: int
+
+
+class IPCheckResponse(BaseModel):
+    # Parallel to the request's ips: verdict (None for an unparseable address) and the matching CIDR.
+    allowed: List[Optional[bool]]
+    matched: List[Optional[str]]
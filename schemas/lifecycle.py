@@ -0,0 +1,83 @@
+# sc-siem-corvette/schemas/lifecycle.py
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+
+# Ages are whole UTC days since an index's date; steps never apply to today's index.
+AgeDays = Optional[int]
+
+
+# --- Schemas for Request Data (Input Validation) ---
+
+class LifecyclePolicyCreate(BaseModel):
+    """Schema for creating the lifecycle policy of one template's daily indices."""
+    template_name: str = Field(..., min_length=1)
+    index_prefix: str = Field(..., pattern=r"^[a-z0-9][a-z0-9_.-]*$", description="Indices are named '<index_prefix>-YYYY-MM-DD'")
+    create_ahead: bool = True
+    force_merge_after_days: AgeDays = Field(1, ge=1)
+    read_only_after_days: AgeDays = Field(7, ge=1)
+    read_only_replicas: int = Field(0, ge=0)
+    delete_after_days: AgeDays = Field(30, ge=1)
+    enabled: bool = True
+
+
+class LifecyclePolicyUpdate(BaseModel):
+    """Schema for updating a lifecycle policy. Omitted fields are left unchanged; null disables a step."""
+    template_name: Optional[str] = Field(None, min_length=1)
+    create_ahead: Optional[bool] = None
+    force_merge_after_days: AgeDays = Field(None, ge=1)
+    read_only_after_days: AgeDays = Field(None, ge=1)
+    read_only_replicas: Optional[int] = Field(None, ge=0)
+    delete_after_days: AgeDays = Field(None, ge=1)
+    enabled: Optional[bool] = None
+
+
+# --- Schemas for Response Data (Output Serialization) ---
+
+class LifecyclePolicyResponse(BaseModel):
+    id: int
+    template_name: str
+    index_prefix: str
+    create_ahead: bool
+    force_merge_after_days: AgeDays = None
+    read_only_after_days: AgeDays = None
+    read_only_replicas: int
+    delete_after_days: AgeDays = None
+    enabled: bool
+    last_run_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LifecycleAction(BaseModel):
+    policy_id: int
+    index: str
+    action: str  # 'create', 'force_merge', 'read_only' or 'delete'
+    reason: str
+    status: Optional[str] = None  # 'planned', 'done', 'deferred' or 'failed'
+    error: Optional[str] = None
+
+
+class LifecycleIndexStatus(BaseModel):
+    index: str
+    age_days: int
+    docs: int
+    size_bytes: int
+    segments: int
+    shards: int
+    replicas: int
+    read_only: bool
+    pending_actions: List[str]
+
+
+class LifecyclePolicyStatus(BaseModel):
+    policy: LifecyclePolicyResponse
+    indices: List[LifecycleIndexStatus]
+
+
+class LifecycleRunResponse(BaseModel):
+    dry_run: bool
+    actions: List[LifecycleAction]
+    search_load: Optional[Dict[str, Any]] = None
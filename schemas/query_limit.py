@@ -0,0 +1,58 @@
+# sc-siem-corvette/schemas/query_limit.py
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+
+
+# --- Schemas for Request Data (Input Validation) ---
+
+class QueryLimitCreate(BaseModel):
+    """
+    Schema for setting a tenant's query cost thresholds. Without a client_id
+    the limits apply to every tenant without limits of its own. Omitted values
+    fall back to the server defaults.
+    """
+    client_id: Optional[str] = None
+    max_cost: Optional[float] = Field(None, gt=0)
+    downgrade_cost: Optional[float] = Field(None, gt=0)
+    max_size: Optional[int] = Field(None, ge=0)
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    terminate_after: Optional[int] = Field(None, ge=0, description="Documents collected per shard; 0 disables")
+    max_in_flight: Optional[int] = Field(None, ge=1, description="Concurrent OpenSearch calls")
+    weight: Optional[float] = Field(None, gt=0, description="Share of contended search slots; 2 gets twice the share of 1")
+
+
+class QueryLimitUpdate(BaseModel):
+    """Schema for updating query limits. Omitted fields are left unchanged; null restores the default."""
+    max_cost: Optional[float] = Field(None, gt=0)
+    downgrade_cost: Optional[float] = Field(None, gt=0)
+    max_size: Optional[int] = Field(None, ge=0)
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    terminate_after: Optional[int] = Field(None, ge=0)
+    max_in_flight: Optional[int] = Field(None, ge=1)
+    weight: Optional[float] = Field(None, gt=0)
+
+
+# --- Schemas for Response Data (Output Serialization) ---
+
+class QueryLimitResponse(BaseModel):
+    id: int
+    client_id: Optional[str] = None
+    max_cost: Optional[float] = None
+    downgrade_cost: Optional[float] = None
+    max_size: Optional[int] = None
+    timeout_seconds: Optional[float] = None
+    terminate_after: Optional[int] = None
+    max_in_flight: Optional[int] = None
+    weight: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class QueryCostEstimate(BaseModel):
+    cost: float
+    factors: Dict[str, float]  # span_days, indices, hits, buckets, agg_depth, expensive_clauses
+    limits: Dict[str, Optional[float]]  # Effective limits for the request's tenant
+    verdict: str  # 'accept', 'downgrade' or 'reject'
+    downgrades: List[str] = []  # What would be changed to admit it
+    reason: Optional[str] = None  # Why it would be rejected
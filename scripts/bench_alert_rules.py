@@ -0,0 +1,186 @@
+# sc-siem-corvette/scripts/bench_alert_rules.py
+"""
+Alert evaluation benchmark: one scheduler tick for 10, 100 and 1000 polling rules.
+
+Seeds the rules (spread over --patterns index patterns, all due for one
+window) and evaluates them twice per rule count: through evaluate_due_rules,
+which claims the rules and sends each (index pattern, interval) group as
+_msearch batches of ALERT_MSEARCH_MAX_ITEMS, and as one search per rule
+(ALERT_MSEARCH_MAX_CONCURRENT at a time), the way independently scheduled
+rules would run. Both variants compile, match and record alerts the same way.
+OpenSearch is replaced by an in-process fake whose round trips take
+--latency-ms and whose searches take --search-ms each, with an _msearch running
+max_concurrent_searches of them side by side; every tenth rule matches. The
+report shows wall time, API CPU time and OpenSearch round trips per tick.
+Cluster-side work is one search per rule in both variants. Rules are stored
+in DATABASE_URL (a local SQLite file by default); the seeded rules are named
+bench-* and are removed afterwards.
+
+    python scripts/bench_alert_rules.py --rules 10 100 1000 --rounds 3
+"""
+import os
+import sys
+import math
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Rules are claimed and recorded through the async engine, so it must share the sync engine's database.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///./bench.db"
+    os.environ["ASYNC_DATABASE_URL"] = "sqlite+aiosqlite:///./bench.db"
+
+
+class FakeOpenSearch:
+    """Answers rule searches after a modelled delay; every tenth search matches one window."""
+
+    def __init__(self, latency: float, search_time: float, match_key: int):
+        self.latency = latency
+        self.search_time = search_time
+        self.match_key = match_key
+        self.round_trips = 0
+        self.searches = 0
+
+    def _response(self) -> dict:
+        self.searches += 1
+        buckets = [{"key": self.match_key, "doc_count": 50}] if self.searches % 10 == 0 else []
+        return {"timed_out": False, "_shards": {"failed": 0}, "aggregations": {"windows": {"buckets": buckets}}}
+
+    async def search(self, index=None, body=None, **kwargs):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency + self.search_time)
+        return self._response()
+
+    async def msearch(self, body=None, max_concurrent_searches=1, **kwargs):
+        self.round_trips += 1
+        searches = len(body) // 2
+        await asyncio.sleep(self.latency + math.ceil(searches / max_concurrent_searches) * self.search_time)
+        return {"responses": [{**self._response(), "status": 200} for _ in range(searches)]}
+
+
+async def _cleanup(db):
+    from sqlalchemy import delete, select
+    from models.alert import AlertRule, Alert
+
+    bench_rules = select(AlertRule.id).where(AlertRule.name.like("bench-%"))
+    await db.execute(delete(Alert).where(Alert.rule_id.in_(bench_rules)))
+    await db.execute(delete(AlertRule).where(AlertRule.name.like("bench-%")))
+
+
+async def _reset(rules: int, patterns: int, interval: int, now):
+    """Replaces the benchmark rules with `rules` fresh ones, each due for exactly one window."""
+    from datetime import timedelta
+    from database.database import AsyncSessionLocal
+    from models.alert import AlertRule
+    from services.alert_service import window_end
+
+    async with AsyncSessionLocal() as db:
+        await _cleanup(db)
+        probe = AlertRule(interval_seconds=interval)
+        watermark = window_end(probe, now) - timedelta(seconds=interval)
+        db.add_all(
+            AlertRule(
+                name=f"bench-{n}", client_id="bench", index_pattern=f"bench-{n % patterns}-*",
+                query={"match": {"message": f"word{n}"}}, threshold=10, interval_seconds=interval,
+                watermark=watermark, enabled=True, mode="poll",
+            )
+            for n in range(rules)
+        )
+        await db.commit()
+
+
+async def _per_rule(os_client, now):
+    """Evaluates every due rule with its own search, recording alerts like the scheduler does."""
+    from sqlalchemy import select
+    from database.database import AsyncSessionLocal
+    from models.alert import AlertRule
+    from services import alert_service
+
+    groups = await alert_service._claim_due_rules(now)
+    rule_ids = [rule_id for ids in groups.values() for rule_id in ids]
+    limit = asyncio.Semaphore(alert_service.ALERT_MSEARCH_MAX_CONCURRENT)
+    async with AsyncSessionLocal() as db:
+        rules = (await db.execute(select(AlertRule).filter(AlertRule.id.in_(rule_ids)))).scalars().all()
+
+        async def one(rule):
+            end = alert_service.window_end(rule, now)
+            start = alert_service.as_utc(rule.watermark)
+            index_target, body = alert_service.build_rule_search(rule, start, end)
+            async with limit:
+                response = await os_client.search(index=index_target, body=body, ignore_unavailable=True)
+            return rule, start, end, response
+
+        for rule, start, end, response in await asyncio.gather(*(one(rule) for rule in rules)):
+            for dedup_key, count, match_start, match_end in alert_service.rule_matches(rule, response, start, end):
+                await alert_service.record_alert(db, rule, dedup_key, count, match_start, match_end, now)
+            rule.watermark, rule.claimed_until, rule.last_evaluated_at = end, None, now
+        await db.commit()
+    return len(rule_ids)
+
+
+async def _timed(run, fake) -> dict:
+    round_trips = fake.round_trips
+    wall, cpu = time.perf_counter(), time.process_time()
+    evaluated = await run()
+    return {
+        "wall": time.perf_counter() - wall,
+        "cpu": time.process_time() - cpu,
+        "round_trips": fake.round_trips - round_trips,
+        "evaluated": evaluated,
+    }
+
+
+def _report(name: str, rules: int, results: list):
+    wall = statistics.median(r["wall"] for r in results)
+    cpu = statistics.median(r["cpu"] for r in results)
+    print(
+        f"{rules:5d} rules  {name:<8} wall {wall * 1000:8.1f}ms  API CPU {cpu * 1000:8.1f}ms "
+        f"({cpu / rules * 1000:5.2f}ms/rule)  round trips {results[0]['round_trips']:5d}  "
+        f"evaluated {results[0]['evaluated']:5d}"
+    )
+
+
+async def main(args):
+    from datetime import datetime, timezone, timedelta
+    from database.database import Base, engine, AsyncSessionLocal, async_engine
+    from models.alert import AlertRule
+    from services import alert_service
+
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc)
+    probe = AlertRule(interval_seconds=args.interval)
+    match_key = int((alert_service.window_end(probe, now) - timedelta(seconds=args.interval)).timestamp() * 1000)
+    fake = FakeOpenSearch(args.latency_ms / 1000, args.search_ms / 1000, match_key)
+    print(
+        f"{args.patterns} index patterns, {args.latency_ms:.0f}ms per round trip, "
+        f"{args.search_ms:.0f}ms per search, median of {args.rounds} ticks"
+    )
+    try:
+        for rules in args.rules:
+            for name, run in (
+                ("msearch", lambda: alert_service.evaluate_due_rules(fake, now)),
+                ("per-rule", lambda: _per_rule(fake, now)),
+            ):
+                results = []
+                for _ in range(args.rounds):
+                    await _reset(rules, args.patterns, args.interval, now)
+                    results.append(await _timed(run, fake))
+                _report(name, rules, results)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await _cleanup(db)
+            await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000], help="Rule counts to evaluate")
+    parser.add_argument("--patterns", type=int, default=3, help="Index patterns the rules are spread over")
+    parser.add_argument("--interval", type=int, default=60, help="Rule interval in seconds")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Network and request overhead per round trip")
+    parser.add_argument("--search-ms", type=float, default=10, help="Cluster time per rule search")
+    parser.add_argument("--rounds", type=int, default=3, help="Ticks per rule count and variant")
+    asyncio.run(main(parser.parse_args()))
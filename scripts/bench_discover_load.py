@@ -0,0 +1,180 @@
+# sc-siem-corvette/scripts/bench_discover_load.py
+"""
+Load test: /health and /api/v1/discover/ latency under slow OpenSearch queries.
+
+Starts a fake OpenSearch (scripts/fake_opensearch.py) that answers every
+search after --latency-ms, serves the Discover router and the health check
+with uvicorn in a worker thread, then fires --queries concurrent Discover
+requests while a prober calls /health every 50ms. The run is made twice:
+with the AsyncOpenSearch client the service uses, and with a synchronous
+opensearchpy client called from the async handlers (the old behaviour),
+which holds the event loop for each round trip. Authentication is replaced
+by an admin principal and the result cache is disabled, so every query
+reaches the fake cluster. The search scheduler is off by default so all
+queries are admitted; --scheduler keeps it on and reports what it sheds.
+
+    python scripts/bench_discover_load.py --queries 200 --latency-ms 500
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class _Blocking:
+    """Exposes a synchronous opensearchpy client through awaitable methods that block the loop."""
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return _Blocking(attr)
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+        return call
+
+
+def _build_app():
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    from routes import discover
+    from services import opensearch_service
+    from utils.security import get_current_user
+    from utils.principal_cache import Principal
+    from utils.permissions import Permissions
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await opensearch_service.connect()
+        try:
+            yield
+        finally:
+            await opensearch_service.disconnect()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(discover.router, prefix="/api/v1/discover")
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    admin = Principal(
+        user_id=1, username="bench", client_id=None, is_active=True, role_id=1, role_name="admin",
+        permissions=frozenset({Permissions.CAN_MANAGE_INDICES.value}),
+    )
+    app.dependency_overrides[get_current_user] = lambda: admin
+    return app
+
+
+def _start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    thread = threading.Thread(target=server.run, name="api", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _run(base: str, queries: int) -> dict:
+    import aiohttp
+
+    health, discover = [], []
+    statuses = Counter()
+    stop = asyncio.Event()
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        async def probe():
+            while not stop.is_set():
+                started = time.perf_counter()
+                async with session.get(f"{base}/health") as response:
+                    await response.read()
+                health.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        async def query(n: int):
+            body = {"index_pattern": "syslog-*", "size": 50, "time_range": {"from": f"now-{n + 1}m", "to": "now"}}
+            started = time.perf_counter()
+            async with session.post(f"{base}/api/v1/discover/", json=body) as response:
+                await response.read()
+                statuses[response.status] += 1
+            discover.append(time.perf_counter() - started)
+
+        prober = asyncio.create_task(probe())
+        await asyncio.sleep(0.2)  # A few unloaded probes first
+        started = time.perf_counter()
+        await asyncio.gather(*(query(n) for n in range(queries)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+    return {"elapsed": elapsed, "health": health, "discover": discover, "statuses": statuses}
+
+
+def _report(name: str, result: dict):
+    statuses = " ".join(f"{code}x{count}" for code, count in sorted(result["statuses"].items()))
+    for label in ("health", "discover"):
+        timings = result[label]
+        print(
+            f"{name:<9} {label:<9} n {len(timings):5d}  p50 {_percentile(timings, 0.5) * 1000:8.1f}ms  "
+            f"p99 {_percentile(timings, 0.99) * 1000:8.1f}ms  max {max(timings, default=0) * 1000:8.1f}ms"
+        )
+    print(f"{name:<9} wall {result['elapsed']:6.2f}s  statuses {statuses}")
+
+
+async def main(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import fake_opensearch
+
+    fake = fake_opensearch.start_in_thread(args.opensearch_port, args.latency_ms / 1000, max_hits=50)
+    os.environ["OPENSEARCH_HOST"] = "127.0.0.1"
+    os.environ["OPENSEARCH_PORT"] = str(args.opensearch_port)
+    if not args.scheduler:
+        os.environ["SEARCH_SCHEDULER_ENABLED"] = "false"
+
+    from opensearchpy import OpenSearch
+    from services import opensearch_service
+
+    server, thread = _start_server(_build_app(), args.port)
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        print(f"{args.queries} concurrent Discover queries, {args.latency_ms:.0f}ms per search")
+        async_client = opensearch_service.client
+        _report("async", await _run(base, args.queries))
+
+        sync_client = OpenSearch(hosts=[{"host": "127.0.0.1", "port": args.opensearch_port}], maxsize=args.queries)
+        opensearch_service.client = _Blocking(sync_client)
+        _report("blocking", await _run(base, args.queries))
+        opensearch_service.client = async_client
+        print(f"fake OpenSearch answered {fake.searches} searches")
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--queries", type=int, default=200, help="Concurrent Discover queries")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Time the fake OpenSearch takes per search")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the API under test")
+    parser.add_argument("--opensearch-port", type=int, default=9201, help="Port for the fake OpenSearch")
+    parser.add_argument("--scheduler", action="store_true", help="Keep the search scheduler on")
+    asyncio.run(main(parser.parse_args()))
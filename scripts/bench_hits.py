@@ -0,0 +1,136 @@
+# sc-siem-corvette/scripts/bench_hits.py
+"""
+Serialization benchmark: the raw Discover response path against the Hit model path.
+
+Renders an OpenSearch search response holding N wide Windows event documents
+and turns it into the HTTP response body twice. The model path is the one
+Discover used before DISCOVER_FAST_RESPONSE: opensearch-py's json parser, a Hit
+per document, a validated DiscoverResponse, and FastAPI's response-model
+serialization rendered by JSONResponse. The raw path parses with orjson,
+reshapes the hits as plain dicts and renders them with FastJSONResponse. Both
+bodies are checked to decode to the same JSON. Nothing is sent to OpenSearch.
+
+    python scripts/bench_hits.py --hits 100 1000 5000 --rounds 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+
+def _windows_event(rng: random.Random, at: datetime) -> dict:
+    """A Security log event of roughly the width Winlogbeat ships (about 60 leaf fields)."""
+    user = f"user{rng.randrange(500)}"
+    host = f"WS-{rng.randrange(200):04d}"
+    return {
+        "@timestamp": at.isoformat(),
+        "client_id": "bench",
+        "message": f"An account was successfully logged on. Subject: Security ID: S-1-5-18 Account Name: {host}$ "
+                   f"Logon Type: {rng.choice([2, 3, 10])} New Logon: Account Name: {user} Process Name: C:\\Windows\\System32\\svchost.exe",
+        "event": {"code": "4624", "kind": "event", "provider": "Microsoft-Windows-Security-Auditing",
+                  "action": "logged-in", "category": ["authentication"], "type": ["start"], "outcome": "success",
+                  "created": at.isoformat(), "module": "security", "dataset": "security"},
+        "host": {"name": host, "hostname": host, "os": {"family": "windows", "name": "Windows 10 Pro", "version": "10.0",
+                                                         "build": "19045.3693", "kernel": "10.0.19041.3693"},
+                 "ip": [f"10.1.{rng.randrange(256)}.{rng.randrange(256)}"], "mac": ["00-50-56-AB-12-34"],
+                 "architecture": "x86_64", "id": f"{rng.getrandbits(128):032x}"},
+        "winlog": {
+            "channel": "Security", "computer_name": f"{host}.corp.example.com", "event_id": "4624",
+            "record_id": rng.randrange(10 ** 9), "task": "Logon", "opcode": "Info", "keywords": ["Audit Success"],
+            "provider_guid": "{54849625-5478-4994-a5ba-3e3b0328c30d}", "provider_name": "Microsoft-Windows-Security-Auditing",
+            "process": {"pid": rng.randrange(65536), "thread": {"id": rng.randrange(65536)}},
+            "logon": {"id": f"0x{rng.getrandbits(32):x}", "type": "Network"},
+            "event_data": {
+                "SubjectUserSid": "S-1-5-18", "SubjectUserName": f"{host}$", "SubjectDomainName": "CORP",
+                "SubjectLogonId": "0x3e7", "TargetUserSid": f"S-1-5-21-{rng.getrandbits(30)}-{rng.randrange(10000)}",
+                "TargetUserName": user, "TargetDomainName": "CORP", "TargetLogonId": f"0x{rng.getrandbits(32):x}",
+                "LogonType": "3", "LogonProcessName": "NtLmSsp", "AuthenticationPackageName": "NTLM",
+                "WorkstationName": host, "LogonGuid": "{00000000-0000-0000-0000-000000000000}",
+                "TransmittedServices": "-", "LmPackageName": "NTLM V2", "KeyLength": "128",
+                "ProcessId": "0x0", "ProcessName": "-", "IpAddress": f"10.2.{rng.randrange(256)}.{rng.randrange(256)}",
+                "IpPort": str(rng.randrange(1024, 65536)), "ImpersonationLevel": "%%1833",
+                "RestrictedAdminMode": "-", "TargetOutboundUserName": "-", "TargetOutboundDomainName": "-",
+                "VirtualAccount": "%%1843", "TargetLinkedLogonId": "0x0", "ElevatedToken": "%%1842",
+            },
+        },
+        "source": {"ip": f"10.2.{rng.randrange(256)}.{rng.randrange(256)}", "port": rng.randrange(1024, 65536),
+                   "domain": host},
+        "user": {"name": user, "domain": "CORP", "id": f"S-1-5-21-{rng.getrandbits(30)}"},
+        "agent": {"type": "winlogbeat", "version": "8.11.1", "name": host, "id": f"{rng.getrandbits(128):032x}"},
+        "ecs": {"version": "8.0.0"},
+    }
+
+
+def _search_response(hits: int) -> bytes:
+    rng = random.Random(hits)
+    now = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+    return json.dumps({
+        "took": 42, "timed_out": False,
+        "_shards": {"total": 3, "successful": 3, "skipped": 0, "failed": 0},
+        "hits": {
+            "total": {"value": 10000, "relation": "gte"}, "max_score": None,
+            "hits": [
+                {"_index": "winlogbeat-2026-10-18", "_id": f"doc-{n}", "_score": None,
+                 "_source": _windows_event(rng, now - timedelta(seconds=n)),
+                 "sort": [int((now - timedelta(seconds=n)).timestamp() * 1000)]}
+                for n in range(hits)
+            ],
+        },
+    }).encode("utf-8")
+
+
+def _report(name: str, timings: list, hits: int, body: bytes):
+    mean = statistics.fmean(timings)
+    print(
+        f"{hits:6d} hits  {name:<6} mean {mean * 1000:8.2f}ms  p50 {statistics.median(timings) * 1000:8.2f}ms  "
+        f"max {max(timings) * 1000:8.2f}ms  {hits / mean:10.0f} hits/s  body {len(body) / 1024:8.0f} KiB"
+    )
+
+
+async def main(args):
+    import orjson
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from schemas.discover import DiscoverResponse
+    from services.opensearch_service import _to_discover_response
+    from utils.helpers import FastJSONResponse
+
+    response_field = create_model_field("Response_discover_logs", DiscoverResponse, mode="serialization")
+
+    async def model_path(raw: bytes) -> bytes:
+        response = _to_discover_response(json.loads(raw))
+        content = await serialize_response(field=response_field, response_content=response)
+        return JSONResponse(content).body
+
+    async def raw_path(raw: bytes) -> bytes:
+        return FastJSONResponse(_to_discover_response(orjson.loads(raw), raw=True)).body
+
+    for hits in args.hits:
+        raw = _search_response(hits)
+        model_body, raw_body = await model_path(raw), await raw_path(raw)
+        if json.loads(model_body) != json.loads(raw_body):
+            sys.exit(f"The two paths render different bodies at {hits} hits.")
+        for name, path, body in (("model", model_path, model_body), ("raw", raw_path, raw_body)):
+            timings = []
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                await path(raw)
+                timings.append(time.perf_counter() - started)
+            _report(name, timings, hits, body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--hits", type=int, nargs="+", default=[100, 1000, 5000], help="Hits per response")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per variant")
+    asyncio.run(main(parser.parse_args()))
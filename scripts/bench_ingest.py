@@ -0,0 +1,145 @@
+# sc-siem-corvette/scripts/bench_ingest.py
+"""
+Bulk ingest throughput benchmark (documents per second).
+
+Feeds NDJSON request bodies through ingest_ndjson, the same path as
+POST /api/v1/ingest/{source_type}, while the bulk writer flushes to a fake
+client whose bulk() answers after a fixed round trip plus a per-document
+cost. Runs once with every document sent on its own and once with the
+configured batching, and reports how long it took until every document was
+acknowledged. Requests rejected with 429 are retried after a short pause, as
+a collector would.
+
+    python scripts/bench_ingest.py --documents 200000 --latency-ms 5
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+HOSTS = [f"web-{n}" for n in range(50)]
+PROGRAMS = ["nginx", "sshd", "kernel", "cron", "postfix"]
+
+
+class FakeBulkClient:
+    """Stands in for OpenSearch: every _bulk takes the round trip plus a per-document cost, and succeeds."""
+
+    def __init__(self, latency: float, per_document: float, reject_rate: float, rng: random.Random):
+        self.latency = latency
+        self.per_document = per_document
+        self.reject_rate = reject_rate
+        self.rng = rng
+        self.requests = 0
+
+    async def bulk(self, body: bytes, **kwargs):
+        self.requests += 1
+        count = body.count(b"\n") // 2
+        await asyncio.sleep(self.latency + self.per_document * count)
+        if not self.reject_rate:
+            return {"errors": False, "items": []}
+        statuses = [429 if self.rng.random() < self.reject_rate else 201 for _ in range(count)]
+        return {"errors": 429 in statuses, "items": [{"create": {"status": s}} for s in statuses]}
+
+
+def _bodies(rng: random.Random, documents: int, per_request: int) -> list:
+    import orjson
+
+    bodies = []
+    for offset in range(0, documents, per_request):
+        lines = [
+            orjson.dumps({
+                "@timestamp": f"2026-10-18T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z",
+                "host": {"name": rng.choice(HOSTS)},
+                "program": rng.choice(PROGRAMS),
+                "source_ip": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                "message": f"event {offset + i} " + "x" * rng.randint(50, 400),
+            })
+            for i in range(min(per_request, documents - offset))
+        ]
+        bodies.append(b"\n".join(lines) + b"\n")
+    return bodies
+
+
+async def _chunks(body: bytes, size: int = 65536):
+    for offset in range(0, len(body), size):
+        yield body[offset:offset + size]
+
+
+async def _run(bodies: list, client: FakeBulkClient, documents: int) -> dict:
+    from fastapi import HTTPException
+    from services import ingest_service
+
+    ingest_service.ingester = ingester = ingest_service.BulkIngester()
+    ingester.start(lambda: client)
+    throttled = 0
+    started = time.perf_counter()
+    try:
+        for body in bodies:
+            while True:
+                try:
+                    await ingest_service.ingest_ndjson("syslog", "bench", _chunks(body))
+                    break
+                except HTTPException as e:
+                    if e.status_code != 429:
+                        raise
+                    throttled += 1
+                    await asyncio.sleep(0.01)
+        while ingester.stats.indexed + ingester.stats.failed < documents:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+    finally:
+        await ingester.stop()
+    return {
+        "elapsed": elapsed,
+        "indexed": ingester.stats.indexed,
+        "retried": ingester.stats.retried,
+        "bulk_requests": client.requests,
+        "throttled": throttled,
+    }
+
+
+def _report(name: str, result: dict):
+    print(
+        f"{name:<8} {result['indexed']:8d} docs in {result['elapsed']:7.2f}s  "
+        f"{result['indexed'] / result['elapsed']:10,.0f} docs/s  "
+        f"bulk requests {result['bulk_requests']:7d}  retried {result['retried']:6d}  429s {result['throttled']:5d}"
+    )
+
+
+async def main(args):
+    from services import ingest_service
+
+    rng = random.Random(args.seed)
+
+    def client():
+        return FakeBulkClient(args.latency_ms / 1000, args.per_doc_us / 10 ** 6, args.reject_rate, rng)
+
+    print(
+        f"fake _bulk: {args.latency_ms}ms round trip + {args.per_doc_us}us/doc, "
+        f"{ingest_service.INGEST_FLUSHERS} flushers, batches of up to {ingest_service.INGEST_BATCH_MAX_DOCS} docs"
+    )
+
+    batch_max_docs = ingest_service.INGEST_BATCH_MAX_DOCS
+    ingest_service.INGEST_BATCH_MAX_DOCS = 1
+    _report("single", await _run(_bodies(rng, args.single_documents, args.request_docs), client(), args.single_documents))
+
+    ingest_service.INGEST_BATCH_MAX_DOCS = batch_max_docs
+    _report("batched", await _run(_bodies(rng, args.documents, args.request_docs), client(), args.documents))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--documents", type=int, default=200000, help="Documents sent with batching")
+    parser.add_argument("--single-documents", type=int, default=2000, help="Documents sent one per _bulk request")
+    parser.add_argument("--request-docs", type=int, default=1000, help="Documents per ingest request")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Round trip of one _bulk request")
+    parser.add_argument("--per-doc-us", type=float, default=5, help="Added cost per document in a _bulk request")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Share of documents answered with 429")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
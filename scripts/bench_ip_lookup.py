@@ -0,0 +1,77 @@
+# sc-siem-corvette/scripts/bench_ip_lookup.py
+"""
+IP list lookup benchmark.
+
+Loads random IPv4 prefixes (lengths /8 to /32) into one tenant's allow and
+deny lists and measures lookups per second: raw longest-prefix matches on the
+PrefixTable, and batched IPListIndex.check() calls as the /check endpoint and
+the syslog receiver make them. A linear scan over the same prefixes is timed
+on a small sample for comparison.
+
+    python scripts/bench_ip_lookup.py --prefixes 100000 --lookups 200000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import ipaddress
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+
+def _random_networks(rng: random.Random, count: int):
+    networks = set()
+    while len(networks) < count:
+        length = rng.randint(8, 32)
+        networks.add(ipaddress.IPv4Network((rng.getrandbits(32) >> (32 - length) << (32 - length), length)))
+    return list(networks)
+
+
+def _report(name: str, count: int, elapsed: float):
+    print(f"{name:<14} {count:9d} lookups in {elapsed:7.3f}s  {count / elapsed:12,.0f} lookups/s")
+
+
+def main(args):
+    from services.ip_list_service import IPListIndex
+
+    rng = random.Random(args.seed)
+    networks = _random_networks(rng, args.prefixes)
+    index = IPListIndex()
+    started = time.perf_counter()
+    for position, network in enumerate(networks):
+        index._list("bench").apply("add", "deny" if position % 10 == 0 else "allow", network)
+    print(f"{args.prefixes} prefixes loaded in {time.perf_counter() - started:.2f}s")
+
+    numbers = [rng.getrandbits(32) for _ in range(args.lookups)]
+    addresses = [str(ipaddress.IPv4Address(number)) for number in numbers]
+
+    table = index.lists["bench"].tables["allow"][4]
+    started = time.perf_counter()
+    for number in numbers:
+        table.longest_match(number)
+    _report("longest_match", len(numbers), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for offset in range(0, len(addresses), args.batch):
+        index.check("bench", addresses[offset:offset + args.batch])
+    _report(f"check x{args.batch}", len(addresses), time.perf_counter() - started)
+
+    sample = addresses[:args.linear_sample]
+    started = time.perf_counter()
+    for value in sample:
+        address = ipaddress.ip_address(value)
+        max((network.prefixlen for network in networks if address in network), default=-1)
+    _report("linear scan", len(sample), time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--prefixes", type=int, default=100000, help="Prefixes loaded into the lists")
+    parser.add_argument("--lookups", type=int, default=200000, help="Addresses looked up")
+    parser.add_argument("--batch", type=int, default=500, help="Addresses per check() call")
+    parser.add_argument("--linear-sample", type=int, default=20, help="Addresses timed with the linear scan")
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
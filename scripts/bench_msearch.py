@@ -0,0 +1,88 @@
+# sc-siem-corvette/scripts/bench_msearch.py
+"""
+Batch benchmark: one _msearch against N concurrent searches.
+
+Builds N distinct Discover requests (one per look-back window) and runs them
+through fetch_logs_batch (a single _msearch) and through N concurrent
+fetch_logs calls. The result cache is disabled so every round reaches the
+cluster. Needs a running OpenSearch, configured with the usual OPENSEARCH_*
+variables, and an index pattern that holds documents.
+
+    python scripts/bench_msearch.py --index 'syslog-*' --searches 10 --rounds 20
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Every round must reach OpenSearch, and the services read this at import time.
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+
+def _build_requests(index: str, searches: int, size: int):
+    from schemas.discover import DiscoverRequest
+
+    return [
+        DiscoverRequest(**{
+            "index_pattern": index,
+            "size": size,
+            "time_range": {"from": f"now-{i + 1}h", "to": "now"},
+        })
+        for i in range(searches)
+    ]
+
+
+async def _time_rounds(run, rounds: int) -> list:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(name: str, timings: list, searches: int):
+    mean = statistics.fmean(timings)
+    print(
+        f"{name:<10} mean {mean * 1000:8.1f}ms  p50 {statistics.median(timings) * 1000:8.1f}ms  "
+        f"max {max(timings) * 1000:8.1f}ms  {searches / mean:8.1f} searches/s"
+    )
+
+
+async def main(args):
+    from services import opensearch_service
+
+    await opensearch_service.connect()
+    if opensearch_service.client is None:
+        sys.exit("OpenSearch is not reachable; set OPENSEARCH_HOST/PORT/USER/PASSWORD.")
+    try:
+        requests = _build_requests(args.index, args.searches, args.size)
+
+        async def separate():
+            await asyncio.gather(*(opensearch_service.fetch_logs(r, raw=True) for r in requests))
+
+        async def batched():
+            await opensearch_service.fetch_logs_batch(requests, raw=True)
+
+        # One warm-up round each, so connection setup is not counted.
+        await separate()
+        await batched()
+        print(f"{args.searches} searches of size {args.size} on {args.index}, {args.rounds} rounds")
+        _report("separate", await _time_rounds(separate, args.rounds), args.searches)
+        _report("msearch", await _time_rounds(batched, args.rounds), args.searches)
+    finally:
+        await opensearch_service.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--index", default="syslog-*", help="Index pattern to search")
+    parser.add_argument("--searches", type=int, default=10, help="Searches per round")
+    parser.add_argument("--size", type=int, default=50, help="Hits per search")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per variant")
+    asyncio.run(main(parser.parse_args()))
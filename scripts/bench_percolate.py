@@ -0,0 +1,212 @@
+# sc-siem-corvette/scripts/bench_percolate.py
+"""
+Alert matching benchmark: percolation at ingest against polling rule windows.
+
+Writes a steady stream of synthetic events into a scratch index and, in three
+timed phases, (1) only indexes them, (2) also percolates every batch against
+all rules, the way percolate rules are matched, and (3) also evaluates all
+rules as one _msearch per interval window, the way polling rules are. For
+each phase it reports the OpenSearch CPU time used (summed over the nodes'
+process CPU counters), how much of it went to matching on top of indexing,
+and how long after being indexed an event was matched against the rules.
+Batching and settle delays are part of that latency, as in the services.
+Needs a running OpenSearch, configured with the usual OPENSEARCH_* variables.
+The scratch indices are deleted afterwards.
+
+    python scripts/bench_percolate.py --rules 100 --rate 2000 --seconds 60 --interval 10
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+EVENTS_INDEX = "bench-percolate-events"
+RULES_INDEX = "bench-percolate-rules"
+HOSTS = [f"web-{n}" for n in range(200)]
+WORDS = [f"word{n}" for n in range(1000)]
+MAPPING = {
+    "@timestamp": {"type": "date"},
+    "client_id": {"type": "keyword"},
+    "host": {"type": "keyword"},
+    "message": {"type": "text"},
+}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _rule_queries(rng: random.Random, count: int) -> list:
+    """Rule queries compiled like alert rules are, each matching roughly one event in a few hundred."""
+    from datetime import datetime, timezone
+    from models.alert import AlertRule
+    from services import opensearch_service
+    from services.alert_service import rule_request
+
+    queries = []
+    for n in range(count):
+        rule = AlertRule(
+            index_pattern=EVENTS_INDEX,
+            client_id="bench",
+            query={"bool": {"must": [
+                {"match": {"message": rng.choice(WORDS)}},
+                {"term": {"host": rng.choice(HOSTS)}},
+            ]}},
+            watermark=datetime.now(timezone.utc),
+        )
+        queries.append(opensearch_service.build_opensearch_query(rule_request(rule))["query"])
+    return queries
+
+
+def _event(rng: random.Random) -> dict:
+    from datetime import datetime, timezone
+
+    return {
+        "@timestamp": datetime.now(timezone.utc).isoformat(),
+        "client_id": "bench",
+        "host": rng.choice(HOSTS),
+        "message": " ".join(rng.choice(WORDS) for _ in range(12)),
+    }
+
+
+async def _cpu_millis(os_client) -> int:
+    stats = await os_client.nodes.stats(metric="process")
+    return sum(node["process"]["cpu"]["total_in_millis"] for node in stats["nodes"].values())
+
+
+async def _setup(os_client, queries: list):
+    for index in (EVENTS_INDEX, RULES_INDEX):
+        await os_client.indices.delete(index=index, ignore_unavailable=True)
+    await os_client.indices.create(index=EVENTS_INDEX, body={"mappings": {"properties": MAPPING}})
+    await os_client.indices.create(index=RULES_INDEX, body={
+        "mappings": {"properties": {**MAPPING, "query": {"type": "percolator"}, "rule_id": {"type": "integer"}}},
+    })
+    body = []
+    for rule_id, query in enumerate(queries):
+        body.append({"index": {"_index": RULES_INDEX, "_id": str(rule_id)}})
+        body.append({"rule_id": rule_id, "query": query})
+    await os_client.bulk(body=body, refresh=True)
+
+
+async def _phase(os_client, rng: random.Random, args, queries: list, mode: str) -> dict:
+    """Indexes events for args.seconds; mode is 'index', 'percolate' or 'poll'."""
+    from datetime import datetime, timezone, timedelta
+
+    batch_size = max(1, int(args.rate * args.flush))
+    latencies = []  # Seconds from indexing an event until it was matched, one entry per event
+    unpolled = []   # (indexed at, events) not yet covered by a polling run
+    searches = 0
+    cpu_before = await _cpu_millis(os_client)
+    started = time.perf_counter()
+    next_poll = started + args.interval
+
+    while time.perf_counter() - started < args.seconds:
+        tick = time.perf_counter()
+        documents = [_event(rng) for _ in range(batch_size)]
+        body = []
+        for document in documents:
+            body.append({"create": {"_index": EVENTS_INDEX}})
+            body.append(document)
+        await os_client.bulk(body=body)
+        indexed_at = time.perf_counter()
+
+        if mode == "percolate":
+            await os_client.search(index=RULES_INDEX, body={
+                "size": len(queries),
+                "_source": ["rule_id"],
+                "query": {"percolate": {"field": "query", "documents": documents}},
+            })
+            searches += 1
+            # Events arrive spread over the flush interval; the first of a batch waits longest.
+            done = time.perf_counter()
+            latencies.extend(
+                done - indexed_at + args.flush * (len(documents) - i) / len(documents) for i in range(len(documents))
+            )
+        elif mode == "poll":
+            unpolled.append((indexed_at, len(documents)))
+            if time.perf_counter() >= next_poll:
+                # Events must be searchable, as they are once the settle delay has passed.
+                await os_client.indices.refresh(index=EVENTS_INDEX)
+                end = datetime.now(timezone.utc)
+                start = end - timedelta(seconds=args.interval)
+                window = {"range": {"@timestamp": {"gte": start.isoformat(), "lt": end.isoformat()}}}
+                msearch = []
+                for query in queries:
+                    msearch.append({"index": EVENTS_INDEX})
+                    msearch.append({"size": 0, "track_total_hits": True, "query": {"bool": {"filter": [query, window]}}})
+                await os_client.msearch(body=msearch)
+                searches += 1
+                done = time.perf_counter()
+                # A polling rule also waits ALERT_SETTLE_SECONDS before its window may be searched.
+                latencies.extend(done - at + args.settle for at, count in unpolled for _ in range(count))
+                unpolled = []
+                next_poll += args.interval
+
+        await asyncio.sleep(max(0.0, args.flush - (time.perf_counter() - tick)))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed": elapsed,
+        "cpu": (await _cpu_millis(os_client) - cpu_before) / 1000,
+        "searches": searches,
+        "p50": _percentile(latencies, 0.5),
+        "p99": _percentile(latencies, 0.99),
+    }
+
+
+def _report(name: str, result: dict, baseline: dict = None):
+    extra = f"  (+{result['cpu'] - baseline['cpu']:7.1f}s over indexing)" if baseline else ""
+    latency = (
+        f"  match latency p50 {result['p50'] * 1000:9.1f}ms  p99 {result['p99'] * 1000:9.1f}ms"
+        if result["searches"] else ""
+    )
+    print(
+        f"{name:<10} OpenSearch CPU {result['cpu']:7.1f}s in {result['elapsed']:5.1f}s{extra}  "
+        f"searches {result['searches']:5d}{latency}"
+    )
+
+
+async def main(args):
+    from services import opensearch_service
+
+    await opensearch_service.connect()
+    os_client = opensearch_service.client
+    if os_client is None:
+        sys.exit("OpenSearch is not reachable; set OPENSEARCH_HOST/PORT/USER/PASSWORD.")
+    rng = random.Random(args.seed)
+    try:
+        queries = _rule_queries(rng, args.rules)
+        await _setup(os_client, queries)
+        print(
+            f"{args.rules} rules, {args.rate} events/s for {args.seconds}s per phase, "
+            f"percolated every {args.flush}s, polled every {args.interval}s (+{args.settle}s settle)"
+        )
+        baseline = await _phase(os_client, rng, args, queries, "index")
+        _report("index", baseline)
+        _report("percolate", await _phase(os_client, rng, args, queries, "percolate"), baseline)
+        _report("poll", await _phase(os_client, rng, args, queries, "poll"), baseline)
+    finally:
+        for index in (EVENTS_INDEX, RULES_INDEX):
+            await os_client.indices.delete(index=index, ignore_unavailable=True)
+        await opensearch_service.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rules", type=int, default=100, help="Alert rules matched against the events")
+    parser.add_argument("--rate", type=int, default=2000, help="Events indexed per second")
+    parser.add_argument("--seconds", type=float, default=60, help="Length of each phase")
+    parser.add_argument("--flush", type=float, default=1, help="Seconds between batches (ALERT_PERCOLATE_FLUSH_SECONDS)")
+    parser.add_argument("--interval", type=int, default=10, help="Polling interval of the rules")
+    parser.add_argument("--settle", type=float, default=30, help="Settle delay of polling rules (ALERT_SETTLE_SECONDS)")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
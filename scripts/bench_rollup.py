@@ -0,0 +1,210 @@
+# sc-siem-corvette/scripts/bench_rollup.py
+"""
+Dashboard panel benchmark: per-minute rollups against raw aggregations.
+
+Generates a synthetic 30-day event stream for a few tenants, rolls it up into
+per-minute buckets exactly as the rollup job would store them, and times the
+three panel types (histogram, top hosts, severity pie) over 1, 7 and 30 days
+for one tenant through rollup_service.panel_data. With --opensearch the same
+events are also indexed into a scratch index, and the equivalent raw
+date_histogram/terms aggregations are timed with the request cache disabled,
+as a dashboard refresh over a moving range would run them.
+
+The buckets go to the database in DATABASE_URL (a scratch SQLite file by
+default) under 'bench-' client ids, which are removed again afterwards.
+
+    python scripts/bench_rollup.py --days 30 --events-per-minute 5 --rounds 20 --opensearch
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Buckets are written through the sync engine and read through the async one, so both must share a database.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///./bench_rollup.db"
+    os.environ["ASYNC_DATABASE_URL"] = "sqlite+aiosqlite:///./bench_rollup.db"
+
+RAW_INDEX = "bench-rollup-raw"
+SEVERITIES = ["debug", "info", "notice", "warning", "error", "critical"]
+STRING_FIELD = {"type": "text", "fields": {"keyword": {"type": "keyword"}}}
+RAW_MAPPING = {
+    "@timestamp": {"type": "date"},
+    "client_id": STRING_FIELD,
+    "host": STRING_FIELD,
+    "severity": STRING_FIELD,
+    "source_ip": {"type": "ip"},
+}
+PANELS = [
+    ("histogram", None),
+    ("top_n", "host"),
+    ("pie", "severity"),
+]
+RANGES_DAYS = [1, 7, 30]
+
+
+def _events(rng: random.Random, args, end: datetime):
+    """Yields (tenant, minute, host, severity, source_ip) for every synthetic event, oldest first."""
+    hosts = [f"host-{n}" for n in range(args.hosts)]
+    host_weights = [1 / (n + 1) for n in range(args.hosts)]  # A few busy hosts, a long tail
+    ips = [f"10.{n // 256}.{n % 256}.1" for n in range(args.source_ips)]
+    first = end - timedelta(days=args.days)
+    for minute in range(args.days * 1440):
+        at = first + timedelta(minutes=minute)
+        for tenant in range(args.tenants):
+            for _ in range(rng.randint(0, 2 * args.events_per_minute)):
+                yield (
+                    f"bench-{tenant}", at,
+                    rng.choices(hosts, host_weights)[0],
+                    rng.choices(SEVERITIES, [5, 40, 20, 20, 10, 5])[0],
+                    rng.choice(ips),
+                )
+
+
+def _load(args, end: datetime, os_bulk=None) -> int:
+    """Rolls the events up into rollup_buckets (and hands raw batches to os_bulk). Returns the event count."""
+    from sqlalchemy import delete, insert
+    from database.database import Base, SessionLocal, engine
+    from models.dashboard import RollupBucket
+    from services.rollup_service import ROLLUP_DIMENSIONS, TOTAL_DIMENSION
+
+    Base.metadata.create_all(bind=engine, tables=[RollupBucket.__table__])
+    counts = {}
+    raw, total = [], 0
+    for tenant, at, host, severity, source_ip in _events(random.Random(args.seed), args, end):
+        total += 1
+        values = {TOTAL_DIMENSION: "", "host": host, "severity": severity, "source_ip": source_ip}
+        for dimension in [TOTAL_DIMENSION, *ROLLUP_DIMENSIONS]:
+            key = (tenant, dimension, values.get(dimension, ""), at)
+            counts[key] = counts.get(key, 0) + 1
+        if os_bulk is not None:
+            raw.append({"@timestamp": at.isoformat(), "client_id": tenant, "host": host,
+                        "severity": severity, "source_ip": source_ip})
+            if len(raw) >= 5000:
+                os_bulk(raw)
+                raw = []
+    if raw:
+        os_bulk(raw)
+
+    rows = [
+        {"client_id": tenant, "dimension": dimension, "value": value, "bucket_start": at, "count": count}
+        for (tenant, dimension, value, at), count in counts.items()
+    ]
+    with SessionLocal() as db:
+        db.execute(delete(RollupBucket).where(RollupBucket.client_id.like("bench-%")))
+        for offset in range(0, len(rows), 10000):
+            db.execute(insert(RollupBucket), rows[offset:offset + 10000])
+        db.commit()
+    print(f"{total} events over {args.days} days, {len(rows)} rollup buckets")
+    return total
+
+
+def _cleanup():
+    from sqlalchemy import delete
+    from database.database import SessionLocal
+    from models.dashboard import RollupBucket
+
+    with SessionLocal() as db:
+        db.execute(delete(RollupBucket).where(RollupBucket.client_id.like("bench-%")))
+        db.commit()
+
+
+def _raw_body(panel_type: str, dimension: str, start: datetime, end: datetime) -> dict:
+    from services.rollup_service import (
+        DASHBOARD_HISTOGRAM_BUCKETS, ROLLUP_BUCKET_SECONDS, ROLLUP_CLIENT_FIELD, ROLLUP_DIMENSIONS,
+    )
+    from utils.helpers import auto_interval
+
+    body = {
+        "size": 0,
+        "track_total_hits": True,
+        "query": {"bool": {"filter": [
+            {"term": {ROLLUP_CLIENT_FIELD: "bench-0"}},
+            {"range": {"@timestamp": {"gte": start.isoformat(), "lt": end.isoformat()}}},
+        ]}},
+    }
+    if panel_type == "histogram":
+        interval = auto_interval((end - start).total_seconds(), DASHBOARD_HISTOGRAM_BUCKETS, ROLLUP_BUCKET_SECONDS)
+        body["aggs"] = {"panel": {"date_histogram": {"field": "@timestamp", "fixed_interval": interval}}}
+    else:
+        body["aggs"] = {"panel": {"terms": {"field": ROLLUP_DIMENSIONS[dimension], "size": 10}}}
+    return body
+
+
+def _stats(timings: list) -> str:
+    return f"mean {statistics.fmean(timings) * 1000:8.1f}ms  p50 {statistics.median(timings) * 1000:8.1f}ms"
+
+
+async def main(args):
+    from database.database import AsyncSessionLocal
+    from models.dashboard import DashboardPanel
+    from services import opensearch_service, rollup_service
+
+    end = rollup_service.floor_to_bucket(datetime.now(timezone.utc))
+    os_client = None
+    bulk_batches = []
+    if args.opensearch:
+        await opensearch_service.connect()
+        os_client = opensearch_service.client
+        if os_client is None:
+            sys.exit("OpenSearch is not reachable; set OPENSEARCH_HOST/PORT/USER/PASSWORD.")
+        await os_client.indices.delete(index=RAW_INDEX, ignore_unavailable=True)
+        await os_client.indices.create(index=RAW_INDEX, body={"mappings": {"properties": RAW_MAPPING}})
+
+    try:
+        _load(args, end, bulk_batches.append if os_client is not None else None)
+        if os_client is not None:
+            for batch in bulk_batches:
+                body = []
+                for document in batch:
+                    body.append({"create": {"_index": RAW_INDEX}})
+                    body.append(document)
+                await os_client.bulk(body=body)
+            bulk_batches.clear()
+            await os_client.indices.refresh(index=RAW_INDEX)
+            await os_client.indices.forcemerge(index=RAW_INDEX, max_num_segments=1)
+
+        for panel_type, dimension in PANELS:
+            panel = DashboardPanel(id=0, panel_type=panel_type, dimension=dimension, size=10, interval=None)
+            for days in RANGES_DAYS:
+                start = end - timedelta(days=days)
+                timings = []
+                async with AsyncSessionLocal() as db:
+                    for _ in range(args.rounds):
+                        started = time.perf_counter()
+                        await rollup_service.panel_data(db, panel, "bench-0", start, end)
+                        timings.append(time.perf_counter() - started)
+                line = f"{panel_type:<9} {days:3d}d  rollup {_stats(timings)}"
+
+                if os_client is not None:
+                    timings = []
+                    body = _raw_body(panel_type, dimension, start, end)
+                    for _ in range(args.rounds):
+                        started = time.perf_counter()
+                        await os_client.search(index=RAW_INDEX, body=body, request_cache=False)
+                        timings.append(time.perf_counter() - started)
+                    line += f"  |  raw {_stats(timings)}"
+                print(line)
+    finally:
+        _cleanup()
+        if os_client is not None:
+            await os_client.indices.delete(index=RAW_INDEX, ignore_unavailable=True)
+            await opensearch_service.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--days", type=int, default=30, help="Length of the synthetic history")
+    parser.add_argument("--tenants", type=int, default=2)
+    parser.add_argument("--events-per-minute", type=int, default=5, help="Average events per tenant and minute")
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--source-ips", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20, help="Timed runs per panel and range")
+    parser.add_argument("--opensearch", action="store_true", help="Also time raw aggregations on a running OpenSearch")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
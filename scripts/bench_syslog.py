@@ -0,0 +1,75 @@
+# sc-siem-corvette/scripts/bench_syslog.py
+"""
+Syslog receiver throughput benchmark (messages per second on one core).
+
+Times parse_message alone, then the receiver's process() step, which
+attributes each message to a client through the IP lists, parses it, picks
+its daily index and hands it to the bulk writer's buffer. Nothing is sent to
+OpenSearch, so the numbers are the receiver's own ceiling.
+
+    python scripts/bench_syslog.py --messages 200000
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import ipaddress
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+# The bulk writer is not running, so its buffer must hold every message.
+os.environ["INGEST_QUEUE_MAX"] = str(10 ** 9)
+os.environ["SYSLOG_REPLAY_FILE"] = ""
+
+SAMPLES = [
+    '<165>1 2026-10-11T22:14:15.003Z web-{n}.example.com nginx 4121 ID47 '
+    '[meta@32473 iut="3" eventSource="Application"] GET /index.html 200 {n}',
+    "<34>Oct 11 22:14:15 host-{n} sshd[{n}]: Failed password for root from 10.0.0.{n} port 22 ssh2",
+    "<13>2026-10-11T22:14:15.000+02:00 host-{n} kernel: eth0 link up {n}",
+    "<14>plain text without a header {n}",
+]
+
+
+def _messages(rng: random.Random, count: int, sources: int):
+    source_ips = [str(ipaddress.IPv4Address(0x0A000000 + i)) for i in range(sources)]
+    return [
+        (rng.choice(SAMPLES).format(n=rng.randint(1, 250)).encode(), rng.choice(source_ips), time.time())
+        for _ in range(count)
+    ]
+
+
+def _report(name: str, count: int, elapsed: float):
+    print(f"{name:<10} {count:9d} messages in {elapsed:7.3f}s  {count / elapsed:12,.0f} messages/s")
+
+
+async def main(args):
+    from datetime import datetime, timezone
+    from services import syslog_receiver
+    from services.ip_list_service import ip_index, normalize_cidr
+
+    ip_index._list("bench").apply("add", "source", normalize_cidr("10.0.0.0/8"))
+    ip_index.loaded = True
+    messages = _messages(random.Random(args.seed), args.messages, args.sources)
+
+    now = datetime.now(timezone.utc)
+    lines = [raw.decode() for raw, _, _ in messages]
+    started = time.perf_counter()
+    for line in lines:
+        syslog_receiver.parse_message(line, now)
+    _report("parse", len(lines), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for offset in range(0, len(messages), syslog_receiver.SYSLOG_PARSE_BATCH):
+        await syslog_receiver.process(messages[offset:offset + syslog_receiver.SYSLOG_PARSE_BATCH])
+    _report("pipeline", len(messages), time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=200000, help="Messages timed per variant")
+    parser.add_argument("--sources", type=int, default=1000, help="Distinct sending addresses")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,134 @@
+# sc-siem-corvette/scripts/fake_opensearch.py
+"""
+A stand-in OpenSearch for load tests: answers every search after a fixed delay.
+
+Serves just enough of the REST API for the Discover paths: ping, _search
+(with or without a point-in-time), _msearch, and opening and closing
+point-in-times. Every search waits --latency-ms before answering, like a
+slow query on a busy cluster, and returns up to --hits synthetic syslog
+documents. Other calls are answered with an empty object. The benchmarks
+start it in a thread (see start_in_thread); it can also run on its own:
+
+    python scripts/fake_opensearch.py --port 9201 --latency-ms 500
+"""
+import asyncio
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+
+import orjson
+from aiohttp import web
+
+
+def _hits(count: int, index: str = "syslog-2026-10-18") -> list:
+    now = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+    hits = []
+    for n in range(count):
+        at = now - timedelta(seconds=n)
+        hits.append({
+            "_index": index,
+            "_id": f"doc-{n}",
+            "_score": None,
+            "_source": {
+                "@timestamp": at.isoformat(),
+                "client_id": "bench",
+                "host": f"host-{n % 20}",
+                "program": "sshd",
+                "severity": "info",
+                "source_ip": f"10.0.{n % 256}.1",
+                "message": f"Accepted publickey for user{n % 50} from 10.0.{n % 256}.1 port {20000 + n} ssh2",
+            },
+            "sort": [int(at.timestamp() * 1000), f"doc-{n}"],
+        })
+    return hits
+
+
+class FakeOpenSearch:
+    def __init__(self, latency: float, max_hits: int):
+        self.latency = latency
+        self.max_hits = max_hits
+        self.searches = 0
+        self.requests = 0
+        self._responses = {}  # size -> rendered search response
+
+    def _search_response(self, body: dict) -> dict:
+        size = min(int(body.get("size", 10)), self.max_hits)
+        response = self._responses.get(size)
+        if response is None:
+            response = self._responses[size] = {
+                "took": int(self.latency * 1000),
+                "timed_out": False,
+                "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                "hits": {"total": {"value": self.max_hits, "relation": "eq"}, "max_score": None, "hits": _hits(size)},
+            }
+        if "pit" in body:
+            return {**response, "pit_id": body["pit"]["id"]}
+        return response
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        path = request.path.rstrip("/")
+        raw = await request.read()
+        if path.endswith("/_msearch"):
+            lines = [orjson.loads(line) for line in raw.splitlines() if line.strip()]
+            bodies = lines[1::2]
+            self.searches += len(bodies)
+            await asyncio.sleep(self.latency)  # The searches of one _msearch run side by side
+            payload = {"took": int(self.latency * 1000), "responses": [{**self._search_response(b), "status": 200} for b in bodies]}
+        elif path.endswith("/_search"):
+            self.searches += 1
+            await asyncio.sleep(self.latency)
+            payload = self._search_response(orjson.loads(raw) if raw else {})
+        elif path.endswith("/_search/point_in_time"):
+            if request.method == "DELETE":
+                payload = {"pits": [{"pit_id": "fake-pit", "successful": True}]}
+            else:
+                payload = {"pit_id": "fake-pit", "_shards": {"total": 1, "successful": 1, "failed": 0}}
+        elif path == "":
+            payload = {"name": "fake", "cluster_name": "fake", "version": {"distribution": "opensearch", "number": "2.11.0"}}
+        else:
+            payload = {}
+        return web.Response(body=orjson.dumps(payload), content_type="application/json")
+
+
+async def serve(port: int, latency: float, max_hits: int) -> web.AppRunner:
+    fake = FakeOpenSearch(latency, max_hits)
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["fake"] = fake
+    app.router.add_route("*", "/{tail:.*}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def start_in_thread(port: int, latency: float, max_hits: int = 100) -> FakeOpenSearch:
+    """Runs the fake on its own event loop in a daemon thread, so a blocked caller cannot slow it down."""
+    started = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        runner = loop.run_until_complete(serve(port, latency, max_hits))
+        holder["fake"] = runner.app["fake"]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fake-opensearch", daemon=True).start()
+    started.wait()
+    return holder["fake"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--port", type=int, default=9201)
+    parser.add_argument("--latency-ms", type=float, default=500, help="Delay before every search is answered")
+    parser.add_argument("--hits", type=int, default=100, help="Most hits returned per search")
+    args = parser.parse_args()
+
+    async def main():
+        await serve(args.port, args.latency_ms / 1000, args.hits)
+        print(f"Fake OpenSearch on 127.0.0.1:{args.port}, {args.latency_ms:.0f}ms per search")
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
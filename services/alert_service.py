@@ -0,0 +1,360 @@
+# sc-siem-corvette/services/alert_service.py
+import os
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from opensearchpy import AsyncOpenSearch
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal
+from models.alert import AlertRule, Alert
+from schemas.discover import DiscoverRequest, TimeRange
+from services import opensearch_service, search_scheduler
+from utils.helpers import as_utc
+
+ALERTING_ENABLED = os.getenv("ALERTING_ENABLED", "true").lower() == "true"
+# How often the scheduler looks for due rules.
+ALERT_TICK_SECONDS = float(os.getenv("ALERT_TICK_SECONDS", 10))
+# Windows end this far behind "now" so that events still being indexed are not missed.
+ALERT_SETTLE_SECONDS = int(os.getenv("ALERT_SETTLE_SECONDS", 30))
+# After downtime a rule resumes at most this far back (or one interval, if longer) instead of
+# scanning everything it missed.
+# Each interval in that span is one histogram bucket (times ALERT_MAX_GROUPS for grouped rules),
+# which must stay below the cluster's search.max_buckets.
+ALERT_MAX_LOOKBACK_SECONDS = int(os.getenv("ALERT_MAX_LOOKBACK_SECONDS", 3600))
+# Rules per _msearch, and how many of them OpenSearch may run concurrently.
+ALERT_MSEARCH_MAX_ITEMS = int(os.getenv("ALERT_MSEARCH_MAX_ITEMS", 100))
+ALERT_MSEARCH_MAX_CONCURRENT = int(os.getenv("ALERT_MSEARCH_MAX_CONCURRENT", 8))
+# Most group_by values that can raise alerts from one evaluation of one rule.
+ALERT_MAX_GROUPS = int(os.getenv("ALERT_MAX_GROUPS", 100))
+# How long a worker keeps the rules it claimed before another worker may take them over.
+# Must stay well above the time one group of rules takes to evaluate.
+ALERT_CLAIM_SECONDS = int(os.getenv("ALERT_CLAIM_SECONDS", 300))
+
+
+class AlertEngineStats:
+    def __init__(self):
+        self.ticks = 0
+        self.groups_evaluated = 0
+        self.rules_evaluated = 0
+        self.msearch_calls = 0
+        self.alerts_raised = 0
+        self.alerts_updated = 0
+        self.failures = 0
+
+
+engine_stats = AlertEngineStats()
+
+
+def window_end(rule: AlertRule, now: datetime) -> datetime:
+    """
+    End of the latest window a rule may evaluate. Windows are aligned to the
+    rule's interval, so rules sharing an interval also share their windows.
+    """
+    settled = int((now - timedelta(seconds=ALERT_SETTLE_SECONDS)).timestamp())
+    return datetime.fromtimestamp(settled - settled % rule.interval_seconds, tz=timezone.utc)
+
+
+def window_start(rule: AlertRule, end: datetime) -> datetime:
+    """
+    Start of the span to evaluate up to `end`: the rule's watermark, clamped to
+    ALERT_MAX_LOOKBACK_SECONDS after downtime. The clamp never cuts into the
+    rule's latest window, so rules with intervals longer than the lookback
+    still see whole windows.
+    """
+    lookback = max(ALERT_MAX_LOOKBACK_SECONDS, rule.interval_seconds)
+    return max(as_utc(rule.watermark), end - timedelta(seconds=lookback))
+
+
+def rule_request(rule: AlertRule, start: Optional[datetime] = None, end: Optional[datetime] = None) -> DiscoverRequest:
+    """Expresses a rule as a Discover request, optionally limited to the window [start, end)."""
+    time_range = None
+    if start is not None and end is not None:
+        time_range = TimeRange(**{
+            "from": str(int(start.timestamp() * 1000)),
+            "to": str(int(end.timestamp() * 1000) - 1),
+        })
+    return DiscoverRequest(
+        index_pattern=rule.index_pattern,
+        client_id=rule.client_id,
+        time_range=time_range,
+        query=rule.query or {"match_all": {}},
+        filters=rule.filters,
+        size=0,
+    )
+
+
+def build_rule_search(rule: AlertRule, start: datetime, end: datetime) -> Tuple[Optional[str], dict]:
+    """
+    Compiles a rule into (index_target, body) for [start, end), with the same
+    tenant filter and index pruning as a Discover search. The span is split
+    into the rule's interval windows by a date_histogram, so a catch-up span
+    after downtime is still held against the threshold one window at a time.
+    The target is None when no index can hold events in the span.
+    """
+    request = rule_request(rule, start, end)
+    body = opensearch_service.build_opensearch_query(request)
+    body.pop("sort", None)
+    body.pop("from", None)
+    body["track_total_hits"] = False
+    windows = {"date_histogram": {
+        "field": "@timestamp",
+        "fixed_interval": f"{rule.interval_seconds}s",
+        "min_doc_count": rule.threshold,
+    }}
+    if rule.group_by:
+        windows["aggs"] = {"groups": {"terms": {
+            "field": rule.group_by,
+            "size": ALERT_MAX_GROUPS,
+            "min_doc_count": rule.threshold,
+        }}}
+    body["aggs"] = {"windows": windows}
+    return opensearch_service.resolve_index_target(request), body
+
+
+def rule_matches(rule: AlertRule, response: dict, start: datetime, end: datetime) -> List[Tuple[str, int, datetime, datetime]]:
+    """
+    Returns (dedup_key, event_count, window_start, window_end) for every alert
+    the rule raises from one search response over [start, end), oldest window
+    first. Windows are clipped to the span searched.
+    """
+    matches = []
+    for window in response.get("aggregations", {}).get("windows", {}).get("buckets", []):
+        window_start = datetime.fromtimestamp(window["key"] / 1000, tz=timezone.utc)
+        window_stop = min(window_start + timedelta(seconds=rule.interval_seconds), end)
+        window_start = max(window_start, start)
+        if rule.group_by:
+            for bucket in window.get("groups", {}).get("buckets", []):
+                if bucket["doc_count"] >= rule.threshold:
+                    matches.append((str(bucket["key"]), bucket["doc_count"], window_start, window_stop))
+        elif window["doc_count"] >= rule.threshold:
+            matches.append(("", window["doc_count"], window_start, window_stop))
+    return matches
+
+
+async def record_alert(db: AsyncSession, rule: AlertRule, dedup_key: str, count: int, start: datetime, end: datetime, now: datetime):
+    """Folds a match into the rule's open alert for the same key, or raises a new alert."""
+    existing = (await db.execute(
+        select(Alert)
+        .filter(Alert.rule_id == rule.id, Alert.dedup_key == dedup_key, Alert.status != "resolved")
+        .order_by(Alert.last_seen.desc())
+    )).scalars().first()
+    dedup_window = timedelta(seconds=rule.dedup_window_seconds)
+    label = f"{rule.name} [{dedup_key}]" if dedup_key else rule.name
+
+    if existing is not None and now - as_utc(existing.last_seen) <= dedup_window:
+        existing.event_count += count
+        existing.occurrences += 1
+        existing.last_seen = now
+        existing.window_start, existing.window_end = start, end
+        existing.message = f"{label}: {count} matching events in the latest window ({existing.occurrences} occurrences)"
+        engine_stats.alerts_updated += 1
+        return
+
+    db.add(Alert(
+        rule_id=rule.id,
+        client_id=rule.client_id,
+        dedup_key=dedup_key,
+        status="open",
+        severity=rule.severity,
+        message=f"{label}: {count} matching events",
+        event_count=count,
+        occurrences=1,
+        first_seen=now,
+        last_seen=now,
+        window_start=start,
+        window_end=end,
+    ))
+    engine_stats.alerts_raised += 1
+
+
+def _error_reason(item: dict) -> str:
+    error = item.get("error")
+    return str(error.get("reason", error) if isinstance(error, dict) else error)
+
+
+async def _evaluate_group(db: AsyncSession, os_client: AsyncOpenSearch, rules: List[AlertRule], now: datetime):
+    """
+    Evaluates rules that share an index pattern and interval with as few
+    _msearch round trips as possible. A rule's watermark only advances when its
+    search succeeded completely, so failed windows are retried on the next tick.
+    """
+    searches = []  # (rule, start, end, index_target, body)
+    for rule in rules:
+        end = window_end(rule, now)
+        start = window_start(rule, end)
+        rule.last_evaluated_at = now
+        await opensearch_service.load_field_types(os_client, rule_request(rule))
+        try:
+            index_target, body = build_rule_search(rule, start, end)
+        except HTTPException as e:
+            # Filters stored before they were validated; the watermark stays put until the rule is fixed.
+            rule.last_error = str(e.detail)
+            continue
+        if index_target is None:
+            rule.watermark, rule.last_error = end, None
+            continue
+        searches.append((rule, start, end, index_target, body))
+
+    for offset in range(0, len(searches), ALERT_MSEARCH_MAX_ITEMS):
+        chunk = searches[offset:offset + ALERT_MSEARCH_MAX_ITEMS]
+        body = []
+        for _, _, _, index_target, query in chunk:
+            body.append({"index": index_target, "ignore_unavailable": True})
+            body.append(query)
+        try:
+            async with search_scheduler.scheduler.slot(None, search_scheduler.BACKGROUND):
+                response = await os_client.msearch(
+                    body=body,
+                    max_concurrent_searches=ALERT_MSEARCH_MAX_CONCURRENT,
+                    request_timeout=opensearch_service.OPENSEARCH_SEARCH_TIMEOUT
+                )
+            engine_stats.msearch_calls += 1
+        except Exception as e:
+            engine_stats.failures += 1
+            for rule, *_ in chunk:
+                rule.last_error = f"An error occurred while querying OpenSearch: {e}"
+            continue
+
+        for (rule, start, end, _, _), item in zip(chunk, response["responses"]):
+            if "error" in item and item.get("status") != 404:
+                rule.last_error = f"An error occurred while querying OpenSearch: {_error_reason(item)}"
+                continue
+            if item.get("timed_out") or item.get("_shards", {}).get("failed"):
+                rule.last_error = "Partial results from OpenSearch; the window will be retried."
+                continue
+            if "error" not in item:
+                for dedup_key, count, match_start, match_end in rule_matches(rule, item, start, end):
+                    await record_alert(db, rule, dedup_key, count, match_start, match_end, now)
+            rule.watermark, rule.last_error = end, None
+            engine_stats.rules_evaluated += 1
+
+
+async def _claim_due_rules(now: datetime) -> Dict[Tuple[str, int], List[int]]:
+    """
+    Claims the enabled polling rules whose next window has closed by setting
+    claimed_until with a conditional UPDATE, in one short transaction, so only
+    one worker evaluates each rule and no lock is held while OpenSearch is
+    queried. Returns the claimed rule ids grouped by (index pattern, interval).
+    """
+    settled = now - timedelta(seconds=ALERT_SETTLE_SECONDS)
+    claimable = or_(AlertRule.claimed_until.is_(None), AlertRule.claimed_until < now)
+    async with AsyncSessionLocal() as db:
+        # A rule can only be due once its watermark is behind the settle delay;
+        # window alignment is checked below.
+        rules = (await db.execute(
+            select(AlertRule)
+            .filter(
+                AlertRule.enabled.is_(True),
+                AlertRule.mode == "poll",
+                AlertRule.watermark < settled,
+                claimable,
+            )
+        )).scalars().all()
+        due = {rule.id: rule for rule in rules if window_end(rule, now) > as_utc(rule.watermark)}
+        if not due:
+            return {}
+
+        claimed = (await db.execute(
+            update(AlertRule)
+            .where(AlertRule.id.in_(due), claimable)
+            .values(claimed_until=now + timedelta(seconds=ALERT_CLAIM_SECONDS))
+            .returning(AlertRule.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        await db.commit()
+
+    groups: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for rule_id in claimed:
+        rule = due[rule_id]
+        groups[(rule.index_pattern, rule.interval_seconds)].append(rule_id)
+    return groups
+
+
+async def _release_rules(rule_ids: List[int]):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(AlertRule)
+            .where(AlertRule.id.in_(rule_ids))
+            .values(claimed_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+async def evaluate_due_rules(os_client: AsyncOpenSearch, now: Optional[datetime] = None) -> int:
+    """
+    Runs one scheduler tick: claims every enabled polling rule whose next window
+    has closed, then evaluates them grouped by (index pattern, interval). Each
+    group is committed in its own transaction, so a failing group only retries
+    its own windows. Returns the number of rules that were claimed.
+    """
+    now = now or datetime.now(timezone.utc)
+    groups = await _claim_due_rules(now)
+
+    for rule_ids in groups.values():
+        try:
+            async with AsyncSessionLocal() as db:
+                rules = (await db.execute(select(AlertRule).filter(AlertRule.id.in_(rule_ids)))).scalars().all()
+                await _evaluate_group(db, os_client, rules, now)
+                for rule in rules:
+                    rule.claimed_until = None
+                await db.commit()
+            engine_stats.groups_evaluated += 1
+        except Exception as e:
+            engine_stats.failures += 1
+            print(f"WARNING: Alert evaluation failed for rules {rule_ids}: {e}")
+            await _release_rules(rule_ids)
+
+    engine_stats.ticks += 1
+    return sum(len(rule_ids) for rule_ids in groups.values())
+
+
+_engine_task: Optional[asyncio.Task] = None
+
+
+async def _engine_loop(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    while True:
+        os_client = client_provider()
+        if os_client is not None:
+            try:
+                await evaluate_due_rules(os_client)
+            except Exception as e:
+                engine_stats.failures += 1
+                print(f"WARNING: Alert evaluation failed: {e}")
+        await asyncio.sleep(ALERT_TICK_SECONDS)
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts the alert scheduler in the background."""
+    global _engine_task
+    if ALERTING_ENABLED and _engine_task is None:
+        _engine_task = asyncio.create_task(_engine_loop(client_provider))
+
+
+async def stop():
+    global _engine_task
+    if _engine_task is not None:
+        _engine_task.cancel()
+        try:
+            await _engine_task
+        except asyncio.CancelledError:
+            pass
+        _engine_task = None
+
+
+def stats() -> dict:
+    return {
+        "enabled": ALERTING_ENABLED,
+        "ticks": engine_stats.ticks,
+        "groups_evaluated": engine_stats.groups_evaluated,
+        "rules_evaluated": engine_stats.rules_evaluated,
+        "msearch_calls": engine_stats.msearch_calls,
+        "alerts_raised": engine_stats.alerts_raised,
+        "alerts_updated": engine_stats.alerts_updated,
+        "failures": engine_stats.failures,
+    }
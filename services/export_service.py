@@ -0,0 +1,170 @@
+# sc-siem-corvette/services/export_service.py
+import os
+import io
+import csv
+import json
+import zlib
+import asyncio
+from typing import AsyncIterator, List, Optional, Any
+
+from fastapi import HTTPException, status
+from opensearchpy import AsyncOpenSearch, NotFoundError, ConnectionTimeout
+
+from schemas.discover import DiscoverRequest
+from services import opensearch_service, search_scheduler
+from utils.helpers import get_path
+
+# Number of hits fetched (and held in memory) per round trip while exporting.
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", 1000))
+EXPORT_KEEP_ALIVE = os.getenv("EXPORT_KEEP_ALIVE", "5m")
+# Tries per page when the search scheduler sheds it or OpenSearch times out, with exponential backoff.
+EXPORT_PAGE_MAX_ATTEMPTS = int(os.getenv("EXPORT_PAGE_MAX_ATTEMPTS", 5))
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_value(value: Any) -> Any:
+    """Nested objects and lists are written to CSV cells as JSON."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _render_ndjson(hits: List[dict], columns: Optional[List[str]]) -> str:
+    lines = []
+    for hit in hits:
+        source = hit.get("_source", {})
+        if columns:
+            source = {column: get_path(source, column) for column in columns}
+        lines.append(json.dumps(source, default=str))
+    return "\n".join(lines) + "\n"
+
+
+def _render_csv(hits: List[dict], columns: List[str], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for hit in hits:
+        source = hit.get("_source", {})
+        writer.writerow([_csv_value(get_path(source, column)) for column in columns])
+    return buffer.getvalue()
+
+
+async def export_logs(request: DiscoverRequest, fmt: str = "ndjson", compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    Prepares a streaming export of every hit matching the request.
+    The point-in-time is opened eagerly so that errors surface as a proper HTTP
+    status before the response starts; the returned iterator then walks the
+    result set one page at a time.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    os_client = opensearch_service.get_client()
+    await opensearch_service.load_field_types(os_client, request)
+
+    # Aggregations, highlighting and offsets have no meaning in an export.
+    export_request = request.model_copy(update={"aggregations": None, "highlight": None, "size": EXPORT_PAGE_SIZE, "from_": 0})
+    query = opensearch_service.build_opensearch_query(export_request)
+
+    index_target = opensearch_service.resolve_index_target(request)
+    if index_target is not None:
+        # Checked before the response starts. Pages are never truncated, as that would end the export early.
+        query.pop("from", None)
+        opensearch_service.admit_search(query, index_target, export_request, truncate=False)
+    try:
+        pit_id = None
+        if index_target is not None:
+            pit_id = await opensearch_service.open_point_in_time(
+                os_client, index_target, EXPORT_KEEP_ALIVE, request.client_id, search_scheduler.BACKGROUND
+            )
+    except HTTPException as e:
+        raise e
+    except NotFoundError:
+        pit_id = None
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An error occurred while opening a point-in-time: {e}"
+        )
+
+    return _stream_pages(os_client, query, pit_id, fmt, request.fields, compress, request.client_id)
+
+
+async def _search_page(os_client: AsyncOpenSearch, query: dict, client_id: Optional[str]) -> dict:
+    """
+    Fetches one page in the background lane. The response has usually started
+    streaming by then, so a shed or timed-out page is retried rather than
+    ending the export early.
+    """
+    for attempt in range(1, EXPORT_PAGE_MAX_ATTEMPTS + 1):
+        try:
+            async with search_scheduler.scheduler.slot(client_id, search_scheduler.BACKGROUND):
+                return await os_client.search(body=query, request_timeout=opensearch_service.OPENSEARCH_SEARCH_TIMEOUT)
+        except (HTTPException, ConnectionTimeout) as e:
+            shed = isinstance(e, HTTPException) and e.status_code in (status.HTTP_429_TOO_MANY_REQUESTS, status.HTTP_503_SERVICE_UNAVAILABLE)
+            if attempt == EXPORT_PAGE_MAX_ATTEMPTS or not (shed or isinstance(e, ConnectionTimeout)):
+                raise
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+
+async def _stream_pages(
+    os_client: AsyncOpenSearch,
+    query: dict,
+    pit_id: Optional[str],
+    fmt: str,
+    columns: Optional[List[str]],
+    compress: bool,
+    client_id: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yields encoded chunks page by page and always releases the point-in-time.
+    Each page waits for its own background slot in the search scheduler, so a
+    long export never holds capacity that interactive searches are waiting for.
+    A page that still fails after its retries raises, which aborts the
+    response instead of ending it like a complete file.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 emits a gzip container
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    try:
+        if pit_id is not None:
+            query = opensearch_service.apply_cursor(query, pit_id, EXPORT_KEEP_ALIVE)
+            # The cost guard may have lowered the page size; a page is only the last one when it falls short of it.
+            page_size = query.get("size", EXPORT_PAGE_SIZE)
+            first_page = True
+            while True:
+                response = await _search_page(os_client, query, client_id)
+                hits = response["hits"]["hits"]
+                pit_id = response.get("pit_id", pit_id)
+
+                if fmt == "csv":
+                    if columns is None:
+                        # Without an explicit field list, the first page decides the CSV columns.
+                        columns = sorted({key for hit in hits for key in hit.get("_source", {})})
+                    chunk = _render_csv(hits, columns, header=first_page)
+                else:
+                    chunk = _render_ndjson(hits, columns) if hits else ""
+                first_page = False
+
+                if chunk:
+                    data = encode(chunk)
+                    if data:
+                        yield data
+
+                if not hits or len(hits) < page_size:
+                    break
+                query["pit"]["id"] = pit_id
+                query["search_after"] = hits[-1]["sort"]
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        if pit_id is not None:
+            await opensearch_service.close_point_in_time(pit_id)
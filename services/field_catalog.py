@@ -0,0 +1,209 @@
+# sc-siem-corvette/services/field_catalog.py
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from opensearchpy import AsyncOpenSearch
+
+from services.single_flight import SingleFlight
+
+# How often the field types of patterns in use are reloaded, and how old they
+# may get before filters are compiled without them.
+FIELD_CATALOG_REFRESH_INTERVAL = float(os.getenv("FIELD_CATALOG_REFRESH_INTERVAL", 300))
+FIELD_CATALOG_MAX_AGE = float(os.getenv("FIELD_CATALOG_MAX_AGE", 900))
+# Patterns nobody searched for this long are dropped from the catalog.
+FIELD_CATALOG_IDLE_SECONDS = float(os.getenv("FIELD_CATALOG_IDLE_SECONDS", 3600))
+# How long a search waits for the first load of its pattern before compiling without it.
+FIELD_CATALOG_LOAD_TIMEOUT = float(os.getenv("FIELD_CATALOG_LOAD_TIMEOUT", 2))
+
+# Field types whose indexed value is the exact value, so term queries can target them directly.
+EXACT_TYPES = {
+    "keyword", "constant_keyword", "wildcard", "ip", "version", "boolean", "date", "date_nanos",
+    "long", "integer", "short", "byte", "double", "float", "half_float", "scaled_float", "unsigned_long",
+}
+NUMERIC_TYPES = {"long", "integer", "short", "byte", "double", "float", "half_float", "scaled_float", "unsigned_long"}
+# Container types carry no values of their own.
+CONTAINER_TYPES = {"object", "nested"}
+
+
+@dataclass
+class FieldInfo:
+    name: str
+    types: Tuple[str, ...]  # Several when indices behind the pattern disagree
+    searchable: bool
+    aggregatable: bool
+    keyword_variant: Optional[str] = None  # Keyword sub-field holding the exact value of a text field
+
+    @property
+    def type(self) -> str:
+        return self.types[0] if len(self.types) == 1 else "conflict"
+
+    @property
+    def is_text(self) -> bool:
+        return "text" in self.types or "match_only_text" in self.types
+
+    @property
+    def is_exact(self) -> bool:
+        return all(t in EXACT_TYPES for t in self.types)
+
+    @property
+    def is_numeric(self) -> bool:
+        return all(t in NUMERIC_TYPES for t in self.types)
+
+    @property
+    def is_ip(self) -> bool:
+        return self.types == ("ip",)
+
+
+@dataclass
+class PatternFields:
+    fields: Optional[Dict[str, FieldInfo]]  # None until the first load
+    refreshed_at: float  # time.time() of the last successful load
+    last_used: float
+
+
+def parse_field_caps(response: dict) -> Dict[str, FieldInfo]:
+    """Turns a _field_caps response into FieldInfo entries, linking text fields to their keyword sub-field."""
+    fields: Dict[str, FieldInfo] = {}
+    for name, by_type in response.get("fields", {}).items():
+        types = tuple(sorted(t for t in by_type if t not in CONTAINER_TYPES and not t.startswith("_")))
+        if not types:
+            continue  # Metadata fields (_id, _index, ...) and objects
+        fields[name] = FieldInfo(
+            name=name,
+            types=types,
+            searchable=all(caps.get("searchable", True) for t, caps in by_type.items() if t in types),
+            aggregatable=all(caps.get("aggregatable", False) for t, caps in by_type.items() if t in types),
+        )
+    for name, info in fields.items():
+        variant = fields.get(f"{name}.keyword")
+        if info.is_text and variant is not None and variant.types == ("keyword",):
+            info.keyword_variant = variant.name
+    return fields
+
+
+class FieldCatalog:
+    """
+    Cached field types per index pattern, built from _field_caps. Query
+    compilation reads it synchronously; patterns are loaded on first use and
+    then kept current in the background.
+    """
+
+    def __init__(self):
+        self.patterns: Dict[str, PatternFields] = {}
+        self._flights = SingleFlight()
+        self.loads = 0
+        self.failures = 0
+        self.misses = 0  # Lookups answered without field types
+
+    def _is_fresh(self, entry: PatternFields) -> bool:
+        return entry.fields is not None and time.time() - entry.refreshed_at <= FIELD_CATALOG_MAX_AGE
+
+    def get(self, index_pattern: str) -> Optional[Dict[str, FieldInfo]]:
+        """
+        Returns the pattern's field types, or None when they are not loaded (or
+        too old). Unknown patterns are queued for the next background refresh.
+        """
+        now = time.time()
+        entry = self.patterns.get(index_pattern)
+        if entry is None:
+            entry = self.patterns[index_pattern] = PatternFields(None, 0.0, now)
+        entry.last_used = now
+        if not self._is_fresh(entry):
+            self.misses += 1
+            return None
+        return entry.fields
+
+    async def load(self, os_client: AsyncOpenSearch, index_pattern: str) -> Dict[str, FieldInfo]:
+        response = await os_client.field_caps(
+            index=index_pattern,
+            fields="*",
+            ignore_unavailable=True,
+            allow_no_indices=True,
+        )
+        fields = parse_field_caps(response)
+        entry = self.patterns.get(index_pattern)
+        if entry is None:
+            entry = self.patterns[index_pattern] = PatternFields(None, 0.0, time.time())
+        entry.fields, entry.refreshed_at = fields, time.time()
+        self.loads += 1
+        return fields
+
+    async def ensure(self, os_client: AsyncOpenSearch, index_pattern: str):
+        """
+        Loads the pattern's field types if they are missing or stale, waiting at
+        most FIELD_CATALOG_LOAD_TIMEOUT. Concurrent callers share one load, which
+        keeps running past the timeout so later searches benefit from it. Until
+        then the compiler falls back to its mapping-unaware defaults.
+        """
+        entry = self.patterns.get(index_pattern)
+        if entry is not None and self._is_fresh(entry):
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(self._flights.do(index_pattern, lambda: self.load(os_client, index_pattern))),
+                FIELD_CATALOG_LOAD_TIMEOUT,
+            )
+        except Exception as e:
+            self.failures += 1
+            print(f"WARNING: Could not load field types of '{index_pattern}': {e}")
+
+    async def refresh(self, os_client: AsyncOpenSearch):
+        """Reloads patterns in use whose field types are due, and forgets idle ones."""
+        now = time.time()
+        for index_pattern, entry in list(self.patterns.items()):
+            if now - entry.last_used > FIELD_CATALOG_IDLE_SECONDS:
+                del self.patterns[index_pattern]
+            elif entry.fields is None or now - entry.refreshed_at >= FIELD_CATALOG_REFRESH_INTERVAL:
+                try:
+                    await self._flights.do(index_pattern, lambda p=index_pattern: self.load(os_client, p))
+                except Exception as e:
+                    self.failures += 1
+                    print(f"WARNING: Could not refresh field types of '{index_pattern}': {e}")
+
+    def stats(self) -> dict:
+        return {
+            "patterns": len(self.patterns),
+            "fields": sum(len(entry.fields or {}) for entry in self.patterns.values()),
+            "loads": self.loads,
+            "failures": self.failures,
+            "misses": self.misses,
+        }
+
+
+catalog = FieldCatalog()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_loop(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    # Patterns are mostly loaded on demand; wake often enough to pick up ones
+    # queued by synchronous lookups (e.g. the alert scheduler) soon after.
+    tick = min(FIELD_CATALOG_REFRESH_INTERVAL, 30)
+    while True:
+        os_client = client_provider()
+        if os_client is not None:
+            try:
+                await catalog.refresh(os_client)
+            except Exception as e:
+                print(f"WARNING: Field catalog refresh failed: {e}")
+        await asyncio.sleep(tick)
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts refreshing the catalog in the background."""
+    global _refresh_task
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop(client_provider))
+
+
+async def stop():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
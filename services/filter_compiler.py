@@ -0,0 +1,149 @@
+# sc-siem-corvette/services/filter_compiler.py
+import os
+import ipaddress
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from schemas.discover import DynamicFilter
+from services.field_catalog import FieldInfo
+
+FILTER_TYPES = ("term", "match", "range")
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+# Most values one multi-value term filter may list (OpenSearch refuses more than 65536).
+FILTER_MAX_TERMS = int(os.getenv("FILTER_MAX_TERMS", 1024))
+
+Fields = Optional[Dict[str, FieldInfo]]
+
+
+def _reject(detail: str):
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool)) and value != ""
+
+
+def _values(f: DynamicFilter) -> List[Any]:
+    """The filter's values, de-duplicated in order; a list value means 'any of'."""
+    values = f.value if isinstance(f.value, list) else [f.value]
+    if not values:
+        _reject(f"Filter on '{f.field}' has no values.")
+    if len(values) > FILTER_MAX_TERMS:
+        _reject(f"Filter on '{f.field}' lists {len(values)} values; at most {FILTER_MAX_TERMS} are allowed.")
+    unique = []
+    for value in values:
+        if not _is_scalar(value):
+            _reject(f"Filter on '{f.field}' has an invalid value: {value!r}")
+        if value not in unique:
+            unique.append(value)
+    return unique
+
+
+def validate_filter(f: DynamicFilter):
+    """Checks what can be checked without knowing the field's mapping."""
+    if not f.field or not f.field.strip() or "*" in f.field:
+        _reject("Filters need a concrete field name.")
+    if f.type not in FILTER_TYPES:
+        _reject(f"Unsupported filter type '{f.type}' on '{f.field}'. Use one of: {', '.join(FILTER_TYPES)}")
+    if f.type == "term":
+        _values(f)
+    elif not _is_scalar(f.value):
+        _reject(f"'{f.type}' filter on '{f.field}' needs a single value.")
+    if f.type == "range" and f.operator not in RANGE_OPERATORS:
+        _reject(f"Range filter on '{f.field}' needs an operator: {', '.join(RANGE_OPERATORS)}")
+
+
+def validate_filters(filters: Optional[List[DynamicFilter]]):
+    for f in filters or []:
+        validate_filter(f)
+
+
+def _check_value(f: DynamicFilter, info: Optional[FieldInfo], value: Any):
+    """Rejects values the field's type can't hold, which OpenSearch would otherwise fail the whole search on."""
+    if info is None:
+        return
+    if info.is_numeric:
+        if isinstance(value, bool):
+            _reject(f"Field '{f.field}' is numeric; got {value!r}.")
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            _reject(f"Field '{f.field}' is numeric; got {value!r}.")
+    elif info.is_ip:
+        try:
+            # Term queries on ip fields accept single addresses and CIDR blocks alike.
+            ipaddress.ip_network(str(value).strip(), strict=False)
+        except ValueError:
+            _reject(f"Field '{f.field}' holds IP addresses; got {value!r}. Use an address or a CIDR block.")
+
+
+def _field_info(f: DynamicFilter, fields: Fields) -> Optional[FieldInfo]:
+    info = fields.get(f.field) if fields is not None else None
+    if info is not None and not info.searchable:
+        _reject(f"Field '{f.field}' is not indexed and can't be filtered on.")
+    return info
+
+
+def exact_field(name: str, info: Optional[FieldInfo]) -> Optional[str]:
+    """
+    Picks the variant of a field that holds exact values: the field itself for
+    keyword, ip, numeric and date fields, the keyword sub-field of a text
+    field, or None for text without one. Without field types it assumes the
+    text + '.keyword' shape of dynamic mappings.
+    """
+    if info is None:
+        return name if name.endswith(".keyword") else f"{name}.keyword"
+    if info.is_exact:
+        return name
+    if info.keyword_variant:
+        return info.keyword_variant
+    return None if info.is_text else name
+
+
+def aggregatable_field(name: str, fields: Fields) -> str:
+    """Picks the variant of a field that terms aggregations can run on, or rejects the field with 400."""
+    info = fields.get(name) if fields is not None else None
+    if info is None:
+        return exact_field(name, None)
+    if info.aggregatable:
+        return name
+    if info.keyword_variant:
+        return info.keyword_variant
+    _reject(f"Field '{name}' has no doc values and can't be aggregated on.")
+
+
+def compile_filter(f: DynamicFilter, fields: Fields) -> dict:
+    validate_filter(f)
+    info = _field_info(f, fields)
+
+    if f.type == "term":
+        values = _values(f)
+        for value in values:
+            _check_value(f, info, value)
+        target = exact_field(f.field, info)
+        if target is None:
+            # Analyzed text only: the closest exact match is the phrase.
+            clauses = [{"match_phrase": {f.field: value}} for value in values]
+            return clauses[0] if len(clauses) == 1 else {"bool": {"should": clauses, "minimum_should_match": 1}}
+        if len(values) == 1:
+            return {"term": {target: values[0]}}
+        return {"terms": {target: values}}
+
+    if f.type == "match":
+        return {"match": {f.field: f.value}}
+
+    _check_value(f, info, f.value)
+    target = f.field
+    if info is not None and info.is_text and info.keyword_variant:
+        target = info.keyword_variant  # Ranges over analyzed terms are meaningless.
+    return {"range": {target: {f.operator: f.value}}}
+
+
+def compile_filters(filters: Optional[List[DynamicFilter]], fields: Fields) -> List[dict]:
+    """
+    Compiles Discover filters into filter-context clauses for the fields'
+    actual types. Malformed filters are rejected with 400 before any of them
+    reaches the cluster.
+    """
+    return [compile_filter(f, fields) for f in filters or []]
@@ -0,0 +1,233 @@
+# sc-siem-corvette/services/index_catalog.py
+import os
+import time
+import asyncio
+import re
+import fnmatch
+from dataclasses import dataclass
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from opensearchpy import AsyncOpenSearch
+
+from schemas.discover import TimeRange
+from utils.helpers import parse_time_expression
+
+# How often the catalog is rebuilt, and how old it may get before searches fall
+# back to the raw wildcard pattern.
+INDEX_CATALOG_REFRESH_INTERVAL = float(os.getenv("INDEX_CATALOG_REFRESH_INTERVAL", 60))
+INDEX_CATALOG_MAX_AGE = float(os.getenv("INDEX_CATALOG_MAX_AGE", 300))
+# Undated indices that received documents within this window are treated as still
+# being written to: they are never pruned and their bounds are re-read on every
+# refresh. Older ones keep the bounds measured last.
+INDEX_CATALOG_HOT_WINDOW = float(os.getenv("INDEX_CATALOG_HOT_WINDOW", 86400))
+# Above this many matching indices the explicit list is not worth sending.
+INDEX_CATALOG_MAX_EXPLICIT = int(os.getenv("INDEX_CATALOG_MAX_EXPLICIT", 200))
+TIMESTAMP_FIELD = "@timestamp"
+# Daily indices are named <source_type>-YYYY-MM-DD after the UTC day of their documents.
+_DAILY_INDEX_RE = re.compile(r"^.+-(\d{4}-\d{2}-\d{2})$")
+_MEASURE_BATCH = 50
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    min_ts: Optional[datetime]
+    max_ts: Optional[datetime]
+    dated: bool = False  # Bounds come from the index name and cannot move
+
+
+def _daily_bounds(index_name: str) -> Optional[IndexInfo]:
+    match = _DAILY_INDEX_RE.match(index_name)
+    if not match:
+        return None
+    try:
+        day = date.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+    start = datetime.combine(day, day_time.min, tzinfo=timezone.utc)
+    return IndexInfo(index_name, start, start + timedelta(days=1) - timedelta(milliseconds=1), dated=True)
+
+
+class IndexCatalog:
+    """
+    Cached view of the cluster's indices, their aliases and the @timestamp range
+    each index holds. Used to turn an index pattern plus a time range into the
+    concrete indices that can actually contain matching documents.
+    """
+
+    def __init__(self):
+        self.indices: Dict[str, IndexInfo] = {}
+        self.aliases: Dict[str, List[str]] = {}
+        self.refreshed_at: Optional[float] = None  # time.time() of the last successful refresh
+        self.pruned_searches = 0
+        self.fallback_searches = 0
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.refreshed_at is not None and time.time() - self.refreshed_at <= INDEX_CATALOG_MAX_AGE
+
+    def _is_cold(self, info: Optional[IndexInfo], now: float) -> bool:
+        """Undated indices whose newest document is older than the hot window keep their cached bounds."""
+        return info is not None and info.max_ts is not None and info.max_ts.timestamp() < now - INDEX_CATALOG_HOT_WINDOW
+
+    async def refresh(self, os_client: AsyncOpenSearch):
+        """
+        Rebuilds the catalog from the cluster's alias table. Daily indices take
+        their bounds from their name; only the remaining indices that are still
+        hot (or not yet measured) are asked for their @timestamp range.
+        """
+        alias_table = await os_client.indices.get_alias(index="*,-.*", expand_wildcards="open")
+        aliases: Dict[str, List[str]] = {}
+        for index_name, entry in alias_table.items():
+            for alias in entry.get("aliases", {}):
+                aliases.setdefault(alias, []).append(index_name)
+
+        now = time.time()
+        indices: Dict[str, IndexInfo] = {}
+        to_measure: List[str] = []
+        for name in alias_table:
+            info = _daily_bounds(name)
+            if info is None:
+                cached = self.indices.get(name)
+                if self._is_cold(cached, now):
+                    info = cached
+                else:
+                    info = IndexInfo(name, None, None)
+                    to_measure.append(name)
+            indices[name] = info
+
+        buckets = []
+        # Batched so the index list stays well inside OpenSearch's request-line limit.
+        for offset in range(0, len(to_measure), _MEASURE_BATCH):
+            batch = to_measure[offset:offset + _MEASURE_BATCH]
+            bounds = await os_client.search(
+                index=",".join(batch),
+                body={
+                    "size": 0,
+                    "aggs": {
+                        "by_index": {
+                            "terms": {"field": "_index", "size": len(batch)},
+                            "aggs": {
+                                "min_ts": {"min": {"field": TIMESTAMP_FIELD}},
+                                "max_ts": {"max": {"field": TIMESTAMP_FIELD}},
+                            },
+                        }
+                    },
+                },
+                ignore_unavailable=True,
+                allow_no_indices=True,
+            )
+            buckets.extend(bounds.get("aggregations", {}).get("by_index", {}).get("buckets", []))
+
+        for bucket in buckets:
+            min_value = bucket["min_ts"].get("value")
+            max_value = bucket["max_ts"].get("value")
+            indices[bucket["key"]] = IndexInfo(
+                bucket["key"],
+                datetime.fromtimestamp(min_value / 1000, tz=timezone.utc) if min_value is not None else None,
+                datetime.fromtimestamp(max_value / 1000, tz=timezone.utc) if max_value is not None else None,
+            )
+
+        self.indices, self.aliases = indices, aliases
+        self.refreshed_at = now
+
+    def _expand(self, index_pattern: str) -> Optional[List[str]]:
+        """Expands a comma-separated pattern of index names, wildcards and aliases."""
+        names = set()
+        for part in (p.strip() for p in index_pattern.split(",")):
+            if not part or part.startswith("-") or ":" in part:
+                # Exclusions and cross-cluster targets are left to OpenSearch.
+                return None
+            for index_name in self.indices:
+                if fnmatch.fnmatchcase(index_name, part):
+                    names.add(index_name)
+            for alias, members in self.aliases.items():
+                if fnmatch.fnmatchcase(alias, part):
+                    names.update(members)
+        return sorted(names)
+
+    def _may_overlap(self, info: IndexInfo, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        if info.min_ts is None or info.max_ts is None:
+            return True  # Empty or unmapped timestamp: nothing to prune on.
+        if not info.dated and info.max_ts.timestamp() >= self.refreshed_at - INDEX_CATALOG_HOT_WINDOW:
+            return True  # Still receiving documents, so its bounds are moving.
+        if start is not None and info.max_ts < start:
+            return False
+        if end is not None and info.min_ts > end:
+            return False
+        return True
+
+    def resolve(self, index_pattern: str, time_range: Optional[TimeRange]) -> Optional[List[str]]:
+        """
+        Returns the concrete indices matching the pattern that can hold documents in
+        the time range, or None when the caller should search the raw pattern
+        (stale catalog, unparseable range, or too many indices to list).
+        """
+        if not time_range or not self.is_fresh:
+            self.fallback_searches += 1
+            return None
+        # The catalog cannot know about indices created after the last refresh,
+        # which mostly happens when a new day's index is rolled over.
+        refreshed_day = datetime.fromtimestamp(self.refreshed_at, tz=timezone.utc).date()
+        if refreshed_day != datetime.now(timezone.utc).date():
+            self.fallback_searches += 1
+            return None
+
+        start = parse_time_expression(time_range.from_)
+        end = parse_time_expression(time_range.to, round_up=True)
+        candidates = self._expand(index_pattern)
+        if candidates is None or (time_range.from_ and start is None) or (time_range.to and end is None):
+            self.fallback_searches += 1
+            return None
+
+        pruned = [name for name in candidates if self._may_overlap(self.indices[name], start, end)]
+        if len(pruned) > INDEX_CATALOG_MAX_EXPLICIT:
+            self.fallback_searches += 1
+            return None
+        self.pruned_searches += 1
+        return pruned
+
+    def stats(self) -> dict:
+        return {
+            "indices": len(self.indices),
+            "dated_indices": sum(1 for info in self.indices.values() if info.dated),
+            "aliases": len(self.aliases),
+            "age_seconds": time.time() - self.refreshed_at if self.refreshed_at else None,
+            "fresh": self.is_fresh,
+            "pruned_searches": self.pruned_searches,
+            "fallback_searches": self.fallback_searches,
+        }
+
+
+catalog = IndexCatalog()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_loop(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    while True:
+        os_client = client_provider()
+        if os_client is not None:
+            try:
+                await catalog.refresh(os_client)
+            except Exception as e:
+                print(f"WARNING: Index catalog refresh failed: {e}")
+        await asyncio.sleep(INDEX_CATALOG_REFRESH_INTERVAL)
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts refreshing the catalog in the background."""
+    global _refresh_task
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop(client_provider))
+
+
+async def stop():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
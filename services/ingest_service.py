@@ -0,0 +1,422 @@
+# sc-siem-corvette/services/ingest_service.py
+import os
+import re
+import asyncio
+import secrets
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone, timedelta
+from typing import AsyncIterator, Callable, Deque, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from opensearchpy import AsyncOpenSearch
+
+from services import percolator_service
+from utils.helpers import parse_time_expression
+
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "true").lower() == "true"
+# Source types accepted by the ingest endpoint; each gets daily '<source_type>-YYYY-MM-DD' indices.
+INGEST_SOURCE_TYPES = [s.strip() for s in os.getenv("INGEST_SOURCE_TYPES", "syslog").split(",") if s.strip()]
+# Documents buffered or in flight; beyond this, ingest requests are rejected with 429.
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", 200000))
+# Most documents accepted from one request.
+INGEST_MAX_REQUEST_DOCS = int(os.getenv("INGEST_MAX_REQUEST_DOCS", 20000))
+# Longest NDJSON line accepted; a longer one rejects the request with 413.
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", 1024 * 1024))
+# A _bulk request is sent when it reaches either limit, or when its oldest document has waited the flush interval.
+INGEST_BATCH_MAX_DOCS = int(os.getenv("INGEST_BATCH_MAX_DOCS", 2000))
+INGEST_BATCH_MAX_BYTES = int(os.getenv("INGEST_BATCH_MAX_BYTES", 5 * 1024 * 1024))
+INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", 1))
+# Concurrent _bulk requests per worker.
+INGEST_FLUSHERS = int(os.getenv("INGEST_FLUSHERS", 4))
+# Retries of a rejected document, with exponential backoff starting at INGEST_RETRY_BACKOFF_SECONDS.
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", 5))
+INGEST_RETRY_BACKOFF_SECONDS = float(os.getenv("INGEST_RETRY_BACKOFF_SECONDS", 0.5))
+INGEST_BULK_TIMEOUT = float(os.getenv("INGEST_BULK_TIMEOUT", 60))
+# Documents whose @timestamp falls outside these bounds are refused, so callers cannot create
+# daily indices for arbitrary days.
+INGEST_MAX_AGE_DAYS = int(os.getenv("INGEST_MAX_AGE_DAYS", 30))
+INGEST_MAX_FUTURE_SECONDS = int(os.getenv("INGEST_MAX_FUTURE_SECONDS", 900))
+
+TIMESTAMP_FIELD = "@timestamp"
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Per-document _bulk statuses that are worth retrying (rejected by a busy or recovering cluster).
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# A document resent after a failed _bulk request may already have been indexed by it.
+CONFLICT_STATUS = 409
+
+
+@dataclass
+class PendingDocument:
+    index: str
+    source: dict
+    size: int
+    queued_at: float
+    attempts: int = 0
+    # Fixed when the document is accepted, so a resent document cannot be indexed twice.
+    id: str = field(default_factory=lambda: secrets.token_urlsafe(15))
+
+
+# --- Parsing ---
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], int]]:
+    """
+    Parses an NDJSON body as it arrives, yielding (line number, document, size)
+    per non-empty line. The document is None when the line is not a JSON object.
+    Raises 413 as soon as a line grows beyond INGEST_MAX_LINE_BYTES.
+    """
+    pending = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        # Only the new chunk is searched for line ends; the unfinished line before it had none.
+        scan_from = len(pending)
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", scan_from)
+            if end < 0:
+                break
+            _check_line_length(end - start)
+            line = bytes(pending[start:end])
+            line_number += 1
+            if line.strip():
+                yield line_number, _load_object(line), len(line)
+            start = scan_from = end + 1
+        del pending[:start]
+        _check_line_length(len(pending))
+    if pending.strip():
+        yield line_number + 1, _load_object(bytes(pending)), len(pending)
+
+
+def _check_line_length(length: int):
+    if length > INGEST_MAX_LINE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"NDJSON lines can be at most {INGEST_MAX_LINE_BYTES} bytes long."
+        )
+
+
+def _load_object(line: bytes) -> Optional[dict]:
+    try:
+        value = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _utc_day(value: str) -> Optional[str]:
+    """The day of a UTC ('...Z') timestamp without parsing all of it, or None when it doesn't start with a valid date."""
+    day = value[:10]
+    if not _DAY_RE.match(day):
+        return None
+    try:
+        date.fromisoformat(day)
+    except ValueError:
+        return None
+    return day
+
+
+def daily_index(source_type: str, document: dict, now: datetime) -> str:
+    """
+    Returns the daily index for a document, from the UTC day of its @timestamp.
+    Documents without a usable timestamp are stamped with the ingest time.
+    Raises ValueError for timestamps on a day more than INGEST_MAX_AGE_DAYS
+    before, or INGEST_MAX_FUTURE_SECONDS after, the ingest time.
+    """
+    value = document.get(TIMESTAMP_FIELD)
+    day = _utc_day(value) if isinstance(value, str) and value.endswith("Z") else None
+    if day is None:
+        timestamp = None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            try:
+                timestamp = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+            except (OverflowError, OSError, ValueError):
+                raise ValueError(f"{TIMESTAMP_FIELD} {value!r} is out of range")
+        elif isinstance(value, str):
+            try:
+                timestamp = parse_time_expression(value, now)
+            except (OverflowError, ValueError):
+                timestamp = None
+        if timestamp is None:
+            timestamp = now
+            document[TIMESTAMP_FIELD] = now.isoformat()
+        day = timestamp.strftime("%Y-%m-%d")
+    # ISO days compare correctly as strings.
+    oldest = (now - timedelta(days=INGEST_MAX_AGE_DAYS)).strftime("%Y-%m-%d")
+    newest = (now + timedelta(seconds=INGEST_MAX_FUTURE_SECONDS)).strftime("%Y-%m-%d")
+    if not oldest <= day <= newest:
+        raise ValueError(f"{TIMESTAMP_FIELD} {value!r} is outside the accepted range ({oldest} to {newest})")
+    return f"{source_type}-{day}"
+
+
+# --- Batching ---
+
+class IngestStats:
+    def __init__(self):
+        self.accepted = 0
+        self.rejected_requests = 0
+        self.invalid_documents = 0
+        self.indexed = 0
+        self.retried = 0
+        self.failed = 0
+        self.bulk_requests = 0
+        self.bulk_failures = 0
+
+
+class BulkIngester:
+    """
+    Buffers accepted documents and writes them with concurrent _bulk requests.
+    Documents count against INGEST_QUEUE_MAX until they are indexed or given
+    up on, so a slow cluster pushes back on clients instead of growing memory.
+    """
+
+    def __init__(self):
+        self.stats = IngestStats()
+        self._buffer: Deque[PendingDocument] = deque()
+        self._buffered_bytes = 0
+        self._pending = 0  # Buffered, in flight or waiting to be retried
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def has_room(self, count: int = 1) -> bool:
+        return self._pending + count <= INGEST_QUEUE_MAX
+
+    def enqueue(self, documents: List[PendingDocument]) -> bool:
+        """Accepts all documents or none of them (when they would not fit)."""
+        if not self.has_room(len(documents)):
+            self.stats.rejected_requests += 1
+            return False
+        self._pending += len(documents)
+        self.stats.accepted += len(documents)
+        self._push(documents)
+        return True
+
+    def _push(self, documents: List[PendingDocument], front: bool = False):
+        if front:
+            self._buffer.extendleft(reversed(documents))
+        else:
+            self._buffer.extend(documents)
+        self._buffered_bytes += sum(document.size for document in documents)
+        self._wakeup.set()
+
+    def _batch_ready(self, now: float) -> bool:
+        return (
+            len(self._buffer) >= INGEST_BATCH_MAX_DOCS
+            or self._buffered_bytes >= INGEST_BATCH_MAX_BYTES
+            or now - self._buffer[0].queued_at >= INGEST_FLUSH_SECONDS
+        )
+
+    def _take(self) -> List[PendingDocument]:
+        batch, size = [], 0
+        while self._buffer and len(batch) < INGEST_BATCH_MAX_DOCS:
+            document = self._buffer[0]
+            if batch and size + document.size > INGEST_BATCH_MAX_BYTES:
+                break
+            self._buffer.popleft()
+            batch.append(document)
+            size += document.size
+        self._buffered_bytes -= size
+        return batch
+
+    async def _next_batch(self) -> List[PendingDocument]:
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._buffer and self._batch_ready(loop.time()):
+                return self._take()
+            timeout = self._buffer[0].queued_at + INGEST_FLUSH_SECONDS - loop.time() if self._buffer else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retry(self, documents: List[PendingDocument]):
+        """Puts rejected documents back at the front of the buffer after a backoff, or gives up on them."""
+        retry = []
+        for document in documents:
+            document.attempts += 1
+            if document.attempts > INGEST_MAX_RETRIES:
+                self._done(1, failed=True)
+            else:
+                retry.append(document)
+        if not retry:
+            return
+        self.stats.retried += len(retry)
+        loop = asyncio.get_running_loop()
+        delay = INGEST_RETRY_BACKOFF_SECONDS * 2 ** (min(document.attempts for document in retry) - 1)
+
+        def requeue():
+            now = loop.time()
+            for document in retry:
+                document.queued_at = now - INGEST_FLUSH_SECONDS  # Due immediately
+            self._push(retry, front=True)
+
+        loop.call_later(delay, requeue)
+
+    def _done(self, count: int, failed: bool = False):
+        self._pending -= count
+        if failed:
+            self.stats.failed += count
+        else:
+            self.stats.indexed += count
+
+    async def send(self, os_client: AsyncOpenSearch, batch: List[PendingDocument]):
+        """Writes one batch with a single _bulk request and sorts out per-document results."""
+        body = bytearray()
+        for document in batch:
+            body += orjson.dumps({"create": {"_index": document.index, "_id": document.id}})
+            body += b"\n"
+            body += orjson.dumps(document.source)
+            body += b"\n"
+        try:
+            response = await os_client.bulk(body=bytes(body), request_timeout=INGEST_BULK_TIMEOUT)
+            self.stats.bulk_requests += 1
+        except Exception as e:
+            self.stats.bulk_failures += 1
+            print(f"WARNING: Bulk request of {len(batch)} documents failed: {e}")
+            self._retry(batch)
+            return
+
+        if not response.get("errors"):
+            indexed, retry = batch, []
+        else:
+            indexed, retry, failed = [], [], 0
+            for document, item in zip(batch, response["items"]):
+                result = next(iter(item.values()))
+                item_status = result.get("status", 500)
+                if item_status < 300 or (item_status == CONFLICT_STATUS and document.attempts):
+                    indexed.append(document)
+                elif item_status in RETRYABLE_STATUSES:
+                    retry.append(document)
+                else:
+                    failed += 1
+            if failed:
+                self._done(failed, failed=True)
+        self._done(len(indexed))
+        self._retry(retry)
+        percolator_service.submit([(document.index, document.source) for document in indexed])
+
+    async def _flush_loop(self, client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+        while True:
+            batch = await self._next_batch()
+            os_client = client_provider()
+            if os_client is None:
+                # Not a rejection of the documents: keep them, without using up their retries.
+                self._push(batch, front=True)
+                await asyncio.sleep(INGEST_RETRY_BACKOFF_SECONDS)
+                continue
+            try:
+                await self.send(os_client, batch)
+            except Exception as e:
+                self.stats.bulk_failures += 1
+                print(f"WARNING: Handling a bulk response failed: {e}")
+
+    def start(self, client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._flush_loop(client_provider)) for _ in range(INGEST_FLUSHERS)]
+
+    async def stop(self):
+        """Gives buffered documents one last flush interval, then stops the flushers."""
+        deadline = asyncio.get_running_loop().time() + INGEST_FLUSH_SECONDS
+        while self._buffer and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def stats_dict(self) -> dict:
+        return {
+            "enabled": INGEST_ENABLED,
+            "buffered": len(self._buffer),
+            "pending": self._pending,
+            "capacity": INGEST_QUEUE_MAX,
+            "accepted": self.stats.accepted,
+            "rejected_requests": self.stats.rejected_requests,
+            "invalid_documents": self.stats.invalid_documents,
+            "indexed": self.stats.indexed,
+            "retried": self.stats.retried,
+            "failed": self.stats.failed,
+            "bulk_requests": self.stats.bulk_requests,
+            "bulk_failures": self.stats.bulk_failures,
+        }
+
+
+ingester = BulkIngester()
+
+
+async def ingest_ndjson(source_type: str, client_id: str, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    Accepts an NDJSON request body for indexing: every document is stamped with
+    the client_id and routed to its daily index. The request is accepted as a
+    whole or rejected with 429 when the buffer cannot take it.
+    """
+    if source_type not in INGEST_SOURCE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown source type '{source_type}'. Accepted: {', '.join(INGEST_SOURCE_TYPES)}"
+        )
+    if not ingester.running:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Ingest is not enabled")
+    if not ingester.has_room():
+        # Fail before reading the body when the buffer is already full.
+        ingester.stats.rejected_requests += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Ingest buffer is full, retry later",
+            headers={"Retry-After": str(max(1, int(INGEST_FLUSH_SECONDS)))}
+        )
+
+    now = datetime.now(timezone.utc)
+    queued_at = asyncio.get_running_loop().time()
+    documents: List[PendingDocument] = []
+    invalid_lines: List[int] = []
+    async for line_number, document, size in parse_ndjson(chunks):
+        if document is None:
+            invalid_lines.append(line_number)
+            continue
+        if len(documents) >= INGEST_MAX_REQUEST_DOCS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {INGEST_MAX_REQUEST_DOCS} documents can be sent per request."
+            )
+        document["client_id"] = client_id
+        try:
+            index = daily_index(source_type, document, now)
+        except ValueError:
+            invalid_lines.append(line_number)
+            continue
+        documents.append(PendingDocument(index, document, size, queued_at))
+
+    ingester.stats.invalid_documents += len(invalid_lines)
+    if documents and not ingester.enqueue(documents):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Ingest buffer is full, retry later",
+            headers={"Retry-After": str(max(1, int(INGEST_FLUSH_SECONDS)))}
+        )
+    return {"accepted": len(documents), "invalid": len(invalid_lines), "invalid_lines": invalid_lines[:100]}
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts the bulk flushers in the background."""
+    if INGEST_ENABLED:
+        ingester.start(client_provider)
+
+
+async def stop():
+    await ingester.stop()
+
+
+def stats() -> dict:
+    return ingester.stats_dict()
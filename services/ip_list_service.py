@@ -0,0 +1,339 @@
+# sc-siem-corvette/services/ip_list_service.py
+import os
+import time
+import asyncio
+import ipaddress
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal
+from models.ip_list import IPListEntry, IPListChange
+
+# How often each worker applies list changes made by other workers.
+IP_LIST_SYNC_SECONDS = float(os.getenv("IP_LIST_SYNC_SECONDS", 5))
+# Change log rows older than this are pruned; a worker that falls further behind reloads everything.
+IP_LIST_CHANGE_RETENTION_SECONDS = int(os.getenv("IP_LIST_CHANGE_RETENTION_SECONDS", 86400))
+# Periodic full reload, catching changes whose log ids were committed out of order.
+IP_LIST_FULL_RELOAD_SECONDS = float(os.getenv("IP_LIST_FULL_RELOAD_SECONDS", 600))
+# Most addresses accepted by one batched check.
+IP_CHECK_MAX_ADDRESSES = int(os.getenv("IP_CHECK_MAX_ADDRESSES", 10000))
+
+# 'source' entries are not checked by check(): they map syslog sources to the client they send for.
+LIST_TYPES = ("allow", "deny", "source")
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def normalize_cidr(value: str) -> Network:
+    """Parses an address or CIDR ('10.1.2.3', '10.0.0.0/8', '2001:db8::/32'), ignoring host bits."""
+    return ipaddress.ip_network(value.strip(), strict=False)
+
+
+def parse_cidrs(values: Iterable[str]) -> List[Network]:
+    """Parses a batch of CIDRs, rejecting the whole batch if any entry is invalid."""
+    networks, invalid = [], []
+    for value in values:
+        try:
+            networks.append(normalize_cidr(value))
+        except ValueError:
+            invalid.append(value)
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid CIDR entries ({len(invalid)}): {', '.join(invalid[:10])}"
+        )
+    return networks
+
+
+class PrefixTable:
+    """
+    Longest-prefix-match table for one address family: a hash set of network
+    keys per prefix length, probed from the longest length present. A lookup
+    costs at most one set probe per distinct prefix length (33 for IPv4, 129
+    for IPv6), and adding or removing a prefix is a single set update.
+    """
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self._tables: Dict[int, set] = {}
+        self._lengths: List[int] = []  # Prefix lengths in use, longest first
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self._tables.values())
+
+    def add(self, network: Network):
+        length = network.prefixlen
+        table = self._tables.get(length)
+        if table is None:
+            table = self._tables[length] = set()
+            self._lengths = sorted(self._tables, reverse=True)
+        table.add(int(network.network_address) >> (self.bits - length))
+
+    def remove(self, network: Network):
+        length = network.prefixlen
+        table = self._tables.get(length)
+        if table is None:
+            return
+        table.discard(int(network.network_address) >> (self.bits - length))
+        if not table:
+            del self._tables[length]
+            self._lengths = sorted(self._tables, reverse=True)
+
+    def longest_match(self, address: int) -> int:
+        """Returns the length of the longest matching prefix, or -1 when nothing matches."""
+        for length in self._lengths:
+            if address >> (self.bits - length) in self._tables[length]:
+                return length
+        return -1
+
+
+class IPList:
+    """The allow and deny prefixes of one tenant (or of the global list)."""
+
+    def __init__(self):
+        self.tables = {
+            list_type: {4: PrefixTable(32), 6: PrefixTable(128)}
+            for list_type in LIST_TYPES
+        }
+
+    def apply(self, op: str, list_type: str, network: Network):
+        table = self.tables[list_type][network.version]
+        if op == "add":
+            table.add(network)
+        else:
+            table.remove(network)
+
+    def has_allow_entries(self) -> bool:
+        return any(len(table) for table in self.tables["allow"].values())
+
+    def match(self, version: int, address: int) -> Tuple[int, Optional[str]]:
+        """Returns (prefix length, list type) of the longest match; deny wins ties."""
+        deny = self.tables["deny"][version].longest_match(address)
+        allow = self.tables["allow"][version].longest_match(address)
+        if deny < 0 and allow < 0:
+            return -1, None
+        return (deny, "deny") if deny >= allow else (allow, "allow")
+
+
+class IPListIndex:
+    """
+    In-memory lookup index over every tenant's lists. Loaded once from the
+    database, then kept current by replaying the change log.
+    """
+
+    def __init__(self):
+        self.lists: Dict[Optional[str], IPList] = {}
+        self.last_change_id = 0
+        self.loaded = False
+        self.full_loads = 0
+        self.changes_applied = 0
+        self.lookups = 0
+        self.loaded_at = 0.0  # time.monotonic() of the last full load
+
+    def _list(self, client_id: Optional[str]) -> IPList:
+        ip_list = self.lists.get(client_id)
+        if ip_list is None:
+            ip_list = self.lists[client_id] = IPList()
+        return ip_list
+
+    async def load(self, db: AsyncSession):
+        last_change_id = (await db.execute(select(func.max(IPListChange.id)))).scalar() or 0
+        lists: Dict[Optional[str], IPList] = {}
+        result = await db.stream(select(IPListEntry.client_id, IPListEntry.list_type, IPListEntry.cidr))
+        async for client_id, list_type, cidr in result:
+            lists.setdefault(client_id, IPList()).apply("add", list_type, normalize_cidr(cidr))
+        self.lists, self.last_change_id, self.loaded = lists, last_change_id, True
+        self.loaded_at = time.monotonic()
+        self.full_loads += 1
+
+    async def sync(self, db: AsyncSession):
+        """Applies changes logged since the last sync, reloading fully if some were already pruned."""
+        if not self.loaded or time.monotonic() - self.loaded_at > IP_LIST_FULL_RELOAD_SECONDS:
+            await self.load(db)
+            return
+        oldest = (await db.execute(select(func.min(IPListChange.id)))).scalar()
+        if oldest is not None and oldest > self.last_change_id + 1:
+            await self.load(db)
+            return
+        changes = (await db.execute(
+            select(IPListChange).filter(IPListChange.id > self.last_change_id).order_by(IPListChange.id)
+        )).scalars().all()
+        for change in changes:
+            self._list(change.client_id).apply(change.op, change.list_type, normalize_cidr(change.cidr))
+            self.last_change_id = change.id
+        self.changes_applied += len(changes)
+
+    def check(self, client_id: Optional[str], addresses: List[str]) -> Tuple[List[Optional[bool]], List[Optional[str]]]:
+        """
+        Decides for each address whether it may send logs for the tenant.
+        The longest matching prefix across the tenant's and the global lists
+        wins (deny on ties). Unmatched addresses are allowed unless an allow
+        list is in use, in which case only listed addresses are.
+        Returns parallel lists of verdicts (None for unparseable input) and
+        matched CIDRs.
+        """
+        candidates = [self.lists.get(client_id)]
+        if client_id is not None:
+            candidates.append(self.lists.get(None))  # Global entries apply to every tenant.
+        lists = [ip_list for ip_list in candidates if ip_list is not None]
+        allow_list_in_use = any(ip_list.has_allow_entries() for ip_list in lists)
+        verdicts: List[Optional[bool]] = []
+        matches: List[Optional[str]] = []
+
+        for value in addresses:
+            try:
+                address = ipaddress.ip_address(value.strip())
+            except ValueError:
+                verdicts.append(None)
+                matches.append(None)
+                continue
+            if address.version == 6 and address.ipv4_mapped:
+                address = address.ipv4_mapped
+            bits = 32 if address.version == 4 else 128
+            number = int(address)
+
+            best_length, best_type = -1, None
+            for ip_list in lists:
+                length, list_type = ip_list.match(address.version, number)
+                if length > best_length or (length == best_length and list_type == "deny"):
+                    best_length, best_type = length, list_type
+
+            if best_type is None:
+                verdicts.append(not allow_list_in_use)
+                matches.append(None)
+            else:
+                verdicts.append(best_type == "allow")
+                network = ipaddress.ip_network((number >> (bits - best_length) << (bits - best_length), best_length))
+                matches.append(str(network))
+
+        self.lookups += len(addresses)
+        return verdicts, matches
+
+    def is_allowed(self, client_id: Optional[str], address: str) -> bool:
+        verdicts, _ = self.check(client_id, [address])
+        return bool(verdicts[0])
+
+    def source_clients(self, address: str) -> List[str]:
+        """
+        Returns the clients whose source lists hold the longest prefix matching
+        the address: one client normally, none when no source list holds it,
+        several when clients map it with the same prefix length.
+        """
+        try:
+            parsed = ipaddress.ip_address(address)
+        except ValueError:
+            return []
+        if parsed.version == 6 and parsed.ipv4_mapped:
+            parsed = parsed.ipv4_mapped
+        number = int(parsed)
+        best_length, best_clients = -1, []
+        for client_id, ip_list in self.lists.items():
+            if client_id is None:
+                continue
+            length = ip_list.tables["source"][parsed.version].longest_match(number)
+            if length < 0 or length < best_length:
+                continue
+            if length > best_length:
+                best_length, best_clients = length, []
+            best_clients.append(client_id)
+        return best_clients
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever the lists do; lets callers cache lookups."""
+        return self.full_loads, self.last_change_id
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "lists": len(self.lists),
+            "prefixes": sum(len(t) for ip_list in self.lists.values() for by_type in ip_list.tables.values() for t in by_type.values()),
+            "last_change_id": self.last_change_id,
+            "full_loads": self.full_loads,
+            "changes_applied": self.changes_applied,
+            "lookups": self.lookups,
+        }
+
+
+ip_index = IPListIndex()
+
+
+# --- Changes (entries and change log are written in the caller's transaction) ---
+
+def client_filter(client_id: Optional[str]):
+    return IPListEntry.client_id.is_(None) if client_id is None else IPListEntry.client_id == client_id
+
+
+async def add_entries(db: AsyncSession, client_id: Optional[str], list_type: str, networks: List[Network], description: Optional[str] = None) -> int:
+    """Adds networks that are not on the list yet. Returns how many were added."""
+    existing = set((await db.execute(
+        select(IPListEntry.cidr).filter(client_filter(client_id), IPListEntry.list_type == list_type)
+    )).scalars().all())
+    new = sorted({str(network) for network in networks} - existing)
+    if new:
+        await db.execute(IPListEntry.__table__.insert(), [
+            {"client_id": client_id, "list_type": list_type, "cidr": cidr, "description": description} for cidr in new
+        ])
+        await db.execute(IPListChange.__table__.insert(), [
+            {"client_id": client_id, "list_type": list_type, "cidr": cidr, "op": "add"} for cidr in new
+        ])
+    return len(new)
+
+
+async def remove_entries(db: AsyncSession, entries: List[IPListEntry]):
+    if not entries:
+        return
+    await db.execute(delete(IPListEntry).where(IPListEntry.id.in_([entry.id for entry in entries])))
+    await db.execute(IPListChange.__table__.insert(), [
+        {"client_id": entry.client_id, "list_type": entry.list_type, "cidr": entry.cidr, "op": "remove"} for entry in entries
+    ])
+
+
+async def sync_now():
+    """Applies pending changes to this worker's index (e.g. right after it made them)."""
+    async with AsyncSessionLocal() as db:
+        await ip_index.sync(db)
+
+
+async def _prune_changes(db: AsyncSession):
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=IP_LIST_CHANGE_RETENTION_SECONDS)
+    await db.execute(delete(IPListChange).where(IPListChange.created_at < cutoff))
+    await db.commit()
+
+
+_sync_task: Optional[asyncio.Task] = None
+
+
+async def _sync_loop():
+    last_prune = time.monotonic()
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await ip_index.sync(db)
+                if time.monotonic() - last_prune > 3600:
+                    await _prune_changes(db)
+                    last_prune = time.monotonic()
+        except Exception as e:
+            print(f"WARNING: IP list sync failed: {e}")
+        await asyncio.sleep(IP_LIST_SYNC_SECONDS)
+
+
+def start():
+    """Loads the lists and keeps them in sync in the background."""
+    global _sync_task
+    if _sync_task is None:
+        _sync_task = asyncio.create_task(_sync_loop())
+
+
+async def stop():
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
@@ -0,0 +1,347 @@
+# sc-siem-corvette/services/lifecycle_service.py
+import os
+import re
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from opensearchpy import AsyncOpenSearch
+from sqlalchemy import select, update, or_
+
+from database.database import AsyncSessionLocal
+from models.lifecycle import LifecyclePolicy
+
+LIFECYCLE_ENABLED = os.getenv("LIFECYCLE_ENABLED", "true").lower() == "true"
+# How often each policy is applied, and how often workers look for policies that are due.
+LIFECYCLE_INTERVAL_SECONDS = int(os.getenv("LIFECYCLE_INTERVAL_SECONDS", 3600))
+LIFECYCLE_TICK_SECONDS = float(os.getenv("LIFECYCLE_TICK_SECONDS", 300))
+# Actions per run, and the pause between two of them, so lifecycle work trickles instead of bursting.
+LIFECYCLE_MAX_ACTIONS_PER_RUN = int(os.getenv("LIFECYCLE_MAX_ACTIONS_PER_RUN", 20))
+LIFECYCLE_ACTION_SPACING_SECONDS = float(os.getenv("LIFECYCLE_ACTION_SPACING_SECONDS", 5))
+# Force merges only run in these UTC hours ('1-5'; empty: any hour)...
+LIFECYCLE_MERGE_HOURS = os.getenv("LIFECYCLE_MERGE_HOURS", "")
+# ...and only while fewer searches than this are queued across the cluster's search thread pools.
+LIFECYCLE_MAX_SEARCH_QUEUE = int(os.getenv("LIFECYCLE_MAX_SEARCH_QUEUE", 10))
+LIFECYCLE_FORCE_MERGE_TIMEOUT = float(os.getenv("LIFECYCLE_FORCE_MERGE_TIMEOUT", 3600))
+
+# Cheap actions first; force merges last since they may be deferred.
+ACTION_ORDER = {"delete": 0, "create": 1, "read_only": 2, "force_merge": 3}
+HEAVY_ACTIONS = {"force_merge"}
+
+
+@dataclass
+class IndexState:
+    name: str
+    day: date
+    docs: int = 0
+    size_bytes: int = 0
+    segments: int = 0
+    shards: int = 1
+    replicas: int = 0
+    read_only: bool = False
+
+
+@dataclass
+class Action:
+    policy_id: int
+    index: str
+    action: str
+    reason: str
+    status: str = "planned"
+    error: Optional[str] = None
+    replicas: int = field(default=0, repr=False)
+
+
+class LifecycleStats:
+    def __init__(self):
+        self.runs = 0
+        self.actions_done = 0
+        self.actions_deferred = 0
+        self.actions_failed = 0
+
+
+lifecycle_stats = LifecycleStats()
+
+
+def validate_policy(force_merge_after_days: Optional[int], read_only_after_days: Optional[int], delete_after_days: Optional[int]):
+    """Deletion must come after the other steps, or they would never apply."""
+    if delete_after_days is None:
+        return
+    for name, value in (("force_merge_after_days", force_merge_after_days), ("read_only_after_days", read_only_after_days)):
+        if value is not None and value >= delete_after_days:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{name} must be less than delete_after_days"
+            )
+
+
+def _parse_hours(spec: str) -> Optional[Tuple[int, int]]:
+    if not spec:
+        return None
+    start, _, end = spec.partition("-")
+    return int(start), int(end or start)
+
+
+def in_merge_hours(now: datetime) -> bool:
+    hours = _parse_hours(LIFECYCLE_MERGE_HOURS)
+    if hours is None:
+        return True
+    start, end = hours
+    # Windows may wrap around midnight ('22-4').
+    return start <= now.hour <= end if start <= end else (now.hour >= start or now.hour <= end)
+
+
+async def search_load(os_client: AsyncOpenSearch) -> dict:
+    """Active and queued searches summed over all nodes."""
+    response = await os_client.nodes.stats(metric="thread_pool")
+    active = queued = 0
+    for node in response.get("nodes", {}).values():
+        pool = node.get("thread_pool", {}).get("search", {})
+        active += pool.get("active", 0)
+        queued += pool.get("queue", 0)
+    return {"active": active, "queued": queued}
+
+
+# --- Planning ---
+
+def _index_day(name: str, prefix: str) -> Optional[date]:
+    match = re.match(rf"^{re.escape(prefix)}-(\d{{4}}-\d{{2}}-\d{{2}})$", name)
+    if not match:
+        return None
+    try:
+        return date.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+
+
+async def inspect_indices(os_client: AsyncOpenSearch, prefix: str) -> Dict[str, IndexState]:
+    """Reads the settings and primary-shard stats of a policy's daily indices with two requests."""
+    pattern = f"{prefix}-*"
+    settings = await os_client.indices.get_settings(
+        index=pattern, flat_settings=True, allow_no_indices=True, ignore_unavailable=True, expand_wildcards="open",
+    )
+    states: Dict[str, IndexState] = {}
+    for name, entry in settings.items():
+        day = _index_day(name, prefix)
+        if day is None:
+            continue
+        values = entry.get("settings", {})
+        states[name] = IndexState(
+            name=name,
+            day=day,
+            shards=int(values.get("index.number_of_shards", 1)),
+            replicas=int(values.get("index.number_of_replicas", 0)),
+            read_only=str(values.get("index.blocks.write", "false")).lower() == "true",
+        )
+    if not states:
+        return states
+
+    stats = await os_client.indices.stats(
+        index=pattern, metric="docs,store,segments", allow_no_indices=True, ignore_unavailable=True, expand_wildcards="open",
+    )
+    for name, entry in stats.get("indices", {}).items():
+        state = states.get(name)
+        if state is None:
+            continue
+        primaries = entry.get("primaries", {})
+        state.docs = primaries.get("docs", {}).get("count", 0)
+        state.size_bytes = primaries.get("store", {}).get("size_in_bytes", 0)
+        state.segments = primaries.get("segments", {}).get("count", 0)
+    return states
+
+
+def index_actions(policy: LifecyclePolicy, state: IndexState, today: date) -> List[Tuple[str, str]]:
+    """Returns the (action, reason) steps an existing index is due for."""
+    age = (today - state.day).days
+    if policy.delete_after_days is not None and age >= policy.delete_after_days:
+        return [("delete", f"{age} days old, retention is {policy.delete_after_days} days")]
+    actions = []
+    if policy.read_only_after_days is not None and age >= policy.read_only_after_days:
+        if not state.read_only or state.replicas != policy.read_only_replicas:
+            actions.append(("read_only", f"{age} days old; block writes and set replicas to {policy.read_only_replicas}"))
+    if policy.force_merge_after_days is not None and age >= policy.force_merge_after_days:
+        if state.segments > state.shards:
+            actions.append(("force_merge", f"{state.segments} segments on {state.shards} primary shards"))
+    return actions
+
+
+def plan_policy(policy: LifecyclePolicy, states: Dict[str, IndexState], today: date) -> List[Action]:
+    actions = []
+    if policy.create_ahead:
+        tomorrow = f"{policy.index_prefix}-{(today + timedelta(days=1)).isoformat()}"
+        if tomorrow not in states:
+            actions.append(Action(policy.id, tomorrow, "create", "created ahead of its day"))
+    for state in sorted(states.values(), key=lambda s: s.day):
+        for action, reason in index_actions(policy, state, today):
+            actions.append(Action(policy.id, state.name, action, reason, replicas=policy.read_only_replicas))
+    return actions
+
+
+# --- Execution ---
+
+async def _execute(os_client: AsyncOpenSearch, action: Action):
+    if action.action == "create":
+        # The body is left empty so the policy's index template applies.
+        await os_client.indices.create(index=action.index, body={}, ignore=400)
+    elif action.action == "delete":
+        await os_client.indices.delete(index=action.index)
+    elif action.action == "read_only":
+        await os_client.indices.put_settings(index=action.index, body={
+            "index.blocks.write": True,
+            "index.number_of_replicas": action.replicas,
+        })
+    elif action.action == "force_merge":
+        await os_client.indices.forcemerge(
+            index=action.index, max_num_segments=1, request_timeout=LIFECYCLE_FORCE_MERGE_TIMEOUT,
+        )
+
+
+async def apply_actions(os_client: AsyncOpenSearch, actions: List[Action], now: Optional[datetime] = None) -> List[Action]:
+    """
+    Executes actions one at a time, spaced out and capped per run. Force
+    merges are deferred outside LIFECYCLE_MERGE_HOURS or while searches are
+    queuing; deferred and capped actions are picked up by a later run.
+    """
+    now = now or datetime.now(timezone.utc)
+    actions = sorted(actions, key=lambda a: ACTION_ORDER[a.action])
+    executed = 0
+    for action in actions:
+        if executed >= LIFECYCLE_MAX_ACTIONS_PER_RUN:
+            action.status, action.error = "deferred", "action limit of this run reached"
+            lifecycle_stats.actions_deferred += 1
+            continue
+        if action.action in HEAVY_ACTIONS:
+            reason = None
+            if not in_merge_hours(now):
+                reason = f"outside merge hours ({LIFECYCLE_MERGE_HOURS} UTC)"
+            else:
+                load = await search_load(os_client)
+                if load["queued"] >= LIFECYCLE_MAX_SEARCH_QUEUE:
+                    reason = f"{load['queued']} searches queued"
+            if reason:
+                action.status, action.error = "deferred", reason
+                lifecycle_stats.actions_deferred += 1
+                continue
+
+        if executed:
+            await asyncio.sleep(LIFECYCLE_ACTION_SPACING_SECONDS)
+        executed += 1
+        try:
+            await _execute(os_client, action)
+            action.status = "done"
+            lifecycle_stats.actions_done += 1
+        except Exception as e:
+            action.status, action.error = "failed", str(e)
+            lifecycle_stats.actions_failed += 1
+    return actions
+
+
+async def plan(os_client: AsyncOpenSearch, policies: List[LifecyclePolicy], today: Optional[date] = None) -> List[Action]:
+    today = today or datetime.now(timezone.utc).date()
+    actions = []
+    for policy in policies:
+        states = await inspect_indices(os_client, policy.index_prefix)
+        actions.extend(plan_policy(policy, states, today))
+    return sorted(actions, key=lambda a: ACTION_ORDER[a.action])
+
+
+async def run_policies(os_client: AsyncOpenSearch, policies: List[LifecyclePolicy]) -> List[Action]:
+    """Plans and applies the given policies now, recording the outcome on each policy."""
+    actions = await apply_actions(os_client, await plan(os_client, policies))
+    errors: Dict[int, List[str]] = {}
+    for action in actions:
+        if action.status == "failed":
+            errors.setdefault(action.policy_id, []).append(f"{action.action} {action.index}: {action.error}")
+    async with AsyncSessionLocal() as db:
+        for policy in policies:
+            await db.execute(
+                update(LifecyclePolicy)
+                .where(LifecyclePolicy.id == policy.id)
+                .values(last_run_at=datetime.now(timezone.utc), last_error="; ".join(errors.get(policy.id, [])) or None)
+            )
+        await db.commit()
+    lifecycle_stats.runs += 1
+    return actions
+
+
+_manual_runs = set()
+
+
+def run_in_background(os_client: AsyncOpenSearch, policies: List[LifecyclePolicy]):
+    """Starts a run without waiting for it; force merges can take long."""
+    task = asyncio.create_task(run_policies(os_client, policies))
+    _manual_runs.add(task)
+    task.add_done_callback(_manual_runs.discard)
+
+
+async def _claim_due_policies() -> List[LifecyclePolicy]:
+    """
+    Claims the enabled policies whose interval has passed by moving their
+    last_run_at forward with a conditional UPDATE, so only one worker applies
+    each policy even though runs can take long (no lock is held meanwhile).
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=LIFECYCLE_INTERVAL_SECONDS)
+    claimed = []
+    async with AsyncSessionLocal() as db:
+        policies = (await db.execute(select(LifecyclePolicy).filter(LifecyclePolicy.enabled.is_(True)))).scalars().all()
+        for policy in policies:
+            result = await db.execute(
+                update(LifecyclePolicy)
+                .where(
+                    LifecyclePolicy.id == policy.id,
+                    or_(LifecyclePolicy.last_run_at.is_(None), LifecyclePolicy.last_run_at < cutoff),
+                )
+                .values(last_run_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(policy)
+        await db.commit()
+    return claimed
+
+
+_lifecycle_task: Optional[asyncio.Task] = None
+
+
+async def _lifecycle_loop(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    while True:
+        os_client = client_provider()
+        if os_client is not None:
+            try:
+                policies = await _claim_due_policies()
+                if policies:
+                    await run_policies(os_client, policies)
+            except Exception as e:
+                print(f"WARNING: Index lifecycle run failed: {e}")
+        await asyncio.sleep(LIFECYCLE_TICK_SECONDS)
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts applying lifecycle policies in the background."""
+    global _lifecycle_task
+    if LIFECYCLE_ENABLED and _lifecycle_task is None:
+        _lifecycle_task = asyncio.create_task(_lifecycle_loop(client_provider))
+
+
+async def stop():
+    global _lifecycle_task
+    if _lifecycle_task is not None:
+        _lifecycle_task.cancel()
+        try:
+            await _lifecycle_task
+        except asyncio.CancelledError:
+            pass
+        _lifecycle_task = None
+
+
+def stats() -> dict:
+    return {
+        "enabled": LIFECYCLE_ENABLED,
+        "runs": lifecycle_stats.runs,
+        "actions_done": lifecycle_stats.actions_done,
+        "actions_deferred": lifecycle_stats.actions_deferred,
+        "actions_failed": lifecycle_stats.actions_failed,
+    }
@@ -1,32 +1,146 @@
 # sc-siem-corvette/services/opensearch_service.py
 import os
-from opensearchpy import OpenSearch, NotFoundError
+import hmac
+import json
+import base64
+import hashlib
+from datetime import datetime
+from typing import Optional, List, Any, Union, Tuple
+import orjson
+from opensearchpy import AsyncOpenSearch, NotFoundError, ConnectionTimeout, JSONSerializer, SerializationError
 from fastapi import HTTPException, status
-from schemas.discover import DiscoverRequest, DiscoverResponse, Hit
+from schemas.discover import DiscoverRequest, DiscoverResponse, DiscoverHistogramRequest, FieldValuesRequest, Hit
+from services.index_catalog import catalog as index_catalog
+from services.field_catalog import catalog as field_catalog
+from services.filter_compiler import compile_filters, aggregatable_field
+from services.result_cache import result_cache, normalize_time_range, RESULT_CACHE_ENABLED
+from services.single_flight import search_flights
+from services import query_guard, search_scheduler
+from utils.helpers import parse_time_expression, auto_interval, interval_seconds
+from utils.security import SECRET_KEY
 
 # --- OpenSearch Connection ---
 OPENSEARCH_HOST = os.getenv("OPENSEARCH_HOST", "localhost")
 OPENSEARCH_PORT = int(os.getenv("OPENSEARCH_PORT", 9200))
 OPENSEARCH_USER = os.getenv("OPENSEARCH_USER", "admin")
 OPENSEARCH_PASSWORD = os.getenv("OPENSEARCH_PASSWORD", "T-3:^otm!")
+# Maximum number of pooled HTTP connections kept open to the cluster.
+OPENSEARCH_POOL_MAXSIZE = int(os.getenv("OPENSEARCH_POOL_MAXSIZE", 25))
+# Default per-call timeout (seconds) for management calls, and a separate one for searches.
+OPENSEARCH_TIMEOUT = float(os.getenv("OPENSEARCH_TIMEOUT", 10))
+OPENSEARCH_SEARCH_TIMEOUT = float(os.getenv("OPENSEARCH_SEARCH_TIMEOUT", 30))
 
-try:
-    client = OpenSearch(
+# Sort key appended to every cursor query so that search_after is unambiguous
+# when several documents share the same sort values.
+CURSOR_TIEBREAKER = os.getenv("DISCOVER_CURSOR_TIEBREAKER", "_id")
+# Longest keep_alive a client may ask for; every open point-in-time holds segments on the cluster.
+DISCOVER_CURSOR_MAX_KEEP_ALIVE = os.getenv("DISCOVER_CURSOR_MAX_KEEP_ALIVE", "10m")
+
+# Upper bound on the number of searches in one batch request, and how many of
+# them OpenSearch may run concurrently for a single _msearch.
+DISCOVER_BATCH_MAX_ITEMS = int(os.getenv("DISCOVER_BATCH_MAX_ITEMS", 20))
+DISCOVER_BATCH_MAX_CONCURRENT = int(os.getenv("DISCOVER_BATCH_MAX_CONCURRENT", 4))
+
+# When enabled, Discover hits are returned as plain dicts and rendered with
+# orjson instead of being validated into Hit models one by one.
+DISCOVER_FAST_RESPONSE = os.getenv("DISCOVER_FAST_RESPONSE", "true").lower() == "true"
+
+# Hard cap on histogram buckets, whatever interval or target a client asks for.
+DISCOVER_HISTOGRAM_MAX_BUCKETS = int(os.getenv("DISCOVER_HISTOGRAM_MAX_BUCKETS", 500))
+
+# Caps for the field sidebar's top values: values returned, documents sampled per
+# shard, and documents a shard looks at before it stops collecting, which keeps
+# the cost flat however many documents the time range holds.
+DISCOVER_FIELD_VALUES_MAX_SIZE = int(os.getenv("DISCOVER_FIELD_VALUES_MAX_SIZE", 100))
+DISCOVER_FIELD_VALUES_MAX_SAMPLE = int(os.getenv("DISCOVER_FIELD_VALUES_MAX_SAMPLE", 20000))
+DISCOVER_FIELD_VALUES_SCAN_LIMIT = int(os.getenv("DISCOVER_FIELD_VALUES_SCAN_LIMIT", 200000))
+
+
+class OrjsonSerializer(JSONSerializer):
+    """JSONSerializer that parses OpenSearch responses with orjson."""
+
+    def loads(self, s):
+        try:
+            return orjson.loads(s)
+        except (orjson.JSONDecodeError, TypeError) as e:
+            raise SerializationError(s, e)
+
+# The client is created in the application lifespan (see main.py) so that the
+# aiohttp session is bound to the running event loop and closed on shutdown.
+client: Optional[AsyncOpenSearch] = None
+
+
+async def connect():
+    """Creates the shared AsyncOpenSearch client and verifies the cluster is reachable."""
+    global client
+    new_client = AsyncOpenSearch(
         hosts=[{'host': OPENSEARCH_HOST, 'port': OPENSEARCH_PORT}],
         http_auth=(OPENSEARCH_USER, OPENSEARCH_PASSWORD),
         use_ssl=False,
         verify_certs=False,
         ssl_assert_hostname=False,
         ssl_show_warn=False,
+        maxsize=OPENSEARCH_POOL_MAXSIZE,
+        timeout=OPENSEARCH_TIMEOUT,
+        serializer=OrjsonSerializer(),
     )
-    if not client.ping():
-        raise ConnectionError("Could not connect to OpenSearch")
-except Exception as e:
-    print(f"ERROR: Could not initialize OpenSearch client: {e}")
-    client = None
+    try:
+        if not await new_client.ping():
+            raise ConnectionError("Could not connect to OpenSearch")
+        client = new_client
+    except Exception as e:
+        print(f"ERROR: Could not initialize OpenSearch client: {e}")
+        await new_client.close()
+        client = None
+
+
+async def disconnect():
+    """Closes the shared client and releases its pooled connections."""
+    global client
+    if client is not None:
+        await client.close()
+        client = None
+
+
+def get_client() -> AsyncOpenSearch:
+    """Returns the shared client, or raises 503 if OpenSearch is not available."""
+    if not client:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OpenSearch service is not available"
+        )
+    return client
+
+def _needs_score(request: DiscoverRequest) -> bool:
+    """Whether anything in the request reads the relevance score of its hits."""
+    if request.highlight or request.aggregations:
+        return True  # Highlighters and aggregations such as top_hits may depend on scoring.
+    return any(opt.field == "_score" for opt in request.sort or [])
+
+
+async def load_field_types(os_client: AsyncOpenSearch, request: Union[DiscoverRequest, DiscoverHistogramRequest]):
+    """Makes sure the field types the filter compiler needs for the request are cached."""
+    if request.filters:
+        await field_catalog.ensure(os_client, request.index_pattern)
+
+
+def admit_search(body: dict, index_target: str, request: DiscoverRequest, truncate: bool = True) -> List[str]:
+    """
+    Runs a compiled search through the query cost guard: adds the timeout,
+    downgrades or rejects (400) expensive searches. Returns the downgrades.
+    """
+    return query_guard.admit(
+        body, index_target, request.client_id, request.time_range,
+        truncate=truncate, timeout_ceiling=OPENSEARCH_SEARCH_TIMEOUT - 1,
+    )
+
 
 def build_opensearch_query(request: DiscoverRequest) -> dict:
-    """Builds a flexible OpenSearch query DSL from the discover request."""
+    """
+    Builds a flexible OpenSearch query DSL from the discover request. Filters
+    are compiled for the field types cached for the index pattern (see
+    load_field_types) and raise 400 when malformed.
+    """
     query_filters = []
 
     if request.time_range:
@@ -44,21 +158,17 @@ def build_opensearch_query(request: DiscoverRequest) -> dict:
         query_filters.append({"term": {"client_id.keyword": request.client_id}})
 
     if request.filters:
-        for f in request.filters:
-            if f.type == "term":
-                query_filters.append({"term": {f"{f.field}.keyword": f.value}})
-            elif f.type == "match":
-                query_filters.append({"match": {f.field: f.value}})
-            elif f.type == "range" and f.operator:
-                query_filters.append({"range": {f.field: {f.operator: f.value}}})
+        query_filters.extend(compile_filters(request.filters, field_catalog.get(request.index_pattern)))
+
+    bool_query = {"filter": query_filters}
+    if _needs_score(request):
+        bool_query["must"] = request.query
+    elif request.query and "match_all" not in request.query:
+        # Nothing reads the relevance score, so match the query without computing it (and let its clauses be cached).
+        query_filters.append(request.query)
 
     query_body = {
-        "query": {
-            "bool": {
-                "must": request.query,
-                "filter": query_filters
-            }
-        },
+        "query": {"bool": bool_query},
         "size": request.size,
         "from": request.from_
     }
@@ -79,57 +189,656 @@ def build_opensearch_query(request: DiscoverRequest) -> dict:
 
     return query_body
 
-async def fetch_logs(request: DiscoverRequest) -> DiscoverResponse:
-    """Executes the search query against OpenSearch and returns the results."""
+async def cached_search(
+    os_client: AsyncOpenSearch,
+    index: str,
+    body: dict,
+    client_id: Optional[str],
+    live: bool = True,
+    lane: str = search_scheduler.INTERACTIVE,
+) -> dict:
+    """
+    Runs a search through the result cache. The key covers the compiled body,
+    the resolved indices and the tenant. On a miss, concurrent identical
+    searches share a single upstream call, which waits for a slot of the
+    tenant in the search scheduler. Partial or timed-out responses are never
+    cached. The returned dict may be shared and must not be mutated.
+    """
+    key = result_cache.make_key(index, body, client_id)
+    if RESULT_CACHE_ENABLED:
+        cached = await result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async def search_upstream() -> dict:
+        async with search_scheduler.scheduler.slot(client_id, lane):
+            response = await os_client.search(
+                index=index,
+                body=body,
+                ignore_unavailable=True,
+                request_timeout=OPENSEARCH_SEARCH_TIMEOUT
+            )
+        if RESULT_CACHE_ENABLED and not response.get("timed_out") and not response.get("_shards", {}).get("failed"):
+            await result_cache.put(key, response, live)
+        return response
+
+    return await search_flights.do(key, search_upstream)
+
+
+def resolve_index_target(request: DiscoverRequest) -> Optional[str]:
+    """
+    Narrows the request's index pattern to the daily indices that can hold
+    documents in its time range. Falls back to the raw pattern when the index
+    catalog can't decide, and returns None when no index can match.
+    """
+    indices = index_catalog.resolve(request.index_pattern, request.time_range)
+    if indices is None:
+        return request.index_pattern
+    return ",".join(indices) if indices else None
+
+
+def prepare_search(request: DiscoverRequest) -> Optional[Tuple[str, dict, bool]]:
+    """
+    Resolves the index target and compiles the query for a (non-cursor) search.
+    Returns (index_target, query, live), or None when no index can match.
+    """
+    index_target = resolve_index_target(request)
+    if index_target is None:
+        return None
+
+    live = True
+    if RESULT_CACHE_ENABLED and request.time_range:
+        # Snap relative ranges to the cache grid so repeated dashboard refreshes share entries.
+        time_range, live = normalize_time_range(request.time_range)
+        request = request.model_copy(update={"time_range": time_range})
+    return index_target, build_opensearch_query(request), live
+
+
+async def fetch_logs(request: DiscoverRequest, raw: bool = False) -> Union[DiscoverResponse, dict]:
+    """
+    Executes the search query against OpenSearch and returns the results.
+    With raw=True the result is a plain dict in the DiscoverResponse shape,
+    skipping per-hit model validation.
+    """
+    os_client = get_client()
+    await load_field_types(os_client, request)
+
+    if request.use_cursor or request.cursor:
+        query = build_opensearch_query(request)
+        return await _fetch_logs_with_cursor(os_client, request, query, raw)
+
+    prepared = prepare_search(request)
+    if prepared is None:
+        return _empty_response(raw)
+    index_target, query, live = prepared
+    downgrades = admit_search(query, index_target, request)
+
+    try:
+        response = await cached_search(os_client, index_target, query, request.client_id, live)
+        return _to_discover_response(response, raw=raw, downgrades=downgrades)
+
+    except HTTPException as e:
+        raise e
+    except NotFoundError:
+        return _empty_response(raw)
+    except ConnectionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="OpenSearch did not respond in time"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An error occurred while querying OpenSearch: {e}"
+        )
+
+
+async def fetch_logs_batch(requests: List[Optional[DiscoverRequest]], raw: bool = False) -> List[dict]:
+    """
+    Executes several Discover requests with a single _msearch round trip.
+    Requests answered by the result cache are not sent. Returns one item per
+    request with a status and either a response or an error; a None entry
+    (already rejected by the caller) is skipped and left for the caller to fill.
+    """
+    os_client = get_client()
+    results: List[Optional[dict]] = [None] * len(requests)
+    pending = []  # (position, index_target, query, live, cache key, downgrades)
+
+    for position, request in enumerate(requests):
+        if request is None:
+            continue
+        if request.use_cursor or request.cursor:
+            results[position] = _batch_error(status.HTTP_400_BAD_REQUEST, "Cursor pagination is not supported in batch requests.")
+            continue
+        await load_field_types(os_client, request)
+        try:
+            prepared = prepare_search(request)
+        except HTTPException as e:
+            results[position] = _batch_error(e.status_code, e.detail)
+            continue
+        if prepared is None:
+            results[position] = _batch_item(_empty_response(raw))
+            continue
+        index_target, query, live = prepared
+        try:
+            downgrades = admit_search(query, index_target, request)
+        except HTTPException as e:
+            results[position] = _batch_error(e.status_code, e.detail)
+            continue
+        key = result_cache.make_key(index_target, query, request.client_id)
+        cached = await result_cache.get(key) if RESULT_CACHE_ENABLED else None
+        if cached is not None:
+            results[position] = _batch_item(_to_discover_response(cached, raw=raw, downgrades=downgrades))
+        else:
+            pending.append((position, index_target, query, live, key, downgrades))
+
+    if pending:
+        body = []
+        for _, index_target, query, _, _, _ in pending:
+            body.append({"index": index_target, "ignore_unavailable": True})
+            body.append(query)
+        # One round trip takes one slot; a batch mixing tenants is scheduled as an all-clients call.
+        client_ids = {requests[position].client_id for position, *_ in pending}
+        client_id = client_ids.pop() if len(client_ids) == 1 else None
+        try:
+            async with search_scheduler.scheduler.slot(client_id):
+                response = await os_client.msearch(
+                    body=body,
+                    max_concurrent_searches=DISCOVER_BATCH_MAX_CONCURRENT,
+                    request_timeout=OPENSEARCH_SEARCH_TIMEOUT
+                )
+        except HTTPException as e:
+            raise e
+        except ConnectionTimeout:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="OpenSearch did not respond in time"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"An error occurred while querying OpenSearch: {e}"
+            )
+
+        for (position, _, _, live, key, downgrades), item in zip(pending, response["responses"]):
+            if "error" in item:
+                error = item["error"]
+                reason = error.get("reason", error) if isinstance(error, dict) else error
+                if item.get("status") == status.HTTP_404_NOT_FOUND:
+                    results[position] = _batch_item(_empty_response(raw))
+                else:
+                    results[position] = _batch_error(item.get("status", status.HTTP_400_BAD_REQUEST), f"An error occurred while querying OpenSearch: {reason}")
+                continue
+            if RESULT_CACHE_ENABLED and not item.get("timed_out") and not item.get("_shards", {}).get("failed"):
+                await result_cache.put(key, item, live)
+            results[position] = _batch_item(_to_discover_response(item, raw=raw, downgrades=downgrades))
+
+    return results
+
+
+def _batch_item(response: Union[DiscoverResponse, dict]) -> dict:
+    return {"status": status.HTTP_200_OK, "response": response, "error": None}
+
+
+def _batch_error(status_code: int, detail: str) -> dict:
+    return {"status": status_code, "response": None, "error": detail}
+
+
+def _to_discover_payload(response: dict, cursor: Optional[str] = None, downgrades: Optional[List[str]] = None) -> dict:
+    """
+    Reshapes a raw OpenSearch search response into the DiscoverResponse layout,
+    flagging results that are partial because of a timeout, an early stop or
+    failed shards.
+    """
+    # Rename the OpenSearch response keys (_index, _source) to the
+    # field names used by the Hit model (index, source).
+    hits = [{"index": hit['_index'], "source": hit['_source'], "highlight": hit.get('highlight', {})}
+            for hit in response['hits']['hits']]
+    return {
+        "hits": hits,
+        "total": response['hits']['total']['value'],
+        "aggregations": response.get('aggregations', {}),
+        "cursor": cursor,
+        **_partial_flags(response),
+        "downgrades": downgrades or [],
+    }
+
+
+def _partial_flags(response: dict) -> dict:
+    timed_out = bool(response.get("timed_out", False))
+    terminated_early = bool(response.get("terminated_early", False))
+    failed_shards = response.get("_shards", {}).get("failed", 0)
+    return {
+        "partial": timed_out or terminated_early or failed_shards > 0,
+        "timed_out": timed_out,
+        "terminated_early": terminated_early,
+        "failed_shards": failed_shards,
+    }
+
+
+def _to_discover_response(
+    response: dict,
+    cursor: Optional[str] = None,
+    raw: bool = False,
+    downgrades: Optional[List[str]] = None,
+) -> Union[DiscoverResponse, dict]:
+    """Converts a raw OpenSearch search response into a DiscoverResponse (or its dict form)."""
+    payload = _to_discover_payload(response, cursor, downgrades)
+    if raw:
+        return payload
+    payload["hits"] = [Hit(**hit) for hit in payload["hits"]]
+    return DiscoverResponse(**payload)
+
+
+def _empty_response(raw: bool = False) -> Union[DiscoverResponse, dict]:
+    if raw:
+        return {"hits": [], "total": 0, "aggregations": {}, "cursor": None, **_partial_flags({}), "downgrades": []}
+    return DiscoverResponse(hits=[], total=0, aggregations={})
+
+# --- Cursor Pagination (point-in-time + search_after) ---
+
+def validate_keep_alive(keep_alive: str):
+    """Rejects (400) keep-alives that are not a positive duration up to DISCOVER_CURSOR_MAX_KEEP_ALIVE."""
+    seconds = interval_seconds(keep_alive)
+    if seconds is None or seconds > interval_seconds(DISCOVER_CURSOR_MAX_KEEP_ALIVE):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"keep_alive must be a duration such as '1m', at most {DISCOVER_CURSOR_MAX_KEEP_ALIVE}."
+        )
+
+
+def _cursor_signature(payload: bytes) -> str:
+    digest = hmac.new(SECRET_KEY.encode("utf-8"), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii")
+
+
+def encode_cursor(pit_id: str, search_after: List[Any], keep_alive: str, client_id: Optional[str]) -> str:
+    """
+    Packs the point-in-time id, the last sort values and the client the cursor
+    belongs to into an opaque token, signed so that none of them can be altered.
+    """
+    payload = base64.urlsafe_b64encode(json.dumps({
+        "pit": pit_id, "after": search_after, "keep_alive": keep_alive, "client_id": client_id,
+    }).encode("utf-8"))
+    return f"{payload.decode('ascii')}.{_cursor_signature(payload)}"
+
+
+def decode_cursor(cursor: str, client_id: Optional[str], any_client: bool = False) -> dict:
+    """
+    Unpacks a cursor produced by encode_cursor, rejecting anything malformed or
+    tampered with (400) and, unless any_client is set, cursors opened for
+    another client than client_id (403).
+    """
+    try:
+        payload, signature = cursor.encode("ascii").split(b".")
+        if not hmac.compare_digest(signature.decode("ascii"), _cursor_signature(payload)):
+            raise ValueError("bad signature")
+        state = json.loads(base64.urlsafe_b64decode(payload))
+        if not isinstance(state.get("pit"), str) or not isinstance(state.get("after"), list):
+            raise ValueError("missing keys")
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not any_client and state.get("client_id") != client_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="The cursor belongs to another client.")
+    return state
+
+
+def apply_cursor(query: dict, pit_id: str, keep_alive: str, search_after: Optional[List[Any]] = None) -> dict:
+    """Rewrites a compiled query to page through a point-in-time with search_after."""
+    query.pop("from", None)
+    query["sort"] = query["sort"] + [{CURSOR_TIEBREAKER: {"order": "asc"}}]
+    query["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+    if search_after:
+        query["search_after"] = search_after
+    return query
+
+
+async def open_point_in_time(
+    os_client: AsyncOpenSearch,
+    index_pattern: str,
+    keep_alive: str,
+    client_id: Optional[str] = None,
+    lane: str = search_scheduler.INTERACTIVE,
+) -> str:
+    """Opens a point-in-time over the index pattern and returns its id."""
+    async with search_scheduler.scheduler.slot(client_id, lane):
+        response = await os_client.create_pit(index=index_pattern, keep_alive=keep_alive)
+    return response["pit_id"]
+
+
+async def close_point_in_time(pit_id: str):
+    """Releases a point-in-time. Errors are ignored as the PIT expires on its own."""
     if not client:
+        return
+    try:
+        await client.delete_pit(body={"pit_id": [pit_id]})
+    except Exception as e:
+        print(f"WARNING: Could not delete point-in-time: {e}")
+
+
+async def _fetch_logs_with_cursor(
+    os_client: AsyncOpenSearch,
+    request: DiscoverRequest,
+    query: dict,
+    raw: bool = False,
+) -> Union[DiscoverResponse, dict]:
+    """Fetches one page through a point-in-time, returning a cursor while more pages remain."""
+    # Checked before a point-in-time is opened. An early stop would end the
+    # cursor on a short page, so pages are never truncated.
+    query.pop("from", None)
+    downgrades = admit_search(query, request.index_pattern, request, truncate=False)
+    if request.cursor:
+        state = decode_cursor(request.cursor, request.client_id)
+        pit_id, search_after, keep_alive = state["pit"], state["after"], state["keep_alive"]
+    else:
+        validate_keep_alive(request.keep_alive)
+        index_target = resolve_index_target(request)
+        if index_target is None:
+            return _empty_response(raw)
+        try:
+            pit_id = await open_point_in_time(os_client, index_target, request.keep_alive, request.client_id)
+        except HTTPException as e:
+            raise e
+        except NotFoundError:
+            return _empty_response(raw)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"An error occurred while opening a point-in-time: {e}"
+            )
+        search_after, keep_alive = None, request.keep_alive
+
+    query = apply_cursor(query, pit_id, keep_alive, search_after)
+
+    try:
+        # Searches against a point-in-time must not name an index.
+        async with search_scheduler.scheduler.slot(request.client_id):
+            response = await os_client.search(body=query, request_timeout=OPENSEARCH_SEARCH_TIMEOUT)
+    except HTTPException as e:
+        raise e
+    except NotFoundError:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="OpenSearch service is not available"
+            status_code=status.HTTP_410_GONE,
+            detail="The cursor has expired. Start a new search."
+        )
+    except ConnectionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="OpenSearch did not respond in time"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An error occurred while querying OpenSearch: {e}"
         )
 
-    query = build_opensearch_query(request)
+    # OpenSearch may hand back a new PIT id; always continue with the latest one.
+    pit_id = response.get("pit_id", pit_id)
+    page = response['hits']['hits']
+    if page and len(page) >= query["size"]:
+        next_cursor = encode_cursor(pit_id, page[-1]["sort"], keep_alive, request.client_id)
+    else:
+        next_cursor = None
+        await close_point_in_time(pit_id)
+
+    return _to_discover_response(response, cursor=next_cursor, raw=raw, downgrades=downgrades)
+
+
+# --- Histogram ---
+
+# Calendar intervals (aligned to the requested time zone) and their nominal length.
+CALENDAR_INTERVALS = {"1d": 86400, "1w": 7 * 86400, "1M": 30 * 86400, "1q": 91 * 86400, "1y": 365 * 86400}
+
+
+def choose_histogram_interval(start: datetime, end: datetime, target_buckets: int, requested: Optional[str] = None) -> Tuple[str, dict]:
+    """
+    Returns (interval, date_histogram parameters) for a time span.
+    A requested interval is honoured unless it would exceed the bucket budget,
+    in which case the finest interval within the budget is used instead.
+    Intervals of a day or more are calendar-aligned.
+    """
+    span = max((end - start).total_seconds(), 1)
+    if requested:
+        if requested in CALENDAR_INTERVALS:
+            seconds, params = CALENDAR_INTERVALS[requested], {"calendar_interval": requested}
+        else:
+            seconds, params = interval_seconds(requested), {"fixed_interval": requested}
+            if seconds is None or seconds <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid histogram interval '{requested}'."
+                )
+        if span / seconds <= DISCOVER_HISTOGRAM_MAX_BUCKETS:
+            return requested, params
+        target_buckets = DISCOVER_HISTOGRAM_MAX_BUCKETS
+
+    interval = auto_interval(span, target_buckets)
+    if interval in ("1d", "7d"):
+        interval = "1d" if interval == "1d" else "1w"
+    if span / (CALENDAR_INTERVALS.get(interval) or interval_seconds(interval)) > target_buckets:
+        # Wider than the coarsest fixed interval allows: fall back to months, then years.
+        interval = "1M" if span / CALENDAR_INTERVALS["1M"] <= target_buckets else "1y"
+    if interval in CALENDAR_INTERVALS:
+        return interval, {"calendar_interval": interval}
+    return interval, {"fixed_interval": interval}
+
+
+async def fetch_histogram(request: DiscoverHistogramRequest) -> dict:
+    """
+    Counts matching logs over time with a server-chosen interval and returns
+    the buckets as parallel timestamps/counts arrays. Uses the same query,
+    tenant filter, index pruning and result cache as a Discover search.
+    """
+    os_client = get_client()
+    await load_field_types(os_client, request)
+    target_buckets = min(request.target_buckets, DISCOVER_HISTOGRAM_MAX_BUCKETS)
+
+    time_range, live = request.time_range, True
+    if RESULT_CACHE_ENABLED:
+        # Snapped here (rather than in prepare_search) so the bucket bounds match the cache grid.
+        time_range, live = normalize_time_range(time_range)
+    start = parse_time_expression(time_range.from_)
+    end = parse_time_expression(time_range.to, round_up=True)
+
+    if start is not None and end is not None and end > start:
+        interval, params = choose_histogram_interval(start, end, target_buckets, request.interval)
+        histogram = {
+            "date_histogram": {
+                "field": "@timestamp",
+                **params,
+                "time_zone": request.time_zone,
+                "min_doc_count": 0,
+                "extended_bounds": {"min": int(start.timestamp() * 1000), "max": int(end.timestamp() * 1000)},
+            }
+        }
+    else:
+        # Bounds OpenSearch understands but we don't: let it pick the interval.
+        interval = None
+        histogram = {"auto_date_histogram": {"field": "@timestamp", "buckets": target_buckets, "time_zone": request.time_zone}}
+
+    discover_request = DiscoverRequest(
+        index_pattern=request.index_pattern,
+        client_id=request.client_id,
+        time_range=time_range,
+        query=request.query,
+        filters=request.filters,
+        size=0,
+    )
+    prepared = prepare_search(discover_request)
+    if prepared is None:
+        return {"interval": interval, "timestamps": [], "counts": [], "total": 0}
+    index_target, query, _ = prepared
+    query.pop("sort", None)
+    query.pop("from", None)
+    query["track_total_hits"] = True
+    query["aggs"] = {"histogram": histogram}
+    # Counts must cover the whole range, so the histogram is never cut short per shard.
+    admit_search(query, index_target, discover_request, truncate=False)
 
     try:
-        response = client.search(
-            index=request.index_pattern,
-            body=query
+        response = await cached_search(os_client, index_target, query, request.client_id, live)
+    except HTTPException as e:
+        raise e
+    except NotFoundError:
+        return {"interval": interval, "timestamps": [], "counts": [], "total": 0}
+    except ConnectionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="OpenSearch did not respond in time"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An error occurred while querying OpenSearch: {e}"
+        )
+
+    aggregation = response.get("aggregations", {}).get("histogram", {})
+    buckets = aggregation.get("buckets", [])
+    return {
+        "interval": interval or aggregation.get("interval"),
+        "timestamps": [bucket["key"] for bucket in buckets],
+        "counts": [bucket["doc_count"] for bucket in buckets],
+        "total": response["hits"]["total"]["value"],
+    }
+
+# --- Query Cost ---
+
+async def estimate_search_cost(request: DiscoverRequest) -> dict:
+    """Compiles a Discover request and reports what the query cost guard would do with it, without running it."""
+    os_client = get_client()
+    await load_field_types(os_client, request)
+    index_target = resolve_index_target(request)
+    query = build_opensearch_query(request)
+    if request.use_cursor or request.cursor:
+        query.pop("from", None)
+    return query_guard.plan(
+        query, index_target or request.index_pattern, request.client_id, request.time_range,
+        truncate=not (request.use_cursor or request.cursor),
+        timeout_ceiling=OPENSEARCH_SEARCH_TIMEOUT - 1,
+    )
+
+
+# --- Field Sidebar ---
+
+async def list_fields(index_pattern: str) -> dict:
+    """
+    Lists the fields of an index pattern from the field catalog, flattened to
+    dotted names. Keyword sub-fields of text fields are folded into their parent
+    as its keyword_variant.
+    Not scoped to a client: tenants share the daily indices and their mappings,
+    so field names are treated as non-sensitive. No values are returned.
+    """
+    os_client = get_client()
+    await field_catalog.ensure(os_client, index_pattern)
+    fields = field_catalog.get(index_pattern)
+    if fields is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"The fields of '{index_pattern}' could not be loaded"
         )
-        
-        # ** THE FIX **
-        # Populate the Hit model using the new field names (index, source)
-        # from the OpenSearch response keys (_index, _source).
-        hits = [Hit(index=hit['_index'], source=hit['_source'], highlight=hit.get('highlight', {}))
-                for hit in response['hits']['hits']]
-        total = response['hits']['total']['value']
-        aggregations = response.get('aggregations', {})
+    variants = {info.keyword_variant for info in fields.values() if info.keyword_variant}
+    return {
+        "index_pattern": index_pattern,
+        "fields": [
+            {
+                "name": info.name,
+                "type": info.type,
+                "searchable": info.searchable,
+                "aggregatable": info.aggregatable or info.keyword_variant is not None,
+                "keyword_variant": info.keyword_variant,
+            }
+            for name, info in sorted(fields.items())
+            if name not in variants
+        ],
+    }
 
-        return DiscoverResponse(hits=hits, total=total, aggregations=aggregations)
 
+async def fetch_field_values(request: FieldValuesRequest) -> dict:
+    """
+    Returns the top values of a field among a sample of the matching logs.
+    Each shard stops after DISCOVER_FIELD_VALUES_SCAN_LIMIT documents and counts
+    values over at most sample_size of them (optionally diversified), so the
+    cost doesn't grow with the time range. Uses the same tenant filter and
+    result cache as a Discover search.
+    """
+    os_client = get_client()
+    await field_catalog.ensure(os_client, request.index_pattern)
+    fields = field_catalog.get(request.index_pattern)
+    field = aggregatable_field(request.field, fields)
+    size = min(request.size, DISCOVER_FIELD_VALUES_MAX_SIZE)
+    sample_size = min(request.sample_size, DISCOVER_FIELD_VALUES_MAX_SAMPLE)
+
+    if request.diversify_by:
+        sampler = {"diversified_sampler": {
+            "shard_size": sample_size,
+            "field": aggregatable_field(request.diversify_by, fields),
+            "max_docs_per_value": request.max_docs_per_value,
+        }}
+    else:
+        sampler = {"sampler": {"shard_size": sample_size}}
+
+    discover_request = DiscoverRequest(
+        index_pattern=request.index_pattern,
+        client_id=request.client_id,
+        time_range=request.time_range,
+        query=request.query,
+        filters=request.filters,
+        size=0,
+    )
+    prepared = prepare_search(discover_request)
+    if prepared is None:
+        return {"field": request.field, "sampled": 0, "values": []}
+    index_target, query, live = prepared
+    query.pop("sort", None)
+    query.pop("from", None)
+    query["track_total_hits"] = False
+    query["terminate_after"] = max(DISCOVER_FIELD_VALUES_SCAN_LIMIT, sample_size)
+    query["aggs"] = {"sample": {**sampler, "aggs": {"values": {"terms": {"field": field, "size": size}}}}}
+    admit_search(query, index_target, discover_request)
+
+    try:
+        response = await cached_search(os_client, index_target, query, request.client_id, live)
+    except HTTPException as e:
+        raise e
     except NotFoundError:
-        return DiscoverResponse(hits=[], total=0, aggregations={})
+        return {"field": request.field, "sampled": 0, "values": []}
+    except ConnectionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="OpenSearch did not respond in time"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"An error occurred while querying OpenSearch: {e}"
         )
 
+    sample = response.get("aggregations", {}).get("sample", {})
+    return {
+        "field": request.field,
+        "sampled": sample.get("doc_count", 0),
+        "values": [
+            {"value": bucket.get("key_as_string", bucket["key"]), "count": bucket["doc_count"]}
+            for bucket in sample.get("values", {}).get("buckets", [])
+        ],
+    }
+
+
 # --- Template Management ---
 
 async def create_index_template(name: str, template: dict):
     """Creates or updates an index template."""
-    if not client:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="OpenSearch not available")
+    os_client = get_client()
     try:
-        return client.indices.put_template(name=name, body=template)
+        return await os_client.indices.put_template(name=name, body=template)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 async def get_index_template(name: str):
     """Gets an index template."""
-    if not client:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="OpenSearch not available")
+    os_client = get_client()
     try:
-        return client.indices.get_template(name=name)
+        return await os_client.indices.get_template(name=name)
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
     except Exception as e:
@@ -137,10 +846,9 @@ async def get_index_template(name: str):
 
 async def delete_index_template(name: str):
     """Deletes an index template."""
-    if not client:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="OpenSearch not available")
+    os_client = get_client()
     try:
-        return client.indices.delete_template(name=name)
+        return await os_client.indices.delete_template(name=name)
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
     except Exception as e:
@@ -148,9 +856,8 @@ async def delete_index_template(name: str):
 
 async def index_template_exists(name: str):
     """Checks if an index template exists."""
-    if not client:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="OpenSearch not available")
+    os_client = get_client()
     try:
-        return client.indices.exists_template(name=name)
+        return await os_client.indices.exists_template(name=name)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -0,0 +1,395 @@
+# sc-siem-corvette/services/percolator_service.py
+import os
+import time
+import asyncio
+import fnmatch
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from opensearchpy import AsyncOpenSearch, NotFoundError
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database.database import AsyncSessionLocal, async_engine
+from models.alert import AlertRule, AlertWindowCount
+from services import opensearch_service
+from services.alert_service import rule_request, record_alert
+from utils.helpers import as_utc, get_path, parse_time_expression
+
+ALERT_PERCOLATOR_ENABLED = os.getenv("ALERT_PERCOLATOR_ENABLED", "true").lower() == "true"
+# Index holding one percolator query per 'percolate' rule.
+ALERT_PERCOLATOR_INDEX = os.getenv("ALERT_PERCOLATOR_INDEX", "corvette-alert-rules")
+# Documents are percolated in batches of up to this many, at least every flush interval.
+ALERT_PERCOLATE_BATCH_SIZE = int(os.getenv("ALERT_PERCOLATE_BATCH_SIZE", 500))
+ALERT_PERCOLATE_FLUSH_SECONDS = float(os.getenv("ALERT_PERCOLATE_FLUSH_SECONDS", 1))
+# Documents waiting to be percolated; beyond this, new documents skip alerting rather than slow ingest.
+ALERT_PERCOLATE_QUEUE_MAX = int(os.getenv("ALERT_PERCOLATE_QUEUE_MAX", 50000))
+# Matching rules fetched per percolate round trip; when more rules match a batch, further pages are fetched.
+ALERT_PERCOLATE_MAX_RULES = int(os.getenv("ALERT_PERCOLATE_MAX_RULES", 1000))
+# How often each worker reloads rule thresholds from the database (and drops finished window counts).
+ALERT_PERCOLATE_RULE_REFRESH_SECONDS = float(os.getenv("ALERT_PERCOLATE_RULE_REFRESH_SECONDS", 30))
+# Matches are counted in the window of the event's @timestamp. Events arriving
+# more than this long after their window ended no longer count towards it.
+ALERT_PERCOLATE_MAX_LATENESS_SECONDS = int(os.getenv("ALERT_PERCOLATE_MAX_LATENESS_SECONDS", 3600))
+
+TIMESTAMP_FIELD = "@timestamp"
+# Window counts are upserted; SQLite (used by the tests) accepts the same statement as PostgreSQL.
+_upsert = sqlite.insert if async_engine.dialect.name == "sqlite" else postgresql.insert
+
+
+@dataclass(frozen=True)
+class RuleSnapshot:
+    """The parts of a percolate rule needed to turn matches into alerts."""
+    id: int
+    index_pattern: str
+    group_by: Optional[str]
+    threshold: int
+    interval_seconds: int
+
+    def covers(self, index: str) -> bool:
+        """Whether a document written to `index` falls under the rule's index pattern."""
+        patterns = [p.strip() for p in self.index_pattern.split(",") if p.strip()]
+        if any(p.startswith("-") and fnmatch.fnmatchcase(index, p[1:]) for p in patterns):
+            return False
+        return any(not p.startswith("-") and fnmatch.fnmatchcase(index, p) for p in patterns)
+
+
+def _snapshot(rule: AlertRule) -> RuleSnapshot:
+    return RuleSnapshot(rule.id, rule.index_pattern, rule.group_by, rule.threshold, rule.interval_seconds)
+
+
+class PercolatorStats:
+    def __init__(self):
+        self.batches = 0
+        self.documents = 0
+        self.dropped_documents = 0
+        self.matches = 0
+        self.late_matches = 0
+        self.result_pages = 0
+        self.alerts = 0
+        self.failures = 0
+
+
+percolator_stats = PercolatorStats()
+_rules: Dict[int, RuleSnapshot] = {}
+_rules_loaded_at = 0.0
+_queue: Optional[asyncio.Queue] = None
+
+
+def _group_value(document: dict, group_by: str) -> str:
+    # Rules group on keyword sub-fields ('host.keyword'); documents hold the parent value.
+    path = group_by[:-len(".keyword")] if group_by.endswith(".keyword") else group_by
+    value = get_path(document, path)
+    return "" if value is None else str(value)
+
+
+def _event_time(document: dict, now: datetime) -> datetime:
+    """The document's @timestamp, or `now` when it has none that can be read."""
+    try:
+        return parse_time_expression(document.get(TIMESTAMP_FIELD), now) or now
+    except (OverflowError, ValueError):
+        return now
+
+
+# --- Rule registration ---
+
+async def ensure_index(os_client: AsyncOpenSearch):
+    if not await os_client.indices.exists(index=ALERT_PERCOLATOR_INDEX):
+        await os_client.indices.create(index=ALERT_PERCOLATOR_INDEX, body={
+            # Fields that no log index has mapped yet are percolated as text instead of failing.
+            "settings": {"index.percolator.map_unmapped_fields_as_text": True},
+            "mappings": {"properties": {
+                "query": {"type": "percolator"},
+                "rule_id": {"type": "integer"},
+            }},
+        })
+
+
+async def _sync_field_mappings(os_client: AsyncOpenSearch, index_pattern: str):
+    """Copies the field mappings of the rule's log indices, which percolator queries are parsed against."""
+    mappings = await os_client.indices.get_mapping(index=index_pattern, ignore_unavailable=True, allow_no_indices=True)
+    properties = {}
+    for entry in mappings.values():
+        for name, spec in entry.get("mappings", {}).get("properties", {}).items():
+            properties.setdefault(name, spec)
+    properties.pop("query", None)
+    properties.pop("rule_id", None)
+    if properties:
+        try:
+            await os_client.indices.put_mapping(index=ALERT_PERCOLATOR_INDEX, body={"properties": properties})
+        except Exception as e:
+            print(f"WARNING: Could not copy field mappings of '{index_pattern}' to the percolator index: {e}")
+
+
+async def register_rule(rule: AlertRule):
+    """Stores (or replaces) the rule's query in the percolator index."""
+    os_client = opensearch_service.get_client()
+    await ensure_index(os_client)
+    await _sync_field_mappings(os_client, rule.index_pattern)
+    await opensearch_service.load_field_types(os_client, rule_request(rule))
+    # The query carries the rule's client_id filter, so documents only match rules of their own tenant.
+    query = opensearch_service.build_opensearch_query(rule_request(rule))["query"]
+    await os_client.index(
+        index=ALERT_PERCOLATOR_INDEX,
+        id=str(rule.id),
+        body={"rule_id": rule.id, "query": query},
+        refresh=True,
+    )
+    _rules[rule.id] = _snapshot(rule)
+
+
+async def unregister_rule(rule_id: int):
+    _rules.pop(rule_id, None)
+    try:
+        await opensearch_service.get_client().delete(index=ALERT_PERCOLATOR_INDEX, id=str(rule_id), refresh=True)
+    except NotFoundError:
+        pass
+
+
+async def _load_rules() -> List[AlertRule]:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(AlertRule).filter(AlertRule.enabled.is_(True), AlertRule.mode == "percolate")
+        )).scalars().all()
+
+
+async def _refresh_rules():
+    global _rules, _rules_loaded_at
+    _rules = {rule.id: _snapshot(rule) for rule in await _load_rules()}
+    _rules_loaded_at = time.monotonic()
+
+
+async def sync_rules(os_client: AsyncOpenSearch):
+    """Re-registers every enabled percolate rule, so the index follows the database after restarts."""
+    await ensure_index(os_client)
+    for rule in await _load_rules():
+        await register_rule(rule)
+    await _refresh_rules()
+
+
+# --- Matching ---
+
+def submit(documents: List[Tuple[str, dict]]):
+    """
+    Queues freshly ingested (index, document) pairs for percolation. Never
+    blocks: when the queue is full the documents skip alerting and are counted
+    as dropped.
+    """
+    if _queue is None:
+        return
+    for document in documents:
+        try:
+            _queue.put_nowait(document)
+        except asyncio.QueueFull:
+            percolator_stats.dropped_documents += 1
+
+
+async def percolate(os_client: AsyncOpenSearch, documents: List[Tuple[str, dict]], now: Optional[datetime] = None):
+    """
+    Matches a batch of (index, document) pairs against every registered rule
+    with a single percolate query, then adds the matches to the shared window
+    counts. A document counts in the rule's interval window of its @timestamp,
+    and only for rules whose index pattern covers the index it was written to.
+    """
+    now = now or datetime.now(timezone.utc)
+    if time.monotonic() - _rules_loaded_at > ALERT_PERCOLATE_RULE_REFRESH_SECONDS:
+        await _refresh_rules()
+        await _prune_window_counts(now)
+    if not _rules:
+        return
+
+    hits = await _matching_rules(os_client, [source for _, source in documents])
+    percolator_stats.batches += 1
+    percolator_stats.documents += len(documents)
+
+    oldest_end = now.timestamp() - ALERT_PERCOLATE_MAX_LATENESS_SECONDS
+    matches: Dict[Tuple[int, str, int], int] = {}  # (rule_id, dedup_key, window start) -> count
+    # The rules as they were matched: _rules may change while the counts are written.
+    rules: Dict[int, RuleSnapshot] = {}
+    for hit in hits:
+        rule = _rules.get(hit["_source"]["rule_id"])
+        if rule is None:
+            continue
+        # With several documents, each hit lists the positions of the documents it matched.
+        slots = hit.get("fields", {}).get("_percolator_document_slot", [0])
+        slots = [slot for slot in slots if rule.covers(documents[slot][0])]
+        if not slots:
+            continue
+        percolator_stats.matches += len(slots)
+
+        for slot in slots:
+            epoch = int(_event_time(documents[slot][1], now).timestamp())
+            window_start = epoch - epoch % rule.interval_seconds
+            if window_start + rule.interval_seconds < oldest_end:
+                percolator_stats.late_matches += 1
+                continue
+            key = _group_value(documents[slot][1], rule.group_by) if rule.group_by else ""
+            matches[(rule.id, key, window_start)] = matches.get((rule.id, key, window_start), 0) + 1
+            rules[rule.id] = rule
+
+    if matches:
+        await _count_matches(matches, rules, now)
+
+
+async def _matching_rules(os_client: AsyncOpenSearch, sources: List[dict]) -> List[dict]:
+    """
+    Percolates the documents and returns every matching rule's hit, fetching
+    ALERT_PERCOLATE_MAX_RULES at a time in rule_id order.
+    """
+    body = {
+        "size": ALERT_PERCOLATE_MAX_RULES,
+        "_source": ["rule_id"],
+        "track_total_hits": False,
+        "sort": [{"rule_id": "asc"}],
+        "query": {"percolate": {"field": "query", "documents": sources}},
+    }
+    hits: List[dict] = []
+    while True:
+        response = await os_client.search(
+            index=ALERT_PERCOLATOR_INDEX,
+            body=body,
+            request_timeout=opensearch_service.OPENSEARCH_SEARCH_TIMEOUT,
+        )
+        percolator_stats.result_pages += 1
+        page = response["hits"]["hits"]
+        hits.extend(page)
+        if len(page) < ALERT_PERCOLATE_MAX_RULES:
+            return hits
+        body["search_after"] = page[-1]["sort"]
+
+
+async def _count_matches(matches: Dict[Tuple[int, str, int], int], rules: Dict[int, RuleSnapshot], now: datetime):
+    """
+    Adds a batch's matches to the window counts shared by all workers with one
+    upsert, then raises an alert for every window that reached its rule's
+    threshold. `rules` holds the rules as they were when the batch matched,
+    so a rule changed or removed meanwhile neither fails the batch nor applies
+    its new interval or threshold to an old window. A window is marked as
+    alerted with a conditional UPDATE, so only one worker raises it.
+    """
+    rows = [
+        {
+            "rule_id": rule_id,
+            "dedup_key": key,
+            "window_start": datetime.fromtimestamp(window_start, tz=timezone.utc),
+            "window_end": datetime.fromtimestamp(window_start + rules[rule_id].interval_seconds, tz=timezone.utc),
+            "count": count,
+            "alerted": False,
+        }
+        # Sorted, so concurrent upserts lock rows in the same order.
+        for (rule_id, key, window_start), count in sorted(matches.items())
+    ]
+    statement = _upsert(AlertWindowCount).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[AlertWindowCount.rule_id, AlertWindowCount.dedup_key, AlertWindowCount.window_start],
+        set_={"count": AlertWindowCount.count + statement.excluded.count},
+    ).returning(
+        AlertWindowCount.rule_id, AlertWindowCount.dedup_key, AlertWindowCount.window_start,
+        AlertWindowCount.window_end, AlertWindowCount.count, AlertWindowCount.alerted,
+    )
+
+    async with AsyncSessionLocal() as db:
+        counted = (await db.execute(statement)).all()
+        for rule_id, key, window_start, window_end, count, alerted in counted:
+            if alerted or count < rules[rule_id].threshold:
+                continue
+            claimed = await db.execute(
+                update(AlertWindowCount)
+                .where(
+                    AlertWindowCount.rule_id == rule_id,
+                    AlertWindowCount.dedup_key == key,
+                    AlertWindowCount.window_start == window_start,
+                    AlertWindowCount.alerted.is_(False),
+                )
+                .values(alerted=True)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount != 1:
+                continue
+            rule = await db.get(AlertRule, rule_id)
+            if rule is None or not rule.enabled:
+                continue
+            await record_alert(db, rule, key, count, as_utc(window_start), as_utc(window_end), now)
+            percolator_stats.alerts += 1
+        await db.commit()
+
+
+async def _prune_window_counts(now: datetime):
+    """Drops the counts of windows that late events can no longer reach."""
+    cutoff = now - timedelta(seconds=ALERT_PERCOLATE_MAX_LATENESS_SECONDS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(AlertWindowCount).where(AlertWindowCount.window_end < cutoff))
+        await db.commit()
+
+
+async def _take_batch() -> List[Tuple[str, dict]]:
+    """Waits for the first document, then collects more until the batch is full or the flush interval ends."""
+    batch = [await _queue.get()]
+    deadline = asyncio.get_running_loop().time() + ALERT_PERCOLATE_FLUSH_SECONDS
+    while len(batch) < ALERT_PERCOLATE_BATCH_SIZE:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+_percolate_task: Optional[asyncio.Task] = None
+
+
+async def _percolate_loop(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    synced = False
+    while True:
+        batch = await _take_batch()
+        os_client = client_provider()
+        if os_client is None:
+            percolator_stats.dropped_documents += len(batch)
+            continue
+        try:
+            if not synced:
+                await sync_rules(os_client)
+                synced = True
+            await percolate(os_client, batch)
+        except Exception as e:
+            percolator_stats.failures += 1
+            print(f"WARNING: Percolating {len(batch)} documents failed: {e}")
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts matching submitted documents in the background."""
+    global _percolate_task, _queue
+    if ALERT_PERCOLATOR_ENABLED and _percolate_task is None:
+        _queue = asyncio.Queue(maxsize=ALERT_PERCOLATE_QUEUE_MAX)
+        _percolate_task = asyncio.create_task(_percolate_loop(client_provider))
+
+
+async def stop():
+    global _percolate_task, _queue
+    if _percolate_task is not None:
+        _percolate_task.cancel()
+        try:
+            await _percolate_task
+        except asyncio.CancelledError:
+            pass
+        _percolate_task = None
+        _queue = None
+
+
+def stats() -> dict:
+    return {
+        "enabled": ALERT_PERCOLATOR_ENABLED,
+        "rules": len(_rules),
+        "queued_documents": _queue.qsize() if _queue is not None else 0,
+        "batches": percolator_stats.batches,
+        "documents": percolator_stats.documents,
+        "dropped_documents": percolator_stats.dropped_documents,
+        "matches": percolator_stats.matches,
+        "late_matches": percolator_stats.late_matches,
+        "result_pages": percolator_stats.result_pages,
+        "alerts": percolator_stats.alerts,
+        "failures": percolator_stats.failures,
+    }
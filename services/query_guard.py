@@ -0,0 +1,425 @@
+# sc-siem-corvette/services/query_guard.py
+import os
+import re
+import copy
+import math
+import asyncio
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+
+from database.database import AsyncSessionLocal
+from models.query_limit import QueryLimit
+from schemas.discover import TimeRange
+from utils.helpers import parse_time_expression, interval_seconds
+
+QUERY_GUARD_ENABLED = os.getenv("QUERY_GUARD_ENABLED", "true").lower() == "true"
+# Default thresholds; tenants can override them (see /api/v1/query-limits).
+QUERY_GUARD_MAX_COST = float(os.getenv("QUERY_GUARD_MAX_COST", 1000))
+QUERY_GUARD_DOWNGRADE_COST = float(os.getenv("QUERY_GUARD_DOWNGRADE_COST", 250))
+QUERY_GUARD_MAX_SIZE = int(os.getenv("QUERY_GUARD_MAX_SIZE", 10000))
+# Server-side search timeout. Keep it below OPENSEARCH_SEARCH_TIMEOUT so the
+# cluster answers with partial results before the client gives up on it.
+QUERY_GUARD_TIMEOUT_SECONDS = float(os.getenv("QUERY_GUARD_TIMEOUT_SECONDS", 25))
+# Documents collected per shard before a search stops early; 0 disables.
+QUERY_GUARD_TERMINATE_AFTER = int(os.getenv("QUERY_GUARD_TERMINATE_AFTER", 0))
+# What a downgrade reduces requests to.
+QUERY_GUARD_DOWNGRADE_SIZE = int(os.getenv("QUERY_GUARD_DOWNGRADE_SIZE", 500))
+QUERY_GUARD_DOWNGRADE_BUCKETS = int(os.getenv("QUERY_GUARD_DOWNGRADE_BUCKETS", 100))
+QUERY_GUARD_DOWNGRADE_TERMINATE_AFTER = int(os.getenv("QUERY_GUARD_DOWNGRADE_TERMINATE_AFTER", 100000))
+# Span assumed for searches without a (parseable) time range.
+QUERY_GUARD_UNBOUNDED_DAYS = float(os.getenv("QUERY_GUARD_UNBOUNDED_DAYS", 90))
+# How often each worker reloads the tenant limits.
+QUERY_GUARD_RELOAD_SECONDS = float(os.getenv("QUERY_GUARD_RELOAD_SECONDS", 30))
+
+# Cost per unit of each factor. A day of data and a hundred hits or buckets
+# cost about the same; expensive clauses are charged per day they scan.
+COST_WEIGHTS = {
+    "span_days": 1.0,
+    "indices": 0.5,
+    "hits": 0.01,
+    "buckets": 0.01,
+    "agg_depth": 10.0,  # Per level of nesting below the first
+    "expensive_clauses": 2.0,  # Per clause and day
+}
+
+SIZED_BUCKET_AGGS = {"terms", "multi_terms", "significant_terms", "significant_text", "rare_terms", "composite"}
+HISTOGRAM_AGGS = {"date_histogram", "histogram", "auto_date_histogram", "variable_width_histogram"}
+HISTOGRAM_DEFAULT_BUCKETS = 100
+EXPENSIVE_QUERIES = {"regexp", "wildcard", "fuzzy", "prefix", "script"}
+_QUERY_STRING_PATTERN = re.compile(r"[*?~/]")
+_LEADING_WILDCARD = re.compile(r"(^|[\s:(])[*?]")
+
+
+@dataclass
+class QueryCost:
+    span_days: float
+    indices: int
+    hits: int
+    buckets: int
+    agg_depth: int
+    expensive_clauses: int
+
+    @property
+    def score(self) -> float:
+        return round(
+            self.span_days * COST_WEIGHTS["span_days"]
+            + self.indices * COST_WEIGHTS["indices"]
+            + self.hits * COST_WEIGHTS["hits"]
+            + self.buckets * COST_WEIGHTS["buckets"]
+            + max(self.agg_depth - 1, 0) * COST_WEIGHTS["agg_depth"]
+            + self.expensive_clauses * max(self.span_days, 1) * COST_WEIGHTS["expensive_clauses"],
+            2,
+        )
+
+
+@dataclass
+class Limits:
+    max_cost: float
+    downgrade_cost: float
+    max_size: int
+    timeout_seconds: float
+    terminate_after: int
+
+
+# --- Estimation ---
+
+def span_days(time_range: Optional[TimeRange]) -> float:
+    if time_range is None:
+        return QUERY_GUARD_UNBOUNDED_DAYS
+    start = parse_time_expression(time_range.from_)
+    end = parse_time_expression(time_range.to, round_up=True)
+    if start is None or end is None:
+        return QUERY_GUARD_UNBOUNDED_DAYS
+    return max((end - start).total_seconds(), 0) / 86400
+
+
+def _has_leading_wildcard(clause: Any) -> bool:
+    """Whether a wildcard or regexp clause ({field: pattern} or {field: {"value": pattern}}) starts with a wildcard."""
+    if not isinstance(clause, dict):
+        return False
+    for value in clause.values():
+        pattern = value.get("value", value.get("wildcard")) if isinstance(value, dict) else value
+        if isinstance(pattern, str) and pattern.startswith(("*", "?", ".*", ".+")):
+            return True
+    return False
+
+
+def expensive_clauses(node: Any) -> int:
+    """
+    Counts clauses that scan the term dictionary instead of looking terms up:
+    regexp, wildcard, fuzzy, prefix and script queries, and query strings
+    using those operators. A leading wildcard scans all of it and counts thrice.
+    """
+    count = 0
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in EXPENSIVE_QUERIES:
+                count += 3 if key in ("wildcard", "regexp") and _has_leading_wildcard(value) else 1
+            elif key in ("query_string", "simple_query_string") and isinstance(value, dict):
+                text = str(value.get("query", ""))
+                if _QUERY_STRING_PATTERN.search(text):
+                    count += 3 if _LEADING_WILDCARD.search(text) else 1
+                continue
+            count += expensive_clauses(value)
+    elif isinstance(node, list):
+        count += sum(expensive_clauses(item) for item in node)
+    return count
+
+
+def _int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _bucket_count(kind: str, params: Any, days: float) -> int:
+    if not isinstance(params, dict):
+        return 1
+    if kind in SIZED_BUCKET_AGGS:
+        return _int(params.get("size"), 10)
+    if kind in HISTOGRAM_AGGS:
+        if "buckets" in params:
+            return _int(params["buckets"], HISTOGRAM_DEFAULT_BUCKETS)
+        interval = params.get("fixed_interval") or params.get("calendar_interval") or params.get("interval")
+        seconds = interval_seconds(str(interval)) if interval else None
+        if kind == "date_histogram" and seconds:
+            return max(math.ceil(days * 86400 / seconds), 1)
+        return HISTOGRAM_DEFAULT_BUCKETS
+    if kind in ("filters", "range", "date_range", "ip_range"):
+        entries = params.get("filters") or params.get("ranges") or []
+        return max(len(entries), 1)
+    return 1  # Metric and single-bucket aggregations
+
+
+def aggregation_cost(aggs: Any, days: float, parent_buckets: int = 1, depth: int = 1) -> Tuple[int, int, int]:
+    """
+    Estimates (buckets, nesting depth, top_hits hits) of an aggregations
+    object. Nested bucket counts multiply: 100 hosts x 100 users is 10000.
+    """
+    buckets, max_depth, hits = 0, 0, 0
+    if not isinstance(aggs, dict):
+        return buckets, max_depth, hits
+    for agg in aggs.values():
+        if not isinstance(agg, dict):
+            continue
+        own = 1
+        for kind, params in agg.items():
+            if kind in ("aggs", "aggregations", "meta"):
+                continue
+            own = _bucket_count(kind, params, days)
+            if kind == "top_hits" and isinstance(params, dict):
+                hits += parent_buckets * _int(params.get("size"), 3)
+        produced = parent_buckets * own
+        buckets += produced
+        max_depth = max(max_depth, depth)
+        sub_buckets, sub_depth, sub_hits = aggregation_cost(agg.get("aggs") or agg.get("aggregations"), days, produced, depth + 1)
+        buckets += sub_buckets
+        max_depth = max(max_depth, sub_depth)
+        hits += sub_hits
+    return buckets, max_depth, hits
+
+
+def estimate(body: dict, index_target: str, time_range: Optional[TimeRange]) -> QueryCost:
+    """Scores a compiled search body by what it asks the cluster to do."""
+    days = span_days(time_range)
+    indices = 0
+    for part in (p.strip() for p in index_target.split(",")):
+        if part:
+            # Daily indices: a wildcard matches about one index per day of the range.
+            indices += max(math.ceil(days), 1) if "*" in part or "?" in part else 1
+    buckets, depth, top_hits = aggregation_cost(body.get("aggs"), days)
+    return QueryCost(
+        span_days=round(days, 2),
+        indices=indices,
+        hits=_int(body.get("from"), 0) + _int(body.get("size"), 10) + top_hits,
+        buckets=buckets,
+        agg_depth=depth,
+        expensive_clauses=expensive_clauses(body.get("query")),
+    )
+
+
+# --- Limits ---
+
+class LimitTable:
+    """Per-tenant query limits, loaded from the database and refreshed in the background."""
+
+    def __init__(self):
+        self.rows: Dict[Optional[str], dict] = {}
+        self.loaded = False
+
+    async def load(self):
+        async with AsyncSessionLocal() as db:
+            limits = (await db.execute(select(QueryLimit))).scalars().all()
+        self.rows = {
+            limit.client_id: {
+                "max_cost": limit.max_cost,
+                "downgrade_cost": limit.downgrade_cost,
+                "max_size": limit.max_size,
+                "timeout_seconds": limit.timeout_seconds,
+                "terminate_after": limit.terminate_after,
+                "max_in_flight": limit.max_in_flight,
+                "weight": limit.weight,
+            }
+            for limit in limits
+        }
+        self.loaded = True
+
+    def value(self, client_id: Optional[str], name: str, fallback: Any) -> Any:
+        """One of the tenant's limits, falling back to the default row and then to the server default."""
+        rows = (self.rows.get(client_id, {}), self.rows.get(None, {})) if client_id is not None else (self.rows.get(None, {}),)
+        for row in rows:
+            if row.get(name) is not None:
+                return row[name]
+        return fallback
+
+    def limits_for(self, client_id: Optional[str]) -> Limits:
+        def pick(name: str, fallback):
+            return self.value(client_id, name, fallback)
+
+        return Limits(
+            max_cost=pick("max_cost", QUERY_GUARD_MAX_COST),
+            downgrade_cost=pick("downgrade_cost", QUERY_GUARD_DOWNGRADE_COST),
+            max_size=pick("max_size", QUERY_GUARD_MAX_SIZE),
+            timeout_seconds=pick("timeout_seconds", QUERY_GUARD_TIMEOUT_SECONDS),
+            terminate_after=pick("terminate_after", QUERY_GUARD_TERMINATE_AFTER),
+        )
+
+
+limit_table = LimitTable()
+
+
+class GuardStats:
+    def __init__(self):
+        self.admitted = 0
+        self.downgraded = 0
+        self.rejected = 0
+
+
+guard_stats = GuardStats()
+
+
+# --- Admission ---
+
+def _cap_buckets(aggs: Any, cap: int) -> bool:
+    """Lowers the size of bucket aggregations above the cap, in place. Returns whether anything changed."""
+    changed = False
+    if not isinstance(aggs, dict):
+        return changed
+    for agg in aggs.values():
+        if not isinstance(agg, dict):
+            continue
+        for kind, params in agg.items():
+            if kind in SIZED_BUCKET_AGGS and isinstance(params, dict) and _int(params.get("size"), 10) > cap:
+                params["size"] = cap
+                if "shard_size" in params:
+                    params["shard_size"] = min(_int(params["shard_size"], cap * 2), cap * 2)
+                changed = True
+        changed = _cap_buckets(agg.get("aggs") or agg.get("aggregations"), cap) or changed
+    return changed
+
+
+def plan(
+    body: dict,
+    index_target: str,
+    client_id: Optional[str],
+    time_range: Optional[TimeRange],
+    truncate: bool = True,
+    timeout_ceiling: Optional[float] = None,
+) -> dict:
+    """
+    Applies the tenant's limits to a compiled search body, in place. Every
+    search gets a timeout (and terminate_after when configured). Bodies over
+    the size limit or the downgrade cost are reduced: fewer hits, no
+    highlighting, smaller bucket aggregations and, when truncate allows it,
+    an early stop per shard. Returns the estimate and the verdict
+    ('accept', 'downgrade' or 'reject' when still over max_cost).
+    """
+    limits = limit_table.limits_for(client_id)
+    downgrades: List[str] = []
+
+    timeout = limits.timeout_seconds
+    if timeout_ceiling is not None:
+        timeout = min(timeout, timeout_ceiling)
+    body["timeout"] = f"{max(int(timeout * 1000), 1)}ms"
+    if truncate and limits.terminate_after and "terminate_after" not in body:
+        body["terminate_after"] = limits.terminate_after
+
+    size, offset = _int(body.get("size"), 10), _int(body.get("from"), 0)
+    if offset + size > limits.max_size:
+        if offset >= limits.max_size:
+            return _verdict("reject", estimate(body, index_target, time_range), limits, downgrades,
+                            f"Pages beyond the first {limits.max_size} hits need cursor pagination.")
+        body["size"] = limits.max_size - offset
+        downgrades.append(f"size capped to {body['size']}")
+
+    cost = estimate(body, index_target, time_range)
+    if cost.score > limits.downgrade_cost:
+        if body.get("size", 10) > QUERY_GUARD_DOWNGRADE_SIZE:
+            body["size"] = QUERY_GUARD_DOWNGRADE_SIZE
+            downgrades.append(f"size capped to {QUERY_GUARD_DOWNGRADE_SIZE}")
+        if body.pop("highlight", None) is not None:
+            downgrades.append("highlighting removed")
+        if body.get("aggs"):
+            # The aggregations may be shared with the caller's request; change a copy.
+            aggs = copy.deepcopy(body["aggs"])
+            if _cap_buckets(aggs, QUERY_GUARD_DOWNGRADE_BUCKETS):
+                body["aggs"] = aggs
+                downgrades.append(f"bucket aggregations capped to {QUERY_GUARD_DOWNGRADE_BUCKETS} buckets")
+        if truncate and QUERY_GUARD_DOWNGRADE_TERMINATE_AFTER and "terminate_after" not in body:
+            body["terminate_after"] = QUERY_GUARD_DOWNGRADE_TERMINATE_AFTER
+            downgrades.append(f"stops after {QUERY_GUARD_DOWNGRADE_TERMINATE_AFTER} documents per shard")
+        cost = estimate(body, index_target, time_range)
+
+    if cost.score > limits.max_cost:
+        return _verdict("reject", cost, limits, downgrades)
+    return _verdict("downgrade" if downgrades else "accept", cost, limits, downgrades)
+
+
+def _verdict(verdict: str, cost: QueryCost, limits: Limits, downgrades: List[str], reason: Optional[str] = None) -> dict:
+    if verdict == "reject" and reason is None:
+        reason = (
+            f"Query is too expensive (cost {cost.score}, limit {limits.max_cost}): "
+            f"{cost.span_days} days over {cost.indices} indices, {cost.hits} hits, {cost.buckets} buckets, "
+            f"{cost.expensive_clauses} wildcard/regex clauses. Narrow the time range or reduce size, aggregations or wildcards."
+        )
+    return {
+        "cost": cost.score,
+        "factors": asdict(cost),
+        "limits": asdict(limits),
+        "verdict": verdict,
+        "downgrades": downgrades,
+        "reason": reason,
+    }
+
+
+def admit(
+    body: dict,
+    index_target: str,
+    client_id: Optional[str],
+    time_range: Optional[TimeRange],
+    truncate: bool = True,
+    timeout_ceiling: Optional[float] = None,
+) -> List[str]:
+    """
+    Applies the query limits to a search body (see plan) and raises 400 when it
+    is too expensive to run. Returns the downgrades that were applied.
+    """
+    if not QUERY_GUARD_ENABLED:
+        return []
+    result = plan(body, index_target, client_id, time_range, truncate, timeout_ceiling)
+    if result["verdict"] == "reject":
+        guard_stats.rejected += 1
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result["reason"])
+    guard_stats.admitted += 1
+    if result["downgrades"]:
+        guard_stats.downgraded += 1
+    return result["downgrades"]
+
+
+def stats() -> dict:
+    return {
+        "enabled": QUERY_GUARD_ENABLED,
+        "tenant_limits": len(limit_table.rows),
+        "admitted": guard_stats.admitted,
+        "downgraded": guard_stats.downgraded,
+        "rejected": guard_stats.rejected,
+    }
+
+
+async def reload_now():
+    """Reloads the limits on this worker (e.g. right after they were changed)."""
+    await limit_table.load()
+
+
+_reload_task: Optional[asyncio.Task] = None
+
+
+async def _reload_loop():
+    while True:
+        try:
+            await limit_table.load()
+        except Exception as e:
+            print(f"WARNING: Query limit reload failed: {e}")
+        await asyncio.sleep(QUERY_GUARD_RELOAD_SECONDS)
+
+
+def start():
+    """Loads the tenant limits and keeps them current in the background."""
+    global _reload_task
+    if _reload_task is None:
+        _reload_task = asyncio.create_task(_reload_loop())
+
+
+async def stop():
+    global _reload_task
+    if _reload_task is not None:
+        _reload_task.cancel()
+        try:
+            await _reload_task
+        except asyncio.CancelledError:
+            pass
+        _reload_task = None
@@ -0,0 +1,232 @@
+# sc-siem-corvette/services/result_cache.py
+import os
+import re
+import time
+import asyncio
+import hashlib
+import struct
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Optional, Tuple
+
+import orjson
+
+from schemas.discover import TimeRange
+from utils.helpers import parse_time_expression
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+# Relative ranges ("now-15m") are snapped to this grid so near-identical requests share entries.
+RESULT_CACHE_BUCKET_SECONDS = int(os.getenv("RESULT_CACHE_BUCKET_SECONDS", 30))
+# Entries whose range reaches the present expire quickly; fully historical ones live longer.
+RESULT_CACHE_LIVE_TTL = float(os.getenv("RESULT_CACHE_LIVE_TTL", 10))
+RESULT_CACHE_HISTORICAL_TTL = float(os.getenv("RESULT_CACHE_HISTORICAL_TTL", 600))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Optional second tier: entries evicted from memory are written here instead of dropped.
+# Files left by an earlier run are adopted at startup, so give each worker process its own directory.
+RESULT_CACHE_SPILL_DIR = os.getenv("RESULT_CACHE_SPILL_DIR")
+RESULT_CACHE_SPILL_MAX_BYTES = int(os.getenv("RESULT_CACHE_SPILL_MAX_BYTES", 512 * 1024 * 1024))
+
+# Spill files are named after their key; anything else in the directory is left alone.
+_SPILL_FILE_RE = re.compile(r"^([0-9a-f]{64})\.bin(\.tmp)?$")
+_SPILL_HEADER = struct.Struct("!d")  # expires_at
+
+
+def normalize_time_range(time_range: TimeRange, now: Optional[datetime] = None) -> Tuple[TimeRange, bool]:
+    """
+    Resolves relative bounds to absolute epoch millis snapped to the cache grid
+    (start rounded down, end rounded up), and reports whether the range reaches
+    the present. Absolute bounds are passed through unchanged.
+    """
+    now = now or datetime.now(timezone.utc)
+    bucket = RESULT_CACHE_BUCKET_SECONDS
+
+    def snap(value: str, round_up: bool) -> str:
+        if "now" not in value:
+            return value
+        parsed = parse_time_expression(value, now=now, round_up=round_up)
+        if parsed is None:
+            return value
+        seconds = parsed.timestamp()
+        snapped = (-(-seconds // bucket) if round_up else seconds // bucket) * bucket
+        return str(int(snapped * 1000))
+
+    end = parse_time_expression(time_range.to, now=now, round_up=True)
+    is_live = end is None or end >= now - timedelta(seconds=bucket)
+    normalized = TimeRange(**{"from": snap(time_range.from_, False), "to": snap(time_range.to, True)})
+    return normalized, is_live
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU of serialized search responses, with an optional on-disk
+    spill tier. Keys always include the tenant, so entries are never shared
+    across client_ids.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None, spill_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._memory: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._spilled_bytes = 0
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._adopt_spill_dir()
+
+    @staticmethod
+    def make_key(index: str, body: dict, client_id: Optional[str]) -> str:
+        canonical = orjson.dumps(
+            {"index": index, "body": body, "client_id": client_id},
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        )
+        return hashlib.sha256(canonical).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return orjson.loads(entry[1])
+            self._drop_memory(key)
+
+        spilled = self._spilled.get(key)
+        if spilled is not None:
+            payload = await asyncio.to_thread(self._read_spill, key)
+            self._drop_spill(key)
+            if payload is not None and spilled[0] > now:
+                try:
+                    value = orjson.loads(payload)
+                except orjson.JSONDecodeError:
+                    value = None  # Damaged on disk; treated as a miss
+                if value is not None:
+                    self.spill_hits += 1
+                    self._store_memory(key, spilled[0], payload)
+                    await self._spill_evicted()
+                    return value
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: Any, live: bool):
+        ttl = RESULT_CACHE_LIVE_TTL if live else RESULT_CACHE_HISTORICAL_TTL
+        payload = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        if len(payload) > self.max_bytes:
+            return
+        self._store_memory(key, time.time() + ttl, payload)
+        await self._spill_evicted()
+
+    def _store_memory(self, key: str, expires_at: float, payload: bytes):
+        self._drop_memory(key)
+        self._memory[key] = (expires_at, payload)
+        self._memory_bytes += len(payload)
+
+    def _drop_memory(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+    async def _spill_evicted(self):
+        """Evicts least recently used entries until memory fits, spilling live ones to disk."""
+        now = time.time()
+        while self._memory_bytes > self.max_bytes and self._memory:
+            key, (expires_at, payload) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(payload)
+            if self.spill_dir and expires_at > now and len(payload) <= self.spill_max_bytes:
+                self._drop_spill(key)
+                if await asyncio.to_thread(self._write_spill, key, expires_at, payload):
+                    self._spilled[key] = (expires_at, len(payload))
+                    self._spilled_bytes += len(payload)
+                    while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+                        self._drop_spill(next(iter(self._spilled)))
+
+    # --- Disk tier (file I/O runs in a thread; bookkeeping stays on the event loop) ---
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.bin")
+
+    def _adopt_spill_dir(self):
+        """
+        Takes over the spill files an earlier process left behind, so they count
+        against the byte budget. Expired, unreadable and half-written files are
+        deleted; when the rest exceed the budget, the soonest to expire go first.
+        The directory must therefore not be shared by concurrently running workers.
+        """
+        now = time.time()
+        adopted = []
+        for name in os.listdir(self.spill_dir):
+            match = _SPILL_FILE_RE.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                size = os.path.getsize(path) - _SPILL_HEADER.size
+                with open(path, "rb") as f:
+                    header = f.read(_SPILL_HEADER.size)
+                expires_at = _SPILL_HEADER.unpack(header)[0] if len(header) == _SPILL_HEADER.size else 0.0
+                if match.group(2) or expires_at <= now or size <= 0:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            adopted.append((expires_at, match.group(1), size))
+        for expires_at, key, size in sorted(adopted):
+            self._spilled[key] = (expires_at, size)
+            self._spilled_bytes += size
+        while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+            self._drop_spill(next(iter(self._spilled)))
+
+    def _write_spill(self, key: str, expires_at: float, payload: bytes) -> bool:
+        # Written under a temporary name and renamed, so a crash never leaves a truncated entry.
+        path = self._spill_path(key)
+        try:
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(_SPILL_HEADER.pack(expires_at))
+                f.write(payload)
+            os.replace(f"{path}.tmp", path)
+            return True
+        except OSError as e:
+            print(f"WARNING: Could not spill cache entry to disk: {e}")
+            return False
+
+    def _read_spill(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._spill_path(key), "rb") as f:
+                f.read(_SPILL_HEADER.size)
+                return f.read()
+        except OSError:
+            return None
+
+    def _drop_spill(self, key: str):
+        entry = self._spilled.pop(key, None)
+        if entry is None:
+            return
+        self._spilled_bytes -= entry[1]
+        try:
+            os.remove(self._spill_path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.spill_hits + self.misses
+        return {
+            "enabled": RESULT_CACHE_ENABLED,
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+            "max_bytes": self.max_bytes,
+            "spilled_entries": len(self._spilled),
+            "spilled_bytes": self._spilled_bytes,
+            "hits": self.hits,
+            "spill_hits": self.spill_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+        }
+
+
+result_cache = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_SPILL_DIR, RESULT_CACHE_SPILL_MAX_BYTES)
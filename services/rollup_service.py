@@ -0,0 +1,369 @@
+# sc-siem-corvette/services/rollup_service.py
+import os
+import json
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from opensearchpy import AsyncOpenSearch
+from sqlalchemy import select, insert, update, delete, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal
+from models.dashboard import DashboardPanel, RollupBucket, RollupWatermark
+from services import search_scheduler
+from utils.helpers import as_utc, auto_interval, interval_seconds
+
+ROLLUP_ENABLED = os.getenv("ROLLUP_ENABLED", "true").lower() == "true"
+ROLLUP_INDEX_PATTERN = os.getenv("ROLLUP_INDEX_PATTERN", "syslog-*")
+# Dimension name -> keyword (or ip) field counted per minute for every tenant.
+ROLLUP_DIMENSIONS: Dict[str, str] = json.loads(os.getenv(
+    "ROLLUP_DIMENSIONS",
+    '{"host": "host.keyword", "severity": "severity.keyword", "source_ip": "source_ip"}'
+))
+ROLLUP_CLIENT_FIELD = os.getenv("ROLLUP_CLIENT_FIELD", "client_id.keyword")
+ROLLUP_TIMESTAMP_FIELD = "@timestamp"
+# Seconds between rollup passes, and how far behind "now" a minute must be
+# before it is rolled up (so late-indexed events are still counted).
+ROLLUP_RUN_INTERVAL = float(os.getenv("ROLLUP_RUN_INTERVAL", 60))
+ROLLUP_SETTLE_SECONDS = int(os.getenv("ROLLUP_SETTLE_SECONDS", 120))
+# History rolled up on first start (and kept: older buckets are pruned), and the
+# largest span handled in one pass.
+ROLLUP_BACKFILL_DAYS = int(os.getenv("ROLLUP_BACKFILL_DAYS", 30))
+ROLLUP_MAX_SPAN_SECONDS = int(os.getenv("ROLLUP_MAX_SPAN_SECONDS", 6 * 3600))
+ROLLUP_PAGE_SIZE = int(os.getenv("ROLLUP_PAGE_SIZE", 1000))
+# How long a worker may hold the watermark while it searches; a crashed worker's claim expires after this.
+ROLLUP_CLAIM_SECONDS = int(os.getenv("ROLLUP_CLAIM_SECONDS", 600))
+# Target number of buckets for histogram panels without a fixed interval.
+DASHBOARD_HISTOGRAM_BUCKETS = int(os.getenv("DASHBOARD_HISTOGRAM_BUCKETS", 100))
+# Histograms are widened so that no range produces more buckets than this.
+DASHBOARD_HISTOGRAM_MAX_BUCKETS = int(os.getenv("DASHBOARD_HISTOGRAM_MAX_BUCKETS", 1000))
+
+TOTAL_DIMENSION = "total"
+ROLLUP_BUCKET_SECONDS = 60
+WATERMARK_NAME = f"minute:{ROLLUP_INDEX_PATTERN}"
+
+
+def floor_to_bucket(value: datetime, seconds: int = ROLLUP_BUCKET_SECONDS) -> datetime:
+    epoch = int(value.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def validate_panel(panel_type: str, dimension: Optional[str], interval: Optional[str]):
+    """Rejects panels that the rollups cannot answer."""
+    if panel_type in ("top_n", "pie") and dimension not in ROLLUP_DIMENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Panel dimension must be one of: {', '.join(ROLLUP_DIMENSIONS)}"
+        )
+    if interval is not None:
+        seconds = interval_seconds(interval)
+        if seconds is None or seconds % ROLLUP_BUCKET_SECONDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Histogram interval must be a whole number of minutes, e.g. '5m' or '1h'."
+            )
+
+
+# --- Incremental rollup job ---
+
+class RollupStats:
+    def __init__(self):
+        self.passes = 0
+        self.buckets_written = 0
+        self.buckets_pruned = 0
+        self.failures = 0
+        self.rolled_up_to: Optional[datetime] = None
+
+
+rollup_stats = RollupStats()
+
+
+async def _collect(os_client: AsyncOpenSearch, start: datetime, end: datetime, field: Optional[str]) -> List[dict]:
+    """Counts documents per tenant, minute and (optionally) field value with a paged composite aggregation."""
+    sources = [
+        {"client_id": {"terms": {"field": ROLLUP_CLIENT_FIELD, "missing_bucket": True}}},
+        {"minute": {"date_histogram": {"field": ROLLUP_TIMESTAMP_FIELD, "fixed_interval": "1m"}}},
+    ]
+    if field is not None:
+        sources.append({"value": {"terms": {"field": field, "missing_bucket": True}}})
+
+    body = {
+        "size": 0,
+        "query": {"range": {ROLLUP_TIMESTAMP_FIELD: {
+            "gte": int(start.timestamp() * 1000),
+            "lt": int(end.timestamp() * 1000),
+            "format": "epoch_millis",
+        }}},
+        "aggs": {"rollup": {"composite": {"size": ROLLUP_PAGE_SIZE, "sources": sources}}},
+    }
+    # Missing values and empty strings both land on the "" row, so counts are merged by key.
+    counts: Dict[tuple, int] = {}
+    while True:
+        async with search_scheduler.scheduler.slot(None, search_scheduler.BACKGROUND):
+            response = await os_client.search(index=ROLLUP_INDEX_PATTERN, body=body, ignore_unavailable=True, allow_no_indices=True)
+        agg = response.get("aggregations", {}).get("rollup", {})
+        for bucket in agg.get("buckets", []):
+            key = bucket["key"]
+            value = key.get("value")
+            row_key = (key.get("client_id"), key["minute"], "" if value is None else str(value))
+            counts[row_key] = counts.get(row_key, 0) + bucket["doc_count"]
+        after_key = agg.get("after_key")
+        if not after_key or len(agg.get("buckets", [])) < ROLLUP_PAGE_SIZE:
+            return [
+                {
+                    "client_id": client_id,
+                    "bucket_start": datetime.fromtimestamp(minute / 1000, tz=timezone.utc),
+                    "value": value,
+                    "count": count,
+                }
+                for (client_id, minute, value), count in counts.items()
+            ]
+        body["aggs"]["rollup"]["composite"]["after"] = after_key
+
+
+async def _claim_span(now: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Claims the next settled span after the watermark by setting claimed_until
+    with a conditional UPDATE, in one short transaction, so only one worker
+    rolls up each span and no lock is held while OpenSearch is searched.
+    Returns (start, end), or None when nothing is due or another worker holds
+    the claim.
+    """
+    claim = now + timedelta(seconds=ROLLUP_CLAIM_SECONDS)
+    async with AsyncSessionLocal() as db:
+        watermark = (await db.execute(
+            select(RollupWatermark).where(RollupWatermark.name == WATERMARK_NAME)
+        )).scalars().first()
+        if watermark is None:
+            start = floor_to_bucket(now - timedelta(days=ROLLUP_BACKFILL_DAYS))
+            db.add(RollupWatermark(name=WATERMARK_NAME, rolled_up_to=start, claimed_until=claim))
+            try:
+                await db.commit()
+            except IntegrityError:
+                return None  # Another worker created (and claimed) it first
+        else:
+            start = as_utc(watermark.rolled_up_to)
+
+        end = min(floor_to_bucket(now - timedelta(seconds=ROLLUP_SETTLE_SECONDS)),
+                  start + timedelta(seconds=ROLLUP_MAX_SPAN_SECONDS))
+        rollup_stats.rolled_up_to = start
+        if end <= start:
+            if watermark is None:
+                await _release_span(start)
+            return None
+        if watermark is not None:
+            claimed = await db.execute(
+                update(RollupWatermark)
+                .where(
+                    RollupWatermark.name == WATERMARK_NAME,
+                    RollupWatermark.rolled_up_to == watermark.rolled_up_to,
+                    or_(RollupWatermark.claimed_until.is_(None), RollupWatermark.claimed_until < now),
+                )
+                .values(claimed_until=claim)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return None
+    return start, end
+
+
+async def _release_span(start: datetime):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == WATERMARK_NAME, RollupWatermark.rolled_up_to == start)
+            .values(claimed_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+async def roll_up_once(os_client: AsyncOpenSearch, now: Optional[datetime] = None) -> bool:
+    """
+    Rolls up the next settled span after the watermark. The span is claimed in
+    one short transaction, searched outside any transaction, and its buckets
+    are written in a second one that also advances the watermark, but only if
+    it still starts where the claim did. Several workers running the job
+    therefore never count the same minute twice, and none of them holds a
+    database connection or row lock while waiting for OpenSearch.
+    Returns True when a span was rolled up.
+    """
+    now = now or datetime.now(timezone.utc)
+    span = await _claim_span(now)
+    if span is None:
+        return False
+    start, end = span
+
+    try:
+        rows = [dict(row, dimension=TOTAL_DIMENSION) for row in await _collect(os_client, start, end, None)]
+        for dimension, field in ROLLUP_DIMENSIONS.items():
+            rows.extend(dict(row, dimension=dimension) for row in await _collect(os_client, start, end, field))
+    except Exception:
+        await _release_span(start)
+        raise
+
+    async with AsyncSessionLocal() as db:
+        advanced = await db.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == WATERMARK_NAME, RollupWatermark.rolled_up_to == start)
+            .values(rolled_up_to=end, claimed_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        if advanced.rowcount != 1:
+            # The claim expired and another worker rolled the span up meanwhile.
+            await db.rollback()
+            return False
+        if rows:
+            await db.execute(insert(RollupBucket), rows)
+        await db.commit()
+
+    rollup_stats.passes += 1
+    rollup_stats.buckets_written += len(rows)
+    rollup_stats.rolled_up_to = end
+    return True
+
+
+async def prune_buckets(now: Optional[datetime] = None) -> int:
+    """Deletes buckets older than the backfill window. Returns the number of rows removed."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = floor_to_bucket(now - timedelta(days=ROLLUP_BACKFILL_DAYS))
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(RollupBucket).where(RollupBucket.bucket_start < cutoff))
+        await db.commit()
+    rollup_stats.buckets_pruned += result.rowcount or 0
+    return result.rowcount or 0
+
+
+_rollup_task: Optional[asyncio.Task] = None
+
+
+async def _rollup_loop(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    while True:
+        os_client = client_provider()
+        if os_client is not None:
+            try:
+                # Catch up in bounded spans (e.g. the initial backfill) before sleeping.
+                while await roll_up_once(os_client):
+                    pass
+                await prune_buckets()
+            except Exception as e:
+                rollup_stats.failures += 1
+                print(f"WARNING: Dashboard rollup pass failed: {e}")
+        await asyncio.sleep(ROLLUP_RUN_INTERVAL)
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Starts maintaining the rollups in the background."""
+    global _rollup_task
+    if ROLLUP_ENABLED and _rollup_task is None:
+        _rollup_task = asyncio.create_task(_rollup_loop(client_provider))
+
+
+async def stop():
+    global _rollup_task
+    if _rollup_task is not None:
+        _rollup_task.cancel()
+        try:
+            await _rollup_task
+        except asyncio.CancelledError:
+            pass
+        _rollup_task = None
+
+
+def stats() -> dict:
+    return {
+        "enabled": ROLLUP_ENABLED,
+        "passes": rollup_stats.passes,
+        "buckets_written": rollup_stats.buckets_written,
+        "buckets_pruned": rollup_stats.buckets_pruned,
+        "failures": rollup_stats.failures,
+        "rolled_up_to": rollup_stats.rolled_up_to.isoformat() if rollup_stats.rolled_up_to else None,
+    }
+
+
+# --- Panel queries (answered by merging per-minute buckets) ---
+
+async def get_rolled_up_to(db: AsyncSession) -> Optional[datetime]:
+    value = (await db.execute(
+        select(RollupWatermark.rolled_up_to).where(RollupWatermark.name == WATERMARK_NAME)
+    )).scalar()
+    return as_utc(value) if value is not None else None
+
+
+def _bucket_filter(dimension: str, client_id: Optional[str], start: datetime, end: datetime) -> list:
+    conditions = [
+        RollupBucket.dimension == dimension,
+        RollupBucket.bucket_start >= start,
+        RollupBucket.bucket_start < end,
+    ]
+    # Dashboards without a client_id (admin only) span every tenant.
+    if client_id is not None:
+        conditions.append(RollupBucket.client_id == client_id)
+    return conditions
+
+
+def _histogram_interval(requested: Optional[str], span_seconds: float) -> Tuple[str, int]:
+    """Returns (interval, seconds), widened in whole minutes when the range would exceed the bucket budget."""
+    interval = requested or auto_interval(span_seconds, DASHBOARD_HISTOGRAM_BUCKETS, minimum_seconds=ROLLUP_BUCKET_SECONDS)
+    step = interval_seconds(interval)
+    if span_seconds / step > DASHBOARD_HISTOGRAM_MAX_BUCKETS:
+        minutes = int(-(-span_seconds // (DASHBOARD_HISTOGRAM_MAX_BUCKETS * ROLLUP_BUCKET_SECONDS)))
+        interval, step = f"{minutes}m", minutes * ROLLUP_BUCKET_SECONDS
+    return interval, step
+
+
+async def _histogram(db: AsyncSession, panel: DashboardPanel, client_id: Optional[str], start: datetime, end: datetime) -> dict:
+    interval, step = _histogram_interval(panel.interval, (end - start).total_seconds())
+    first = floor_to_bucket(start, step)
+
+    slots = int(-(-(end - first).total_seconds() // step))
+    counts = [0] * slots
+    result = await db.execute(
+        select(RollupBucket.bucket_start, func.sum(RollupBucket.count))
+        .where(*_bucket_filter(TOTAL_DIMENSION, client_id, start, end))
+        .group_by(RollupBucket.bucket_start)
+    )
+    for bucket_start, count in result:
+        slot = int((as_utc(bucket_start) - first).total_seconds() // step)
+        if 0 <= slot < slots:
+            counts[slot] += int(count)
+
+    first_ms = int(first.timestamp() * 1000)
+    return {
+        "interval": interval,
+        "timestamps": [first_ms + i * step * 1000 for i in range(slots)],
+        "counts": counts,
+    }
+
+
+async def _top_values(db: AsyncSession, panel: DashboardPanel, client_id: Optional[str], start: datetime, end: datetime) -> dict:
+    total_count = func.sum(RollupBucket.count).label("total_count")
+    result = await db.execute(
+        select(RollupBucket.value, total_count)
+        .where(*_bucket_filter(panel.dimension, client_id, start, end), RollupBucket.value != "")
+        .group_by(RollupBucket.value)
+        .order_by(total_count.desc(), RollupBucket.value)
+        .limit(panel.size)
+    )
+    buckets = [{"key": value, "count": int(count)} for value, count in result]
+    data = {"buckets": buckets}
+
+    if panel.panel_type == "pie":
+        overall = (await db.execute(
+            select(func.sum(RollupBucket.count)).where(*_bucket_filter(TOTAL_DIMENSION, client_id, start, end))
+        )).scalar() or 0
+        data["other"] = max(int(overall) - sum(b["count"] for b in buckets), 0)
+    return data
+
+
+async def panel_data(db: AsyncSession, panel: DashboardPanel, client_id: Optional[str], start: datetime, end: datetime) -> dict:
+    """Computes one panel for [start, end) from the rollup buckets."""
+    if panel.panel_type == "histogram":
+        data = await _histogram(db, panel, client_id, start, end)
+    else:
+        data = await _top_values(db, panel, client_id, start, end)
+    return {"panel_id": panel.id, "panel_type": panel.panel_type, **data}
@@ -0,0 +1,560 @@
+# sc-siem-corvette/services/search_job_service.py
+import os
+import asyncio
+import secrets
+import functools
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from opensearchpy import AsyncOpenSearch, NotFoundError, ConnectionTimeout
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal
+from models.search_job import SearchJob
+from schemas.discover import DiscoverRequest, TimeRange
+from services import opensearch_service, search_scheduler
+from utils.helpers import parse_time_expression
+
+# How long a job and its results are kept after it was submitted.
+SEARCH_JOB_TTL_SECONDS = int(os.getenv("SEARCH_JOB_TTL_SECONDS", 86400))
+# Jobs one client may have running at once (beyond: 429).
+SEARCH_JOB_MAX_RUNNING_PER_CLIENT = int(os.getenv("SEARCH_JOB_MAX_RUNNING_PER_CLIENT", 2))
+# Most hits (from + size) a job collects.
+SEARCH_JOB_MAX_HITS = int(os.getenv("SEARCH_JOB_MAX_HITS", 10000))
+# Width of the time windows a job searches one after the other, aligned to UTC so
+# they match daily indices. Widened for long ranges to stay within SEARCH_JOB_MAX_WINDOWS.
+SEARCH_JOB_WINDOW_SECONDS = int(os.getenv("SEARCH_JOB_WINDOW_SECONDS", 86400))
+SEARCH_JOB_MAX_WINDOWS = int(os.getenv("SEARCH_JOB_MAX_WINDOWS", 200))
+# Progress is saved after every window; the merged hits and aggregations, which
+# can be large, only every this many windows (when they changed) and at the end.
+SEARCH_JOB_RESULTS_SAVE_WINDOWS = int(os.getenv("SEARCH_JOB_RESULTS_SAVE_WINDOWS", 10))
+# Attempts per window when the search scheduler sheds it or OpenSearch does not answer in time.
+SEARCH_JOB_MAX_ATTEMPTS = int(os.getenv("SEARCH_JOB_MAX_ATTEMPTS", 5))
+# Running jobs that made no progress for this long (their worker went away) are failed.
+SEARCH_JOB_STALE_SECONDS = int(os.getenv("SEARCH_JOB_STALE_SECONDS", 900))
+SEARCH_JOB_SWEEP_SECONDS = int(os.getenv("SEARCH_JOB_SWEEP_SECONDS", 60))
+
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def _reject(detail: str):
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+# --- Merging window results ---
+
+# Aggregations whose results over consecutive windows combine into the result
+# over the whole range (terms counts as exactly as they do across shards).
+BUCKET_AGGREGATIONS = {"terms", "date_histogram", "histogram", "range", "date_range"}
+SINGLE_BUCKET_AGGREGATIONS = {"filter", "missing"}
+METRIC_AGGREGATIONS = {"value_count", "sum", "min", "max", "stats"}
+MERGEABLE_AGGREGATIONS = BUCKET_AGGREGATIONS | SINGLE_BUCKET_AGGREGATIONS | METRIC_AGGREGATIONS
+
+
+def _parse_aggregation(name: str, body: Any) -> Tuple[str, dict, dict]:
+    """Splits an aggregation into (type, parameters, sub-aggregations)."""
+    kinds = [key for key in body if key not in ("aggs", "aggregations", "meta")] if isinstance(body, dict) else []
+    if len(kinds) != 1:
+        _reject(f"Aggregation '{name}' must have exactly one type.")
+    params = body[kinds[0]] if isinstance(body[kinds[0]], dict) else {}
+    return kinds[0], params, body.get("aggs") or body.get("aggregations") or {}
+
+
+def _terms_order(params: dict) -> List[Tuple[str, str]]:
+    order = params.get("order") or {"_count": "desc"}
+    return [(key, str(direction)) for item in (order if isinstance(order, list) else [order]) for key, direction in item.items()]
+
+
+def check_aggregations(aggs: Any):
+    """Rejects (400) aggregations whose per-window results can't be merged."""
+    if not isinstance(aggs, dict):
+        _reject("Aggregations must be an object.")
+    for name, body in aggs.items():
+        kind, params, subs = _parse_aggregation(name, body)
+        if kind not in MERGEABLE_AGGREGATIONS:
+            _reject(
+                f"Aggregation '{name}' ({kind}) can't be combined across the time windows of a search job. "
+                f"Supported: {', '.join(sorted(MERGEABLE_AGGREGATIONS))}"
+            )
+        if params.get("keyed"):
+            _reject(f"Aggregation '{name}' can't be keyed in a search job.")
+        if kind == "terms" and any(key not in ("_count", "_key") for key, _ in _terms_order(params)):
+            _reject(f"Terms aggregation '{name}' can only be ordered by _count or _key in a search job.")
+        check_aggregations(subs)
+
+
+def _pick(choose: Callable, *values):
+    values = [value for value in values if value is not None]
+    return choose(values) if values else None
+
+
+def _merge_aggregation(kind: str, params: dict, subs: dict, a: dict, b: dict) -> dict:
+    if kind == "stats":
+        count = a.get("count", 0) + b.get("count", 0)
+        total = (a.get("sum") or 0) + (b.get("sum") or 0)
+        return {
+            "count": count,
+            "min": _pick(min, a.get("min"), b.get("min")),
+            "max": _pick(max, a.get("max"), b.get("max")),
+            "avg": total / count if count else None,
+            "sum": total,
+        }
+    if kind in ("sum", "value_count"):
+        return {"value": (a.get("value") or 0) + (b.get("value") or 0)}
+    if kind in ("min", "max"):
+        return {"value": _pick(min if kind == "min" else max, a.get("value"), b.get("value"))}
+    if kind in SINGLE_BUCKET_AGGREGATIONS:
+        return {"doc_count": a.get("doc_count", 0) + b.get("doc_count", 0), **merge_aggregations(subs, a, b)}
+
+    buckets: Dict[Any, dict] = {}
+    for bucket in a.get("buckets", []) + b.get("buckets", []):
+        seen = buckets.get(bucket.get("key"))
+        if seen is None:
+            buckets[bucket.get("key")] = bucket
+        else:
+            buckets[bucket.get("key")] = {**seen, "doc_count": seen["doc_count"] + bucket["doc_count"], **merge_aggregations(subs, seen, bucket)}
+    merged = list(buckets.values())
+    if kind in ("date_histogram", "histogram"):
+        merged.sort(key=lambda bucket: bucket["key"])
+    if kind != "terms":
+        return {"buckets": merged}  # Ranges keep the order of their definition
+
+    merged.sort(key=lambda bucket: str(bucket["key"]))
+    for key, direction in reversed(_terms_order(params)):
+        merged.sort(key=lambda bucket: bucket["doc_count"] if key == "_count" else bucket["key"], reverse=direction == "desc")
+    size = int(params.get("size", 10))
+    return {
+        "doc_count_error_upper_bound": a.get("doc_count_error_upper_bound", 0) + b.get("doc_count_error_upper_bound", 0),
+        "sum_other_doc_count": a.get("sum_other_doc_count", 0) + b.get("sum_other_doc_count", 0)
+        + sum(bucket["doc_count"] for bucket in merged[size:]),
+        "buckets": merged[:size],
+    }
+
+
+def merge_aggregations(aggs: dict, merged: dict, window: dict) -> dict:
+    """Combines the aggregation results of one more window into those merged so far."""
+    result = {}
+    for name, body in aggs.items():
+        kind, params, subs = _parse_aggregation(name, body)
+        a, b = merged.get(name), window.get(name)
+        if a is not None and b is not None:
+            result[name] = _merge_aggregation(kind, params, subs, a, b)
+        elif a is not None or b is not None:
+            result[name] = a if b is None else b
+    return result
+
+
+def _compare_hits(a: dict, b: dict, orders: List[str]) -> int:
+    for x, y, order in zip(a.get("sort", []), b.get("sort", []), orders):
+        if x == y:
+            continue
+        if x is None or y is None:
+            return 1 if x is None else -1  # Missing values sort last
+        try:
+            before = x < y
+        except TypeError:
+            before = str(x) < str(y)
+        return (-1 if before else 1) * (1 if order == "asc" else -1)
+    return 0
+
+
+def merge_hits(merged: List[dict], window: List[dict], orders: List[str], keep: int) -> List[dict]:
+    """Keeps the best `keep` hits of both lists by their sort values."""
+    hits = merged + [
+        {key: hit[key] for key in ("_index", "_id", "_source", "highlight", "sort") if key in hit}
+        for hit in window
+    ]
+    hits.sort(key=functools.cmp_to_key(lambda a, b: _compare_hits(a, b, orders)))
+    return hits[:keep]
+
+
+# --- Windows ---
+
+def _sorted_by_time(request: DiscoverRequest) -> bool:
+    return not request.sort or request.sort[0].field == "@timestamp"
+
+
+def plan_windows(request: DiscoverRequest) -> List[Tuple[int, int]]:
+    """
+    Splits the request's time range into (start, end) epoch-millis windows,
+    both inclusive, in the order they are searched: newest first, unless
+    the hits are sorted by time ascending.
+    """
+    if request.time_range is None:
+        _reject("Search jobs need a time range.")
+    start = parse_time_expression(request.time_range.from_)
+    end = parse_time_expression(request.time_range.to, round_up=True)
+    if start is None or end is None or end <= start:
+        _reject("The time range of a search job needs a start and an end after it.")
+
+    start_ms, end_ms = int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+    # Widened in whole multiples of the base width so windows stay aligned with
+    # it; an unaligned start costs one extra window, hence MAX_WINDOWS - 1.
+    base = SEARCH_JOB_WINDOW_SECONDS * 1000
+    needed = -(-(end_ms - start_ms + 1) // max(SEARCH_JOB_MAX_WINDOWS - 1, 1))
+    width = max(-(-needed // base), 1) * base
+    windows, window_start = [], start_ms
+    while window_start <= end_ms:
+        window_end = min((window_start // width + 1) * width - 1, end_ms)
+        windows.append((window_start, window_end))
+        window_start = window_end + 1
+    if not (request.sort and request.sort[0].field == "@timestamp" and request.sort[0].order == "asc"):
+        windows.reverse()
+    return windows
+
+
+# --- Running jobs ---
+
+class JobStats:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.windows = 0
+        self.retries = 0
+
+
+job_stats = JobStats()
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _save(job_id: str, **values) -> bool:
+    """Updates a running job. Returns False once it is no longer running (cancelled, expired or deleted)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(SearchJob)
+            .where(SearchJob.id == job_id, SearchJob.status == RUNNING)
+            .values(updated_at=datetime.now(timezone.utc), **values)
+        )
+        await db.commit()
+    return result.rowcount > 0
+
+
+async def _save_results(job_id: str, **results):
+    """Keeps the results merged since the last save of a job that stopped early, whatever its status."""
+    if not results:
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(SearchJob).where(SearchJob.id == job_id).values(**results))
+        await db.commit()
+
+
+async def _search_window(os_client: AsyncOpenSearch, window: DiscoverRequest) -> Optional[Tuple[dict, List[str]]]:
+    """Searches one window in the background lane. Returns (response, downgrades), or None when no index matches."""
+    index_target = opensearch_service.resolve_index_target(window)
+    if index_target is None:
+        return None
+    query = opensearch_service.build_opensearch_query(window)
+    query.pop("from", None)
+    query["track_total_hits"] = True
+    downgrades = opensearch_service.admit_search(query, index_target, window, truncate=False)
+
+    for attempt in range(1, SEARCH_JOB_MAX_ATTEMPTS + 1):
+        try:
+            async with search_scheduler.scheduler.slot(window.client_id, search_scheduler.BACKGROUND):
+                response = await os_client.search(
+                    index=index_target,
+                    body=query,
+                    ignore_unavailable=True,
+                    request_timeout=opensearch_service.OPENSEARCH_SEARCH_TIMEOUT
+                )
+            job_stats.windows += 1
+            return response, downgrades
+        except NotFoundError:
+            return None
+        except (HTTPException, ConnectionTimeout) as e:
+            # Shed by the search scheduler, or the cluster is slow: back off and try the window again.
+            shed = isinstance(e, HTTPException) and e.status_code in (status.HTTP_429_TOO_MANY_REQUESTS, status.HTTP_503_SERVICE_UNAVAILABLE)
+            if attempt == SEARCH_JOB_MAX_ATTEMPTS or not (shed or isinstance(e, ConnectionTimeout)):
+                raise
+            job_stats.retries += 1
+            await asyncio.sleep(min(2 ** attempt, 60))
+
+
+async def _run(job_id: str, request: DiscoverRequest, windows: List[Tuple[int, int]]):
+    """
+    Searches the windows one after the other, saving progress after each and
+    the merged results every SEARCH_JOB_RESULTS_SAVE_WINDOWS windows. Once a
+    time-sorted job holds enough hits, later windows only count and
+    aggregate, since they can't contain better hits.
+    """
+    orders = [opt.order for opt in request.sort] if request.sort else ["desc"]
+    keep = request.from_ + request.size
+    hits: List[dict] = []
+    aggregations: dict = {}
+    total, failed_shards, timed_out, downgrades = 0, 0, False, []
+    hits_changed = aggregations_changed = False
+
+    def unsaved_results() -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        if hits_changed:
+            results["hits"] = hits
+        if aggregations_changed:
+            results["aggregations"] = aggregations
+        return results
+
+    try:
+        os_client = opensearch_service.get_client()
+        await opensearch_service.load_field_types(os_client, request)
+        for done, (start_ms, end_ms) in enumerate(windows, 1):
+            window = request.model_copy(update={
+                "time_range": TimeRange(**{"from": str(start_ms), "to": str(end_ms)}),
+                "from_": 0,
+                "size": 0 if _sorted_by_time(request) and len(hits) >= keep else keep,
+            })
+            values: Dict[str, Any] = {"windows_done": done}
+            result = await _search_window(os_client, window)
+            if result is not None:
+                response, window_downgrades = result
+                if response["hits"]["hits"]:
+                    merged = merge_hits(hits, response["hits"]["hits"], orders, keep)
+                    if [(h["_index"], h["_id"]) for h in merged] != [(h["_index"], h["_id"]) for h in hits]:
+                        hits, hits_changed = merged, True
+                if request.aggregations and response.get("aggregations"):
+                    aggregations = merge_aggregations(request.aggregations, aggregations, response["aggregations"])
+                    aggregations_changed = True
+                total += response["hits"]["total"]["value"]
+                timed_out = timed_out or bool(response.get("timed_out"))
+                failed_shards += response.get("_shards", {}).get("failed", 0)
+                downgrades += [d for d in window_downgrades if d not in downgrades]
+                values.update(total=total, timed_out=timed_out, failed_shards=failed_shards, downgrades=downgrades)
+            last = done == len(windows)
+            if last or done % SEARCH_JOB_RESULTS_SAVE_WINDOWS == 0:
+                values.update(unsaved_results())
+            if last:
+                values.update(status=COMPLETED, completed_at=datetime.now(timezone.utc))
+            if not await _save(job_id, **values):
+                await _save_results(job_id, **unsaved_results())  # Cancelled on another worker
+                return
+            if "hits" in values:
+                hits_changed = False
+            if "aggregations" in values:
+                aggregations_changed = False
+        job_stats.completed += 1
+    except asyncio.CancelledError:
+        # Cancelled or expired jobs are no longer running, so this only marks jobs cut off by a shutdown.
+        await _save(job_id, status=FAILED, error="Interrupted by a server shutdown.", completed_at=datetime.now(timezone.utc))
+        await _save_results(job_id, **unsaved_results())
+        raise
+    except HTTPException as e:
+        job_stats.failed += 1
+        await _save(job_id, status=FAILED, error=str(e.detail), completed_at=datetime.now(timezone.utc), **unsaved_results())
+    except Exception as e:
+        job_stats.failed += 1
+        await _save(job_id, status=FAILED, error=f"An error occurred while querying OpenSearch: {e}",
+                    completed_at=datetime.now(timezone.utc), **unsaved_results())
+    finally:
+        _tasks.pop(job_id, None)
+
+
+async def submit(db: AsyncSession, request: DiscoverRequest, user_id: Optional[int]) -> SearchJob:
+    """
+    Validates a Discover request, stores it as a running job and starts it in
+    the background. Problems that can be found up front (time range, filters,
+    aggregations, limits) are rejected before the job exists.
+    """
+    if request.use_cursor or request.cursor:
+        _reject("Search jobs collect their hits themselves; cursor pagination is not supported.")
+    if request.from_ + request.size > SEARCH_JOB_MAX_HITS:
+        _reject(f"A search job collects at most {SEARCH_JOB_MAX_HITS} hits (from + size).")
+    windows = plan_windows(request)
+    if request.aggregations:
+        check_aggregations(request.aggregations)
+    os_client = opensearch_service.get_client()
+    await opensearch_service.load_field_types(os_client, request)
+    opensearch_service.build_opensearch_query(request)  # Malformed filters fail here, not in the background
+
+    client_filter = SearchJob.client_id.is_(None) if request.client_id is None else SearchJob.client_id == request.client_id
+    running = (await db.execute(
+        select(func.count()).select_from(SearchJob).filter(client_filter, SearchJob.status == RUNNING)
+    )).scalar()
+    if running >= SEARCH_JOB_MAX_RUNNING_PER_CLIENT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"This client already has {running} search jobs running. Wait for one to finish or cancel it."
+        )
+
+    now = datetime.now(timezone.utc)
+    job = SearchJob(
+        id=secrets.token_urlsafe(16),
+        client_id=request.client_id,
+        created_by=user_id,
+        index_pattern=request.index_pattern,
+        request=request.model_dump(mode="json", by_alias=True),
+        status=RUNNING,
+        windows_total=len(windows),
+        windows_done=0,
+        hits=[],
+        total=0,
+        aggregations={},
+        timed_out=False,
+        failed_shards=0,
+        downgrades=[],
+        created_at=now,
+        updated_at=now,
+        expires_at=now + timedelta(seconds=SEARCH_JOB_TTL_SECONDS),
+    )
+    db.add(job)
+    await db.commit()
+    job_stats.submitted += 1
+    _tasks[job.id] = asyncio.create_task(_run(job.id, request, windows))
+    return job
+
+
+# --- Access ---
+
+def _visible(client_id: Optional[str], all_clients: bool):
+    filters = [SearchJob.expires_at > datetime.now(timezone.utc)]
+    if not all_clients:
+        filters.append(SearchJob.client_id == client_id)
+    return filters
+
+
+async def get_job(db: AsyncSession, job_id: str, client_id: Optional[str], all_clients: bool) -> SearchJob:
+    """A job of the caller's client (any job with all_clients), or 404."""
+    job = (await db.execute(
+        select(SearchJob).filter(SearchJob.id == job_id, *_visible(client_id, all_clients))
+    )).scalars().first()
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Search job not found")
+    return job
+
+
+async def list_jobs(db: AsyncSession, client_id: Optional[str], all_clients: bool) -> List[SearchJob]:
+    return (await db.execute(
+        select(SearchJob).filter(*_visible(client_id, all_clients)).order_by(SearchJob.created_at.desc())
+    )).scalars().all()
+
+
+async def cancel(db: AsyncSession, job: SearchJob) -> SearchJob:
+    """Stops a running job. The results merged so far are kept until the job expires."""
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(SearchJob)
+        .where(SearchJob.id == job.id, SearchJob.status == RUNNING)
+        .values(status=CANCELLED, updated_at=now, completed_at=now)
+    )
+    await db.commit()
+    if result.rowcount:
+        job_stats.cancelled += 1
+        # The job may run on another worker; it stops there when it next saves.
+        task = _tasks.get(job.id)
+        if task is not None:
+            task.cancel()
+    await db.refresh(job)
+    return job
+
+
+async def delete_job(db: AsyncSession, job: SearchJob):
+    await cancel(db, job)
+    await db.delete(job)
+    await db.commit()
+
+
+def job_payload(job: SearchJob, with_response: bool = True) -> dict:
+    """Shapes a job for the API; the response holds the requested page of the merged hits in the DiscoverResponse layout."""
+    payload = {
+        "id": job.id,
+        "status": job.status,
+        "client_id": job.client_id,
+        "index_pattern": job.index_pattern,
+        "progress": round(job.windows_done / job.windows_total, 4) if job.windows_total else 1.0,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "completed_at": job.completed_at,
+        "expires_at": job.expires_at,
+    }
+    if with_response:
+        offset = job.request.get("from", 0)
+        hits = (job.hits or [])[offset:offset + job.request.get("size", 100)]
+        payload["response"] = {
+            "hits": [{"index": hit["_index"], "source": hit["_source"], "highlight": hit.get("highlight", {})} for hit in hits],
+            "total": job.total,
+            "aggregations": job.aggregations or {},
+            "cursor": None,
+            "partial": job.status != COMPLETED or job.timed_out or job.failed_shards > 0,
+            "timed_out": job.timed_out,
+            "terminated_early": False,
+            "failed_shards": job.failed_shards,
+            "downgrades": job.downgrades or [],
+        }
+    return payload
+
+
+# --- Expiry ---
+
+async def sweep(now: Optional[datetime] = None):
+    """Deletes expired jobs and fails running jobs that stopped making progress."""
+    now = now or datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        expired = (await db.execute(select(SearchJob.id).filter(SearchJob.expires_at <= now))).scalars().all()
+        for job_id in expired:
+            task = _tasks.get(job_id)
+            if task is not None:
+                task.cancel()
+        if expired:
+            await db.execute(delete(SearchJob).where(SearchJob.id.in_(expired)))
+        await db.execute(
+            update(SearchJob)
+            .where(
+                SearchJob.status == RUNNING,
+                SearchJob.updated_at < now - timedelta(seconds=SEARCH_JOB_STALE_SECONDS),
+                SearchJob.id.notin_(list(_tasks)),
+            )
+            .values(status=FAILED, error="The job stopped making progress. Submit it again.", completed_at=now)
+        )
+        await db.commit()
+
+
+def stats() -> dict:
+    return {
+        "running": len(_tasks),
+        "submitted": job_stats.submitted,
+        "completed": job_stats.completed,
+        "failed": job_stats.failed,
+        "cancelled": job_stats.cancelled,
+        "windows_searched": job_stats.windows,
+        "window_retries": job_stats.retries,
+    }
+
+
+_sweep_task: Optional[asyncio.Task] = None
+
+
+async def _sweep_loop():
+    while True:
+        try:
+            await sweep()
+        except Exception as e:
+            print(f"WARNING: Search job sweep failed: {e}")
+        await asyncio.sleep(SEARCH_JOB_SWEEP_SECONDS)
+
+
+def start():
+    """Starts expiring search jobs in the background."""
+    global _sweep_task
+    if _sweep_task is None:
+        _sweep_task = asyncio.create_task(_sweep_loop())
+
+
+async def stop():
+    """Stops the sweeper and the jobs running on this worker; they are marked as failed."""
+    global _sweep_task
+    if _sweep_task is not None:
+        _sweep_task.cancel()
+        try:
+            await _sweep_task
+        except asyncio.CancelledError:
+            pass
+        _sweep_task = None
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
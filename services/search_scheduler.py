@@ -0,0 +1,232 @@
+# sc-siem-corvette/services/search_scheduler.py
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from services.query_guard import limit_table
+
+SEARCH_SCHEDULER_ENABLED = os.getenv("SEARCH_SCHEDULER_ENABLED", "true").lower() == "true"
+# OpenSearch calls in flight across all tenants; keep it below OPENSEARCH_POOL_MAXSIZE
+# so management calls always find a free connection.
+SEARCH_SCHEDULER_MAX_IN_FLIGHT = int(os.getenv("SEARCH_SCHEDULER_MAX_IN_FLIGHT", 16))
+# Default in-flight calls per tenant; tenants can be given their own (see /api/v1/query-limits).
+SEARCH_SCHEDULER_TENANT_MAX_IN_FLIGHT = int(os.getenv("SEARCH_SCHEDULER_TENANT_MAX_IN_FLIGHT", 4))
+# Slots background work (exports, alert and rollup jobs) may hold, so interactive searches always find room.
+SEARCH_SCHEDULER_BACKGROUND_MAX_IN_FLIGHT = int(os.getenv("SEARCH_SCHEDULER_BACKGROUND_MAX_IN_FLIGHT", 6))
+# Calls one tenant may have waiting (beyond: 429), and all tenants together (beyond: 503).
+SEARCH_SCHEDULER_TENANT_MAX_QUEUED = int(os.getenv("SEARCH_SCHEDULER_TENANT_MAX_QUEUED", 50))
+SEARCH_SCHEDULER_MAX_QUEUED = int(os.getenv("SEARCH_SCHEDULER_MAX_QUEUED", 500))
+# Longest a call may wait for a slot before it is shed with 503, per lane.
+SEARCH_SCHEDULER_INTERACTIVE_MAX_WAIT = float(os.getenv("SEARCH_SCHEDULER_INTERACTIVE_MAX_WAIT", 5))
+SEARCH_SCHEDULER_BACKGROUND_MAX_WAIT = float(os.getenv("SEARCH_SCHEDULER_BACKGROUND_MAX_WAIT", 60))
+
+# Lanes in priority order: a background call only gets a slot no interactive call is waiting for.
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)
+MAX_WAIT = {INTERACTIVE: SEARCH_SCHEDULER_INTERACTIVE_MAX_WAIT, BACKGROUND: SEARCH_SCHEDULER_BACKGROUND_MAX_WAIT}
+
+# Tenant key of calls that span every client (admins without a client_id, system jobs).
+ALL_CLIENTS = "*"
+
+# Only searches go through the scheduler. The other OpenSearch calls bypass it on purpose:
+# - field_catalog and index_catalog refreshes: admitted searches are planned with their
+#   results, so they must not queue behind those searches, and single-flight refresh
+#   loops already keep them to one call per pattern (or one pass) at a time.
+# - lifecycle calls: one periodic loop makes them. They are cluster management rather
+#   than searches, and heavy actions such as force merges are already deferred while
+#   the cluster's search thread pool has a queue (lifecycle_service.search_load).
+# - bulk ingest and percolation: they run on the write path, which has its own buffer
+#   limit and 429s (INGEST_QUEUE_MAX). A shed batch would be lost events, not
+#   a search the user can retry.
+# Together they stay within the OPENSEARCH_POOL_MAXSIZE headroom left above
+# SEARCH_SCHEDULER_MAX_IN_FLIGHT.
+
+
+class _Tenant:
+    def __init__(self, key: str):
+        self.key = key
+        self.queues: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self.in_flight = 0
+        # Start-time fair queuing: the tenant's virtual time advances by 1/weight
+        # per call it is granted; the backlogged tenant furthest behind goes next.
+        self.virtual_time = {lane: 0.0 for lane in LANES}
+        self.granted = 0
+        self.shed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": {lane: len(queue) for lane, queue in self.queues.items()},
+            "granted": self.granted,
+            "shed": self.shed,
+            "avg_wait_ms": round(self.wait_total / self.granted * 1000, 1) if self.granted else 0.0,
+            "max_wait_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+class FairScheduler:
+    """
+    Admission in front of OpenSearch calls. A call runs once a global slot
+    and one of its tenant's slots are free. Waiting calls are served by lane
+    priority, then weighted fair queuing between tenants, then FIFO within a
+    tenant. Calls are shed with 429 when their tenant has too many waiting,
+    and with 503 when everything is full or they waited past their deadline.
+    """
+
+    def __init__(self):
+        self.tenants: Dict[str, _Tenant] = {}
+        self.in_flight = 0
+        self.lane_in_flight = {lane: 0 for lane in LANES}
+        self.queued = 0
+        self.clock = {lane: 0.0 for lane in LANES}  # Virtual start time of the last grant
+        self.shed_429 = 0
+        self.shed_503 = 0
+
+    def _tenant(self, key: str) -> _Tenant:
+        tenant = self.tenants.get(key)
+        if tenant is None:
+            tenant = self.tenants[key] = _Tenant(key)
+        return tenant
+
+    @staticmethod
+    def _tenant_limit(key: str) -> int:
+        return limit_table.value(None if key == ALL_CLIENTS else key, "max_in_flight", SEARCH_SCHEDULER_TENANT_MAX_IN_FLIGHT)
+
+    @staticmethod
+    def _weight(key: str) -> float:
+        return limit_table.value(None if key == ALL_CLIENTS else key, "weight", 1.0)
+
+    def _lane_has_room(self, lane: str) -> bool:
+        if self.in_flight >= SEARCH_SCHEDULER_MAX_IN_FLIGHT:
+            return False
+        return lane == INTERACTIVE or self.lane_in_flight[lane] < SEARCH_SCHEDULER_BACKGROUND_MAX_IN_FLIGHT
+
+    def _grant(self, tenant: _Tenant, lane: str):
+        self.clock[lane] = tenant.virtual_time[lane]
+        tenant.virtual_time[lane] += 1 / max(self._weight(tenant.key), 0.01)
+        tenant.in_flight += 1
+        tenant.granted += 1
+        self.in_flight += 1
+        self.lane_in_flight[lane] += 1
+
+    def _dispatch(self):
+        """Hands free slots to waiting calls."""
+        for lane in LANES:
+            while self._lane_has_room(lane):
+                candidates = [
+                    tenant for tenant in self.tenants.values()
+                    if tenant.queues[lane] and tenant.in_flight < self._tenant_limit(tenant.key)
+                ]
+                if not candidates:
+                    break
+                tenant = min(candidates, key=lambda t: t.virtual_time[lane])
+                waiter = tenant.queues[lane].popleft()
+                self.queued -= 1
+                self._grant(tenant, lane)
+                waiter.set_result(time.monotonic())
+            # Background room implies global room, so background calls only get
+            # slots left over once no interactive call can use them.
+
+    def _withdraw(self, tenant: _Tenant, lane: str, waiter: asyncio.Future):
+        waiter.cancel()
+        try:
+            tenant.queues[lane].remove(waiter)
+            self.queued -= 1
+        except ValueError:
+            pass
+
+    def _shed(self, tenant: _Tenant, status_code: int, detail: str, retry_after: float):
+        tenant.shed += 1
+        if status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            self.shed_429 += 1
+        else:
+            self.shed_503 += 1
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(max(int(retry_after), 1))})
+
+    async def acquire(self, client_id: Optional[str], lane: str = INTERACTIVE):
+        key = client_id or ALL_CLIENTS
+        tenant = self._tenant(key)
+        waiting = any(t.queues[lane] for t in self.tenants.values()) or (
+            lane == BACKGROUND and any(t.queues[INTERACTIVE] for t in self.tenants.values())
+        )
+        if not waiting and self._lane_has_room(lane) and tenant.in_flight < self._tenant_limit(key):
+            self._grant(tenant, lane)
+            return
+
+        if tenant.queued >= SEARCH_SCHEDULER_TENANT_MAX_QUEUED:
+            self._shed(tenant, status.HTTP_429_TOO_MANY_REQUESTS, "Too many searches queued for this client. Retry shortly.", 1)
+        if self.queued >= SEARCH_SCHEDULER_MAX_QUEUED:
+            self._shed(tenant, status.HTTP_503_SERVICE_UNAVAILABLE, "Search capacity is exhausted. Retry shortly.", MAX_WAIT[lane])
+
+        if not tenant.queues[lane]:
+            # A tenant returning from idle starts level with the others instead of with banked credit.
+            tenant.virtual_time[lane] = max(tenant.virtual_time[lane], self.clock[lane])
+        waiter = asyncio.get_running_loop().create_future()
+        tenant.queues[lane].append(waiter)
+        self.queued += 1
+        enqueued_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            granted_at = await asyncio.wait_for(asyncio.shield(waiter), MAX_WAIT[lane])
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                granted_at = waiter.result()  # Granted just as the deadline passed
+            else:
+                self._withdraw(tenant, lane, waiter)
+                self._shed(tenant, status.HTTP_503_SERVICE_UNAVAILABLE, "Search capacity is exhausted. Retry shortly.", MAX_WAIT[lane])
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(client_id, lane)
+            else:
+                self._withdraw(tenant, lane, waiter)
+            raise
+
+        waited = granted_at - enqueued_at
+        tenant.wait_total += waited
+        tenant.wait_max = max(tenant.wait_max, waited)
+
+    def release(self, client_id: Optional[str], lane: str = INTERACTIVE):
+        tenant = self._tenant(client_id or ALL_CLIENTS)
+        tenant.in_flight -= 1
+        self.in_flight -= 1
+        self.lane_in_flight[lane] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, client_id: Optional[str], lane: str = INTERACTIVE):
+        """Holds a scheduler slot of the tenant for the duration of one OpenSearch call."""
+        if not SEARCH_SCHEDULER_ENABLED:
+            yield
+            return
+        await self.acquire(client_id, lane)
+        try:
+            yield
+        finally:
+            self.release(client_id, lane)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": SEARCH_SCHEDULER_ENABLED,
+            "in_flight": self.in_flight,
+            "in_flight_by_lane": dict(self.lane_in_flight),
+            "queued": self.queued,
+            "shed_429": self.shed_429,
+            "shed_503": self.shed_503,
+            "tenants": {key: tenant.stats() for key, tenant in self.tenants.items()},
+        }
+
+
+scheduler = FairScheduler()
@@ -0,0 +1,62 @@
+# sc-siem-corvette/services/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+    The upstream call runs in its own task, so a caller that goes away (for
+    example a client disconnect cancelling the request) does not cancel it for
+    the others; it is only cancelled once every caller has gone. Results are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        self.abandoned_calls = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.upstream_calls += 1
+        else:
+            self.coalesced_calls += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller was cancelled; stop the upstream call and make
+                # sure later callers start a fresh one.
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.abandoned_calls += 1
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "abandoned_calls": self.abandoned_calls,
+        }
+
+
+search_flights = SingleFlight()
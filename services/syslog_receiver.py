@@ -0,0 +1,433 @@
+# sc-siem-corvette/services/syslog_receiver.py
+import os
+import re
+import ssl
+import time
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+from opensearchpy import AsyncOpenSearch
+
+from services import ingest_service, ip_list_service
+from services.ingest_service import PendingDocument, daily_index
+from services.ip_list_service import ip_index
+from utils.helpers import parse_time_expression
+
+SYSLOG_ENABLED = os.getenv("SYSLOG_ENABLED", "false").lower() == "true"
+SYSLOG_HOST = os.getenv("SYSLOG_HOST", "0.0.0.0")
+# Set a port to 0 to disable that transport.
+SYSLOG_TCP_PORT = int(os.getenv("SYSLOG_TCP_PORT", 6514))
+# Off by default: UDP source addresses can be spoofed, so any host could send as a mapped source.
+SYSLOG_UDP_PORT = int(os.getenv("SYSLOG_UDP_PORT", 0))
+# TCP is wrapped in TLS when both are set.
+SYSLOG_TLS_CERT = os.getenv("SYSLOG_TLS_CERT", "")
+SYSLOG_TLS_KEY = os.getenv("SYSLOG_TLS_KEY", "")
+# Longer messages close the TCP connection (UDP datagrams are bounded by the transport).
+SYSLOG_MAX_MESSAGE_BYTES = int(os.getenv("SYSLOG_MAX_MESSAGE_BYTES", 64 * 1024))
+# Received messages waiting to be parsed. When full, TCP senders are slowed down and UDP messages are dropped.
+SYSLOG_QUEUE_MAX = int(os.getenv("SYSLOG_QUEUE_MAX", 100000))
+# Messages parsed and handed to the bulk writer together.
+SYSLOG_PARSE_BATCH = int(os.getenv("SYSLOG_PARSE_BATCH", 500))
+# Client for sources that are on no client's source list (empty: such messages are refused).
+SYSLOG_DEFAULT_CLIENT_ID = os.getenv("SYSLOG_DEFAULT_CLIENT_ID", "")
+# Refused messages are appended here (NDJSON) so they can be replayed once their source is allowed.
+SYSLOG_REPLAY_FILE = os.getenv("SYSLOG_REPLAY_FILE", "syslog-refused.ndjson")
+SYSLOG_REPLAY_MAX_BYTES = int(os.getenv("SYSLOG_REPLAY_MAX_BYTES", 100 * 1024 * 1024))
+SYSLOG_SOURCE_TYPE = "syslog"
+
+FACILITIES = [
+    "kern", "user", "mail", "daemon", "auth", "syslog", "lpr", "news", "uucp", "cron", "authpriv", "ftp",
+    "ntp", "security", "console", "solaris-cron", "local0", "local1", "local2", "local3", "local4",
+    "local5", "local6", "local7",
+]
+SEVERITIES = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
+MONTHS = {name: number for number, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+# <PRI>VERSION TIMESTAMP HOSTNAME APP-NAME PROCID MSGID STRUCTURED-DATA [MSG]
+_RFC5424_RE = re.compile(
+    r"^<(\d{1,3})>\d{1,2} (\S+) (\S+) (\S+) (\S+) (\S+) (-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: \ufeff?(.*))?$",
+    re.DOTALL,
+)
+# <PRI>TIMESTAMP [HOSTNAME] [TAG[PID]:] MSG, with a BSD ('Oct 11 22:14:15') or ISO timestamp.
+_RFC3164_RE = re.compile(
+    r"^<(\d{1,3})>(?:([A-Z][a-z]{2}) +(\d{1,2}) (\d\d):(\d\d):(\d\d)|(\d{4}-\d\d-\d\dT\S+)) "
+    r"(?:(\S+) )?(?:([^\s:\[\]]+)(?:\[(\d+)\])?: )?(.*)$",
+    re.DOTALL,
+)
+_PRI_RE = re.compile(r"^<(\d{1,3})>(.*)$", re.DOTALL)
+
+
+# --- Parsing ---
+
+def _priority_fields(document: dict, priority: str):
+    value = int(priority)
+    facility, severity = value >> 3, value & 7
+    document["facility"] = FACILITIES[facility] if facility < len(FACILITIES) else str(facility)
+    document["severity"] = SEVERITIES[severity]
+
+
+def _timestamp(value: str, now: datetime) -> str:
+    """ISO timestamps are normalised to UTC (what daily indices are cut on); unreadable ones become now."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc).isoformat()
+    except (OverflowError, ValueError):
+        return now.isoformat()
+
+
+def _bsd_timestamp(month: str, day: str, hour: str, minute: str, second: str, now: datetime) -> str:
+    """BSD timestamps carry no year or zone: they are read as UTC in the year that keeps them out of the future."""
+    try:
+        value = datetime(now.year, MONTHS[month], int(day), int(hour), int(minute), int(second), tzinfo=timezone.utc)
+    except (KeyError, ValueError):
+        return now.isoformat()
+    if value > now + timedelta(days=1):
+        value = value.replace(year=now.year - 1)
+    return value.isoformat()
+
+
+def parse_message(line: str, now: datetime) -> dict:
+    """Parses one RFC 5424 or RFC 3164 message; anything else is kept whole as the message."""
+    match = _RFC5424_RE.match(line)
+    if match:
+        priority, timestamp, host, app, procid, msgid, structured, message = match.groups()
+        document = {
+            "@timestamp": now.isoformat() if timestamp == "-" else _timestamp(timestamp, now),
+            "message": message or "",
+            "syslog_format": "rfc5424",
+        }
+        _priority_fields(document, priority)
+        for field, value in (("host", host), ("program", app), ("pid", procid), ("msgid", msgid), ("structured_data", structured)):
+            if value != "-":
+                document[field] = value
+        return document
+
+    match = _RFC3164_RE.match(line)
+    if match:
+        priority, month, day, hour, minute, second, iso, host, tag, pid, message = match.groups()
+        document = {
+            "@timestamp": _timestamp(iso, now) if iso else _bsd_timestamp(month, day, hour, minute, second, now),
+            "message": message,
+            "syslog_format": "rfc3164",
+        }
+        _priority_fields(document, priority)
+        if host:
+            document["host"] = host
+        if tag:
+            document["program"] = tag
+        if pid:
+            document["pid"] = pid
+        return document
+
+    document = {"@timestamp": now.isoformat(), "syslog_format": "raw"}
+    match = _PRI_RE.match(line)
+    if match and int(match.group(1)) < 192:
+        _priority_fields(document, match.group(1))
+        line = match.group(2)
+    document["message"] = line
+    return document
+
+
+# --- Pipeline ---
+
+class SyslogStats:
+    def __init__(self):
+        self.received = 0
+        self.forwarded = 0
+        self.unparsed = 0
+        self.dropped = 0  # UDP messages that found the queue full
+        self.oversized = 0
+        self.refused = 0  # Sources mapped to no client (or to several), or denied by its lists
+        self.replay_written = 0
+        self.replay_dropped = 0
+        self.backpressure_waits = 0
+        self.tcp_connections = 0
+
+
+syslog_stats = SyslogStats()
+_queue: Optional[asyncio.Queue] = None
+# Source address -> client_id (None when refused), valid for one version of the IP lists.
+_source_clients: Dict[str, Optional[str]] = {}
+_source_clients_version: Tuple[int, int] = (-1, -1)
+SOURCE_CACHE_MAX = 100000
+
+
+def resolve_client(source_ip: str) -> Optional[str]:
+    """
+    Returns the client a source sends for: the client whose source list (kept
+    by admins) holds the longest prefix matching it, or SYSLOG_DEFAULT_CLIENT_ID.
+    None when the source is refused: when several clients map it equally, or
+    when the client's own allow and deny lists do not allow it.
+    """
+    global _source_clients, _source_clients_version
+    if _source_clients_version != ip_index.version or len(_source_clients) > SOURCE_CACHE_MAX:
+        _source_clients, _source_clients_version = {}, ip_index.version
+    if source_ip in _source_clients:
+        return _source_clients[source_ip]
+
+    clients = ip_index.source_clients(source_ip)
+    if len(clients) > 1:
+        client_id = None  # Claimed by several clients: attributing it to either would leak the other's logs
+    else:
+        client_id = clients[0] if clients else SYSLOG_DEFAULT_CLIENT_ID or None
+    if client_id is not None and not ip_index.is_allowed(client_id, source_ip):
+        client_id = None
+    _source_clients[source_ip] = client_id
+    return client_id
+
+
+def _write_replay(records: List[bytes]):
+    try:
+        if os.path.exists(SYSLOG_REPLAY_FILE) and os.path.getsize(SYSLOG_REPLAY_FILE) >= SYSLOG_REPLAY_MAX_BYTES:
+            syslog_stats.replay_dropped += len(records)
+            return
+        with open(SYSLOG_REPLAY_FILE, "ab") as replay_file:
+            replay_file.write(b"".join(records))
+        syslog_stats.replay_written += len(records)
+    except OSError as e:
+        syslog_stats.replay_dropped += len(records)
+        print(f"WARNING: Could not write refused syslog messages to '{SYSLOG_REPLAY_FILE}': {e}")
+
+
+async def process(messages: List[Tuple[bytes, str, float]]) -> Tuple[int, int]:
+    """
+    Parses received (message, source ip, received at) tuples, attributes them to
+    clients and hands them to the bulk writer, waiting while it is full.
+    Refused messages go to the replay file. Returns (forwarded, refused).
+    """
+    while not ip_index.loaded:
+        await asyncio.sleep(0.1)  # Before the lists are loaded every source would look refused
+    now = datetime.now(timezone.utc)
+    loop = asyncio.get_running_loop()
+    documents: List[PendingDocument] = []
+    refused: List[bytes] = []
+    for raw, source_ip, received_at in messages:
+        client_id = resolve_client(source_ip)
+        if client_id is None:
+            refused.append(orjson.dumps({
+                "received_at": datetime.fromtimestamp(received_at, tz=timezone.utc).isoformat(),
+                "source_ip": source_ip,
+                "message": raw.decode("utf-8", errors="replace"),
+            }) + b"\n")
+            continue
+        document = parse_message(raw.decode("utf-8", errors="replace").rstrip("\r\n\x00"), now)
+        if document["syslog_format"] == "raw":
+            syslog_stats.unparsed += 1
+        document["source_ip"] = source_ip
+        document["client_id"] = client_id
+        # Timestamps are bounded by the receive time, which senders cannot set (replayed messages keep theirs).
+        received = datetime.fromtimestamp(received_at, tz=timezone.utc)
+        try:
+            index = daily_index(SYSLOG_SOURCE_TYPE, document, received)
+        except ValueError:
+            # The sender's clock is far off: keep its timestamp, but index the message under the receive time.
+            document["original_timestamp"] = document["@timestamp"]
+            document["@timestamp"] = received.isoformat()
+            index = daily_index(SYSLOG_SOURCE_TYPE, document, received)
+        documents.append(PendingDocument(index, document, len(raw), loop.time()))
+
+    if refused:
+        syslog_stats.refused += len(refused)
+        if SYSLOG_REPLAY_FILE:
+            await loop.run_in_executor(None, _write_replay, refused)
+    if documents:
+        # Waiting here stops the parse worker, which fills the queue and in turn slows TCP senders down.
+        while not ingest_service.ingester.enqueue(documents):
+            syslog_stats.backpressure_waits += 1
+            await asyncio.sleep(ingest_service.INGEST_FLUSH_SECONDS / 4)
+        syslog_stats.forwarded += len(documents)
+    return len(documents), len(refused)
+
+
+async def _parse_loop():
+    while True:
+        batch = [await _queue.get()]
+        while len(batch) < SYSLOG_PARSE_BATCH and not _queue.empty():
+            batch.append(_queue.get_nowait())
+        try:
+            await process(batch)
+        except Exception as e:
+            print(f"WARNING: Processing {len(batch)} syslog messages failed: {e}")
+
+
+def _receive(message: bytes, source_ip: str) -> bool:
+    syslog_stats.received += 1
+    try:
+        _queue.put_nowait((message, source_ip, time.time()))
+        return True
+    except asyncio.QueueFull:
+        return False
+
+
+# --- Transports ---
+
+class SyslogUDPProtocol(asyncio.DatagramProtocol):
+    def datagram_received(self, data: bytes, addr):
+        if not _receive(data, addr[0]):
+            syslog_stats.dropped += 1
+
+
+async def _handle_tcp(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Reads octet-counted (RFC 6587) or newline-delimited messages from one connection."""
+    source_ip = writer.get_extra_info("peername")[0]
+    syslog_stats.tcp_connections += 1
+    try:
+        while True:
+            first = await reader.readexactly(1)
+            if first.isdigit():
+                length = int(first + (await reader.readuntil(b" "))[:-1])
+                if length > SYSLOG_MAX_MESSAGE_BYTES:
+                    syslog_stats.oversized += 1
+                    break
+                message = await reader.readexactly(length)
+            else:
+                message = first + await reader.readuntil(b"\n")
+            if message.strip():
+                syslog_stats.received += 1
+                await _queue.put((message, source_ip, time.time()))  # Blocks this sender while the queue is full
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except (asyncio.LimitOverrunError, ValueError):
+        syslog_stats.oversized += 1
+    finally:
+        writer.close()
+
+
+# --- Replay ---
+
+async def replay_refused() -> dict:
+    """
+    Feeds the replay file through the pipeline again, e.g. after the sources
+    were added to a source list. Messages still refused are written to a new
+    replay file.
+    """
+    if not SYSLOG_REPLAY_FILE:
+        return {"replayed": 0, "forwarded": 0, "refused": 0}
+    replaying = f"{SYSLOG_REPLAY_FILE}.replaying"
+    if not os.path.exists(replaying):
+        if not os.path.exists(SYSLOG_REPLAY_FILE):
+            return {"replayed": 0, "forwarded": 0, "refused": 0}
+        os.replace(SYSLOG_REPLAY_FILE, replaying)
+
+    replayed = forwarded = refused = 0
+    with open(replaying, "rb") as replay_file:
+        batch = []
+        for line in replay_file:
+            try:
+                record = orjson.loads(line)
+                received_at = parse_time_expression(record["received_at"]) or datetime.now(timezone.utc)
+                batch.append((record["message"].encode(), record["source_ip"], received_at.timestamp()))
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                continue
+            if len(batch) >= SYSLOG_PARSE_BATCH:
+                counts = await process(batch)
+                forwarded, refused, replayed = forwarded + counts[0], refused + counts[1], replayed + len(batch)
+                batch = []
+        if batch:
+            counts = await process(batch)
+            forwarded, refused, replayed = forwarded + counts[0], refused + counts[1], replayed + len(batch)
+    os.remove(replaying)
+    return {"replayed": replayed, "forwarded": forwarded, "refused": refused}
+
+
+# --- Lifecycle ---
+
+_parse_task: Optional[asyncio.Task] = None
+_tcp_server: Optional[asyncio.AbstractServer] = None
+_udp_transport: Optional[asyncio.DatagramTransport] = None
+
+
+async def start():
+    """Opens the listeners. Messages are written through the ingest service's bulk writer."""
+    global _parse_task, _tcp_server, _udp_transport, _queue
+    if not SYSLOG_ENABLED or _parse_task is not None:
+        return
+    if not ingest_service.ingester.running:
+        print("WARNING: Syslog receiver not started: it needs the ingest service (INGEST_ENABLED).")
+        return
+    loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue(maxsize=SYSLOG_QUEUE_MAX)
+    _parse_task = asyncio.create_task(_parse_loop())
+
+    # reuse_port lets every worker of the API bind the same ports; the kernel spreads senders across them.
+    if SYSLOG_TCP_PORT:
+        ssl_context = None
+        if SYSLOG_TLS_CERT and SYSLOG_TLS_KEY:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(SYSLOG_TLS_CERT, SYSLOG_TLS_KEY)
+        _tcp_server = await asyncio.start_server(
+            _handle_tcp, SYSLOG_HOST, SYSLOG_TCP_PORT,
+            limit=SYSLOG_MAX_MESSAGE_BYTES, ssl=ssl_context, reuse_port=True,
+        )
+    if SYSLOG_UDP_PORT:
+        _udp_transport, _ = await loop.create_datagram_endpoint(
+            SyslogUDPProtocol, local_addr=(SYSLOG_HOST, SYSLOG_UDP_PORT), reuse_port=True,
+        )
+
+
+async def stop():
+    global _parse_task, _tcp_server, _udp_transport
+    if _udp_transport is not None:
+        _udp_transport.close()
+        _udp_transport = None
+    if _tcp_server is not None:
+        _tcp_server.close()
+        await _tcp_server.wait_closed()
+        _tcp_server = None
+    if _parse_task is not None:
+        _parse_task.cancel()
+        try:
+            await _parse_task
+        except asyncio.CancelledError:
+            pass
+        _parse_task = None
+
+
+def stats() -> dict:
+    return {
+        "enabled": SYSLOG_ENABLED,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "received": syslog_stats.received,
+        "forwarded": syslog_stats.forwarded,
+        "unparsed": syslog_stats.unparsed,
+        "dropped": syslog_stats.dropped,
+        "oversized": syslog_stats.oversized,
+        "refused": syslog_stats.refused,
+        "replay_written": syslog_stats.replay_written,
+        "replay_dropped": syslog_stats.replay_dropped,
+        "backpressure_waits": syslog_stats.backpressure_waits,
+        "tcp_connections": syslog_stats.tcp_connections,
+    }
+
+
+async def run_standalone(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Runs the receiver, the IP lists and the bulk writer without the API."""
+    ip_list_service.start()
+    ingest_service.start(client_provider)
+    await start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop()
+        await ingest_service.stop()
+        await ip_list_service.stop()
+
+
+if __name__ == "__main__":
+    # python -m services.syslog_receiver
+    from services import opensearch_service
+
+    async def main():
+        await opensearch_service.connect()
+        try:
+            await run_standalone(lambda: opensearch_service.client)
+        finally:
+            await opensearch_service.disconnect()
+
+    SYSLOG_ENABLED = True
+    asyncio.run(main())
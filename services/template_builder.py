@@ -0,0 +1,235 @@
+# sc-siem-corvette/services/template_builder.py
+import os
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from opensearchpy import AsyncOpenSearch, NotFoundError
+
+# Profiles registered (when missing or changed) at startup; empty disables it.
+TEMPLATE_STARTUP_PROFILES = [p.strip() for p in os.getenv("TEMPLATE_STARTUP_PROFILES", "syslog,network,windows").split(",") if p.strip()]
+TEMPLATE_SHARDS = int(os.getenv("TEMPLATE_SHARDS", 1))
+TEMPLATE_REPLICAS = int(os.getenv("TEMPLATE_REPLICAS", 1))
+# Log indices are searched seconds after ingest at the earliest; refreshing less often means fewer, larger segments.
+TEMPLATE_REFRESH_INTERVAL = os.getenv("TEMPLATE_REFRESH_INTERVAL", "5s")
+# Legacy template order; higher wins over hand-written templates matching the same indices.
+TEMPLATE_ORDER = int(os.getenv("TEMPLATE_ORDER", 10))
+
+TIMESTAMP_FIELD = "@timestamp"
+
+
+# --- Field types ---
+# Queries address exact values as '<field>.keyword' (Discover term filters,
+# the client_id tenant filter, dashboard rollups), so string fields keep the
+# text + keyword sub-field shape of dynamic mappings. The settings that make
+# them cheap are explicit: no norms (log search is not scored), and eager
+# global ordinals on the keyword sub-field of fields we facet on.
+
+def facet() -> dict:
+    return {
+        "type": "text",
+        "norms": False,
+        "fields": {"keyword": {"type": "keyword", "ignore_above": 256, "eager_global_ordinals": True}},
+    }
+
+
+def keyword() -> dict:
+    return {"type": "text", "norms": False, "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}}
+
+
+def message() -> dict:
+    """Free text that is searched but never sorted or aggregated on."""
+    return {"type": "text", "norms": False}
+
+
+def payload() -> dict:
+    """Kept in _source for display only: neither indexed nor stored as doc values."""
+    return {"type": "keyword", "index": False, "doc_values": False}
+
+
+def ip() -> dict:
+    return {"type": "ip", "fields": {"keyword": {"type": "keyword", "ignore_above": 64}}}
+
+
+def number(kind: str = "long") -> dict:
+    return {"type": kind}
+
+
+PROFILES: Dict[str, Dict[str, dict]] = {
+    "syslog": {
+        "client_id": facet(),
+        "host": facet(),
+        "severity": facet(),
+        "facility": facet(),
+        "program": facet(),
+        "syslog_format": facet(),
+        "source_ip": ip(),
+        "pid": keyword(),
+        "msgid": keyword(),
+        "message": message(),
+        "structured_data": payload(),
+    },
+    "network": {
+        "client_id": facet(),
+        "host": facet(),
+        "severity": facet(),
+        "action": facet(),
+        "protocol": facet(),
+        "direction": facet(),
+        "source_ip": ip(),
+        "destination_ip": ip(),
+        "source_port": number("integer"),
+        "destination_port": number("integer"),
+        "bytes": number(),
+        "packets": number(),
+        "rule": keyword(),
+        "message": message(),
+        "payload": payload(),
+    },
+    "windows": {
+        "client_id": facet(),
+        "host": facet(),
+        "severity": facet(),
+        "channel": facet(),
+        "provider": facet(),
+        "event_id": facet(),
+        "level": facet(),
+        "user": facet(),
+        "source_ip": ip(),
+        "record_id": number(),
+        "message": message(),
+        # Event-specific data varies per event id; mapping it would blow up the field count.
+        "event_data": {"type": "object", "enabled": False},
+    },
+}
+
+
+def build_template(profile: str, index_prefix: Optional[str] = None) -> dict:
+    """Builds the legacy index template of a profile for '<index_prefix>-*' indices."""
+    fields = PROFILES.get(profile)
+    if fields is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown template profile '{profile}'. Available: {', '.join(PROFILES)}"
+        )
+    index_prefix = index_prefix or profile
+    return {
+        "index_patterns": [f"{index_prefix}-*"],
+        "order": TEMPLATE_ORDER,
+        "settings": {
+            "index.number_of_shards": str(TEMPLATE_SHARDS),
+            "index.number_of_replicas": str(TEMPLATE_REPLICAS),
+            "index.refresh_interval": TEMPLATE_REFRESH_INTERVAL,
+            "index.codec": "best_compression",
+            # Segments sorted like Discover's default sort let newest-first searches stop early.
+            "index.sort.field": TIMESTAMP_FIELD,
+            "index.sort.order": "desc",
+            "index.query.default_field": "message",
+        },
+        "mappings": {
+            "dynamic_templates": [
+                {"strings": {"match_mapping_type": "string", "mapping": keyword()}},
+            ],
+            "properties": {TIMESTAMP_FIELD: {"type": "date"}, **fields},
+        },
+    }
+
+
+# --- Diffing ---
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, Any]:
+    if isinstance(value, dict):
+        flat: Dict[str, Any] = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    return {prefix: value}
+
+
+def _normalize(template: dict) -> Dict[str, Any]:
+    """
+    Flattens a template into comparable path -> value pairs. OpenSearch returns
+    settings as strings (with flat_settings) and may add defaults we don't set.
+    """
+    flat = {"order": template.get("order", 0), "index_patterns": sorted(template.get("index_patterns", []))}
+    for key, value in _flatten(template.get("settings", {})).items():
+        key = key if key.startswith("index.") else f"index.{key}"
+        flat[f"settings.{key}"] = [str(v) for v in value] if isinstance(value, list) else str(value)
+    for key, value in _flatten(template.get("mappings", {})).items():
+        flat[f"mappings.{key}"] = value
+    return flat
+
+
+def diff_templates(desired: dict, installed: Optional[dict]) -> List[dict]:
+    """
+    Lists the paths the desired template sets to a different value than the
+    installed one (all of them when it is missing). Paths only the installed
+    template has, such as defaults added by OpenSearch, are not differences.
+    """
+    want = _normalize(desired)
+    have = _normalize(installed) if installed is not None else {}
+    return [
+        {"path": path, "installed": have.get(path), "desired": value}
+        for path, value in sorted(want.items())
+        if have.get(path) != value
+    ]
+
+
+async def get_installed(os_client: AsyncOpenSearch, name: str) -> Optional[dict]:
+    try:
+        response = await os_client.indices.get_template(name=name, flat_settings=True)
+    except NotFoundError:
+        return None
+    return response.get(name)
+
+
+async def plan_profile(os_client: AsyncOpenSearch, profile: str, name: Optional[str] = None, index_prefix: Optional[str] = None) -> dict:
+    name = name or profile
+    desired = build_template(profile, index_prefix)
+    changes = diff_templates(desired, await get_installed(os_client, name))
+    return {"name": name, "profile": profile, "changes": changes, "template": desired}
+
+
+async def apply_profile(os_client: AsyncOpenSearch, profile: str, name: Optional[str] = None, index_prefix: Optional[str] = None) -> dict:
+    """Registers the profile's template if it differs from the installed one. Only new indices pick it up."""
+    plan = await plan_profile(os_client, profile, name, index_prefix)
+    plan["applied"] = bool(plan["changes"])
+    if plan["applied"]:
+        await os_client.indices.put_template(name=plan["name"], body=plan["template"])
+    return plan
+
+
+async def sync_startup_profiles(os_client: AsyncOpenSearch) -> List[str]:
+    """Registers the startup profiles whose templates changed. Returns their names."""
+    changed = []
+    for profile in TEMPLATE_STARTUP_PROFILES:
+        try:
+            if (await apply_profile(os_client, profile))["applied"]:
+                changed.append(profile)
+        except Exception as e:
+            print(f"WARNING: Could not register the '{profile}' index template: {e}")
+    if changed:
+        print(f"INFO: Registered index templates: {', '.join(changed)}")
+    return changed
+
+
+_sync_task: Optional[asyncio.Task] = None
+
+
+def start(client_provider: Callable[[], Optional[AsyncOpenSearch]]):
+    """Syncs the startup profiles in the background, without delaying startup."""
+    global _sync_task
+    os_client = client_provider()
+    if os_client is not None and TEMPLATE_STARTUP_PROFILES and _sync_task is None:
+        _sync_task = asyncio.create_task(sync_startup_profiles(os_client))
+
+
+async def stop():
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
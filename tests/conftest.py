@@ -0,0 +1,10 @@
+# sc-siem-corvette/tests/conftest.py
+import os
+import sys
+
+# database.database refuses to import without a DATABASE_URL. The tests never
+# open a connection, so a throwaway SQLite URL is enough.
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./test.db")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# sc-siem-corvette/tests/test_alert_service.py
+from datetime import datetime, timezone, timedelta
+
+from models.alert import AlertRule
+from services.alert_service import ALERT_MAX_LOOKBACK_SECONDS, build_rule_search, rule_matches, window_start
+
+START = datetime(2026, 10, 18, 11, 0, 30, tzinfo=timezone.utc)
+END = datetime(2026, 10, 18, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _rule(**fields) -> AlertRule:
+    return AlertRule(id=1, name="r", index_pattern="syslog-*", query={"match_all": {}}, threshold=10, interval_seconds=300, **fields)
+
+
+def test_catch_up_span_is_held_against_the_threshold_per_window():
+    # An hour of catch-up with 5 events in each 5-minute window: 60 in total, but no window reaches 10.
+    rule = _rule()
+    quiet = {"aggregations": {"windows": {"buckets": [
+        {"key": _ms(START.replace(second=0) + timedelta(minutes=5 * n)), "doc_count": 5} for n in range(12)
+    ]}}}
+    assert rule_matches(rule, quiet, START, END) == []
+
+    busy = {"aggregations": {"windows": {"buckets": [
+        {"key": _ms(START.replace(second=0)), "doc_count": 12},
+        {"key": _ms(END - timedelta(minutes=5)), "doc_count": 10},
+    ]}}}
+    assert rule_matches(rule, busy, START, END) == [
+        # The first window is clipped to the span that was searched.
+        ("", 12, START, START.replace(second=0) + timedelta(minutes=5)),
+        ("", 10, END - timedelta(minutes=5), END),
+    ]
+
+
+def test_grouped_rules_match_per_window_and_value():
+    rule = _rule(group_by="host.keyword")
+    response = {"aggregations": {"windows": {"buckets": [
+        {"key": _ms(END - timedelta(minutes=10)), "doc_count": 30, "groups": {"buckets": [
+            {"key": "a", "doc_count": 25}, {"key": "b", "doc_count": 5},
+        ]}},
+        {"key": _ms(END - timedelta(minutes=5)), "doc_count": 11, "groups": {"buckets": [
+            {"key": "b", "doc_count": 11},
+        ]}},
+    ]}}}
+    assert rule_matches(rule, response, START, END) == [
+        ("a", 25, END - timedelta(minutes=10), END - timedelta(minutes=5)),
+        ("b", 11, END - timedelta(minutes=5), END),
+    ]
+
+
+def test_rule_search_splits_the_span_into_interval_windows():
+    _, body = build_rule_search(_rule(group_by="host.keyword"), START, END)
+    windows = body["aggs"]["windows"]
+    assert windows["date_histogram"] == {"field": "@timestamp", "fixed_interval": "300s", "min_doc_count": 10}
+    assert windows["aggs"]["groups"]["terms"]["field"] == "host.keyword"
+    assert body["size"] == 0
+
+
+def test_rules_with_intervals_longer_than_the_lookback_search_whole_windows():
+    daily = AlertRule(id=2, name="daily", index_pattern="syslog-*", threshold=10, interval_seconds=86400,
+                      watermark=END - timedelta(days=1))
+    assert daily.interval_seconds > ALERT_MAX_LOOKBACK_SECONDS
+    assert window_start(daily, END) == END - timedelta(days=1)
+
+
+def test_catch_up_after_downtime_is_clamped_to_the_lookback():
+    rule = _rule(watermark=END - timedelta(days=2))
+    assert window_start(rule, END) == END - timedelta(seconds=ALERT_MAX_LOOKBACK_SECONDS)
+    rule = _rule(watermark=END - timedelta(minutes=5))
+    assert window_start(rule, END) == END - timedelta(minutes=5)
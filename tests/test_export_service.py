@@ -0,0 +1,95 @@
+# sc-siem-corvette/tests/test_export_service.py
+import asyncio
+import contextlib
+
+import pytest
+from fastapi import HTTPException
+
+from services import export_service, search_scheduler
+
+
+class SheddingScheduler:
+    """Sheds the first `shed` slot requests with 503, like a full background lane."""
+
+    def __init__(self, shed: int):
+        self.shed = shed
+        self.requests = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, client_id, lane=search_scheduler.INTERACTIVE):
+        self.requests += 1
+        if self.requests <= self.shed:
+            raise HTTPException(status_code=503, detail="Search queue is full")
+        yield
+
+
+class FakeSearchClient:
+    def __init__(self, pages):
+        self.pages = list(pages)
+
+    async def search(self, body, **kwargs):
+        hits = self.pages.pop(0)
+        return {"pit_id": "pit", "hits": {"hits": [{"_source": hit, "sort": [n]} for n, hit in enumerate(hits)]}}
+
+
+def _export(monkeypatch, shed: int, attempts: int) -> bytes:
+    async def no_sleep(seconds):
+        pass
+
+    async def no_close(pit_id):
+        pass
+
+    monkeypatch.setattr(search_scheduler, "scheduler", SheddingScheduler(shed))
+    monkeypatch.setattr(export_service.asyncio, "sleep", no_sleep)
+    monkeypatch.setattr(export_service.opensearch_service, "close_point_in_time", no_close)
+    monkeypatch.setattr(export_service, "EXPORT_PAGE_SIZE", 2)
+    monkeypatch.setattr(export_service, "EXPORT_PAGE_MAX_ATTEMPTS", attempts)
+    client = FakeSearchClient([[{"n": 1}, {"n": 2}], [{"n": 3}]])
+
+    async def run():
+        query = {"query": {"match_all": {}}, "size": 2, "sort": [{"@timestamp": "desc"}]}
+        return b"".join([chunk async for chunk in export_service._stream_pages(client, query, "pit", "ndjson", None, False)])
+
+    return asyncio.run(run())
+
+
+def test_shed_pages_are_retried(monkeypatch):
+    assert _export(monkeypatch, shed=2, attempts=3) == b'{"n": 1}\n{"n": 2}\n{"n": 3}\n'
+
+
+def test_export_fails_loudly_once_retries_are_exhausted(monkeypatch):
+    with pytest.raises(HTTPException) as raised:
+        _export(monkeypatch, shed=3, attempts=3)
+    assert raised.value.status_code == 503
+
+
+def test_export_pages_follow_a_size_lowered_by_the_cost_guard(monkeypatch):
+    # The guard caps pages of an expensive export below EXPORT_PAGE_SIZE; the export must still read every page.
+    from schemas.discover import DiscoverRequest
+
+    def downgrading_guard(body, index_target, request, truncate=True):
+        body["size"] = 1
+        return ["size capped to 1"]
+
+    async def fixed(*args, **kwargs):
+        return "pit"
+
+    async def nothing(*args, **kwargs):
+        pass
+
+    service = export_service.opensearch_service
+    client = FakeSearchClient([[{"n": 1}], [{"n": 2}], [{"n": 3}], []])
+    monkeypatch.setattr(search_scheduler, "scheduler", SheddingScheduler(0))
+    monkeypatch.setattr(service, "get_client", lambda: client)
+    monkeypatch.setattr(service, "load_field_types", nothing)
+    monkeypatch.setattr(service, "resolve_index_target", lambda request: "syslog-2026.10.18")
+    monkeypatch.setattr(service, "admit_search", downgrading_guard)
+    monkeypatch.setattr(service, "open_point_in_time", fixed)
+    monkeypatch.setattr(service, "close_point_in_time", nothing)
+    monkeypatch.setattr(export_service, "EXPORT_PAGE_SIZE", 2)
+
+    async def run():
+        pages = await export_service.export_logs(DiscoverRequest(index_pattern="syslog-*"))
+        return b"".join([chunk async for chunk in pages])
+
+    assert asyncio.run(run()) == b'{"n": 1}\n{"n": 2}\n{"n": 3}\n'
@@ -0,0 +1,76 @@
+# sc-siem-corvette/tests/test_filter_compiler.py
+import pytest
+from fastapi import HTTPException
+
+from schemas.discover import DynamicFilter
+from services.field_catalog import FieldInfo
+from services.filter_compiler import compile_filter
+
+FIELDS = {
+    "host": FieldInfo("host", ("text",), True, False, keyword_variant="host.keyword"),
+    "message": FieldInfo("message", ("text",), True, False),
+    "severity": FieldInfo("severity", ("keyword",), True, True),
+    "bytes": FieldInfo("bytes", ("long",), True, True),
+    "source_ip": FieldInfo("source_ip", ("ip",), True, True),
+    "payload": FieldInfo("payload", ("keyword",), False, False),
+}
+
+
+def _compile(fields=FIELDS, **kwargs) -> dict:
+    return compile_filter(DynamicFilter(**kwargs), fields)
+
+
+def _rejected(**kwargs) -> str:
+    with pytest.raises(HTTPException) as error:
+        _compile(**kwargs)
+    assert error.value.status_code == 400
+    return error.value.detail
+
+
+def test_term_on_text_uses_its_keyword_variant():
+    assert _compile(field="host", value="web-1") == {"term": {"host.keyword": "web-1"}}
+
+
+def test_term_on_exact_fields_uses_the_field_itself():
+    assert _compile(field="severity", value="err") == {"term": {"severity": "err"}}
+    assert _compile(field="source_ip", value="10.0.0.0/8") == {"term": {"source_ip": "10.0.0.0/8"}}
+
+
+def test_list_values_become_a_deduplicated_terms_query():
+    assert _compile(field="severity", value=["err", "crit", "err"]) == {"terms": {"severity": ["err", "crit"]}}
+
+
+def test_term_on_text_without_keyword_falls_back_to_phrases():
+    assert _compile(field="message", value="disk full") == {"match_phrase": {"message": "disk full"}}
+    assert _compile(field="message", value=["a b", "c"]) == {
+        "bool": {"should": [{"match_phrase": {"message": "a b"}}, {"match_phrase": {"message": "c"}}], "minimum_should_match": 1}
+    }
+
+
+def test_unknown_field_types_assume_dynamic_mappings():
+    assert _compile(fields=None, field="host", value="web-1") == {"term": {"host.keyword": "web-1"}}
+    assert _compile(fields=None, field="host.keyword", value="web-1") == {"term": {"host.keyword": "web-1"}}
+
+
+def test_range_on_text_uses_its_keyword_variant():
+    assert _compile(field="bytes", value=100, type="range", operator="gte") == {"range": {"bytes": {"gte": 100}}}
+    assert _compile(field="host", value="m", type="range", operator="lt") == {"range": {"host.keyword": {"lt": "m"}}}
+
+
+def test_match_is_passed_through():
+    assert _compile(field="message", value="disk", type="match") == {"match": {"message": "disk"}}
+
+
+def test_values_the_field_type_cannot_hold_are_rejected():
+    assert "numeric" in _rejected(field="bytes", value="lots")
+    assert "numeric" in _rejected(field="bytes", value=True)
+    assert "IP" in _rejected(field="source_ip", value="not-an-ip")
+
+
+def test_malformed_filters_are_rejected():
+    assert "not indexed" in _rejected(field="payload", value="x")
+    assert "concrete field" in _rejected(field="host*", value="x")
+    assert "Unsupported" in _rejected(field="host", value="x", type="wildcard")
+    assert "operator" in _rejected(field="bytes", value=1, type="range")
+    assert "no values" in _rejected(field="host", value=[])
+    assert "invalid value" in _rejected(field="host", value=[{"nested": 1}])
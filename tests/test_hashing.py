@@ -0,0 +1,32 @@
+# sc-siem-corvette/tests/test_hashing.py
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from utils import hashing
+
+
+def test_cancelled_calls_hold_their_slot_until_the_pool_is_done(monkeypatch):
+    monkeypatch.setattr(hashing, "HASHING_MAX_PENDING", 1)
+    release = threading.Event()
+
+    async def run():
+        login = asyncio.create_task(hashing._run_in_hashing_pool(release.wait, 5))
+        await asyncio.sleep(0.05)
+        login.cancel()  # The client went away, but bcrypt is still running
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as raised:
+            await hashing._run_in_hashing_pool(release.wait, 5)
+        assert raised.value.status_code == 429
+
+        release.set()
+        for _ in range(100):
+            if hashing._pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await hashing._run_in_hashing_pool(len, "ok") == 2
+
+    asyncio.run(run())
+    assert hashing._pending == 0
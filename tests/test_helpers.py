@@ -0,0 +1,26 @@
+# sc-siem-corvette/tests/test_helpers.py
+from datetime import datetime, timezone
+
+from utils.helpers import parse_time_expression
+
+NOW = datetime(2026, 10, 18, 12, 30, 0, tzinfo=timezone.utc)
+
+
+def test_time_expressions():
+    assert parse_time_expression("now-15m", NOW) == datetime(2026, 10, 18, 12, 15, tzinfo=timezone.utc)
+    assert parse_time_expression("now-1d/d", NOW) == datetime(2026, 10, 17, tzinfo=timezone.utc)
+    assert parse_time_expression("now/d", NOW, round_up=True) == datetime(2026, 10, 18, 23, 59, 59, 999000, tzinfo=timezone.utc)
+    assert parse_time_expression("1760000000000", NOW) == datetime(2025, 10, 9, 8, 53, 20, tzinfo=timezone.utc)
+    assert parse_time_expression("2026-10-18T14:30:00+02:00", NOW) == NOW.replace(hour=12)
+
+
+def test_out_of_range_time_expressions_are_not_interpreted():
+    for value in (
+        "99999999999999999999",  # Epoch beyond the platform's time_t
+        "now-99999y",
+        "now+999999999d",
+        "now+7999y/y",  # Rounding up past year 9999
+        "0001-01-01T00:00:00+01:00",  # In range only until converted to UTC
+        "yesterday",
+    ):
+        assert parse_time_expression(value, NOW, round_up=True) is None, value
@@ -0,0 +1,86 @@
+# sc-siem-corvette/tests/test_ingest_service.py
+import asyncio
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from services import ingest_service, percolator_service
+from services.ingest_service import BulkIngester, PendingDocument, daily_index
+
+
+class FakeBulkClient:
+    """Indexes by _id like OpenSearch does; the first request times out after indexing its batch."""
+
+    def __init__(self):
+        self.indexed = {}
+        self.requests = 0
+
+    async def bulk(self, body, **kwargs):
+        self.requests += 1
+        items = []
+        for action in body.splitlines()[::2]:
+            document_id = orjson.loads(action)["create"]["_id"]
+            items.append({"create": {"status": 409 if document_id in self.indexed else 201}})
+            self.indexed[document_id] = self.indexed.get(document_id, 0) + 1
+        if self.requests == 1:
+            raise TimeoutError("client-side timeout")
+        return {"errors": any(item["create"]["status"] != 201 for item in items), "items": items}
+
+
+def test_resending_a_timed_out_batch_does_not_index_twice(monkeypatch):
+    monkeypatch.setattr(ingest_service, "INGEST_RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(percolator_service, "submit", lambda documents: None)
+
+    async def run():
+        ingester, client = BulkIngester(), FakeBulkClient()
+        ingester.enqueue([PendingDocument("syslog-2026-10-18", {"message": str(i)}, 16, 0) for i in range(5)])
+        await ingester.send(client, ingester._take())
+        await asyncio.sleep(0.01)
+        await ingester.send(client, ingester._take())
+        return ingester, client
+
+    ingester, client = asyncio.run(run())
+    assert set(client.indexed.values()) == {2}  # Every document was sent twice...
+    assert ingester.stats.indexed == 5          # ...but counted, and stored, once
+    assert ingester.stats.failed == 0
+
+
+def test_daily_index_refuses_days_outside_the_accepted_range(monkeypatch):
+    monkeypatch.setattr(ingest_service, "INGEST_MAX_AGE_DAYS", 30)
+    monkeypatch.setattr(ingest_service, "INGEST_MAX_FUTURE_SECONDS", 900)
+    now = datetime(2026, 10, 18, 23, 50, tzinfo=timezone.utc)
+
+    assert daily_index("syslog", {"@timestamp": "2026-09-18T00:00:00Z"}, now) == "syslog-2026-09-18"
+    assert daily_index("syslog", {"@timestamp": "2026-10-19T00:04:00+00:00"}, now) == "syslog-2026-10-19"
+    for value in ("2026-09-17T23:59:59Z", "1999-01-01T00:00:00Z", "2026-10-20T00:00:00Z", "9999-12-31T00:00:00+00:00", 4102444800000):
+        with pytest.raises(ValueError):
+            daily_index("syslog", {"@timestamp": value}, now)
+
+    document = {"@timestamp": "not a time"}
+    assert daily_index("syslog", document, now) == "syslog-2026-10-18"
+    assert document["@timestamp"] == now.isoformat()
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _parse(*chunks: bytes) -> list:
+    return [item async for item in ingest_service.parse_ndjson(_chunks(*chunks))]
+
+
+def test_parse_ndjson_joins_lines_split_across_chunks():
+    parsed = asyncio.run(_parse(b'{"a": 1}\n{"b"', b': 2}\n\n[1]\n{"c', b'": 3}'))
+    assert parsed == [(1, {"a": 1}, 8), (2, {"b": 2}, 8), (4, None, 3), (5, {"c": 3}, 8)]
+
+
+def test_parse_ndjson_rejects_overlong_lines(monkeypatch):
+    monkeypatch.setattr(ingest_service, "INGEST_MAX_LINE_BYTES", 16)
+    assert len(asyncio.run(_parse(b'{"a": "' + b"x" * 7 + b'"}\n'))) == 1  # Exactly 16 bytes
+    for chunks in ([b'{"a": "' + b"x" * 20], [b'{"a": "' + b"x" * 20 + b'"}\n{}\n'], [b"x" * 10, b"x" * 10]):
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(_parse(*chunks))
+        assert raised.value.status_code == 413
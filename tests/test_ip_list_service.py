@@ -0,0 +1,76 @@
+# sc-siem-corvette/tests/test_ip_list_service.py
+import ipaddress
+
+from services.ip_list_service import IPListIndex, PrefixTable, normalize_cidr
+
+
+def _v4(address: str) -> int:
+    return int(ipaddress.ip_address(address))
+
+
+def test_longest_prefix_wins():
+    table = PrefixTable(32)
+    for cidr in ("10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24"):
+        table.add(normalize_cidr(cidr))
+    assert table.longest_match(_v4("10.1.2.3")) == 24
+    assert table.longest_match(_v4("10.1.9.9")) == 16
+    assert table.longest_match(_v4("10.200.0.1")) == 8
+    assert table.longest_match(_v4("192.168.0.1")) == -1
+    assert len(table) == 3
+
+
+def test_host_bits_are_ignored_and_default_route_matches_everything():
+    table = PrefixTable(32)
+    table.add(normalize_cidr("192.168.1.77/24"))
+    table.add(normalize_cidr("0.0.0.0/0"))
+    assert table.longest_match(_v4("192.168.1.1")) == 24
+    assert table.longest_match(_v4("8.8.8.8")) == 0
+
+
+def test_remove_drops_empty_prefix_lengths():
+    table = PrefixTable(32)
+    table.add(normalize_cidr("10.0.0.0/8"))
+    table.add(normalize_cidr("10.1.0.0/16"))
+    table.remove(normalize_cidr("10.1.0.0/16"))
+    table.remove(normalize_cidr("172.16.0.0/12"))  # Never added: a no-op
+    assert table.longest_match(_v4("10.1.2.3")) == 8
+    assert table._lengths == [8]
+    assert len(table) == 1
+
+
+def test_ipv6_prefixes():
+    table = PrefixTable(128)
+    table.add(normalize_cidr("2001:db8::/32"))
+    table.add(normalize_cidr("2001:db8:1::/48"))
+    assert table.longest_match(int(ipaddress.ip_address("2001:db8:1::1"))) == 48
+    assert table.longest_match(int(ipaddress.ip_address("2001:db8:2::1"))) == 32
+    assert table.longest_match(int(ipaddress.ip_address("2001:db9::1"))) == -1
+
+
+def test_check_prefers_longest_match_across_tenant_and_global_lists():
+    index = IPListIndex()
+    index._list(None).apply("add", "deny", normalize_cidr("10.0.0.0/8"))
+    index._list("c1").apply("add", "allow", normalize_cidr("10.1.0.0/16"))
+    index._list("c1").apply("add", "deny", normalize_cidr("10.1.0.0/16"))
+
+    verdicts, matches = index.check("c1", ["10.1.2.3", "10.9.0.1", "::ffff:10.9.0.1", "172.16.0.1", "nope"])
+    # Deny wins the /16 tie, the global /8 denies the rest of 10/8, IPv4-mapped
+    # addresses are looked up as IPv4, and with an allow list in use unlisted
+    # addresses are refused.
+    assert verdicts == [False, False, False, False, None]
+    assert matches == ["10.1.0.0/16", "10.0.0.0/8", "10.0.0.0/8", None, None]
+
+
+def test_source_clients_use_source_lists_and_report_ties():
+    index = IPListIndex()
+    index._list("c1").apply("add", "source", normalize_cidr("10.0.0.0/8"))
+    index._list("c2").apply("add", "source", normalize_cidr("10.1.0.0/16"))
+    index._list("c3").apply("add", "source", normalize_cidr("10.1.0.0/16"))
+    index._list("c4").apply("add", "allow", normalize_cidr("0.0.0.0/0"))  # Allow entries never attribute
+
+    assert index.source_clients("10.9.0.1") == ["c1"]
+    assert sorted(index.source_clients("10.1.2.3")) == ["c2", "c3"]
+    assert index.source_clients("192.0.2.1") == []
+    assert index.source_clients("nope") == []
+    # Source entries do not make an allow list: c1 still accepts unlisted addresses.
+    assert index.check("c1", ["192.0.2.1"])[0] == [True]
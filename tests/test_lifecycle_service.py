@@ -0,0 +1,60 @@
+# sc-siem-corvette/tests/test_lifecycle_service.py
+from datetime import date
+
+from models.lifecycle import LifecyclePolicy
+from services.lifecycle_service import IndexState, index_actions, plan_policy
+
+TODAY = date(2026, 10, 18)
+
+
+def _policy(**overrides) -> LifecyclePolicy:
+    values = dict(
+        id=1, template_name="syslog", index_prefix="syslog", create_ahead=True,
+        force_merge_after_days=1, read_only_after_days=7, read_only_replicas=0, delete_after_days=30,
+    )
+    values.update(overrides)
+    return LifecyclePolicy(**values)
+
+
+def _state(days_old: int, **overrides) -> IndexState:
+    day = date.fromordinal(TODAY.toordinal() - days_old)
+    values = dict(name=f"syslog-{day.isoformat()}", day=day, segments=12, shards=3, replicas=1)
+    values.update(overrides)
+    return IndexState(**values)
+
+
+def _names(actions):
+    return [action for action, _ in actions]
+
+
+def test_todays_index_is_left_alone():
+    assert index_actions(_policy(), _state(0), TODAY) == []
+
+
+def test_force_merge_only_while_there_are_extra_segments():
+    assert _names(index_actions(_policy(), _state(1), TODAY)) == ["force_merge"]
+    assert index_actions(_policy(), _state(1, segments=3), TODAY) == []
+
+
+def test_read_only_until_writes_are_blocked_and_replicas_dropped():
+    assert _names(index_actions(_policy(), _state(7), TODAY)) == ["read_only", "force_merge"]
+    assert _names(index_actions(_policy(), _state(7, read_only=True), TODAY)) == ["read_only", "force_merge"]
+    assert index_actions(_policy(), _state(7, read_only=True, replicas=0, segments=3), TODAY) == []
+
+
+def test_delete_replaces_every_other_step():
+    assert _names(index_actions(_policy(), _state(30), TODAY)) == ["delete"]
+
+
+def test_disabled_steps_are_skipped():
+    policy = _policy(force_merge_after_days=None, read_only_after_days=None, delete_after_days=None)
+    assert index_actions(policy, _state(400), TODAY) == []
+
+
+def test_plan_creates_tomorrows_index_once():
+    states = {state.name: state for state in (_state(0), _state(1, segments=3))}
+    actions = plan_policy(_policy(), states, TODAY)
+    assert [(a.index, a.action) for a in actions] == [("syslog-2026-10-19", "create")]
+
+    states["syslog-2026-10-19"] = _state(-1)
+    assert plan_policy(_policy(), states, TODAY) == []
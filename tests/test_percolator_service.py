@@ -0,0 +1,48 @@
+# sc-siem-corvette/tests/test_percolator_service.py
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from services import percolator_service
+from services.percolator_service import RuleSnapshot
+
+NOW = datetime(2026, 10, 18, 12, 0, 30, tzinfo=timezone.utc)
+
+
+class FakePercolateClient:
+    """Answers percolate searches with one hit per matching rule, a page at a time in rule_id order."""
+
+    def __init__(self, rule_ids):
+        self.rule_ids = sorted(rule_ids)
+        self.bodies = []
+
+    async def search(self, index, body, **kwargs):
+        self.bodies.append(dict(body))
+        after = body.get("search_after", [-1])[0]
+        page = [rule_id for rule_id in self.rule_ids if rule_id > after][:body["size"]]
+        return {"hits": {"hits": [
+            {"_source": {"rule_id": rule_id}, "sort": [rule_id], "fields": {"_percolator_document_slot": [0]}}
+            for rule_id in page
+        ]}}
+
+
+def test_every_matching_rule_is_counted_across_pages_with_the_rules_as_matched(monkeypatch):
+    rules = {rule_id: RuleSnapshot(rule_id, "syslog-*", None, 5, 60) for rule_id in range(1, 8)}
+    counted = {}
+
+    async def count_matches(matches, matched_rules, now):
+        percolator_service._rules.clear()  # A rule refresh while the counts are written must not matter
+        counted.update(matches=matches, rules=matched_rules)
+
+    monkeypatch.setattr(percolator_service, "_rules", dict(rules))
+    monkeypatch.setattr(percolator_service, "_rules_loaded_at", time.monotonic())
+    monkeypatch.setattr(percolator_service, "ALERT_PERCOLATE_MAX_RULES", 3)
+    monkeypatch.setattr(percolator_service, "_count_matches", count_matches)
+    client = FakePercolateClient(rules)
+
+    asyncio.run(percolator_service.percolate(client, [("syslog-2026-10-18", {"@timestamp": NOW.isoformat()})], NOW))
+
+    assert len(client.bodies) == 3  # Pages of 3, 3 and 1 rules
+    window = int(NOW.timestamp()) // 60 * 60
+    assert counted["matches"] == {(rule_id, "", window): 1 for rule_id in rules}
+    assert counted["rules"] == rules
@@ -0,0 +1,29 @@
+# sc-siem-corvette/tests/test_principal_cache.py
+from utils.principal_cache import Principal, PrincipalCache
+
+
+def _principal(role_id: int = 1) -> Principal:
+    return Principal(
+        user_id=1, username="alice", client_id="acme", is_active=True,
+        role_id=role_id, role_name="analyst", permissions=frozenset({"can_view_logs"}),
+    )
+
+
+def test_principal_loaded_before_an_invalidation_is_not_cached():
+    cache = PrincipalCache(ttl=60)
+    generation = cache.generation
+    # Another session commits a role change while this request is still loading.
+    cache.invalidate_role(1)
+    cache.put(_principal(), generation)
+    assert cache.get("alice") is None
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_principal_loaded_without_concurrent_changes_is_cached():
+    cache = PrincipalCache(ttl=60)
+    generation = cache.generation
+    cache.put(_principal(), generation)
+    assert cache.get("alice") == _principal()
+
+    cache.invalidate_user("alice")
+    assert cache.get("alice") is None
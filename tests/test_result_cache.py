@@ -0,0 +1,62 @@
+# sc-siem-corvette/tests/test_result_cache.py
+import time
+import struct
+import asyncio
+from datetime import datetime, timezone
+
+import orjson
+
+from schemas.discover import TimeRange
+from services.result_cache import RESULT_CACHE_BUCKET_SECONDS, ResultCache, normalize_time_range
+
+NOW = datetime(2026, 10, 18, 12, 0, 7, tzinfo=timezone.utc)
+
+
+def _range(start: str, end: str) -> TimeRange:
+    return TimeRange(**{"from": start, "to": end})
+
+
+def test_relative_bounds_snap_outwards_to_the_grid():
+    normalized, is_live = normalize_time_range(_range("now-15m", "now"), now=NOW)
+    start, end = int(normalized.from_), int(normalized.to)
+    assert start % (RESULT_CACHE_BUCKET_SECONDS * 1000) == 0
+    assert end % (RESULT_CACHE_BUCKET_SECONDS * 1000) == 0
+    assert start <= int(NOW.timestamp() * 1000) - 15 * 60 * 1000
+    assert end >= int(NOW.timestamp() * 1000)
+    assert is_live
+
+
+def test_requests_within_one_bucket_share_a_range():
+    first, _ = normalize_time_range(_range("now-1h", "now"), now=NOW)
+    second, _ = normalize_time_range(_range("now-1h", "now"), now=NOW.replace(second=9))
+    assert (first.from_, first.to) == (second.from_, second.to)
+
+
+def test_absolute_bounds_pass_through_and_are_historical():
+    time_range = _range("2026-10-01T00:00:00.000Z", "2026-10-02T00:00:00.000Z")
+    normalized, is_live = normalize_time_range(time_range, now=NOW)
+    assert (normalized.from_, normalized.to) == (time_range.from_, time_range.to)
+    assert not is_live
+
+
+def test_unparseable_relative_bound_is_left_alone():
+    normalized, is_live = normalize_time_range(_range("now-banana", "now"), now=NOW)
+    assert normalized.from_ == "now-banana"
+    assert is_live
+
+
+def test_spill_files_of_an_earlier_process_are_adopted_or_removed(tmp_path):
+    def spill(key: str, expires_at: float, payload: bytes = b'{"hits": 1}', suffix: str = ".bin"):
+        (tmp_path / f"{key}{suffix}").write_bytes(struct.pack("!d", expires_at) + payload)
+
+    live, expired, partial, over_budget = "a" * 64, "b" * 64, "c" * 64, "d" * 64
+    spill(live, time.time() + 600)
+    spill(over_budget, time.time() + 60, b"x" * 100)
+    spill(expired, time.time() - 1)
+    spill(partial, time.time() + 600, suffix=".bin.tmp")
+    (tmp_path / "notes.txt").write_text("not ours")
+
+    cache = ResultCache(max_bytes=1024, spill_dir=str(tmp_path), spill_max_bytes=len(orjson.dumps({"hits": 1})) + 50)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{live}.bin", "notes.txt"]
+    assert cache.stats()["spilled_entries"] == 1
+    assert asyncio.run(cache.get(live)) == {"hits": 1}
@@ -0,0 +1,104 @@
+# sc-siem-corvette/tests/test_search_job_service.py
+import pytest
+from fastapi import HTTPException
+
+from schemas.discover import DiscoverRequest
+from services.search_job_service import SEARCH_JOB_MAX_WINDOWS, merge_aggregations, merge_hits, plan_windows
+
+DAY_MS = 86400 * 1000
+OCT_1_MS = 1790812800000  # 2026-10-01T00:00:00Z
+
+
+def _request(start: str, end: str, **kwargs) -> DiscoverRequest:
+    return DiscoverRequest(**{"index_pattern": "syslog-*", "time_range": {"from": start, "to": end}, **kwargs})
+
+
+# --- plan_windows ---
+
+def test_windows_are_aligned_to_utc_days_newest_first():
+    windows = plan_windows(_request("2026-10-01T12:00:00Z", "2026-10-03T06:00:00Z"))
+    assert windows == [
+        (OCT_1_MS + 2 * DAY_MS, OCT_1_MS + 2 * DAY_MS + 6 * 3600 * 1000),
+        (OCT_1_MS + DAY_MS, OCT_1_MS + 2 * DAY_MS - 1),
+        (OCT_1_MS + 12 * 3600 * 1000, OCT_1_MS + DAY_MS - 1),
+    ]
+
+
+def test_ascending_time_sort_searches_oldest_first():
+    request = _request("2026-10-01T00:00:00Z", "2026-10-03T00:00:00Z", sort=[{"field": "@timestamp", "order": "asc"}])
+    windows = plan_windows(request)
+    assert windows == sorted(windows)
+    assert windows[0][0] == OCT_1_MS
+
+
+def test_long_ranges_are_widened_to_the_window_budget():
+    windows = plan_windows(_request("2016-01-01T00:00:00Z", "2026-01-01T00:00:00Z"))
+    assert len(windows) <= SEARCH_JOB_MAX_WINDOWS
+    # Contiguous, covering the whole range, and still cut on UTC midnights.
+    ordered = sorted(windows)
+    assert all(a[1] + 1 == b[0] for a, b in zip(ordered, ordered[1:]))
+    assert all(start % DAY_MS == 0 for start, _ in ordered)
+
+
+@pytest.mark.parametrize("time_range", [None, ("2026-10-02T00:00:00Z", "2026-10-01T00:00:00Z"), ("garbage", "now")])
+def test_jobs_need_a_valid_time_range(time_range):
+    request = DiscoverRequest(index_pattern="syslog-*") if time_range is None else _request(*time_range)
+    with pytest.raises(HTTPException) as error:
+        plan_windows(request)
+    assert error.value.status_code == 400
+
+
+# --- merge_aggregations ---
+
+def test_terms_counts_are_summed_and_trimmed_to_size():
+    aggs = {"hosts": {"terms": {"field": "host.keyword", "size": 2}}}
+    merged = merge_aggregations(aggs, {}, {"hosts": {"buckets": [{"key": "a", "doc_count": 5}, {"key": "b", "doc_count": 4}], "sum_other_doc_count": 1}})
+    merged = merge_aggregations(aggs, merged, {"hosts": {"buckets": [{"key": "c", "doc_count": 3}, {"key": "b", "doc_count": 3}], "sum_other_doc_count": 0}})
+    assert merged == {"hosts": {
+        "doc_count_error_upper_bound": 0,
+        "sum_other_doc_count": 1 + 3,
+        "buckets": [{"key": "b", "doc_count": 7}, {"key": "a", "doc_count": 5}],
+    }}
+
+
+def test_histograms_and_metrics_combine_across_windows():
+    aggs = {
+        "over_time": {"date_histogram": {"field": "@timestamp", "fixed_interval": "1d"}, "aggs": {"bytes": {"sum": {"field": "bytes"}}}},
+        "latency": {"stats": {"field": "latency"}},
+        "slowest": {"max": {"field": "latency"}},
+    }
+    first = {
+        "over_time": {"buckets": [{"key": 2, "doc_count": 1, "bytes": {"value": 10}}]},
+        "latency": {"count": 2, "min": 1, "max": 5, "avg": 3, "sum": 6},
+        "slowest": {"value": 5},
+    }
+    second = {
+        "over_time": {"buckets": [{"key": 1, "doc_count": 2, "bytes": {"value": 1}}, {"key": 2, "doc_count": 1, "bytes": {"value": 5}}]},
+        "latency": {"count": 0, "min": None, "max": None, "avg": None, "sum": 0},
+        "slowest": {"value": None},
+    }
+    merged = merge_aggregations(aggs, merge_aggregations(aggs, {}, first), second)
+    assert merged["over_time"]["buckets"] == [
+        {"key": 1, "doc_count": 2, "bytes": {"value": 1}},
+        {"key": 2, "doc_count": 2, "bytes": {"value": 15}},
+    ]
+    assert merged["latency"] == {"count": 2, "min": 1, "max": 5, "avg": 3, "sum": 6}
+    assert merged["slowest"] == {"value": 5}
+
+
+# --- merge_hits ---
+
+def _hit(doc_id: str, *sort):
+    return {"_index": "syslog-x", "_id": doc_id, "_source": {}, "_score": None, "sort": list(sort)}
+
+
+def test_hits_keep_the_best_by_sort_values():
+    merged = merge_hits([], [_hit("a", 30), _hit("b", 10)], ["desc"], keep=2)
+    merged = merge_hits(merged, [_hit("c", 20), _hit("d", 5)], ["desc"], keep=2)
+    assert [hit["_id"] for hit in merged] == ["a", "c"]
+    assert all("_score" not in hit for hit in merged)
+
+
+def test_hits_sort_on_several_keys_with_missing_values_last():
+    merged = merge_hits([], [_hit("a", 1, "x"), _hit("b", None, "a"), _hit("c", 1, "b"), _hit("d", 2, "a")], ["asc", "desc"], keep=10)
+    assert [hit["_id"] for hit in merged] == ["a", "c", "d", "b"]
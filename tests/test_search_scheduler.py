@@ -0,0 +1,192 @@
+# sc-siem-corvette/tests/test_search_scheduler.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services import search_scheduler
+from services.query_guard import limit_table
+from services.search_scheduler import BACKGROUND, INTERACTIVE, FairScheduler
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    """One global slot, so waiting calls are granted one at a time in scheduling order."""
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_ENABLED", True)
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_TENANT_MAX_IN_FLIGHT", 10)
+    monkeypatch.setattr(limit_table, "rows", {})
+
+
+async def _served_order(scheduler: FairScheduler, calls) -> list:
+    """Queues `calls` ((client_id, lane) pairs) behind a held slot, frees it, and returns the order they ran in."""
+    order, held = [], asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("holder"):
+            await held.wait()
+
+    async def call(client_id, lane):
+        async with scheduler.slot(client_id, lane):
+            order.append((client_id, lane))
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(call(client_id, lane)) for client_id, lane in calls]
+    await asyncio.sleep(0)
+    assert scheduler.queued == len(calls)
+    held.set()
+    await asyncio.gather(first, *tasks)
+    return [client_id for client_id, lane in order]
+
+
+def test_a_backlogged_tenant_does_not_delay_another_tenant(one_slot):
+    scheduler = FairScheduler()
+    order = asyncio.run(_served_order(scheduler, [("a", INTERACTIVE)] * 4 + [("b", INTERACTIVE)] * 2))
+    # b arrived behind all of a's calls, but takes turns with a instead of waiting for them.
+    assert order == ["a", "b", "a", "b", "a", "a"]
+    assert scheduler.in_flight == 0 and scheduler.queued == 0
+
+
+def test_slots_are_shared_in_proportion_to_tenant_weight(one_slot, monkeypatch):
+    monkeypatch.setattr(limit_table, "rows", {"b": {"weight": 2.0}})
+    order = asyncio.run(_served_order(FairScheduler(), [("a", INTERACTIVE)] * 3 + [("b", INTERACTIVE)] * 6))
+    assert order[:6].count("b") == 4
+
+
+def test_interactive_calls_are_served_before_background_calls(one_slot):
+    calls = [("jobs", BACKGROUND)] * 2 + [("a", INTERACTIVE), ("b", INTERACTIVE)]
+    assert asyncio.run(_served_order(FairScheduler(), calls)) == ["a", "b", "jobs", "jobs"]
+
+
+def test_background_calls_leave_room_for_interactive_ones(one_slot, monkeypatch):
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_MAX_IN_FLIGHT", 3)
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_BACKGROUND_MAX_IN_FLIGHT", 2)
+
+    async def run():
+        scheduler = FairScheduler()
+        for _ in range(2):
+            await scheduler.acquire("jobs", BACKGROUND)
+        blocked = asyncio.create_task(scheduler.acquire("jobs", BACKGROUND))
+        await asyncio.sleep(0)
+        await scheduler.acquire("a", INTERACTIVE)  # Granted at once despite the waiting background call
+        assert not blocked.done()
+        scheduler.release("jobs", BACKGROUND)
+        await blocked
+        return scheduler.lane_in_flight
+
+    assert asyncio.run(run()) == {INTERACTIVE: 1, BACKGROUND: 2}
+
+
+def test_a_tenant_with_a_full_queue_is_shed_with_429(one_slot, monkeypatch):
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_TENANT_MAX_QUEUED", 1)
+
+    async def run():
+        scheduler = FairScheduler()
+        await scheduler.acquire("a")
+        waiting = asyncio.create_task(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as shed:
+            await scheduler.acquire("a")
+        scheduler.release("a")
+        await waiting
+        return scheduler, shed.value
+
+    scheduler, error = asyncio.run(run())
+    assert error.status_code == 429 and error.headers["Retry-After"] == "1"
+    assert scheduler.shed_429 == 1 and scheduler.tenants["a"].shed == 1
+
+
+def test_a_full_queue_is_shed_with_503(one_slot, monkeypatch):
+    monkeypatch.setattr(search_scheduler, "SEARCH_SCHEDULER_MAX_QUEUED", 1)
+
+    async def run():
+        scheduler = FairScheduler()
+        await scheduler.acquire("a")
+        waiting = asyncio.create_task(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as shed:
+            await scheduler.acquire("b")
+        scheduler.release("a")
+        await waiting
+        return scheduler, shed.value
+
+    scheduler, error = asyncio.run(run())
+    assert error.status_code == 503 and "Retry-After" in error.headers
+    assert scheduler.shed_503 == 1 and scheduler.tenants["b"].shed == 1
+
+
+def test_a_call_that_waits_past_its_deadline_is_shed_with_503(one_slot, monkeypatch):
+    monkeypatch.setitem(search_scheduler.MAX_WAIT, INTERACTIVE, 0.01)
+
+    async def run():
+        scheduler = FairScheduler()
+        await scheduler.acquire("a")
+        with pytest.raises(HTTPException) as shed:
+            await scheduler.acquire("b")
+        scheduler.release("a")
+        return scheduler, shed.value
+
+    scheduler, error = asyncio.run(run())
+    assert error.status_code == 503
+    assert scheduler.queued == 0 and scheduler.in_flight == 0 and scheduler.shed_503 == 1
+
+
+def test_a_cancelled_call_gives_back_its_slot(one_slot):
+    async def run():
+        scheduler = FairScheduler()
+        started = asyncio.Event()
+
+        async def search():
+            async with scheduler.slot("a"):
+                started.set()
+                await asyncio.sleep(3600)
+
+        task = asyncio.create_task(search())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.in_flight == 0 and scheduler.tenants["a"].in_flight == 0
+
+
+def test_a_call_cancelled_while_waiting_leaves_the_queue(one_slot):
+    async def run():
+        scheduler = FairScheduler()
+        await scheduler.acquire("a")
+        waiting = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        queued = scheduler.queued
+        scheduler.release("a")
+        return scheduler, queued
+
+    scheduler, queued = asyncio.run(run())
+    assert queued == 0
+    assert scheduler.in_flight == 0 and scheduler.tenants["b"].in_flight == 0
+
+
+def test_a_call_cancelled_just_after_its_grant_releases_the_slot(one_slot):
+    async def run():
+        scheduler = FairScheduler()
+        await scheduler.acquire("a")
+
+        async def search():
+            async with scheduler.slot("b"):
+                pass
+
+        waiting = asyncio.create_task(search())
+        await asyncio.sleep(0)
+        scheduler.release("a")  # Grants b's slot before b's task gets to run
+        assert scheduler.tenants["b"].in_flight == 1
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.in_flight == 0 and scheduler.tenants["b"].in_flight == 0
@@ -0,0 +1,86 @@
+# sc-siem-corvette/tests/test_syslog_receiver.py
+from datetime import datetime, timezone
+
+from services import syslog_receiver
+from services.ip_list_service import IPListIndex, normalize_cidr
+from services.syslog_receiver import parse_message
+
+NOW = datetime(2026, 10, 18, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def test_rfc5424_message():
+    document = parse_message(
+        '<165>1 2026-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 '
+        '[exampleSDID@32473 iut="3" eventSource="Application"] An application event',
+        NOW,
+    )
+    assert document == {
+        "@timestamp": "2026-10-11T22:14:15.003000+00:00",
+        "message": "An application event",
+        "syslog_format": "rfc5424",
+        "facility": "local4",
+        "severity": "notice",
+        "host": "mymachine.example.com",
+        "program": "evntslog",
+        "msgid": "ID47",
+        "structured_data": '[exampleSDID@32473 iut="3" eventSource="Application"]',
+    }
+
+
+def test_rfc5424_timestamps_are_normalised_to_utc():
+    document = parse_message("<34>1 2026-10-11T22:14:15+02:00 host app 42 - - hi", NOW)
+    assert document["@timestamp"] == "2026-10-11T20:14:15+00:00"
+    assert document["pid"] == "42"
+
+
+def test_unreadable_rfc5424_timestamps_fall_back_to_now():
+    for timestamp in ("ABCDEFGHIJZ", "2026-02-30T00:00:00Z", "-"):
+        document = parse_message(f"<34>1 {timestamp} host app - - - hi", NOW)
+        assert document["@timestamp"] == NOW.isoformat()
+
+
+def test_rfc3164_message():
+    document = parse_message("<34>Oct 11 22:14:15 mymachine su[123]: 'su root' failed for lonvick", NOW)
+    assert document == {
+        "@timestamp": "2026-10-11T22:14:15+00:00",
+        "message": "'su root' failed for lonvick",
+        "syslog_format": "rfc3164",
+        "facility": "auth",
+        "severity": "crit",
+        "host": "mymachine",
+        "program": "su",
+        "pid": "123",
+    }
+
+
+def test_rfc3164_timestamp_from_the_future_belongs_to_last_year():
+    document = parse_message("<13>Dec 31 23:59:59 host app: late", NOW)
+    assert document["@timestamp"] == "2025-12-31T23:59:59+00:00"
+
+
+def test_unrecognised_message_is_kept_whole():
+    document = parse_message("<13>just some text", NOW)
+    assert document == {
+        "@timestamp": NOW.isoformat(),
+        "syslog_format": "raw",
+        "facility": "user",
+        "severity": "notice",
+        "message": "just some text",
+    }
+    assert parse_message("no priority at all", NOW)["message"] == "no priority at all"
+
+
+def test_sources_claimed_by_several_clients_are_refused(monkeypatch):
+    index = IPListIndex()
+    index._list("c1").apply("add", "source", normalize_cidr("10.1.2.3/32"))
+    index._list("c2").apply("add", "source", normalize_cidr("10.1.2.3/32"))
+    index._list("c1").apply("add", "source", normalize_cidr("10.9.0.0/16"))
+    index._list("c1").apply("add", "deny", normalize_cidr("10.9.9.0/24"))
+    monkeypatch.setattr(syslog_receiver, "ip_index", index)
+    monkeypatch.setattr(syslog_receiver, "SYSLOG_DEFAULT_CLIENT_ID", "fallback")
+    monkeypatch.setattr(syslog_receiver, "_source_clients", {})
+
+    assert syslog_receiver.resolve_client("10.1.2.3") is None
+    assert syslog_receiver.resolve_client("10.9.0.1") == "c1"
+    assert syslog_receiver.resolve_client("10.9.9.9") is None  # c1's own deny list still applies
+    assert syslog_receiver.resolve_client("192.0.2.1") == "fallback"
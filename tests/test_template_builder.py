@@ -0,0 +1,46 @@
+# sc-siem-corvette/tests/test_template_builder.py
+import copy
+
+from services.template_builder import build_template, diff_templates
+
+
+def _installed(desired: dict) -> dict:
+    """The desired template the way OpenSearch returns it: flat string settings plus defaults."""
+    installed = copy.deepcopy(desired)
+    installed["settings"] = {key: str(value) for key, value in desired["settings"].items()}
+    installed["settings"]["index.version.created"] = "136327827"
+    installed["aliases"] = {}
+    return installed
+
+
+def test_missing_template_differs_everywhere():
+    desired = build_template("syslog")
+    changes = diff_templates(desired, None)
+    paths = {change["path"] for change in changes}
+    assert {"order", "index_patterns", "settings.index.number_of_shards", "mappings.properties.message.type"} <= paths
+    assert all(change["installed"] is None for change in changes)
+
+
+def test_installed_copy_with_defaults_is_up_to_date():
+    desired = build_template("network", "fw")
+    assert diff_templates(desired, _installed(desired)) == []
+
+
+def test_nested_settings_compare_equal_to_flat_ones():
+    desired = build_template("syslog")
+    installed = _installed(desired)
+    installed["settings"] = {"index": {key[len("index."):]: value for key, value in installed["settings"].items()}}
+    assert diff_templates(desired, installed) == []
+
+
+def test_changed_values_are_reported_by_path():
+    desired = build_template("syslog")
+    installed = _installed(desired)
+    installed["settings"]["index.refresh_interval"] = "1s"
+    installed["mappings"]["properties"]["host"]["fields"]["keyword"]["eager_global_ordinals"] = False
+    installed["index_patterns"] = ["other-*"]
+    assert diff_templates(desired, installed) == [
+        {"path": "index_patterns", "installed": ["other-*"], "desired": ["syslog-*"]},
+        {"path": "mappings.properties.host.fields.keyword.eager_global_ordinals", "installed": False, "desired": True},
+        {"path": "settings.index.refresh_interval", "installed": "1s", "desired": desired["settings"]["index.refresh_interval"]},
+    ]
@@ -1,9 +1,32 @@
 # sc-siem-corvette/utils/hashing.py
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from typing import Optional, Tuple
+import asyncio
 import hashlib
+import threading
+import os
 
 # Use passlib for secure password hashing. Bcrypt is a good choice.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below BCRYPT_ROUNDS are reported by needs_update() and upgraded on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+# Bcrypt is deliberately CPU-heavy, so it runs on a small dedicated pool rather
+# than on the event loop. Once HASHING_MAX_PENDING calls are queued or running,
+# further calls are shed with 429 instead of piling up behind each other.
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", 2))
+HASHING_MAX_PENDING = int(os.getenv("HASHING_MAX_PENDING", 32))
+
+_hashing_executor = ThreadPoolExecutor(max_workers=HASHING_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+_pending_lock = threading.Lock()  # Calls finish on the pool's threads
 
 
 def _prepare_password(password: str) -> str:
@@ -24,3 +47,52 @@ def get_password_hash(password: str) -> str:
     """Generates a hash for a given password."""
     prepared_password = _prepare_password(password)
     return pwd_context.hash(prepared_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if its hash uses outdated parameters, returns a
+    replacement hash as well. The second item is None when no update is needed.
+    """
+    prepared_password = _prepare_password(plain_password)
+    return pwd_context.verify_and_update(prepared_password, hashed_password)
+
+
+def _release(_future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _run_in_hashing_pool(func, *args):
+    """
+    Runs a hashing call on the bcrypt pool, shedding load when it is saturated.
+    A call counts as pending until the pool is done with it, even when the
+    awaiting request was cancelled (e.g. the client disconnected) meanwhile.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= HASHING_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many concurrent login attempts. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    future = _hashing_executor.submit(func, *args)
+    future.add_done_callback(_release)  # Also runs when a queued call is cancelled before it started
+    return await asyncio.wrap_future(future)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Async variant of verify_and_update_password, executed on the bcrypt pool."""
+    return await _run_in_hashing_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Async variant of get_password_hash, executed on the bcrypt pool."""
+    return await _run_in_hashing_pool(get_password_hash, password)
+
+
+def hashing_stats() -> dict:
+    return {"workers": HASHING_WORKERS, "pending": _pending, "max_pending": HASHING_MAX_PENDING}
@@ -0,0 +1,138 @@
+# sc-siem-corvette/utils/helpers.py
+import re
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import Response
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson.
+    Used on hot paths that return plain dicts/lists, bypassing FastAPI's
+    response-model validation and its slower default encoder.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS, default=str)
+
+
+def get_path(source: dict, path: str) -> Any:
+    """Resolves a dotted field name such as 'host.name' inside a _source document."""
+    if path in source:
+        return source[path]
+    value: Any = source
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+# --- Time expressions ---
+# Discover time ranges use OpenSearch's formats: ISO-8601 timestamps, epoch
+# milliseconds, or date math such as "now-15m" and "now-1d/d".
+
+_DATE_MATH_RE = re.compile(r"^now(?P<ops>(?:[+-]\d+[yMwdhHms])*)(?:/(?P<round>[yMwdhHms]))?$")
+_DATE_MATH_OP_RE = re.compile(r"([+-])(\d+)([yMwdhHms])")
+
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "H": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def _shift(value: datetime, sign: int, amount: int, unit: str) -> datetime:
+    if unit in _UNIT_SECONDS:
+        return value + sign * timedelta(seconds=amount * _UNIT_SECONDS[unit])
+    months = value.month - 1 + sign * amount * (12 if unit == "y" else 1)
+    year, month = value.year + months // 12, months % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def _round_down(value: datetime, unit: str) -> datetime:
+    if unit == "s":
+        return value.replace(microsecond=0)
+    if unit == "m":
+        return value.replace(second=0, microsecond=0)
+    if unit in ("h", "H"):
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "d":
+        return day
+    if unit == "w":
+        return day - timedelta(days=day.weekday())
+    if unit == "M":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treats naive datetimes (as returned by some database drivers) as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def parse_time_expression(value: Any, now: Optional[datetime] = None, round_up: bool = False) -> Optional[datetime]:
+    """
+    Parses an OpenSearch time value into an aware UTC datetime.
+    With round_up=True, date-math rounding ("/d") resolves to the end of the
+    unit, as OpenSearch does for the upper bound of a range.
+    Returns None for anything that cannot be interpreted.
+    """
+    if value is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    text = str(value).strip()
+
+    # Out-of-range input ("now-99999y", huge epochs) raises from datetime arithmetic rather than parsing.
+    try:
+        if text.isdigit():
+            return datetime.fromtimestamp(int(text) / 1000, tz=timezone.utc)
+
+        match = _DATE_MATH_RE.match(text)
+        if match:
+            result = now
+            for sign, amount, unit in _DATE_MATH_OP_RE.findall(match.group("ops") or ""):
+                result = _shift(result, 1 if sign == "+" else -1, int(amount), unit)
+            unit = match.group("round")
+            if unit:
+                rounded = _round_down(result, unit)
+                if round_up:
+                    rounded = _shift(rounded, 1, 1, unit) - timedelta(milliseconds=1)
+                result = rounded
+            return result
+
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+# --- Histogram intervals ---
+
+_INTERVAL_RE = re.compile(r"^(\d+)([smhdw])$")
+
+# Intervals an automatic histogram may pick, from finest to coarsest.
+NICE_INTERVALS = [
+    "1s", "5s", "10s", "30s", "1m", "5m", "10m", "30m", "1h", "3h", "12h", "1d", "7d",
+]
+
+
+def interval_seconds(interval: str) -> Optional[int]:
+    """Converts a fixed interval such as '5m' to seconds, or None when it is not one (or is zero)."""
+    match = _INTERVAL_RE.match(interval.strip()) if interval else None
+    if not match:
+        return None
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)] or None
+
+
+def auto_interval(span_seconds: float, target_buckets: int, minimum_seconds: int = 1) -> str:
+    """Picks the finest nice interval that keeps a span at or below the target bucket count."""
+    for interval in NICE_INTERVALS:
+        seconds = interval_seconds(interval)
+        if seconds >= minimum_seconds and span_seconds / seconds <= target_buckets:
+            return interval
+    return NICE_INTERVALS[-1]
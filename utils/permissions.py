@@ -16,6 +16,7 @@ class Permissions(str, Enum):
     CAN_MANAGE_IPS = "can_manage_ips"
     CAN_VIEW_ALL_LOGS = "can_view_all_logs"
     CAN_VIEW_LOGS = "can_view_logs" # For regular users, potentially restricted
+    CAN_INGEST_LOGS = "can_ingest_logs"
 
     # Alerting
     CAN_SETUP_ALERTS = "can_setup_alerts"
@@ -0,0 +1,175 @@
+# sc-siem-corvette/utils/principal_cache.py
+import os
+import time
+import itertools
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils.permissions import Permissions
+from models.user import User
+from models.role import Role
+
+# How long (seconds) a resolved principal is trusted before it is reloaded.
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Immutable snapshot of an authenticated user and their resolved permissions.
+    This is what the authentication dependencies hand to routes instead of a
+    live SQLAlchemy User, so it can be cached and shared between requests.
+    """
+    user_id: int
+    username: str
+    client_id: Optional[str]
+    is_active: bool
+    role_id: Optional[int]
+    role_name: Optional[str]
+    permissions: FrozenSet[str]
+    token_type: Optional[str] = None
+
+    def has_permission(self, permission: Permissions) -> bool:
+        return permission.value in self.permissions
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        role = user.role
+        role_permissions = (role.permissions or {}) if role else {}
+        return cls(
+            user_id=user.id,
+            username=user.username,
+            client_id=user.client_id,
+            is_active=bool(user.is_active),
+            role_id=role.id if role else None,
+            role_name=role.name if role else None,
+            permissions=frozenset(name for name, granted in role_permissions.items() if granted),
+        )
+
+
+class PrincipalCache:
+    """
+    In-process TTL cache of principals keyed by the token subject (username).
+    Every invalidation bumps a generation counter. A principal loaded before
+    an invalidation is refused by put, so a request that read a user or role
+    just before another session committed a change cannot cache the old one.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def get(self, username: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal, generation: int):
+        """Caches a principal loaded while `generation` was current (read it before loading)."""
+        with self._lock:
+            if generation != self.generation:
+                self.stale_puts += 1
+                return
+            self._entries[principal.username] = (time.monotonic() + self.ttl, principal)
+
+    def invalidate_user(self, username: str):
+        with self._lock:
+            self.generation += 1
+            if self._entries.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_user_id(self, user_id: int):
+        self._invalidate_where(lambda p: p.user_id == user_id)
+
+    def invalidate_role(self, role_id: int):
+        self._invalidate_where(lambda p: p.role_id == role_id)
+
+    def _invalidate_where(self, predicate):
+        with self._lock:
+            self.generation += 1
+            stale = [name for name, (_, p) in self._entries.items() if predicate(p)]
+            for name in stale:
+                del self._entries[name]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+                "ttl_seconds": self.ttl,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL)
+
+
+def with_token_type(principal: Principal, token_type: str) -> Principal:
+    """Returns the cached principal tagged with the type of the presenting token."""
+    return replace(principal, token_type=token_type)
+
+
+# --- Invalidation hooks ---
+# Any write to a user or role drops the affected principals, whichever route
+# (or script) performs it. Changes are collected at flush and applied once the
+# transaction commits, so a concurrent request can't re-cache the old row
+# between the flush and the commit; a rollback discards them. A request that
+# read the old row before the commit is caught by the generation check in put.
+
+_PENDING_KEY = "principal_cache_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for target in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(target, User):
+            pending.add(("user", target.username))
+            # A renamed user must not stay reachable under the old token subject.
+            if target.id is not None:
+                pending.add(("user_id", target.id))
+        elif isinstance(target, Role) and target not in session.new:
+            pending.add(("role", target.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for kind, key in session.info.pop(_PENDING_KEY, ()):
+        if kind == "user":
+            principal_cache.invalidate_user(key)
+        elif kind == "user_id":
+            principal_cache.invalidate_user_id(key)
+        else:
+            principal_cache.invalidate_role(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)